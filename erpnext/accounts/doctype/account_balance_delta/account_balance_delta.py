@@ -0,0 +1,37 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class AccountBalanceDelta(Document):
+	# begin: auto-generated types
+	# This code is auto-generated. Do not modify anything in this block.
+
+	from typing import TYPE_CHECKING
+
+	if TYPE_CHECKING:
+		from frappe.types import DF
+
+		account: DF.Link | None
+		balance: DF.Currency
+		balance_in_account_currency: DF.Currency
+		balance_key: DF.Data | None
+		company: DF.Link | None
+		cost_center: DF.Link | None
+		party: DF.DynamicLink | None
+		party_type: DF.Link | None
+		posting_date: DF.Date | None
+	# end: auto-generated types
+
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_unique(
+		"Account Balance Delta",
+		["balance_key", "posting_date"],
+		constraint_name="unique_balance_key_date",
+	)
+	frappe.db.add_index("Account Balance Delta", ["account", "posting_date"])
@@ -0,0 +1,409 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+"""Balance store behind `get_balance_on`.
+
+Submitted GL Entries are summed per balance, i.e. per Company, Account, Party
+Type, Party and Cost Center, into one Account Balance Delta per posting date
+and one Account Balance Snapshot per month with postings. A snapshot holds the
+balance as on the last day of its month, so the balance as on any date is the
+latest snapshot of each balance before that month plus the deltas of the month.
+Amounts are rounded to the currency precision entry by entry, as the GL Entry
+query they replace did.
+"""
+
+import hashlib
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import cstr, flt, get_first_day, get_last_day, getdate, now
+
+BALANCE_FIELDS = ("company", "account", "party_type", "party", "cost_center")
+
+FIELDS = (
+	"name",
+	"creation",
+	"modified",
+	"owner",
+	"modified_by",
+	"balance_key",
+	*BALANCE_FIELDS,
+	"balance",
+	"balance_in_account_currency",
+)
+
+
+class AccountBalanceSnapshot(Document):
+	# begin: auto-generated types
+	# This code is auto-generated. Do not modify anything in this block.
+
+	from typing import TYPE_CHECKING
+
+	if TYPE_CHECKING:
+		from frappe.types import DF
+
+		account: DF.Link | None
+		balance: DF.Currency
+		balance_in_account_currency: DF.Currency
+		balance_key: DF.Data | None
+		company: DF.Link | None
+		cost_center: DF.Link | None
+		party: DF.DynamicLink | None
+		party_type: DF.Link | None
+		period_end: DF.Date | None
+	# end: auto-generated types
+
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_unique(
+		"Account Balance Snapshot",
+		["balance_key", "period_end"],
+		constraint_name="unique_balance_key_period_end",
+	)
+	frappe.db.add_index("Account Balance Snapshot", ["account", "period_end"])
+
+
+def get_balance_key(entry):
+	return hashlib.md5(
+		"\n".join(cstr(entry.get(field)) for field in BALANCE_FIELDS).encode()
+	).hexdigest()
+
+
+def get_entry_balances(entry, precision, sign=1):
+	"""Balance and balance in account currency moved by a GL Entry."""
+	return (
+		sign * (flt(entry.get("debit"), precision) - flt(entry.get("credit"), precision)),
+		sign
+		* (
+			flt(entry.get("debit_in_account_currency"), precision)
+			- flt(entry.get("credit_in_account_currency"), precision)
+		),
+	)
+
+
+def update_account_balances(gl_entries, sign=1):
+	"""Add submitted GL Entries to the balance store, or remove them with `sign=-1`."""
+	from erpnext.accounts.utils import get_currency_precision
+
+	precision = get_currency_precision()
+	changes = {}
+	for entry in gl_entries:
+		change = changes.setdefault(
+			(get_balance_key(entry), getdate(entry.get("posting_date"))),
+			frappe._dict(
+				values={field: cstr(entry.get(field)) for field in BALANCE_FIELDS},
+				balance=0.0,
+				balance_in_account_currency=0.0,
+			),
+		)
+		balance, balance_in_account_currency = get_entry_balances(entry, precision, sign)
+		change.balance += balance
+		change.balance_in_account_currency += balance_in_account_currency
+
+	for (balance_key, posting_date), change in changes.items():
+		if not change.balance and not change.balance_in_account_currency:
+			continue
+
+		add_to_delta(balance_key, posting_date, change)
+		add_to_snapshots(balance_key, posting_date, change)
+
+
+def remove_voucher_from_account_balances(voucher_type, voucher_no):
+	"""Remove the submitted GL Entries of a voucher before they are deleted."""
+	update_account_balances(
+		frappe.get_all(
+			"GL Entry",
+			filters={"voucher_type": voucher_type, "voucher_no": voucher_no, "is_cancelled": 0},
+			fields=[
+				*BALANCE_FIELDS,
+				"posting_date",
+				"debit",
+				"credit",
+				"debit_in_account_currency",
+				"credit_in_account_currency",
+			],
+		),
+		sign=-1,
+	)
+
+
+def add_to_delta(balance_key, posting_date, change):
+	name = frappe.db.get_value(
+		"Account Balance Delta", {"balance_key": balance_key, "posting_date": posting_date}
+	) or _create_balance_row(
+		"Account Balance Delta", balance_key, change.values, {"posting_date": posting_date}
+	)
+
+	add_to_balance_rows("Account Balance Delta", "name = %(name)s", {"name": name}, change)
+
+
+def add_to_snapshots(balance_key, posting_date, change):
+	"""Move the snapshot of the month of `posting_date` and every later one."""
+	period_end = get_last_day(posting_date)
+	condition = "balance_key = %(balance_key)s and period_end >= %(period_end)s"
+
+	if not frappe.db.exists(
+		"Account Balance Snapshot", {"balance_key": balance_key, "period_end": period_end}
+	):
+		# the first posting of the month, the delta already holds the change
+		opening = get_latest_snapshot(balance_key, get_first_day(posting_date))
+		month = frappe.db.sql(
+			"""
+			select sum(balance), sum(balance_in_account_currency)
+			from `tabAccount Balance Delta`
+			where balance_key = %s and posting_date between %s and %s
+			""",
+			(balance_key, get_first_day(posting_date), period_end),
+		)[0]
+		name = _create_balance_row(
+			"Account Balance Snapshot",
+			balance_key,
+			change.values,
+			{
+				"period_end": period_end,
+				"balance": flt(opening.balance) + flt(month[0]),
+				"balance_in_account_currency": flt(opening.balance_in_account_currency) + flt(month[1]),
+			},
+		)
+		if name:
+			condition = "balance_key = %(balance_key)s and period_end > %(period_end)s"
+
+	add_to_balance_rows(
+		"Account Balance Snapshot",
+		condition,
+		{"balance_key": balance_key, "period_end": period_end},
+		change,
+	)
+
+
+def get_latest_snapshot(balance_key, before):
+	return (
+		frappe.db.sql(
+			"""
+			select balance, balance_in_account_currency
+			from `tabAccount Balance Snapshot`
+			where balance_key = %s and period_end < %s
+			order by period_end desc
+			limit 1
+			""",
+			(balance_key, before),
+			as_dict=True,
+		)
+		or [frappe._dict()]
+	)[0]
+
+
+def add_to_balance_rows(doctype, condition, values, change):
+	frappe.db.sql(
+		f"""
+		update `tab{doctype}`
+		set balance = balance + %(balance)s,
+			balance_in_account_currency = balance_in_account_currency + %(balance_in_account_currency)s,
+			modified = %(modified)s
+		where {condition}
+		""",
+		{
+			**values,
+			"balance": change.balance,
+			"balance_in_account_currency": change.balance_in_account_currency,
+			"modified": now(),
+		},
+	)
+
+
+def _create_balance_row(doctype, balance_key, key_values, values):
+	"""Name of the new row, or of the row created meanwhile by a concurrent transaction.
+
+	Only a new row is returned for snapshots, which are created with their full balance.
+	"""
+	savepoint = "create_account_balance"
+	try:
+		frappe.db.savepoint(savepoint)
+		doc = frappe.get_doc(doctype=doctype, balance_key=balance_key, **key_values, **values)
+		doc.flags.ignore_permissions = True
+		doc.flags.ignore_links = True
+		doc.insert()
+		return doc.name
+	except frappe.UniqueValidationError:
+		frappe.db.rollback(save_point=savepoint)
+		if doctype == "Account Balance Delta":
+			return frappe.db.get_value(doctype, {"balance_key": balance_key, **values})
+
+
+def get_balance_from_store(conditions, date=None, in_account_currency=True):
+	"""Sum of the balances matching `conditions` on the alias `gle` as on `date`, or of every
+	posting if there is no date."""
+	field = "balance_in_account_currency" if in_account_currency else "balance"
+	conditions = " and ".join(conditions) or "1=1"
+
+	if not date:
+		return flt(
+			frappe.db.sql(
+				f"""
+				select sum(gle.{field})
+				from `tabAccount Balance Snapshot` gle
+				where {conditions}
+				and not exists (
+					select 1 from `tabAccount Balance Snapshot` later
+					where later.balance_key = gle.balance_key and later.period_end > gle.period_end
+				)
+				"""
+			)[0][0]
+		)
+
+	month_start = get_first_day(date)
+	snapshots = frappe.db.sql(
+		f"""
+		select sum(gle.{field})
+		from `tabAccount Balance Snapshot` gle
+		where {conditions} and gle.period_end < %(month_start)s
+		and not exists (
+			select 1 from `tabAccount Balance Snapshot` later
+			where later.balance_key = gle.balance_key
+			and later.period_end > gle.period_end and later.period_end < %(month_start)s
+		)
+		""",
+		{"month_start": month_start},
+	)[0][0]
+
+	deltas = frappe.db.sql(
+		f"""
+		select sum(gle.{field})
+		from `tabAccount Balance Delta` gle
+		where {conditions} and gle.posting_date between %(month_start)s and %(date)s
+		""",
+		{"month_start": month_start, "date": getdate(date)},
+	)[0][0]
+
+	return flt(snapshots) + flt(deltas)
+
+
+def get_expected_balances(company=None):
+	"""Deltas and snapshots computed from the GL Entries, keyed by (balance_key, date)."""
+	from erpnext.accounts.utils import get_currency_precision
+
+	precision = get_currency_precision()
+	entries = frappe.db.sql(
+		"""
+		select company, account, party_type, party, cost_center, posting_date,
+			sum(round(debit, %(precision)s)) - sum(round(credit, %(precision)s)) as balance,
+			sum(round(debit_in_account_currency, %(precision)s))
+				- sum(round(credit_in_account_currency, %(precision)s)) as balance_in_account_currency
+		from `tabGL Entry`
+		where is_cancelled = 0 {0}
+		group by company, account, party_type, party, cost_center, posting_date
+		order by posting_date
+		""".format(
+			"and company = %(company)s" if company else ""
+		),
+		{"precision": precision, "company": company},
+		as_dict=True,
+	)
+
+	deltas, snapshots, latest = {}, {}, {}
+	for entry in entries:
+		balance_key = get_balance_key(entry)
+		delta = deltas.setdefault(
+			(balance_key, getdate(entry.posting_date)),
+			frappe._dict(
+				{field: cstr(entry.get(field)) for field in BALANCE_FIELDS},
+				balance_key=balance_key,
+				balance=0.0,
+				balance_in_account_currency=0.0,
+			),
+		)
+		delta.balance += flt(entry.balance)
+		delta.balance_in_account_currency += flt(entry.balance_in_account_currency)
+
+		period_end = get_last_day(entry.posting_date)
+		if (balance_key, period_end) not in snapshots:
+			# entries are in posting date order, carry the previous month forward
+			previous = latest.get(balance_key) or frappe._dict()
+			snapshots[(balance_key, period_end)] = latest[balance_key] = frappe._dict(
+				delta,
+				balance=flt(previous.balance),
+				balance_in_account_currency=flt(previous.balance_in_account_currency),
+			)
+
+		snapshot = snapshots[(balance_key, period_end)]
+		snapshot.balance += flt(entry.balance)
+		snapshot.balance_in_account_currency += flt(entry.balance_in_account_currency)
+
+	return deltas, snapshots
+
+
+def rebuild_account_balances(company=None):
+	"""Recompute the balance store from the GL Entries."""
+	deltas, snapshots = get_expected_balances(company)
+
+	for doctype, date_field, rows in (
+		("Account Balance Delta", "posting_date", deltas),
+		("Account Balance Snapshot", "period_end", snapshots),
+	):
+		frappe.db.delete(doctype, {"company": company} if company else None)
+
+		timestamp, user = now(), frappe.session.user
+		frappe.db.bulk_insert(
+			doctype,
+			fields=(*FIELDS, date_field),
+			values=[
+				(
+					frappe.generate_hash(length=10),
+					timestamp,
+					timestamp,
+					user,
+					user,
+					*(row.get(field) for field in FIELDS[5:]),
+					date,
+				)
+				for (balance_key, date), row in rows.items()
+			],
+		)
+
+
+def check_account_balances(company=None):
+	"""Deltas and snapshots that differ from the GL Entries, as `_dict(doctype, account, party_type,
+	party, cost_center, date, balance, expected_balance, balance_in_account_currency,
+	expected_balance_in_account_currency)`."""
+	from erpnext.accounts.utils import get_currency_precision
+
+	precision = get_currency_precision()
+	expected_deltas, expected_snapshots = get_expected_balances(company)
+
+	mismatches = []
+	for doctype, date_field, expected_rows in (
+		("Account Balance Delta", "posting_date", expected_deltas),
+		("Account Balance Snapshot", "period_end", expected_snapshots),
+	):
+		rows = {
+			(row.balance_key, getdate(row.get(date_field))): row
+			for row in frappe.get_all(
+				doctype,
+				filters={"company": company} if company else None,
+				fields=["balance_key", *BALANCE_FIELDS, date_field, "balance", "balance_in_account_currency"],
+			)
+		}
+
+		for key in set(rows) | set(expected_rows):
+			row = rows.get(key) or frappe._dict()
+			expected = expected_rows.get(key) or frappe._dict()
+			if flt(row.balance, precision) == flt(expected.balance, precision) and flt(
+				row.balance_in_account_currency, precision
+			) == flt(expected.balance_in_account_currency, precision):
+				continue
+
+			mismatches.append(
+				frappe._dict(
+					{field: row.get(field) or expected.get(field) for field in BALANCE_FIELDS},
+					doctype=doctype,
+					date=key[1],
+					balance=flt(row.balance),
+					expected_balance=flt(expected.balance),
+					balance_in_account_currency=flt(row.balance_in_account_currency),
+					expected_balance_in_account_currency=flt(expected.balance_in_account_currency),
+				)
+			)
+
+	return mismatches
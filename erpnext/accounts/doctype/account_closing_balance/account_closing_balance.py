@@ -113,6 +113,30 @@ def generate_key(entry, accounting_dimensions):
 	return tuple(key), key_values
 
 
+def get_last_period_closing_voucher(company, before_date):
+	"""Latest Period Closing Voucher of the company posted before `before_date` whose Account Closing
+	Balances can be used as an opening balance.
+
+	Returns None if closing balances are ignored in Accounts Settings or have not been made yet, as
+	while the closing entries of a large voucher are processed in the background.
+	"""
+	if frappe.db.get_single_value("Accounts Settings", "ignore_account_closing_balance"):
+		return
+
+	last_period_closing_voucher = frappe.db.get_all(
+		"Period Closing Voucher",
+		filters={"docstatus": 1, "company": company, "posting_date": ("<", before_date)},
+		fields=["posting_date", "name"],
+		order_by="posting_date desc",
+		limit=1,
+	)
+
+	if last_period_closing_voucher and frappe.db.exists(
+		"Account Closing Balance", {"period_closing_voucher": last_period_closing_voucher[0].name}
+	):
+		return last_period_closing_voucher[0]
+
+
 def get_previous_closing_entries(company, closing_date, accounting_dimensions):
 	entries = []
 	last_period_closing_voucher = frappe.db.get_all(
@@ -32,6 +32,10 @@ from erpnext.assets.doctype.asset_depreciation_schedule.asset_depreciation_sched
 	get_depr_schedule,
 )
 from erpnext.controllers.accounts_controller import AccountsController
+from erpnext.selling.rental.security_deposit import (
+	clear_security_deposit_cache,
+	update_security_deposit_status,
+)
 
 
 class StockAccountInvalidTransaction(frappe.ValidationError):
@@ -220,73 +224,9 @@ class JournalEntry(AccountsController):
 	# mohan code
 	def validate_sales_order(self):
 		if self.master_order_id:
-			sales_order = frappe.get_doc('Sales Order', self.master_order_id)
-			journal_entries = frappe.get_all("Journal Entry",
-											filters={"master_order_id": self.master_order_id,
-													"security_deposite_type": "SD Amount Received From Client","docstatus":1},
-											fields=["name", "total_debit"])
-			journal_entries_outstanding = frappe.get_all("Journal Entry",
-											filters={"master_order_id": self.master_order_id,
-													"security_deposite_type": "Booking as Outstanding SD From Client","docstatus":1},
-											fields=["name", "total_debit"])
-
-			# Query Journal Entry records for damage and refund
-			journal_entries_damage = frappe.get_all("Journal Entry",
-													filters={"master_order_id": self.master_order_id,"docstatus":1,
-															"security_deposite_type": ["in", ["Adjusted Device Damage Charges", "Adjusted Against Sales Order Rental Charges"]]},
-													fields=["name", "total_debit"])
-
-			journal_entries_refund = frappe.get_all("Journal Entry",
-													filters={"master_order_id": self.master_order_id,"docstatus":1,
-															"security_deposite_type": "Refunding SD to Client"},
-													fields=["name", "total_debit"])
-
-			# Calculate total debit amounts
-			total_debit_amount = sum(journal_entry.total_debit for journal_entry in journal_entries)
-			total_debit_amount_damage = sum(journal_entry.total_debit for journal_entry in journal_entries_damage)
-			total_debit_amount_refund = sum(journal_entry.total_debit for journal_entry in journal_entries_refund)
-			# outstanding_amt = sum(journal_entry.total_debit for journal_entry in journal_entries_outstanding)
-			
-			# Update paid security deposit amount and adjustment amount fields
-			sales_order.paid_security_deposite_amount = total_debit_amount
-			sales_order.adjustment_amount = total_debit_amount_damage
-			# sales_order.outstanding_security_deposit_amount = outstanding_amt
-			security_deposit = float(sales_order.security_deposit)
-			# Calculate outstanding security deposit amount
-			outstanding_security_deposit_amount = float(sales_order.security_deposit) - total_debit_amount
-
-			# Update outstanding security deposit amount field
-			sales_order.outstanding_security_deposit_amount = outstanding_security_deposit_amount
-
-			# Update security deposit amount return to client field
-			sales_order.security_deposit_amount_return_to_client = total_debit_amount_refund
-
-			# Calculate refundable security deposit
-			# refundable_security_deposit = sales_order.paid_security_deposite_amount - sales_order.adjustment_amount - total_debit_amount_refund
-
-			# Update refundable security deposit field
-			sales_order.refundable_security_deposit = sales_order.paid_security_deposite_amount - sales_order.adjustment_amount - total_debit_amount_refund
-
-			# Determine security deposit status based on outstanding amount
-			if outstanding_security_deposit_amount == 0:
-				sales_order.security_deposit_status = 'Paid'
-			elif outstanding_security_deposit_amount == security_deposit:
-				sales_order.security_deposit_status = 'Unpaid'
-			else:
-				sales_order.security_deposit_status = 'Partially Paid'
-		# Convert strings to floats
-			security_deposit = float(sales_order.security_deposit)
-			rounded_total = float(sales_order.rounded_total)
-
-		# Perform addition
-		#total_rental_amount = security_deposit + rounded_total
-		# if sales_order.is_renewed == 0:
-			sales_order.total_rental_amount = float(sales_order.security_deposit) + float(sales_order.rounded_total)
-		else:
-			sales_order.total_rental_amount = float(sales_order.rounded_total)
-		# Assign the result back to sales_order.total_rental_amount
-		#sales_order.total_rental_amount = total_rental_amount        # Save changes to the document
-		sales_order.save()
+			# this entry changes the deposit totals of the order
+			clear_security_deposit_cache(self.master_order_id)
+			update_security_deposit_status(self.master_order_id)
 
 	def update_security_deposit_status_sales_order(self):
 		if self.sales_order_id and self.total_debit and self.security_deposite_type:
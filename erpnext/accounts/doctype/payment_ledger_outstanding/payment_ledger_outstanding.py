@@ -0,0 +1,318 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+"""Current outstanding of every voucher in the Payment Ledger.
+
+Payment Ledger Entries that are not delinked are summed per Company, Account,
+Party and against voucher, the outstanding that `get_voucher_outstandings`
+computes as on today. The latest posting date of the summed entries is kept
+too: a voucher that is settled today can only have had an outstanding on an
+earlier date if it has entries posted after that date. The entries posted by
+the against voucher itself are counted, without them the Accounts Receivable
+report books the other entries on their own vouchers. So are all the summed
+entries, a voucher without any left, e.g. once cancelled, is never open.
+"""
+
+import hashlib
+
+import frappe
+from frappe import qb
+from frappe.model.document import Document
+from frappe.query_builder import Case
+from frappe.query_builder.functions import Count, Max, Sum
+from frappe.utils import cint, cstr, flt, getdate, now
+
+OUTSTANDING_FIELDS = (
+	"company",
+	"account",
+	"account_type",
+	"party_type",
+	"party",
+	"against_voucher_type",
+	"against_voucher_no",
+)
+
+FIELDS = (
+	"name",
+	"creation",
+	"modified",
+	"owner",
+	"modified_by",
+	"outstanding_key",
+	*OUTSTANDING_FIELDS,
+	"posting_date",
+	"outstanding",
+	"outstanding_in_account_currency",
+	"entries",
+	"voucher_entries",
+)
+
+
+class PaymentLedgerOutstanding(Document):
+	# begin: auto-generated types
+	# This code is auto-generated. Do not modify anything in this block.
+
+	from typing import TYPE_CHECKING
+
+	if TYPE_CHECKING:
+		from frappe.types import DF
+
+		account: DF.Link | None
+		account_type: DF.Literal["Receivable", "Payable"]
+		against_voucher_no: DF.DynamicLink | None
+		against_voucher_type: DF.Link | None
+		company: DF.Link | None
+		entries: DF.Int
+		outstanding: DF.Currency
+		outstanding_in_account_currency: DF.Currency
+		outstanding_key: DF.Data | None
+		party: DF.DynamicLink | None
+		party_type: DF.Link | None
+		posting_date: DF.Date | None
+		voucher_entries: DF.Int
+	# end: auto-generated types
+
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_unique(
+		"Payment Ledger Outstanding", ["outstanding_key"], constraint_name="unique_outstanding_key"
+	)
+	frappe.db.add_index("Payment Ledger Outstanding", ["company", "account_type", "posting_date"])
+
+
+def get_outstanding_key(entry):
+	return hashlib.md5(
+		"\n".join(cstr(entry.get(field)) for field in OUTSTANDING_FIELDS).encode()
+	).hexdigest()
+
+
+def update_payment_ledger_outstanding(entries, sign=1):
+	"""Add Payment Ledger Entries to the outstanding of their vouchers, or remove them with
+	`sign=-1`."""
+	changes = {}
+	for entry in entries:
+		change = changes.setdefault(
+			get_outstanding_key(entry),
+			frappe._dict(
+				values={field: cstr(entry.get(field)) for field in OUTSTANDING_FIELDS},
+				posting_date=getdate(entry.get("posting_date")),
+				outstanding=0.0,
+				outstanding_in_account_currency=0.0,
+				entries=0,
+				voucher_entries=0,
+			),
+		)
+		change.posting_date = max(change.posting_date, getdate(entry.get("posting_date")))
+		change.outstanding += sign * flt(entry.get("amount"))
+		change.outstanding_in_account_currency += sign * flt(entry.get("amount_in_account_currency"))
+		change.entries += sign
+		if (entry.get("voucher_type"), entry.get("voucher_no")) == (
+			entry.get("against_voucher_type"),
+			entry.get("against_voucher_no"),
+		):
+			change.voucher_entries += sign
+
+	for outstanding_key, change in changes.items():
+		name = frappe.db.get_value(
+			"Payment Ledger Outstanding", {"outstanding_key": outstanding_key}
+		) or _create_outstanding(outstanding_key, change.values)
+
+		# the posting date only moves forward, removed entries still count as posted
+		frappe.db.sql(
+			"""
+			update `tabPayment Ledger Outstanding`
+			set outstanding = outstanding + %(outstanding)s,
+				outstanding_in_account_currency = outstanding_in_account_currency + %(outstanding_in_account_currency)s,
+				entries = entries + %(entries)s,
+				voucher_entries = voucher_entries + %(voucher_entries)s,
+				posting_date = greatest(coalesce(posting_date, %(posting_date)s), %(posting_date)s),
+				modified = %(modified)s
+			where name = %(name)s
+			""",
+			{
+				"outstanding": change.outstanding,
+				"outstanding_in_account_currency": change.outstanding_in_account_currency,
+				"entries": change.entries,
+				"voucher_entries": change.voucher_entries,
+				"posting_date": change.posting_date,
+				"modified": now(),
+				"name": name,
+			},
+		)
+
+
+def get_linked_entries(criterion):
+	"""Payment Ledger Entries matching `criterion` that are not delinked."""
+	ple = qb.DocType("Payment Ledger Entry")
+	return (
+		qb.from_(ple)
+		.select(
+			*(ple[field] for field in OUTSTANDING_FIELDS),
+			ple.voucher_type,
+			ple.voucher_no,
+			ple.posting_date,
+			ple.amount,
+			ple.amount_in_account_currency,
+		)
+		.where((ple.delinked == 0) & criterion)
+		.run(as_dict=True)
+	)
+
+
+def remove_voucher_from_payment_ledger_outstanding(voucher_type, voucher_no):
+	"""Remove the Payment Ledger Entries of a voucher before they are deleted."""
+	ple = qb.DocType("Payment Ledger Entry")
+	update_payment_ledger_outstanding(
+		get_linked_entries((ple.voucher_type == voucher_type) & (ple.voucher_no == voucher_no)),
+		sign=-1,
+	)
+
+
+def _create_outstanding(outstanding_key, key_values):
+	savepoint = "create_payment_ledger_outstanding"
+	try:
+		frappe.db.savepoint(savepoint)
+		doc = frappe.get_doc(
+			doctype="Payment Ledger Outstanding", outstanding_key=outstanding_key, **key_values
+		)
+		doc.flags.ignore_permissions = True
+		doc.flags.ignore_links = True
+		doc.insert()
+		return doc.name
+	except frappe.UniqueValidationError:
+		# created by a concurrent transaction
+		frappe.db.rollback(save_point=savepoint)
+		return frappe.db.get_value("Payment Ledger Outstanding", {"outstanding_key": outstanding_key})
+
+
+def get_open_vouchers_query(company, account_type, date):
+	"""Against vouchers that can have an outstanding as on `date`: those with an outstanding
+	today, with entries posted after `date` or without entries of their own. Vouchers without
+	any entries left are skipped."""
+	outstanding = qb.DocType("Payment Ledger Outstanding")
+	return (
+		qb.from_(outstanding)
+		.select(outstanding.against_voucher_no)
+		.distinct()
+		.where(
+			(outstanding.company == company)
+			& (outstanding.account_type == account_type)
+			& (outstanding.entries > 0)
+			& (
+				(outstanding.outstanding != 0)
+				| (outstanding.outstanding_in_account_currency != 0)
+				| (outstanding.posting_date > date)
+				| (outstanding.voucher_entries <= 0)
+			)
+		)
+	)
+
+
+def get_expected_outstandings(company=None):
+	"""Outstandings computed from the Payment Ledger Entries."""
+	ple = qb.DocType("Payment Ledger Entry")
+	query = (
+		qb.from_(ple)
+		.select(
+			*(ple[field] for field in OUTSTANDING_FIELDS),
+			Max(ple.posting_date).as_("posting_date"),
+			Sum(ple.amount).as_("outstanding"),
+			Sum(ple.amount_in_account_currency).as_("outstanding_in_account_currency"),
+			Count(ple.name).as_("entries"),
+			Sum(
+				Case()
+				.when(
+					(ple.voucher_type == ple.against_voucher_type) & (ple.voucher_no == ple.against_voucher_no),
+					1,
+				)
+				.else_(0)
+			).as_("voucher_entries"),
+		)
+		.where(ple.delinked == 0)
+		.groupby(*(ple[field] for field in OUTSTANDING_FIELDS))
+	)
+	if company:
+		query = query.where(ple.company == company)
+
+	return query.run(as_dict=True)
+
+
+def rebuild_payment_ledger_outstanding(company=None):
+	"""Recompute every outstanding from the Payment Ledger Entries."""
+	frappe.db.delete("Payment Ledger Outstanding", {"company": company} if company else None)
+
+	timestamp, user = now(), frappe.session.user
+	frappe.db.bulk_insert(
+		"Payment Ledger Outstanding",
+		fields=FIELDS,
+		values=[
+			(
+				frappe.generate_hash(length=10),
+				timestamp,
+				timestamp,
+				user,
+				user,
+				get_outstanding_key(row),
+				*(cstr(row.get(field)) for field in OUTSTANDING_FIELDS),
+				row.posting_date,
+				row.outstanding,
+				row.outstanding_in_account_currency,
+				row.entries,
+				row.voucher_entries,
+			)
+			for row in get_expected_outstandings(company)
+		],
+	)
+
+
+def check_payment_ledger_outstanding(company=None):
+	"""Outstandings that differ from the Payment Ledger Entries, as `_dict(company, account,
+	account_type, party_type, party, against_voucher_type, against_voucher_no, outstanding,
+	expected_outstanding, entries, expected_entries, voucher_entries, expected_voucher_entries)`."""
+	precision = frappe.get_precision("Payment Ledger Outstanding", "outstanding") or 2
+
+	rows = {
+		row.outstanding_key: row
+		for row in frappe.get_all(
+			"Payment Ledger Outstanding",
+			filters={"company": company} if company else None,
+			fields=[
+				"outstanding_key",
+				*OUTSTANDING_FIELDS,
+				"outstanding",
+				"outstanding_in_account_currency",
+				"entries",
+				"voucher_entries",
+			],
+		)
+	}
+	expected_rows = {get_outstanding_key(row): row for row in get_expected_outstandings(company)}
+
+	mismatches = []
+	for outstanding_key in set(rows) | set(expected_rows):
+		row = rows.get(outstanding_key) or frappe._dict()
+		expected = expected_rows.get(outstanding_key) or frappe._dict()
+		if (
+			flt(row.outstanding, precision) == flt(expected.outstanding, precision)
+			and flt(row.outstanding_in_account_currency, precision)
+			== flt(expected.outstanding_in_account_currency, precision)
+			and cint(row.entries) == cint(expected.entries)
+			and cint(row.voucher_entries) == cint(expected.voucher_entries)
+		):
+			continue
+
+		mismatches.append(
+			frappe._dict(
+				{field: row.get(field) or expected.get(field) for field in OUTSTANDING_FIELDS},
+				outstanding=flt(row.outstanding),
+				expected_outstanding=flt(expected.outstanding),
+				entries=cint(row.entries),
+				expected_entries=cint(expected.entries),
+				voucher_entries=cint(row.voucher_entries),
+				expected_voucher_entries=cint(expected.voucher_entries),
+			)
+		)
+
+	return mismatches
@@ -317,6 +317,56 @@ class TestPeriodClosingVoucher(unittest.TestCase):
 		repost_doc.posting_date = today()
 		repost_doc.save()
 
+	def test_general_ledger_opening_from_closing_balance(self):
+		from erpnext.accounts.report.general_ledger.general_ledger import execute, prepare_filters
+
+		frappe.db.sql("delete from `tabGL Entry` where company='Test PCV Company'")
+		frappe.db.sql("delete from `tabPeriod Closing Voucher` where company='Test PCV Company'")
+		frappe.db.sql("delete from `tabAccount Closing Balance` where company='Test PCV Company'")
+
+		company = create_company()
+		cost_center = create_cost_center("Test Cost Center 1")
+
+		for posting_date, amount in (("2021-03-15", 400), ("2021-04-10", 100), ("2021-05-05", 50)):
+			jv = make_journal_entry(
+				posting_date=posting_date,
+				amount=amount,
+				account1="Cash - TPC",
+				account2="Sales - TPC",
+				cost_center=cost_center,
+				save=False,
+			)
+			jv.company = company
+			jv.save()
+			jv.submit()
+
+		pcv = self.make_period_closing_voucher(posting_date="2021-03-31")
+
+		filters = frappe._dict(
+			company=company,
+			from_date="2021-05-01",
+			to_date="2021-05-31",
+			account=["Cash - TPC"],
+			group_by="Group by Account",
+		)
+
+		prepared_filters, account_details = prepare_filters(frappe._dict(filters))
+		self.assertEqual(prepared_filters.period_closing_voucher, pcv.name)
+
+		columns, data = execute(frappe._dict(filters))
+		self.assertEqual(data[0]["debit"], 500)
+		self.assertEqual(data[-1]["debit"], 550)
+
+		frappe.db.set_single_value("Accounts Settings", "ignore_account_closing_balance", 1)
+		try:
+			prepared_filters, account_details = prepare_filters(frappe._dict(filters))
+			self.assertFalse(prepared_filters.period_closing_voucher)
+
+			columns, data_from_gl_entries = execute(frappe._dict(filters))
+			self.assertEqual(data_from_gl_entries, data)
+		finally:
+			frappe.db.set_single_value("Accounts Settings", "ignore_account_closing_balance", 0)
+
 	def make_period_closing_voucher(self, posting_date=None, submit=True):
 		surplus_account = create_account()
 		cost_center = create_cost_center("Test Cost Center 1")
@@ -6,6 +6,13 @@ from frappe import _, qb
 from frappe.model.document import Document
 from frappe.utils.data import comma_and
 
+from erpnext.accounts.doctype.account_balance_snapshot.account_balance_snapshot import (
+	remove_voucher_from_account_balances,
+)
+from erpnext.accounts.doctype.payment_ledger_outstanding.payment_ledger_outstanding import (
+	remove_voucher_from_payment_ledger_outstanding,
+)
+
 
 class RepostAccountingLedger(Document):
 	# begin: auto-generated types
@@ -154,7 +161,9 @@ def start_repost(account_repost_doc=str) -> None:
 				doc = frappe.get_doc(x.voucher_type, x.voucher_no)
 
 				if repost_doc.delete_cancelled_entries:
+					remove_voucher_from_account_balances(doc.doctype, doc.name)
 					frappe.db.delete("GL Entry", filters={"voucher_type": doc.doctype, "voucher_no": doc.name})
+					remove_voucher_from_payment_ledger_outstanding(doc.doctype, doc.name)
 					frappe.db.delete(
 						"Payment Ledger Entry", filters={"voucher_type": doc.doctype, "voucher_no": doc.name}
 					)
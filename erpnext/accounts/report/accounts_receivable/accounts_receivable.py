@@ -14,6 +14,9 @@ from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import (
 	get_accounting_dimensions,
 	get_dimension_with_children,
 )
+from erpnext.accounts.doctype.payment_ledger_outstanding.payment_ledger_outstanding import (
+	get_open_vouchers_query,
+)
 from erpnext.accounts.utils import get_currency_precision, get_party_types_from_account_type
 
 #  This report gives a summary of all Outstanding Invoices considering the following
@@ -398,14 +401,22 @@ class ReceivablePayableReport(object):
 
 	def get_invoice_details(self):
 		self.invoice_details = frappe._dict()
+		values = {"report_date": self.filters.report_date}
+		voucher_condition = parent_condition = ""
+		if self.open_vouchers_filter is not None:
+			# only the vouchers of the entries can become rows
+			values["vouchers"] = tuple({ple.voucher_no for ple in self.ple_entries}) or ("",)
+			voucher_condition = "and name in %(vouchers)s"
+			parent_condition = "and parent in %(vouchers)s"
+
 		if self.account_type == "Receivable":
 			si_list = frappe.db.sql(
-				"""
+				f"""
 				select name, due_date, po_no
 				from `tabSales Invoice`
-				where posting_date <= %s
+				where posting_date <= %(report_date)s {voucher_condition}
 			""",
-				self.filters.report_date,
+				values,
 				as_dict=1,
 			)
 			for d in si_list:
@@ -414,11 +425,12 @@ class ReceivablePayableReport(object):
 			# Get Sales Team
 			if self.filters.show_sales_person:
 				sales_team = frappe.db.sql(
-					"""
+					f"""
 					select parent, sales_person
 					from `tabSales Team`
-					where parenttype = 'Sales Invoice'
+					where parenttype = 'Sales Invoice' {parent_condition}
 				""",
+					values,
 					as_dict=1,
 				)
 				for d in sales_team:
@@ -428,24 +440,24 @@ class ReceivablePayableReport(object):
 
 		if self.account_type == "Payable":
 			for pi in frappe.db.sql(
-				"""
+				f"""
 				select name, due_date, bill_no, bill_date
 				from `tabPurchase Invoice`
-				where posting_date <= %s
+				where posting_date <= %(report_date)s {voucher_condition}
 			""",
-				self.filters.report_date,
+				values,
 				as_dict=1,
 			):
 				self.invoice_details.setdefault(pi.name, pi)
 
 		# Invoices booked via Journal Entries
 		journal_entries = frappe.db.sql(
-			"""
+			f"""
 			select name, due_date, bill_no, bill_date
 			from `tabJournal Entry`
-			where posting_date <= %s
+			where posting_date <= %(report_date)s {voucher_condition}
 		""",
-			self.filters.report_date,
+			values,
 			as_dict=1,
 		)
 
@@ -774,6 +786,10 @@ class ReceivablePayableReport(object):
 		else:
 			self.qb_selection_filter.append(self.ple.posting_date.lte(self.filters.report_date))
 
+		self.open_vouchers_filter = self.get_open_vouchers_filter()
+		if self.open_vouchers_filter is not None:
+			self.qb_selection_filter.append(self.open_vouchers_filter)
+
 		ple = qb.DocType("Payment Ledger Entry")
 		query = (
 			qb.from_(ple)
@@ -813,6 +829,52 @@ class ReceivablePayableReport(object):
 
 		self.ple_entries = query.run(as_dict=True)
 
+	def get_open_vouchers_filter(self):
+		"""Filter on the against voucher of the entries that can reach a row with an outstanding as
+		on the report date, None if the filters split the entries of a voucher.
+
+		The open vouchers stay in subqueries, they are never fetched into the report."""
+		if self.filters.cost_center or self.filters.finance_book:
+			return
+
+		for dimension in get_accounting_dimensions(as_list=False):
+			if self.filters.get(dimension.fieldname):
+				return
+
+		open_vouchers = get_open_vouchers_query(
+			self.filters.company, self.account_type, self.filters.report_date
+		)
+
+		# payments against a return are booked on the row of the invoice it returns against
+		invoice = qb.DocType(
+			"Sales Invoice" if self.account_type == "Receivable" else "Purchase Invoice"
+		)
+		returns = qb.from_(invoice).where(
+			(invoice.is_return == 1)
+			& (invoice.docstatus == 1)
+			& (invoice.company == self.filters.company)
+			& (invoice.update_outstanding_for_self == 0)
+		)
+		returns_of_open = returns.select(invoice.name).where(invoice.return_against.isin(open_vouchers))
+		returned_by_open = returns.select(invoice.return_against).where(invoice.name.isin(open_vouchers))
+
+		def is_open(field):
+			return field.isin(open_vouchers) | field.isin(returns_of_open) | field.isin(returned_by_open)
+
+		# rows are keyed on the voucher of every entry, an open voucher's entries can land on
+		# the row of their own voucher and the entries of its own voucher decide if its row exists
+		linked = qb.DocType("Payment Ledger Entry").as_("linked")
+		linked_entries = qb.from_(linked).where(
+			(linked.delinked == 0)
+			& (linked.company == self.filters.company)
+			& (linked.account_type == self.account_type)
+			& (is_open(linked.voucher_no) | is_open(linked.against_voucher_no))
+		)
+
+		return self.ple.against_voucher_no.isin(
+			linked_entries.select(linked.voucher_no)
+		) | self.ple.against_voucher_no.isin(linked_entries.select(linked.against_voucher_no))
+
 	def get_sales_invoices_or_customers_based_on_sales_person(self):
 		if self.filters.get("sales_person"):
 			lft, rgt = frappe.db.get_value("Sales Person", self.filters.get("sales_person"), ["lft", "rgt"])
@@ -1,4 +1,5 @@
 import unittest
+from unittest.mock import patch
 
 import frappe
 from frappe import qb
@@ -7,8 +8,16 @@ from frappe.utils import add_days, flt, getdate, today
 
 from erpnext import get_default_cost_center
 from erpnext.accounts.doctype.payment_entry.payment_entry import get_payment_entry
+from erpnext.accounts.doctype.payment_ledger_outstanding.payment_ledger_outstanding import (
+	check_payment_ledger_outstanding,
+	get_open_vouchers_query,
+	rebuild_payment_ledger_outstanding,
+)
 from erpnext.accounts.doctype.sales_invoice.test_sales_invoice import create_sales_invoice
-from erpnext.accounts.report.accounts_receivable.accounts_receivable import execute
+from erpnext.accounts.report.accounts_receivable.accounts_receivable import (
+	ReceivablePayableReport,
+	execute,
+)
 from erpnext.accounts.test.accounts_mixin import AccountsTestMixin
 from erpnext.selling.doctype.sales_order.test_sales_order import make_sales_order
 
@@ -170,6 +179,65 @@ class TestAccountsReceivable(AccountsTestMixin, FrappeTestCase):
 			],
 		)
 
+	def test_open_vouchers_from_payment_ledger_outstanding(self):
+		filters = {
+			"company": self.company,
+			"report_date": today(),
+			"range1": 30,
+			"range2": 60,
+			"range3": 90,
+			"range4": 120,
+		}
+
+		def get_outstanding(voucher_no):
+			return frappe.db.get_value(
+				"Payment Ledger Outstanding",
+				{"company": self.company, "against_voucher_no": voucher_no},
+				["outstanding", "voucher_entries"],
+			)
+
+		settled = self.create_sales_invoice(no_payment_schedule=True)
+		pe = get_payment_entry("Sales Invoice", settled.name, bank_account=self.cash)
+		pe.paid_from = self.debit_to
+		pe.save().submit()
+		self.assertEqual(get_outstanding(settled.name), (0, 1))
+
+		si = self.create_sales_invoice(no_payment_schedule=True)
+		self.create_payment_entry(si.name)
+		cr_note = self.create_credit_note(si.name, do_not_submit=True)
+		cr_note.update_outstanding_for_self = False
+		cr_note.save().submit()
+		self.assertEqual(get_outstanding(si.name), (-40, 1))
+		self.assertFalse(check_payment_ledger_outstanding(self.company))
+
+		# the settled invoice is skipped, the rows match the full query
+		report = execute(filters)[1]
+		with patch.object(ReceivablePayableReport, "get_open_vouchers_filter", return_value=None):
+			self.assertEqual(report, execute(filters)[1])
+		self.assertEqual([row.voucher_no for row in report], [si.name])
+
+		pe.cancel()
+		self.assertEqual(get_outstanding(settled.name), (100, 1))
+		self.assertCountEqual([row.voucher_no for row in execute(filters)[1]], [settled.name, si.name])
+
+		# a cancelled voucher has no entries left and is not open anymore
+		cancelled = self.create_sales_invoice(no_payment_schedule=True)
+		cancelled.cancel()
+		self.assertEqual(get_outstanding(cancelled.name), (0, 0))
+		self.assertNotIn(
+			cancelled.name,
+			get_open_vouchers_query(self.company, "Receivable", today()).run(pluck=True),
+		)
+		self.assertFalse(check_payment_ledger_outstanding(self.company))
+
+		# drift is reported and repaired by a rebuild
+		frappe.db.set_value(
+			"Payment Ledger Outstanding", {"against_voucher_no": si.name}, "outstanding", 0
+		)
+		self.assertTrue(check_payment_ledger_outstanding(self.company))
+		rebuild_payment_ledger_outstanding(self.company)
+		self.assertFalse(check_payment_ledger_outstanding(self.company))
+
 	def test_cr_note_flag_to_update_self(self):
 		filters = {
 			"company": self.company,
@@ -7,6 +7,7 @@ from collections import defaultdict
 import frappe
 from frappe import _
 from frappe.query_builder import Criterion
+from frappe.query_builder.functions import Min, Sum
 from frappe.utils import flt, getdate
 
 import erpnext
@@ -341,6 +342,11 @@ def get_data(
 		end_date = filters.period_end_date
 
 	filters.end_date = end_date
+	opening_date = (
+		fiscal_year.year_start_date
+		if filters.filter_based_on == "Fiscal Year"
+		else filters.period_start_date
+	)
 
 	gl_entries_by_account = {}
 	for root in frappe.db.sql(
@@ -361,6 +367,7 @@ def get_data(
 			accounts,
 			ignore_closing_entries=False,
 			root_type=root_type,
+			opening_date=opening_date,
 		)
 
 	calculate_values(accounts_by_name, gl_entries_by_account, companies, filters, fiscal_year)
@@ -606,8 +613,12 @@ def set_gl_entries_by_account(
 	accounts,
 	ignore_closing_entries=False,
 	root_type=None,
+	opening_date=None,
 ):
-	"""Returns a dict like { "account": [gl entries], ... }"""
+	"""Returns a dict like { "account": [gl entries], ... }
+
+	The entries are summed per account and company, separately before and from `opening_date`.
+	A sum has the earliest posting date of its entries."""
 
 	company_lft, company_rgt = frappe.get_cached_value(
 		"Company", filters.get("company"), ["lft", "rgt"]
@@ -635,15 +646,13 @@ def set_gl_entries_by_account(
 			.inner_join(account)
 			.on(account.name == gle.account)
 			.select(
-				gle.posting_date,
+				Min(gle.posting_date).as_("posting_date"),
 				gle.account,
-				gle.debit,
-				gle.credit,
-				gle.is_opening,
+				Sum(gle.debit).as_("debit"),
+				Sum(gle.credit).as_("credit"),
 				gle.company,
-				gle.fiscal_year,
-				gle.debit_in_account_currency,
-				gle.credit_in_account_currency,
+				Sum(gle.debit_in_account_currency).as_("debit_in_account_currency"),
+				Sum(gle.credit_in_account_currency).as_("credit_in_account_currency"),
 				gle.account_currency,
 				account.account_name,
 				account.account_number,
@@ -655,7 +664,15 @@ def set_gl_entries_by_account(
 				& (account.lft >= root_lft)
 				& (account.rgt <= root_rgt)
 			)
-			.orderby(gle.account, gle.posting_date)
+			.groupby(
+				gle.account,
+				gle.company,
+				gle.account_currency,
+				account.account_name,
+				account.account_number,
+				gle.posting_date < getdate(opening_date),
+			)
+			.orderby(gle.account)
 		)
 
 		if root_type:
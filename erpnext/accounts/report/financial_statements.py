@@ -2,14 +2,20 @@
 # License: GNU General Public License v3. See license.txt
 
 
+import bisect
 import functools
 import math
 import re
 
 import frappe
 from frappe import _
+from frappe.query_builder import Case
+from frappe.query_builder.functions import Max, Min, Sum
 from frappe.utils import add_days, add_months, cint, cstr, flt, formatdate, get_first_day, getdate
 
+from erpnext.accounts.doctype.account_closing_balance.account_closing_balance import (
+	get_last_period_closing_voucher,
+)
 from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import (
 	get_accounting_dimensions,
 	get_dimension_with_children,
@@ -189,6 +195,7 @@ def get_data(
 			gl_entries_by_account,
 			ignore_closing_entries=ignore_closing_entries,
 			root_type=root_type,
+			period_cut_dates=get_period_cut_dates(period_list),
 		)
 
 	calculate_values(
@@ -221,6 +228,16 @@ def get_appropriate_currency(company, filters=None):
 		return frappe.get_cached_value("Company", company, "default_currency")
 
 
+def get_period_cut_dates(period_list):
+	"""Dates on which entries start or stop counting in a period: the start of every period, the
+	day after its end and the start of the year, before which entries are in the opening balance."""
+	cut_dates = {getdate(period_list[0].year_start_date)}
+	for period in period_list:
+		cut_dates.update((getdate(period.from_date), getdate(add_days(period.to_date, 1))))
+
+	return sorted(cut_dates)
+
+
 def calculate_values(
 	accounts_by_name,
 	gl_entries_by_account,
@@ -228,26 +245,54 @@ def calculate_values(
 	accumulated_values,
 	ignore_accumulated_values_for_fy,
 ):
-	for entries in gl_entries_by_account.values():
+	"""Add the entries of every account to its periods and its opening balance.
+
+	The entries are summed per period bucket, so all posting dates summed in an entry fall in the
+	same periods. Accumulated values are carried from period to period as running totals."""
+	periods = sorted(period_list, key=lambda period: period.to_date)
+	to_dates = [period.to_date for period in periods]
+	year_start_date = period_list[0].year_start_date
+
+	for account, entries in gl_entries_by_account.items():
+		d = accounts_by_name.get(account)
+		if not d:
+			frappe.msgprint(
+				_("Could not retrieve information for {0}.").format(account),
+				title="Error",
+				raise_exception=1,
+			)
+
+		# (fiscal year, amount) of the entries by the first period they count in
+		starting_amounts = [[] for period in periods]
+
 		for entry in entries:
-			d = accounts_by_name.get(entry.account)
-			if not d:
-				frappe.msgprint(
-					_("Could not retrieve information for {0}.").format(entry.account),
-					title="Error",
-					raise_exception=1,
-				)
-			for period in period_list:
-				# check if posting date is within the period
+			amount = flt(entry.debit) - flt(entry.credit)
+			index = bisect.bisect_left(to_dates, entry.posting_date)
 
-				if entry.posting_date <= period.to_date:
-					if (accumulated_values or entry.posting_date >= period.from_date) and (
+			if accumulated_values:
+				if index < len(periods):
+					starting_amounts[index].append((entry.fiscal_year, amount))
+			else:
+				for period in periods[index:]:
+					if entry.posting_date >= period.from_date and (
 						not ignore_accumulated_values_for_fy or entry.fiscal_year == period.to_date_fiscal_year
 					):
-						d[period.key] = d.get(period.key, 0.0) + flt(entry.debit) - flt(entry.credit)
+						d[period.key] = d.get(period.key, 0.0) + amount
+
+			if entry.posting_date < year_start_date:
+				d["opening_balance"] = d.get("opening_balance", 0.0) + amount
 
-			if entry.posting_date < period_list[0].year_start_date:
-				d["opening_balance"] = d.get("opening_balance", 0.0) + flt(entry.debit) - flt(entry.credit)
+		if accumulated_values:
+			# one running total per fiscal year if values are not accumulated across fiscal years
+			running_totals = {}
+			for period, amounts in zip(periods, starting_amounts):
+				for fiscal_year, amount in amounts:
+					fiscal_year = fiscal_year if ignore_accumulated_values_for_fy else None
+					running_totals[fiscal_year] = running_totals.get(fiscal_year, 0.0) + amount
+
+				fiscal_year = period.to_date_fiscal_year if ignore_accumulated_values_for_fy else None
+				if fiscal_year in running_totals:
+					d[period.key] = running_totals[fiscal_year]
 
 
 def accumulate_values_into_parents(accounts, accounts_by_name, period_list):
@@ -319,17 +364,15 @@ def prepare_data(accounts, balance_must_be, period_list, company_currency, accum
 
 def filter_out_zero_value_rows(data, parent_children_map, show_zero_values=False):
 	data_with_value = []
+	accounts_with_value = {row.get("account") for row in data if row.get("has_value")}
 	for d in data:
 		if show_zero_values or d.get("has_value"):
 			data_with_value.append(d)
 		else:
 			# show group with zero balance, if there are balances against child
-			children = [child.name for child in parent_children_map.get(d.get("account")) or []]
-			if children:
-				for row in data:
-					if row.get("account") in children and row.get("has_value"):
-						data_with_value.append(d)
-						break
+			children = parent_children_map.get(d.get("account")) or []
+			if any(child.name in accounts_with_value for child in children):
+				data_with_value.append(d)
 
 	return data_with_value
 
@@ -429,8 +472,12 @@ def set_gl_entries_by_account(
 	ignore_closing_entries=False,
 	ignore_opening_entries=False,
 	root_type=None,
+	period_cut_dates=None,
 ):
-	"""Returns a dict like { "account": [gl entries], ... }"""
+	"""Returns a dict like { "account": [gl entries], ... }
+
+	With `period_cut_dates` the entries of an account are summed per period bucket, see
+	`get_accounting_entries`."""
 	gl_entries = []
 
 	account_filters = {
@@ -455,20 +502,9 @@ def set_gl_entries_by_account(
 
 	if accounts_list:
 		# For balance sheet
-		ignore_closing_balances = frappe.db.get_single_value(
-			"Accounts Settings", "ignore_account_closing_balance"
-		)
-		if not from_date and not ignore_closing_balances:
-			last_period_closing_voucher = frappe.db.get_all(
-				"Period Closing Voucher",
-				filters={
-					"docstatus": 1,
-					"company": filters.company,
-					"posting_date": ("<", filters["period_start_date"]),
-				},
-				fields=["posting_date", "name"],
-				order_by="posting_date desc",
-				limit=1,
+		if not from_date:
+			last_period_closing_voucher = get_last_period_closing_voucher(
+				filters.company, filters["period_start_date"]
 			)
 			if last_period_closing_voucher:
 				gl_entries += get_accounting_entries(
@@ -478,9 +514,10 @@ def set_gl_entries_by_account(
 					accounts_list,
 					filters,
 					ignore_closing_entries,
-					last_period_closing_voucher[0].name,
+					last_period_closing_voucher.name,
+					period_cut_dates=period_cut_dates,
 				)
-				from_date = add_days(last_period_closing_voucher[0].posting_date, 1)
+				from_date = add_days(last_period_closing_voucher.posting_date, 1)
 				ignore_opening_entries = True
 
 		gl_entries += get_accounting_entries(
@@ -491,6 +528,7 @@ def set_gl_entries_by_account(
 			filters,
 			ignore_closing_entries,
 			ignore_opening_entries=ignore_opening_entries,
+			period_cut_dates=period_cut_dates,
 		)
 
 		if filters and filters.get("presentation_currency"):
@@ -511,11 +549,16 @@ def get_accounting_entries(
 	ignore_closing_entries,
 	period_closing_voucher=None,
 	ignore_opening_entries=False,
+	period_cut_dates=None,
 ):
+	"""Entries of the accounts, or with `period_cut_dates` their sums per account, account
+	currency, fiscal year and bucket of posting dates between consecutive cut dates. A sum has
+	the earliest posting date of its entries."""
 	gl_entry = frappe.qb.DocType(doctype)
-	query = (
-		frappe.qb.from_(gl_entry)
-		.select(
+	query = frappe.qb.from_(gl_entry).where(gl_entry.company == filters.company)
+
+	if period_cut_dates is None:
+		query = query.select(
 			gl_entry.account,
 			gl_entry.debit,
 			gl_entry.credit,
@@ -523,18 +566,39 @@ def get_accounting_entries(
 			gl_entry.credit_in_account_currency,
 			gl_entry.account_currency,
 		)
-		.where(gl_entry.company == filters.company)
-	)
+	else:
+		query = query.select(
+			gl_entry.account,
+			Sum(gl_entry.debit).as_("debit"),
+			Sum(gl_entry.credit).as_("credit"),
+			Sum(gl_entry.debit_in_account_currency).as_("debit_in_account_currency"),
+			Sum(gl_entry.credit_in_account_currency).as_("credit_in_account_currency"),
+			gl_entry.account_currency,
+		).groupby(gl_entry.account, gl_entry.account_currency)
 
 	if doctype == "GL Entry":
-		query = query.select(gl_entry.posting_date, gl_entry.is_opening, gl_entry.fiscal_year)
+		if period_cut_dates is None:
+			query = query.select(gl_entry.posting_date, gl_entry.is_opening, gl_entry.fiscal_year)
+		else:
+			period_bucket = Case()
+			for i, cut_date in enumerate(period_cut_dates):
+				period_bucket = period_bucket.when(gl_entry.posting_date < cut_date, i)
+			period_bucket = period_bucket.else_(len(period_cut_dates))
+
+			query = query.select(
+				Min(gl_entry.posting_date).as_("posting_date"), gl_entry.fiscal_year
+			).groupby(gl_entry.fiscal_year, period_bucket)
+
 		query = query.where(gl_entry.is_cancelled == 0)
 		query = query.where(gl_entry.posting_date <= to_date)
 
 		if ignore_opening_entries:
 			query = query.where(gl_entry.is_opening == "No")
 	else:
-		query = query.select(gl_entry.closing_date.as_("posting_date"))
+		if period_cut_dates is None:
+			query = query.select(gl_entry.closing_date.as_("posting_date"))
+		else:
+			query = query.select(Max(gl_entry.closing_date).as_("posting_date"))
 		query = query.where(gl_entry.period_closing_voucher == period_closing_voucher)
 
 	query = apply_additional_conditions(doctype, query, from_date, ignore_closing_entries, filters)
@@ -210,6 +210,46 @@ frappe.query_reports["General Ledger"] = {
 			fieldtype: "Check",
 		},
 	],
+
+	onload: function (report) {
+		report.page.add_menu_item(__("Export in Background"), function () {
+			frappe.prompt(
+				{
+					fieldname: "file_format",
+					label: __("File Format"),
+					fieldtype: "Select",
+					options: ["CSV", "Excel"],
+					default: "CSV",
+					reqd: 1,
+				},
+				(values) => {
+					frappe.call({
+						method: "erpnext.accounts.report.general_ledger.general_ledger.export_general_ledger",
+						args: {
+							filters: report.get_values(),
+							file_format: values.file_format,
+						},
+						callback: function () {
+							frappe.show_alert(
+								__("The General Ledger is being exported, you will be notified when it is ready")
+							);
+						},
+					});
+				},
+				__("Export General Ledger"),
+				__("Export")
+			);
+		});
+
+		frappe.realtime.off("general_ledger_export_ready");
+		frappe.realtime.on("general_ledger_export_ready", (data) => {
+			frappe.msgprint(
+				__("The General Ledger export is ready: {0}", [
+					`<a href="${encodeURI(data.file_url)}" target="_blank">${__("Download")}</a>`,
+				])
+			);
+		});
+	},
 };
 
 erpnext.utils.add_dimensions("General Ledger", 15);
@@ -6,9 +6,12 @@ from collections import OrderedDict
 
 import frappe
 from frappe import _, _dict
-from frappe.utils import cstr, getdate
+from frappe.utils import cint, cstr, getdate
 
 from erpnext import get_company_currency, get_default_company
+from erpnext.accounts.doctype.account_closing_balance.account_closing_balance import (
+	get_last_period_closing_voucher,
+)
 from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import (
 	get_accounting_dimensions,
 	get_dimension_with_children,
@@ -20,11 +23,26 @@ from erpnext.accounts.utils import get_account_currency
 # to cache translations
 TRANSLATIONS = frappe._dict()
 
+# GL Entries fetched per query when the report is streamed to a file
+GL_ENTRY_PAGE_LENGTH = 5000
+
 
 def execute(filters=None):
 	if not filters:
 		return [], []
 
+	filters, account_details = prepare_filters(filters)
+
+	columns = get_columns(filters)
+
+	update_translations()
+
+	res = get_result(filters, account_details)
+
+	return columns, res
+
+
+def prepare_filters(filters):
 	account_details = {}
 
 	if filters and filters.get("print_in_account_currency") and not filters.get("account"):
@@ -42,13 +60,9 @@ def execute(filters=None):
 
 	filters = set_account_currency(filters)
 
-	columns = get_columns(filters)
-
-	update_translations()
-
-	res = get_result(filters, account_details)
+	set_period_closing_voucher(filters)
 
-	return columns, res
+	return filters, account_details
 
 
 def update_translations():
@@ -160,17 +174,6 @@ def get_result(filters, account_details):
 
 def get_gl_entries(filters, accounting_dimensions):
 	currency_map = get_currency(filters)
-	select_fields = """, debit, credit, debit_in_account_currency,
-		credit_in_account_currency """
-
-	if filters.get("show_remarks"):
-		if remarks_length := frappe.db.get_single_value(
-			"Accounts Settings", "general_ledger_remarks_length"
-		):
-			select_fields += f",substr(remarks, 1, {remarks_length}) as 'remarks'"
-		else:
-			select_fields += """,remarks"""
-
 	order_by_statement = "order by posting_date, account, creation"
 
 	if filters.get("include_dimensions"):
@@ -181,36 +184,14 @@ def get_gl_entries(filters, accounting_dimensions):
 	if filters.get("group_by") == "Group by Account":
 		order_by_statement = "order by account, posting_date, creation"
 
-	if filters.get("include_default_book_entries"):
-		filters["company_fb"] = frappe.get_cached_value(
-			"Company", filters.get("company"), "default_finance_book"
-		)
-
-	dimension_fields = ""
-	if accounting_dimensions:
-		dimension_fields = ", ".join(accounting_dimensions) + ","
-
-	transaction_currency_fields = ""
-	if filters.get("add_values_in_transaction_currency"):
-		transaction_currency_fields = (
-			"debit_in_transaction_currency, credit_in_transaction_currency, transaction_currency,"
-		)
-
 	gl_entries = frappe.db.sql(
 		"""
-		select
-			name as gl_entry, posting_date, account, party_type, party,
-			voucher_type, voucher_subtype, voucher_no, {dimension_fields}
-			cost_center, project, {transaction_currency_fields}
-			against_voucher_type, against_voucher, account_currency,
-			against, is_opening, creation {select_fields}
+		select {select_fields}
 		from `tabGL Entry`
 		where company=%(company)s {conditions}
 		{order_by_statement}
 	""".format(
-			dimension_fields=dimension_fields,
-			transaction_currency_fields=transaction_currency_fields,
-			select_fields=select_fields,
+			select_fields=get_select_fields(filters, accounting_dimensions),
 			conditions=get_conditions(filters),
 			order_by_statement=order_by_statement,
 		),
@@ -218,15 +199,58 @@ def get_gl_entries(filters, accounting_dimensions):
 		as_dict=1,
 	)
 
+	if filters.get("period_closing_voucher"):
+		# after the GL Entries, so that they decide the order of the groups
+		gl_entries += get_closing_balance_entries(filters, accounting_dimensions)
+
 	if filters.get("presentation_currency"):
 		return convert_to_presentation_currency(gl_entries, currency_map)
 	else:
 		return gl_entries
 
 
+def get_select_fields(filters, accounting_dimensions):
+	select_fields = """, debit, credit, debit_in_account_currency,
+		credit_in_account_currency """
+
+	if filters.get("show_remarks"):
+		if remarks_length := frappe.db.get_single_value(
+			"Accounts Settings", "general_ledger_remarks_length"
+		):
+			select_fields += f",substr(remarks, 1, {remarks_length}) as 'remarks'"
+		else:
+			select_fields += """,remarks"""
+
+	dimension_fields = ""
+	if accounting_dimensions:
+		dimension_fields = ", ".join(accounting_dimensions) + ","
+
+	transaction_currency_fields = ""
+	if filters.get("add_values_in_transaction_currency"):
+		transaction_currency_fields = (
+			"debit_in_transaction_currency, credit_in_transaction_currency, transaction_currency,"
+		)
+
+	return """
+			name as gl_entry, posting_date, account, party_type, party,
+			voucher_type, voucher_subtype, voucher_no, {dimension_fields}
+			cost_center, project, {transaction_currency_fields}
+			against_voucher_type, against_voucher, account_currency,
+			against, is_opening, creation {select_fields}""".format(
+		dimension_fields=dimension_fields,
+		transaction_currency_fields=transaction_currency_fields,
+		select_fields=select_fields,
+	)
+
+
 def get_conditions(filters):
 	conditions = []
 
+	if filters.get("include_default_book_entries"):
+		filters["company_fb"] = frappe.get_cached_value(
+			"Company", filters.get("company"), "default_finance_book"
+		)
+
 	if filters.get("account"):
 		filters.account = get_accounts_with_children(filters.account)
 		conditions.append("account in %(account)s")
@@ -275,24 +299,14 @@ def get_conditions(filters):
 
 	conditions.append("(posting_date <=%(to_date)s or is_opening = 'Yes')")
 
+	if filters.get("period_closing_voucher"):
+		# entries until the closing are summed in its Account Closing Balances
+		conditions.append("posting_date > %(period_closing_date)s")
+
 	if filters.get("project"):
 		conditions.append("project in %(project)s")
 
-	if filters.get("include_default_book_entries"):
-		if filters.get("finance_book"):
-			if filters.get("company_fb") and cstr(filters.get("finance_book")) != cstr(
-				filters.get("company_fb")
-			):
-				frappe.throw(_("To use a different finance book, please uncheck 'Include Default FB Entries'"))
-			else:
-				conditions.append("(finance_book in (%(finance_book)s, '') OR finance_book IS NULL)")
-		else:
-			conditions.append("(finance_book in (%(company_fb)s, '') OR finance_book IS NULL)")
-	else:
-		if filters.get("finance_book"):
-			conditions.append("(finance_book in (%(finance_book)s, '') OR finance_book IS NULL)")
-		else:
-			conditions.append("(finance_book in ('') OR finance_book IS NULL)")
+	conditions.append(get_finance_book_condition(filters))
 
 	if not filters.get("show_cancelled_entries"):
 		conditions.append("is_cancelled = 0")
@@ -322,6 +336,97 @@ def get_conditions(filters):
 	return "and {}".format(" and ".join(conditions)) if conditions else ""
 
 
+def get_finance_book_condition(filters):
+	if filters.get("include_default_book_entries"):
+		if filters.get("finance_book"):
+			if filters.get("company_fb") and cstr(filters.get("finance_book")) != cstr(
+				filters.get("company_fb")
+			):
+				frappe.throw(_("To use a different finance book, please uncheck 'Include Default FB Entries'"))
+			else:
+				return "(finance_book in (%(finance_book)s, '') OR finance_book IS NULL)"
+		else:
+			return "(finance_book in (%(company_fb)s, '') OR finance_book IS NULL)"
+	else:
+		if filters.get("finance_book"):
+			return "(finance_book in (%(finance_book)s, '') OR finance_book IS NULL)"
+		else:
+			return "(finance_book in ('') OR finance_book IS NULL)"
+
+
+def set_period_closing_voucher(filters):
+	"""Start the opening balance from the Account Closing Balances of the last Period Closing
+	Voucher before `from_date`, if the filters only use fields that the closing balances keep."""
+	if filters.get("group_by") == "Group by Party" or not (
+		filters.get("account") or filters.get("group_by") == "Group by Account"
+	):
+		# the opening balance is not shown or needs the party
+		return
+
+	for fieldname in (
+		"party_type",
+		"party",
+		"voucher_no",
+		"against_voucher_no",
+		"ignore_err",
+		"show_cancelled_entries",
+	):
+		if filters.get(fieldname):
+			return
+
+	from frappe.desk.reportview import build_match_conditions
+
+	if build_match_conditions("GL Entry"):
+		return
+
+	if period_closing_voucher := get_last_period_closing_voucher(filters.company, filters.from_date):
+		filters.period_closing_voucher = period_closing_voucher.name
+		filters.period_closing_date = period_closing_voucher.posting_date
+
+
+def get_closing_balance_entries(filters, accounting_dimensions):
+	"""Account Closing Balances of `filters.period_closing_voucher` as opening entries.
+
+	Expects the filters prepared by `get_conditions`, with accounts and tree dimensions expanded
+	to their children."""
+	conditions = ["period_closing_voucher = %(period_closing_voucher)s"]
+
+	for fieldname in ("account", "cost_center", "project"):
+		if filters.get(fieldname):
+			conditions.append(f"{fieldname} in %({fieldname})s")
+
+	conditions.append(get_finance_book_condition(filters))
+
+	for dimension in get_accounting_dimensions(as_list=False):
+		if (
+			not dimension.disabled
+			and dimension.document_type != "Finance Book"
+			and filters.get(dimension.fieldname)
+		):
+			conditions.append("{0} in %({0})s".format(dimension.fieldname))
+
+	group_by_fields = ["account", "account_currency"]
+	if accounting_dimensions:
+		group_by_fields += ["cost_center", *accounting_dimensions]
+
+	return frappe.db.sql(
+		"""
+		select
+			{group_by_fields}, closing_date as posting_date, 'No' as is_opening,
+			sum(debit) as debit, sum(credit) as credit,
+			sum(debit_in_account_currency) as debit_in_account_currency,
+			sum(credit_in_account_currency) as credit_in_account_currency
+		from `tabAccount Closing Balance`
+		where {conditions}
+		group by {group_by_fields}
+		order by account""".format(
+			group_by_fields=", ".join(group_by_fields), conditions=" and ".join(conditions)
+		),
+		filters,
+		as_dict=1,
+	)
+
+
 def get_accounts_with_children(accounts):
 	if not isinstance(accounts, list):
 		accounts = [d.strip() for d in accounts.strip().split(",") if d]
@@ -422,49 +527,19 @@ def get_accountwise_gle(filters, accounting_dimensions, gl_entries, gle_map):
 	group_by = group_by_field(filters.get("group_by"))
 	group_by_voucher_consolidated = filters.get("group_by") == "Group by Voucher (Consolidated)"
 
+	account_type_map = None
 	if filters.get("show_net_values_in_party_account"):
 		account_type_map = get_account_type_map(filters.get("company"))
 
 	def update_value_in_dict(data, key, gle):
-		data[key].debit += gle.debit
-		data[key].credit += gle.credit
-
-		data[key].debit_in_account_currency += gle.debit_in_account_currency
-		data[key].credit_in_account_currency += gle.credit_in_account_currency
-
-		if filters.get("show_net_values_in_party_account") and account_type_map.get(
-			data[key].account
-		) in ("Receivable", "Payable"):
-			net_value = data[key].debit - data[key].credit
-			net_value_in_account_currency = (
-				data[key].debit_in_account_currency - data[key].credit_in_account_currency
-			)
-
-			if net_value < 0:
-				dr_or_cr = "credit"
-				rev_dr_or_cr = "debit"
-			else:
-				dr_or_cr = "debit"
-				rev_dr_or_cr = "credit"
-
-			data[key][dr_or_cr] = abs(net_value)
-			data[key][dr_or_cr + "_in_account_currency"] = abs(net_value_in_account_currency)
-			data[key][rev_dr_or_cr] = 0
-			data[key][rev_dr_or_cr + "_in_account_currency"] = 0
-
-		if data[key].against_voucher and gle.against_voucher:
-			data[key].against_voucher += ", " + gle.against_voucher
+		update_totals(data, key, gle, account_type_map)
 
 	from_date, to_date = getdate(filters.from_date), getdate(filters.to_date)
 	show_opening_entries = filters.get("show_opening_entries")
 
 	for gle in gl_entries:
 		group_by_value = gle.get(group_by)
-		gle.voucher_type = _(gle.voucher_type)
-		gle.voucher_subtype = _(gle.voucher_subtype)
-		gle.against_voucher_type = _(gle.against_voucher_type)
-		gle.remarks = _(gle.remarks)
-		gle.party_type = _(gle.party_type)
+		translate_gle(gle)
 
 		if gle.posting_date < from_date or (cstr(gle.is_opening) == "Yes" and not show_opening_entries):
 			if not group_by_voucher_consolidated:
@@ -484,19 +559,7 @@ def get_accountwise_gle(filters, accounting_dimensions, gl_entries, gle_map):
 				gle_map[group_by_value].entries.append(gle)
 
 			elif group_by_voucher_consolidated:
-				keylist = [
-					gle.get("voucher_type"),
-					gle.get("voucher_no"),
-					gle.get("account"),
-					gle.get("party_type"),
-					gle.get("party"),
-				]
-				if filters.get("include_dimensions"):
-					for dim in accounting_dimensions:
-						keylist.append(gle.get(dim))
-					keylist.append(gle.get("cost_center"))
-
-				key = tuple(keylist)
+				key = get_consolidation_key(gle, filters, accounting_dimensions)
 				if key not in consolidated_gle:
 					consolidated_gle.setdefault(key, gle)
 				else:
@@ -510,6 +573,60 @@ def get_accountwise_gle(filters, accounting_dimensions, gl_entries, gle_map):
 	return totals, entries
 
 
+def get_consolidation_key(gle, filters, accounting_dimensions):
+	keylist = [
+		gle.get("voucher_type"),
+		gle.get("voucher_no"),
+		gle.get("account"),
+		gle.get("party_type"),
+		gle.get("party"),
+	]
+	if filters.get("include_dimensions"):
+		for dim in accounting_dimensions:
+			keylist.append(gle.get(dim))
+		keylist.append(gle.get("cost_center"))
+
+	return tuple(keylist)
+
+
+def update_totals(data, key, gle, account_type_map=None):
+	data[key].debit += gle.debit
+	data[key].credit += gle.credit
+
+	data[key].debit_in_account_currency += gle.debit_in_account_currency
+	data[key].credit_in_account_currency += gle.credit_in_account_currency
+
+	# `account_type_map` is only passed to show net values in party accounts
+	if account_type_map and account_type_map.get(data[key].account) in ("Receivable", "Payable"):
+		net_value = data[key].debit - data[key].credit
+		net_value_in_account_currency = (
+			data[key].debit_in_account_currency - data[key].credit_in_account_currency
+		)
+
+		if net_value < 0:
+			dr_or_cr = "credit"
+			rev_dr_or_cr = "debit"
+		else:
+			dr_or_cr = "debit"
+			rev_dr_or_cr = "credit"
+
+		data[key][dr_or_cr] = abs(net_value)
+		data[key][dr_or_cr + "_in_account_currency"] = abs(net_value_in_account_currency)
+		data[key][rev_dr_or_cr] = 0
+		data[key][rev_dr_or_cr + "_in_account_currency"] = 0
+
+	if data[key].against_voucher and gle.against_voucher:
+		data[key].against_voucher += ", " + gle.against_voucher
+
+
+def translate_gle(gle):
+	gle.voucher_type = _(gle.voucher_type)
+	gle.voucher_subtype = _(gle.voucher_subtype)
+	gle.against_voucher_type = _(gle.against_voucher_type)
+	gle.remarks = _(gle.remarks)
+	gle.party_type = _(gle.party_type)
+
+
 def get_account_type_map(company):
 	account_type_map = frappe._dict(
 		frappe.get_all(
@@ -537,11 +654,14 @@ def get_result_as_list(data, filters):
 	return data
 
 
-def get_supplier_invoice_details():
+def get_supplier_invoice_details(invoices=None):
 	inv_details = {}
 	for d in frappe.db.sql(
 		""" select name, bill_no from `tabPurchase Invoice`
-		where docstatus = 1 and bill_no is not null and bill_no != '' """,
+		where docstatus = 1 and bill_no is not null and bill_no != '' {0}""".format(
+			"and name in %(invoices)s" if invoices else ""
+		),
+		{"invoices": invoices},
 		as_dict=1,
 	):
 		inv_details[d.name] = d.bill_no
@@ -555,6 +675,375 @@ def get_balance(row, balance, debit_field, credit_field):
 	return balance
 
 
+@frappe.whitelist()
+def export_general_ledger(filters, file_format="CSV"):
+	"""Write the General Ledger to a private file in a background job."""
+	filters = frappe._dict(frappe.parse_json(filters))
+	frappe.has_permission("GL Entry", throw=True)
+	if file_format not in ("CSV", "Excel"):
+		frappe.throw(_("Invalid file format {0}").format(file_format))
+
+	frappe.enqueue(
+		build_general_ledger_file,
+		queue="long",
+		timeout=7200,
+		filters=filters,
+		file_format=file_format,
+	)
+
+
+def build_general_ledger_file(filters, file_format="CSV"):
+	filters, account_details = prepare_filters(frappe._dict(filters))
+	columns = get_columns(filters)
+	update_translations()
+
+	file_name = "{0}-{1}.{2}".format(
+		frappe.scrub(_("General Ledger")),
+		frappe.generate_hash(length=8),
+		"xlsx" if file_format == "Excel" else "csv",
+	)
+	path = frappe.get_site_path("private", "files", file_name)
+
+	write_rows = write_xlsx if file_format == "Excel" else write_csv
+	write_rows(path, columns, iterate_result(filters, account_details))
+
+	file = frappe.get_doc(
+		{
+			"doctype": "File",
+			"file_name": file_name,
+			"file_url": f"/private/files/{file_name}",
+			"is_private": 1,
+		}
+	).insert(ignore_permissions=True)
+
+	frappe.publish_realtime(
+		"general_ledger_export_ready", {"file_url": file.file_url}, user=frappe.session.user
+	)
+	return file
+
+
+def write_csv(path, columns, rows):
+	import csv
+
+	with open(path, "w", newline="", encoding="utf-8") as f:
+		writer = csv.writer(f)
+		writer.writerow([column["label"] for column in columns])
+		for row in rows:
+			writer.writerow([row.get(column["fieldname"]) for column in columns])
+
+
+def write_xlsx(path, columns, rows):
+	from openpyxl import Workbook
+
+	# write-only workbooks keep no rows in memory
+	workbook = Workbook(write_only=True)
+	sheet = workbook.create_sheet(_("General Ledger"))
+	sheet.append([column["label"] for column in columns])
+	for row in rows:
+		sheet.append([row.get(column["fieldname"]) for column in columns])
+
+	workbook.save(path)
+
+
+def iterate_result(filters, account_details):
+	"""Rows of `get_result`, computed page by page with memory bounded by the page length and the
+	entries of a single posting date.
+
+	Groups, and consolidated vouchers, are listed in the order of their group by field instead
+	of the order of their first posting, so that every group is contiguous in the stream.
+	"""
+	accounting_dimensions = []
+	if filters.get("include_dimensions"):
+		accounting_dimensions = get_accounting_dimensions()
+
+	group_by = group_by_field(filters.get("group_by"))
+	consolidated = filters.get("group_by") == "Group by Voucher (Consolidated)"
+	show_group_opening = not consolidated and filters.get("group_by") != "Group by Voucher"
+
+	account_type_map = None
+	if filters.get("show_net_values_in_party_account"):
+		account_type_map = get_account_type_map(filters.get("company"))
+
+	if filters.get("show_opening_entries"):
+		opening_condition = "posting_date < %(from_date)s"
+	else:
+		opening_condition = "(posting_date < %(from_date)s or is_opening = 'Yes')"
+
+	conditions = get_conditions(filters)
+	balance = RunningBalance(filters)
+	totals = get_totals_dict()
+
+	closing_balances = []
+	if filters.get("period_closing_voucher"):
+		closing_balances = get_closing_balance_entries(filters, accounting_dimensions)
+
+	account_currencies = None
+	if filters.get("presentation_currency"):
+		# converted as in `get_gl_entries`, which looks at the currencies of all entries at once
+		account_currencies = frappe.db.sql_list(
+			f"""select distinct account_currency from `tabGL Entry`
+			where company=%(company)s {conditions}""",
+			filters,
+		)
+		account_currencies = list({*account_currencies, *(d.account_currency for d in closing_balances)})
+		closing_balances = convert_to_presentation_currency(
+			closing_balances, get_currency(filters), account_currencies
+		)
+
+	entry_sort_key = get_entry_sort_key(filters)
+	if consolidated:
+
+		def sort_key(gle):
+			key = get_consolidation_key(gle, filters, accounting_dimensions)
+			return (tuple(cstr(value) for value in key), *entry_sort_key(gle))
+
+	elif group_by == "voucher_no":
+
+		def sort_key(gle):
+			return (gle.voucher_type, gle.voucher_no, *entry_sort_key(gle))
+
+	else:
+		sort_key = entry_sort_key
+
+	def iterate_entries(condition, values=None):
+		return iterate_gl_entries_by_date(
+			filters,
+			accounting_dimensions,
+			conditions,
+			condition,
+			account_currencies,
+			values=values,
+			sort_key=sort_key,
+		)
+
+	# the opening of the report and of every group comes first, sum it in a pass of its own
+	group_openings = {}
+
+	def add_to_group_opening(gle):
+		group_totals = group_openings.setdefault(cstr(gle.get(group_by)), get_totals_dict())
+		update_totals(group_totals, "opening", gle)
+		update_totals(group_totals, "closing", gle)
+
+	for gle in closing_balances:
+		update_totals(totals, "opening", gle)
+		update_totals(totals, "closing", gle)
+		# only accounts can be grouped by when starting from closing balances
+		if show_group_opening and group_by == "account":
+			add_to_group_opening(gle)
+
+	for entries in iterate_entries(opening_condition):
+		for gle in entries:
+			update_totals(totals, "opening", gle)
+			update_totals(totals, "closing", gle)
+			if show_group_opening:
+				add_to_group_opening(gle)
+
+	yield balance.apply(totals.opening)
+
+	condition = f"not {opening_condition}"
+	if show_group_opening:
+		# one pass per group, each seeking on the group by field and the posting date
+		pages = (
+			entries
+			for group_value in get_group_values(filters, conditions, condition, group_by)
+			for entries in iterate_entries(
+				f"{condition} and {get_group_condition(group_by, group_value)}",
+				values={"group_value": group_value},
+			)
+		)
+	else:
+		pages = iterate_entries(condition)
+
+	group, group_value = None, None
+	consolidated_gle, consolidated_key = None, None
+	for entries in pages:
+		balance.load_bill_nos(entries)
+
+		for gle in entries:
+			translate_gle(gle)
+
+			if consolidated:
+				key = get_consolidation_key(gle, filters, accounting_dimensions)
+				if consolidated_gle and consolidated_key == key:
+					update_totals({"gle": consolidated_gle}, "gle", gle, account_type_map)
+					continue
+
+				if consolidated_gle:
+					update_totals(totals, "total", consolidated_gle)
+					update_totals(totals, "closing", consolidated_gle)
+					yield balance.apply(consolidated_gle)
+
+				consolidated_gle, consolidated_key = gle, key
+				continue
+
+			if group is None or cstr(gle.get(group_by)) != group_value:
+				if group:
+					yield from get_group_closing_rows(group, show_group_opening, balance)
+
+				group_value = cstr(gle.get(group_by))
+				group = _dict(totals=group_openings.pop(group_value, None) or get_totals_dict())
+
+				yield balance.apply({})
+				if show_group_opening:
+					yield balance.apply(group.totals.opening)
+
+			update_totals(group.totals, "total", gle)
+			update_totals(group.totals, "closing", gle)
+			update_totals(totals, "total", gle)
+			update_totals(totals, "closing", gle)
+			yield balance.apply(gle)
+
+	if consolidated:
+		if consolidated_gle:
+			update_totals(totals, "total", consolidated_gle)
+			update_totals(totals, "closing", consolidated_gle)
+			yield balance.apply(consolidated_gle)
+	else:
+		if group:
+			yield from get_group_closing_rows(group, show_group_opening, balance)
+		yield balance.apply({})
+
+	yield balance.apply(totals.total)
+	yield balance.apply(totals.closing)
+
+
+def get_group_closing_rows(group, show_group_opening, balance):
+	yield balance.apply(group.totals.total)
+	if show_group_opening:
+		yield balance.apply(group.totals.closing)
+
+
+def get_entry_sort_key(filters):
+	"""Order of the GL Entries of a posting date, as in `get_gl_entries`."""
+	if filters.get("include_dimensions"):
+		return lambda gle: (gle.creation, gle.gl_entry)
+
+	return lambda gle: (gle.account, gle.creation, gle.gl_entry)
+
+
+def get_group_values(filters, conditions, condition, group_by):
+	"""Values of the `group_by` field of the GL Entries matching `condition`, sorted."""
+	values = frappe.db.sql_list(
+		f"""select distinct {group_by} from `tabGL Entry`
+		where company=%(company)s {conditions} and {condition}""",
+		filters,
+	)
+	return sorted({cstr(value) for value in values})
+
+
+def get_group_condition(group_by, group_value):
+	if group_value:
+		return f"{group_by} = %(group_value)s"
+
+	return f"({group_by} is null or {group_by} = '')"
+
+
+def iterate_gl_entries(
+	filters,
+	accounting_dimensions,
+	conditions,
+	condition,
+	account_currencies=None,
+	page_length=None,
+	values=None,
+):
+	"""Pages of the GL Entries of the report matching `condition`, sorted by posting date and name.
+
+	Pages are fetched with keyset pagination on the posting date index, which holds the name too:
+	every query seeks past the last entry of the previous page, so no query reads or sorts the
+	rows it does not return.
+	"""
+	page_length = page_length or GL_ENTRY_PAGE_LENGTH
+	currency_map = get_currency(filters) if filters.get("presentation_currency") else None
+
+	last = None
+	while True:
+		query_values = {**filters, **(values or {})}
+		keyset_condition = ""
+		if last:
+			# the posting date is bounded on its own so that its index can be used
+			keyset_condition = """and posting_date >= %(last_posting_date)s
+				and (posting_date > %(last_posting_date)s or name > %(last_name)s)"""
+			query_values.update(last_posting_date=last.posting_date, last_name=last.gl_entry)
+
+		entries = frappe.db.sql(
+			f"""
+			select {get_select_fields(filters, accounting_dimensions)}
+			from `tabGL Entry`
+			where company=%(company)s {conditions} and {condition} {keyset_condition}
+			order by posting_date, name
+			limit {cint(page_length)}
+			""",
+			query_values,
+			as_dict=1,
+		)
+
+		if not entries:
+			break
+
+		last = entries[-1]
+		if currency_map:
+			entries = convert_to_presentation_currency(entries, currency_map, account_currencies)
+
+		yield entries
+
+		if len(entries) < page_length:
+			break
+
+
+def iterate_gl_entries_by_date(*args, sort_key=None, **kwargs):
+	"""The entries of `iterate_gl_entries`, in one list per posting date sorted by `sort_key`."""
+	entries_of_date = []
+	for entries in iterate_gl_entries(*args, **kwargs):
+		for gle in entries:
+			if entries_of_date and entries_of_date[0].posting_date != gle.posting_date:
+				yield sorted(entries_of_date, key=sort_key)
+				entries_of_date = []
+
+			entries_of_date.append(gle)
+
+	if entries_of_date:
+		yield sorted(entries_of_date, key=sort_key)
+
+
+class RunningBalance:
+	"""Balance and supplier invoice no of the rows of `get_result_as_list`, row by row."""
+
+	def __init__(self, filters):
+		self.filters = filters
+		self.balance = 0
+		self.bill_nos = {}
+
+	def load_bill_nos(self, entries):
+		against_vouchers = list({d.against_voucher for d in entries if d.against_voucher})
+		self.bill_nos = dict.fromkeys(against_vouchers, "")
+		if against_vouchers:
+			self.bill_nos.update(get_supplier_invoice_details(against_vouchers))
+
+	def get_bill_no(self, against_voucher):
+		if not against_voucher:
+			return ""
+
+		if against_voucher not in self.bill_nos:
+			# a consolidated row carried over from an earlier page
+			self.bill_nos[against_voucher] = get_supplier_invoice_details([against_voucher]).get(
+				against_voucher, ""
+			)
+
+		return self.bill_nos[against_voucher]
+
+	def apply(self, row):
+		if not row.get("posting_date"):
+			self.balance = 0
+
+		self.balance = get_balance(row, self.balance, "debit", "credit")
+		row["balance"] = self.balance
+
+		row["account_currency"] = self.filters.account_currency
+		row["bill_no"] = self.get_bill_no(row.get("against_voucher"))
+		return row
+
+
 def get_columns(filters):
 	if filters.get("presentation_currency"):
 		currency = filters["presentation_currency"]
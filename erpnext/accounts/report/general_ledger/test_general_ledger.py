@@ -1,10 +1,14 @@
 # Copyright (c) 2022, Frappe Technologies Pvt. Ltd. and Contributors
 # MIT License. See license.txt
 
+from unittest.mock import patch
+
 import frappe
 from frappe.tests.utils import FrappeTestCase
-from frappe.utils import flt, today
+from frappe.utils import add_days, flt, today
 
+from erpnext.accounts.doctype.journal_entry.test_journal_entry import make_journal_entry
+from erpnext.accounts.report.general_ledger import general_ledger
 from erpnext.accounts.report.general_ledger.general_ledger import execute
 
 
@@ -250,3 +254,43 @@ class TestGeneralLedger(FrappeTestCase):
 			)
 		)
 		self.assertIn(revaluation_jv.name, set([x.voucher_no for x in data]))
+
+	def test_streamed_result(self):
+		for days in (-2, -1, 0, 0, 0):
+			make_journal_entry(
+				"_Test Bank - _TC",
+				"_Test Cash - _TC",
+				100 + days,
+				posting_date=add_days(today(), days),
+				submit=True,
+			)
+
+		filters = frappe._dict(
+			company="_Test Company",
+			from_date=add_days(today(), -1),
+			to_date=today(),
+			account=["_Test Bank - _TC"],
+		)
+
+		def get_rows(data):
+			return [
+				(
+					row.get("account"),
+					row.get("voucher_no"),
+					row.get("debit"),
+					row.get("credit"),
+					row.get("balance"),
+				)
+				for row in data
+			]
+
+		for group_by in ("Group by Account", "Group by Voucher", "Group by Voucher (Consolidated)"):
+			with self.subTest(group_by=group_by):
+				filters.group_by = group_by
+				columns, data = execute(frappe._dict(filters))
+
+				with patch.object(general_ledger, "GL_ENTRY_PAGE_LENGTH", 2):
+					prepared_filters, account_details = general_ledger.prepare_filters(frappe._dict(filters))
+					streamed = list(general_ledger.iterate_result(prepared_filters, account_details))
+
+				self.assertEqual(get_rows(streamed), get_rows(data))
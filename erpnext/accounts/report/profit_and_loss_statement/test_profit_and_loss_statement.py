@@ -1,12 +1,14 @@
 # Copyright (c) 2023, Frappe Technologies Pvt. Ltd. and Contributors
 # MIT License. See license.txt
 
+from unittest.mock import patch
+
 import frappe
 from frappe.tests.utils import FrappeTestCase
 from frappe.utils import add_days, getdate, today
 
 from erpnext.accounts.doctype.sales_invoice.test_sales_invoice import create_sales_invoice
-from erpnext.accounts.report.financial_statements import get_period_list
+from erpnext.accounts.report.financial_statements import get_data, get_period_list
 from erpnext.accounts.report.profit_and_loss_statement.profit_and_loss_statement import execute
 from erpnext.accounts.test.accounts_mixin import AccountsTestMixin
 
@@ -92,3 +94,34 @@ class TestProfitAndLossStatement(AccountsTestMixin, FrappeTestCase):
 				with self.subTest(current_period_key=current_period_key):
 					self.assertEqual(acc[current_period_key], 150)
 					self.assertEqual(acc["total"], 150)
+
+	def test_period_sums_match_entries(self):
+		self.create_sales_invoice(qty=1, rate=150)
+		self.create_sales_invoice(qty=2, rate=75.25)
+
+		filters = self.get_report_filters()
+		period_list = get_period_list(
+			filters.from_fiscal_year,
+			filters.to_fiscal_year,
+			filters.period_start_date,
+			filters.period_end_date,
+			filters.filter_based_on,
+			filters.periodicity,
+			company=filters.company,
+		)
+
+		for accumulated_values in (0, 1):
+			filters.accumulated_values = accumulated_values
+			with self.subTest(accumulated_values=accumulated_values):
+				result = get_data(self.company, "Income", "Credit", period_list, filters, accumulated_values)
+				# without cut dates every entry is added to the periods on its own
+				with patch(
+					"erpnext.accounts.report.financial_statements.get_period_cut_dates",
+					return_value=None,
+				):
+					expected = get_data(
+						self.company, "Income", "Credit", period_list, filters, accumulated_values
+					)
+
+				self.assertTrue(result)
+				self.assertEqual(result, expected)
@@ -152,6 +152,7 @@ class AccountsTestMixin:
 		doctype_list = [
 			"GL Entry",
 			"Payment Ledger Entry",
+			"Payment Ledger Outstanding",
 			"Sales Invoice",
 			"Purchase Invoice",
 			"Payment Entry",
@@ -13,6 +13,7 @@ from frappe.query_builder import AliasedQuery, Criterion, Table
 from frappe.query_builder.functions import Round, Sum
 from frappe.query_builder.utils import DocType
 from frappe.utils import (
+	add_days,
 	cint,
 	create_batch,
 	cstr,
@@ -30,7 +31,15 @@ import erpnext
 
 # imported to enable erpnext.accounts.utils.get_account_currency
 from erpnext.accounts.doctype.account.account import get_account_currency  # noqa
+from erpnext.accounts.doctype.account_balance_snapshot.account_balance_snapshot import (
+	remove_voucher_from_account_balances,
+)
 from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import get_dimensions
+from erpnext.accounts.doctype.payment_ledger_outstanding.payment_ledger_outstanding import (
+	get_linked_entries,
+	remove_voucher_from_payment_ledger_outstanding,
+	update_payment_ledger_outstanding,
+)
 from erpnext.stock import get_warehouse_account_map
 from erpnext.stock.utils import get_stock_value_on
 
@@ -196,12 +205,9 @@ def get_balance_on(
 	if not cost_center and frappe.form_dict.get("cost_center"):
 		cost_center = frappe.form_dict.get("cost_center")
 
-	cond = ["is_cancelled=0"]
-	if start_date:
-		cond.append("posting_date >= %s" % frappe.db.escape(cstr(start_date)))
-	if date:
-		cond.append("posting_date <= %s" % frappe.db.escape(cstr(date)))
-	else:
+	cond = []
+	balance_date = date
+	if not date:
 		# get balance of all entries that exist
 		date = nowdate()
 
@@ -285,24 +291,15 @@ def get_balance_on(
 		cond.append("""gle.company = %s """ % (frappe.db.escape(company)))
 
 	if account or (party_type and party) or account_type:
-		precision = get_currency_precision()
-		if in_account_currency:
-			select_field = (
-				"sum(round(debit_in_account_currency, %s)) - sum(round(credit_in_account_currency, %s))"
-			)
-		else:
-			select_field = "sum(round(debit, %s)) - sum(round(credit, %s))"
+		from erpnext.accounts.doctype.account_balance_snapshot.account_balance_snapshot import (
+			get_balance_from_store,
+		)
+
+		# the store is summed from the same rounded GL Entry amounts
+		bal = get_balance_from_store(cond, balance_date, in_account_currency)
+		if start_date:
+			bal -= get_balance_from_store(cond, add_days(start_date, -1), in_account_currency)
 
-		bal = frappe.db.sql(
-			"""
-			SELECT {0}
-			FROM `tabGL Entry` gle
-			WHERE {1}""".format(
-				select_field, " and ".join(cond)
-			),
-			(precision, precision),
-		)[0][0]
-		# if bal is None, return 0
 		return flt(bal)
 
 
@@ -809,21 +806,25 @@ def update_accounting_ledgers_after_reference_removal(
 
 	# Payment Ledger
 	ple = qb.DocType("Payment Ledger Entry")
+	criterion = (ple.against_voucher_type == ref_type) & (ple.against_voucher_no == ref_no)
+	if payment_name:
+		criterion &= ple.voucher_no == payment_name
+
+	# move the outstanding of the unlinked entries back to their own vouchers
+	unlinked_entries = get_linked_entries(criterion)
+	update_payment_ledger_outstanding(unlinked_entries, sign=-1)
+	for entry in unlinked_entries:
+		entry.against_voucher_type, entry.against_voucher_no = entry.voucher_type, entry.voucher_no
+	update_payment_ledger_outstanding(unlinked_entries)
+
 	ple_update_query = (
 		qb.update(ple)
 		.set(ple.against_voucher_type, ple.voucher_type)
 		.set(ple.against_voucher_no, ple.voucher_no)
 		.set(ple.modified, now())
 		.set(ple.modified_by, frappe.session.user)
-		.where(
-			(ple.against_voucher_type == ref_type)
-			& (ple.against_voucher_no == ref_no)
-			& (ple.delinked == 0)
-		)
+		.where(criterion & (ple.delinked == 0))
 	)
-
-	if payment_name:
-		ple_update_query = ple_update_query.where(ple.voucher_no == payment_name)
 	ple_update_query.run()
 
 
@@ -1365,6 +1366,7 @@ def repost_gle_for_stock_vouchers(
 
 
 def _delete_pl_entries(voucher_type, voucher_no):
+	remove_voucher_from_payment_ledger_outstanding(voucher_type, voucher_no)
 	ple = qb.DocType("Payment Ledger Entry")
 	qb.from_(ple).delete().where(
 		(ple.voucher_type == voucher_type) & (ple.voucher_no == voucher_no)
@@ -1372,6 +1374,7 @@ def _delete_pl_entries(voucher_type, voucher_no):
 
 
 def _delete_gl_entries(voucher_type, voucher_no):
+	remove_voucher_from_account_balances(voucher_type, voucher_no)
 	gle = qb.DocType("GL Entry")
 	qb.from_(gle).delete().where(
 		(gle.voucher_type == voucher_type) & (gle.voucher_no == voucher_no)
@@ -1715,6 +1718,9 @@ def create_payment_ledger_entry(
 			ple.flags.update_outstanding = update_outstanding
 			ple.submit()
 
+		if not cancel:
+			update_payment_ledger_outstanding(ple_map)
+
 
 def update_voucher_outstanding(voucher_type, voucher_no, account, party_type, party):
 	ple = frappe.qb.DocType("Payment Ledger Entry")
@@ -1757,27 +1763,30 @@ def update_voucher_outstanding(voucher_type, voucher_no, account, party_type, pa
 def delink_original_entry(pl_entry, partial_cancel=False):
 	if pl_entry:
 		ple = qb.DocType("Payment Ledger Entry")
+		criterion = (
+			(ple.company == pl_entry.company)
+			& (ple.account_type == pl_entry.account_type)
+			& (ple.account == pl_entry.account)
+			& (ple.party_type == pl_entry.party_type)
+			& (ple.party == pl_entry.party)
+			& (ple.voucher_type == pl_entry.voucher_type)
+			& (ple.voucher_no == pl_entry.voucher_no)
+			& (ple.against_voucher_type == pl_entry.against_voucher_type)
+			& (ple.against_voucher_no == pl_entry.against_voucher_no)
+		)
+
+		if partial_cancel:
+			criterion &= ple.voucher_detail_no == pl_entry.voucher_detail_no
+
+		update_payment_ledger_outstanding(get_linked_entries(criterion), sign=-1)
+
 		query = (
 			qb.update(ple)
 			.set(ple.delinked, True)
 			.set(ple.modified, now())
 			.set(ple.modified_by, frappe.session.user)
-			.where(
-				(ple.company == pl_entry.company)
-				& (ple.account_type == pl_entry.account_type)
-				& (ple.account == pl_entry.account)
-				& (ple.party_type == pl_entry.party_type)
-				& (ple.party == pl_entry.party)
-				& (ple.voucher_type == pl_entry.voucher_type)
-				& (ple.voucher_no == pl_entry.voucher_no)
-				& (ple.against_voucher_type == pl_entry.against_voucher_type)
-				& (ple.against_voucher_no == pl_entry.against_voucher_no)
-			)
+			.where(criterion)
 		)
-
-		if partial_cancel:
-			query = query.where(ple.voucher_detail_no == pl_entry.voucher_detail_no)
-
 		query.run()
 
 
@@ -2,10 +2,128 @@
 # GPL v3 License. See license.txt
 
 import click
+from frappe.commands import get_site, pass_context
 
 
 def call_command(cmd, context):
 	return click.Context(cmd, obj=context).forward(cmd)
 
 
-commands = []
+@click.command("check-batch-balances")
+@click.option("--rebuild", is_flag=True, default=False, help="Rebuild the balances if they differ")
+@pass_context
+def check_batch_balances(context, rebuild=False):
+	"Verify the Batch Warehouse Balances against the Serial and Batch Entries"
+	import frappe
+
+	from erpnext.stock.doctype.batch_warehouse_balance.batch_warehouse_balance import (
+		check_batch_balances,
+		rebuild_batch_balances,
+	)
+
+	site = get_site(context)
+	frappe.init(site=site)
+	frappe.connect()
+	try:
+		mismatches = check_batch_balances()
+		for d in mismatches:
+			click.echo(
+				f"{d.batch_no} in {d.warehouse}: qty {d.qty} (expected {d.expected_qty}), "
+				f"stock value {d.stock_value} (expected {d.expected_stock_value})"
+			)
+
+		if not mismatches:
+			click.secho("Batch Warehouse Balances are in sync", fg="green")
+		elif rebuild:
+			rebuild_batch_balances()
+			frappe.db.commit()
+			click.secho(f"Rebuilt Batch Warehouse Balances, {len(mismatches)} were out of sync", fg="green")
+		else:
+			click.secho(f"{len(mismatches)} Batch Warehouse Balances are out of sync", fg="red")
+			raise SystemExit(1)
+	finally:
+		frappe.destroy()
+
+
+@click.command("check-account-balances")
+@click.option("--company", help="Only check the balances of this company")
+@click.option("--rebuild", is_flag=True, default=False, help="Rebuild the balances if they differ")
+@pass_context
+def check_account_balances(context, company=None, rebuild=False):
+	"Verify the Account Balance Deltas and Snapshots against the GL Entries"
+	import frappe
+
+	from erpnext.accounts.doctype.account_balance_snapshot.account_balance_snapshot import (
+		check_account_balances,
+		rebuild_account_balances,
+	)
+
+	site = get_site(context)
+	frappe.init(site=site)
+	frappe.connect()
+	try:
+		mismatches = check_account_balances(company)
+		for d in mismatches:
+			party = f" {d.party_type} {d.party}" if d.party else ""
+			click.echo(
+				f"{d.doctype} of {d.account}{party} {d.cost_center or ''} on {d.date}: "
+				f"{d.balance} (expected {d.expected_balance})"
+			)
+
+		if not mismatches:
+			click.secho("Account balances are in sync", fg="green")
+		elif rebuild:
+			rebuild_account_balances(company)
+			frappe.db.commit()
+			click.secho(f"Rebuilt account balances, {len(mismatches)} were out of sync", fg="green")
+		else:
+			click.secho(f"{len(mismatches)} account balances are out of sync", fg="red")
+			raise SystemExit(1)
+	finally:
+		frappe.destroy()
+
+
+@click.command("check-payment-ledger-outstanding")
+@click.option("--company", help="Only check the outstanding of this company")
+@click.option(
+	"--rebuild", is_flag=True, default=False, help="Rebuild the outstanding if it differs"
+)
+@pass_context
+def check_payment_ledger_outstanding(context, company=None, rebuild=False):
+	"Verify the Payment Ledger Outstanding against the Payment Ledger Entries"
+	import frappe
+
+	from erpnext.accounts.doctype.payment_ledger_outstanding.payment_ledger_outstanding import (
+		check_payment_ledger_outstanding,
+		rebuild_payment_ledger_outstanding,
+	)
+
+	site = get_site(context)
+	frappe.init(site=site)
+	frappe.connect()
+	try:
+		mismatches = check_payment_ledger_outstanding(company)
+		for d in mismatches:
+			click.echo(
+				f"{d.against_voucher_type} {d.against_voucher_no} in {d.account} for {d.party_type} {d.party}: "
+				f"{d.outstanding} (expected {d.expected_outstanding}), "
+				f"{d.entries} entries (expected {d.expected_entries}), "
+				f"{d.voucher_entries} voucher entries (expected {d.expected_voucher_entries})"
+			)
+
+		if not mismatches:
+			click.secho("Payment Ledger Outstanding is in sync", fg="green")
+		elif rebuild:
+			rebuild_payment_ledger_outstanding(company)
+			frappe.db.commit()
+			click.secho(
+				f"Rebuilt Payment Ledger Outstanding, {len(mismatches)} were out of sync", fg="green"
+			)
+		else:
+			click.secho(f"{len(mismatches)} Payment Ledger Outstanding rows are out of sync", fg="red")
+			raise SystemExit(1)
+	finally:
+		frappe.destroy()
+
+
+commands = [check_account_balances, check_batch_balances, check_payment_ledger_outstanding]
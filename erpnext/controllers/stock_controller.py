@@ -1393,6 +1393,11 @@ def future_sle_exists(args, sl_entries=None):
 		if not sl_entries:
 			return
 
+	# item-warehouses without any entry at or after the posting datetime need no ledger scan
+	sl_entries = get_entries_with_later_bin_postings(args, sl_entries)
+	if not sl_entries:
+		return 0
+
 	or_conditions = get_conditions_to_validate_future_sle(sl_entries)
 
 	data = frappe.db.sql(
@@ -1448,6 +1453,30 @@ def get_cached_data(args, key):
 		return frappe.local.future_sle[key]
 
 
+def get_entries_with_later_bin_postings(args, sl_entries):
+	"""Entries whose Bin has a `latest_posting_datetime` at or after the posting datetime.
+
+	The Bin only moves `latest_posting_datetime` forward, so it may be ahead of the
+	ledger after a cancellation but never behind it.
+	"""
+	from erpnext.stock.utils import get_combine_datetime
+
+	posting_datetime = get_combine_datetime(args.posting_date, args.posting_time)
+	bins = frappe.get_all(
+		"Bin",
+		filters={
+			"item_code": ("in", {entry.item_code for entry in sl_entries}),
+			"warehouse": ("in", {entry.warehouse for entry in sl_entries}),
+			"latest_posting_datetime": (">=", posting_datetime),
+		},
+		fields=["item_code", "warehouse"],
+		as_list=True,
+	)
+
+	bins = set(bins)
+	return [entry for entry in sl_entries if (entry.item_code, entry.warehouse) in bins]
+
+
 def get_sle_entries_against_voucher(args):
 	return frappe.get_all(
 		"Stock Ledger Entry",
@@ -311,6 +311,16 @@ doc_events = {
 	tuple(period_closing_doctypes): {
 		"validate": "erpnext.accounts.doctype.accounting_period.accounting_period.validate_accounting_period_on_doc_save",
 	},
+	"Item": {
+		"on_update": "erpnext.selling.rental.availability.on_item_update",
+		"on_trash": "erpnext.selling.rental.availability.on_item_trash",
+	},
+	"Sales Order": {
+		"on_update": "erpnext.selling.rental.availability.on_sales_order_update",
+		"on_submit": "erpnext.selling.rental.availability.on_sales_order_update",
+		"on_cancel": "erpnext.selling.rental.availability.on_sales_order_update",
+		"on_update_after_submit": "erpnext.selling.rental.availability.on_sales_order_update",
+	},
 	"Stock Entry": {
 		"on_submit": "erpnext.stock.doctype.material_request.material_request.update_completed_and_requested_qty",
 		"on_cancel": "erpnext.stock.doctype.material_request.material_request.update_completed_and_requested_qty",
@@ -391,6 +401,7 @@ scheduler_events = {
 		"0/15 * * * *": [
 			"erpnext.manufacturing.doctype.bom_update_log.bom_update_log.resume_bom_cost_update_jobs",
 			"erpnext.accounts.doctype.process_payment_reconciliation.process_payment_reconciliation.trigger_reconciliation_for_queued_docs",
+			"erpnext.selling.rental.razorpay_callback.retry_queued_callbacks",
 		],
 		"0/30 * * * *": [
 			"erpnext.utilities.doctype.video.video.update_youtube_data",
@@ -447,6 +458,7 @@ scheduler_events = {
 		"erpnext.manufacturing.doctype.bom_update_tool.bom_update_tool.auto_update_latest_price_in_all_boms",
 		"erpnext.crm.utils.open_leads_opportunities_based_on_todays_event",
 		"erpnext.assets.doctype.asset.depreciation.post_depreciation_entries",
+		"erpnext.stock.doctype.stock_valuation_checkpoint.stock_valuation_checkpoint.build_valuation_checkpoints",
 	],
 	"monthly_long": [
 		"erpnext.accounts.deferred_revenue.process_deferred_accounting",
@@ -0,0 +1,14 @@
+import frappe
+
+from erpnext.accounts.doctype.account_balance_snapshot.account_balance_snapshot import (
+	rebuild_account_balances,
+)
+
+
+def execute():
+	frappe.reload_doc("accounts", "doctype", "account_balance_delta")
+	frappe.reload_doc("accounts", "doctype", "account_balance_snapshot")
+
+	for company in frappe.get_all("Company", pluck="name"):
+		rebuild_account_balances(company)
+		frappe.db.commit()
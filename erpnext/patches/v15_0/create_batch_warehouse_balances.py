@@ -0,0 +1,10 @@
+import frappe
+
+from erpnext.stock.doctype.batch_warehouse_balance.batch_warehouse_balance import (
+	rebuild_batch_balances,
+)
+
+
+def execute():
+	frappe.reload_doc("stock", "doctype", "batch_warehouse_balance")
+	rebuild_batch_balances()
@@ -0,0 +1,13 @@
+import frappe
+
+from erpnext.accounts.doctype.payment_ledger_outstanding.payment_ledger_outstanding import (
+	rebuild_payment_ledger_outstanding,
+)
+
+
+def execute():
+	frappe.reload_doc("accounts", "doctype", "payment_ledger_outstanding")
+
+	for company in frappe.get_all("Company", pluck="name"):
+		rebuild_payment_ledger_outstanding(company)
+		frappe.db.commit()
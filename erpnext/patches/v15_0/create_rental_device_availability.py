@@ -0,0 +1,8 @@
+import frappe
+
+from erpnext.selling.rental.availability import rebuild_device_availability
+
+
+def execute():
+	frappe.reload_doc("selling", "doctype", "rental_device_availability")
+	rebuild_device_availability()
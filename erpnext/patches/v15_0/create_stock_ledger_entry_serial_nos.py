@@ -0,0 +1,10 @@
+import frappe
+
+from erpnext.stock.doctype.stock_ledger_entry_serial_no.stock_ledger_entry_serial_no import (
+	rebuild_serial_no_entries,
+)
+
+
+def execute():
+	frappe.reload_doc("stock", "doctype", "stock_ledger_entry_serial_no")
+	rebuild_serial_no_entries()
@@ -0,0 +1,17 @@
+import frappe
+
+
+def execute():
+	frappe.reload_doc("stock", "doctype", "bin")
+	frappe.db.sql(
+		"""
+		update `tabBin` bin
+		inner join (
+			select item_code, warehouse, max(posting_datetime) as posting_datetime
+			from `tabStock Ledger Entry`
+			where is_cancelled = 0
+			group by item_code, warehouse
+		) sle on sle.item_code = bin.item_code and sle.warehouse = bin.warehouse
+		set bin.latest_posting_datetime = sle.posting_datetime
+	"""
+	)
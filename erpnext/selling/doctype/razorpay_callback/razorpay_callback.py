@@ -0,0 +1,32 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+# import frappe
+from frappe.model.document import Document
+
+
+class RazorpayCallback(Document):
+	# begin: auto-generated types
+	# This code is auto-generated. Do not modify anything in this block.
+
+	from typing import TYPE_CHECKING
+
+	if TYPE_CHECKING:
+		from frappe.types import DF
+
+		amount: DF.Currency
+		customer: DF.Link | None
+		error: DF.Code | None
+		journal_entry: DF.Link | None
+		payload: DF.Code | None
+		payment_entry: DF.Link | None
+		payment_id: DF.Data
+		payment_link_id: DF.Data | None
+		payment_link_log: DF.Data | None
+		processed_on: DF.Datetime | None
+		retry_count: DF.Int
+		sales_order: DF.Link | None
+		status: DF.Literal["Queued", "Processed", "Awaiting Payment", "Failed"]
+	# end: auto-generated types
+
+	pass
@@ -0,0 +1,43 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class RentalDeviceAvailability(Document):
+	# begin: auto-generated types
+	# This code is auto-generated. Do not modify anything in this block.
+
+	from typing import TYPE_CHECKING
+
+	if TYPE_CHECKING:
+		from frappe.types import DF
+
+		customer: DF.Link | None
+		end_date: DF.Date | None
+		item_code: DF.Link
+		item_group: DF.Link | None
+		master_order_id: DF.Link | None
+		sales_order: DF.Link | None
+		start_date: DF.Date | None
+		status: DF.Literal[
+			"Available",
+			"Pre Reserved",
+			"Reserved",
+			"Rented Out",
+			"Sold",
+			"Damaged",
+			"Repair Required",
+			"Repair In Progress",
+			"Retired",
+			"Under Service",
+			"Disabled",
+		]
+	# end: auto-generated types
+
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Rental Device Availability", ["item_group", "status"])
@@ -0,0 +1,40 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext.selling.rental.availability import (
+	get_available_devices,
+	get_device_availability,
+	refresh_device_availability,
+)
+from erpnext.stock.doctype.item.test_item import make_item
+
+
+class TestRentalDeviceAvailability(FrappeTestCase):
+	def test_index_follows_item_status(self):
+		item = make_item("_Test Rental Device Availability", {"is_stock_item": 0})
+
+		frappe.db.set_value("Item", item.name, "status", "Available")
+		item.reload()
+		item.save()
+		self.assertEqual(get_device_availability(item.name).status, "Available")
+		self.assertIn(item.name, [d.item_code for d in get_available_devices(item.item_group)])
+
+		item.status = "Damaged"
+		item.save()
+		self.assertEqual(get_device_availability(item.name).status, "Damaged")
+		self.assertNotIn(item.name, [d.item_code for d in get_available_devices(item.item_group)])
+
+	def test_direct_status_write_needs_refresh(self):
+		item = make_item("_Test Rental Device Availability", {"is_stock_item": 0})
+		frappe.db.set_value("Item", item.name, "status", "Available")
+		refresh_device_availability([item.name])
+
+		# db writes skip the Item hooks, the index follows only once refreshed
+		frappe.db.set_value("Item", item.name, "status", "Damaged")
+		self.assertEqual(get_device_availability(item.name).status, "Available")
+
+		refresh_device_availability([item.name])
+		self.assertEqual(get_device_availability(item.name).status, "Damaged")
@@ -3,6 +3,7 @@
 
 
 import json
+import time
 from typing import Literal
 
 import frappe
@@ -13,7 +14,17 @@ from frappe.desk.notifications import clear_doctype_notifications
 from frappe.model.mapper import get_mapped_doc
 from frappe.model.utils import get_fetch_values
 from frappe.query_builder.functions import Sum
-from frappe.utils import add_days, cint, cstr, flt, get_link_to_form, getdate, nowdate, strip_html
+from frappe.utils import (
+	add_days,
+	cint,
+	create_batch,
+	cstr,
+	flt,
+	get_link_to_form,
+	getdate,
+	nowdate,
+	strip_html,
+)
 from datetime import datetime
 from webtoolex_whatsapp.webtoolex_whatsapp.doctype.whatsapp_instance.whatsapp_instance import send_custom_whatsapp_message
 
@@ -31,6 +42,33 @@ from erpnext.manufacturing.doctype.production_plan.production_plan import (
     get_items_for_material_requests,
 )
 from erpnext.selling.doctype.customer.customer import check_credit_limit
+from erpnext.selling.rental.availability import (
+	get_device_availability,
+	get_device_status,
+	refresh_device_availability,
+)
+from erpnext.selling.rental.fleet import get_bin_qty_map, get_fleet_rows
+from erpnext.selling.rental.lifecycle import (
+	InvalidRentalTransitionError,
+	transition_rental_orders,
+	update_rental_status,
+)
+from erpnext.selling.rental.overlap import (
+	check_previous_order_overlap,
+	validate_device_double_booking,
+)
+from erpnext.selling.rental.payment_status import (
+	PAYMENT_FIELDS,
+	SECURITY_DEPOSIT_FIELDS,
+	enqueue_payment_status_update,
+	get_payment_status_values,
+	get_received_amounts,
+	get_rental_amount_values,
+)
+from erpnext.selling.rental.razorpay_callback import register_payment_link_callbacks
+from erpnext.selling.rental.renewal import make_renewal_order
+from erpnext.selling.rental.security_deposit import get_security_deposit_summary, set_changed_values
+from erpnext.selling.rental.technician_queue import add_work_item, close_work_items
 from erpnext.setup.doctype.item_group.item_group import get_item_group_defaults
 from erpnext.stock.doctype.item.item import get_item_defaults
 from erpnext.stock.doctype.stock_reservation_entry.stock_reservation_entry import (
@@ -629,6 +667,8 @@ class SalesOrder(SellingController):
             if overlap:
                 frappe.throw("Current start and end dates overlap with the previous order.")	
 
+        validate_device_double_booking(self)
+
     def update_sales_order_status(self):
         if self.previous_order_id:
 
@@ -2681,7 +2721,7 @@ def make_rental_device_assign(docname, item_group, item_code):
         # Check if the user has permission to update the Item doctype
         frappe.only_for('Item', 'write')
 
-        item_status = frappe.get_value("Item", item_code, "status")
+        item_status = get_device_status(item_code)
 
         if item_status == "Available":
             item_doc = frappe.get_doc("Item", item_code)
@@ -2707,31 +2747,19 @@ def make_rental_device_assign(docname, item_group, item_code):
 
 
 @frappe.whitelist()
-def make_ready_for_delivery(docname, technician_name, technician_mobile, technician_id):
+def make_ready_for_delivery(docname, technician_name, technician_mobile, technician_id, expected_modified=None):
     try:
-        # Get the 'Sales Order' document
-        rental_group_order = frappe.get_doc('Sales Order', docname)
         technician_type = 'Delivery'
-        patient_id = rental_group_order.customer
-        # Update the status of the 'Sales Order'
-        rental_group_order.status = 'Ready for Delivery'
-        rental_group_order.custom_technician_id_before_delivered = technician_id
-        
-        # Fetch Sales Order Item records with the given docname as parent
-        sales_order_items = frappe.get_all("Sales Order Item", filters={"parent": docname}, fields=["name"])
-
-        # Start a transaction
-        frappe.db.begin()
-
-        # Save the sales order
-        rental_group_order.save(ignore_permissions=True)
+        patient_id = frappe.db.get_value('Sales Order', docname, 'customer')
+
+        # Update the status of the 'Sales Order' and all of its items
+        update_rental_status(
+            docname,
+            order_values={'status': 'Ready for Delivery', 'custom_technician_id_before_delivered': technician_id},
+            item_values={'child_status': 'Ready for Delivery', 'technician_id_before_deliverd': technician_id},
+            expected_modified=expected_modified,
+        )
 
-        # Iterate through the fetched Sales Order Items and update their child_status to "Ready for Delivery"
-        for item in sales_order_items:
-            sales_order_item = frappe.get_doc("Sales Order Item", item.name)
-            sales_order_item.child_status = "Ready for Delivery"
-            sales_order_item.technician_id_before_deliverd = technician_id
-            sales_order_item.save(ignore_permissions=True)
         if technician_id:
         # Create an entry in the Technician Visit Entry doctype
             create_technician_portal_entry(technician_id, technician_type, docname,patient_id)
@@ -2741,13 +2769,17 @@ def make_ready_for_delivery(docname, technician_name, technician_mobile, technic
         
         return "Ready for Delivery Success"
 
+    except frappe.TimestampMismatchError:
+        frappe.db.rollback()
+        raise
+
     except Exception as e:
         # If any error occurs, rollback the transaction
         frappe.db.rollback()
         frappe.throw(f"An error occurred: {str(e)}")
 
 # New function to create an entry in the Technician Visit Entry doctype
-def create_technician_portal_entry(technician_id, technician_type, sales_order_id,patient_id=None,item_code=None):
+def create_technician_portal_entry(technician_id, technician_type, sales_order_id,patient_id=None,item_code=None,scheduled_date=None):
     try:
         # Create a new document in the 'Technician Visit Entry' doctype
         technician_portal_entry = frappe.get_doc({
@@ -2769,6 +2801,17 @@ def create_technician_portal_entry(technician_id, technician_type, sales_order_i
         # Share the document with the user
         share_document_with_user(technician_portal_entry.name, technician_user_id)
 
+        # Mirror the visit in the technician's work queue
+        add_work_item(
+            technician_id,
+            technician_type,
+            sales_order_id,
+            item_code=item_code,
+            technician_user=technician_user_id,
+            technician_visit_entry=technician_portal_entry.name,
+            scheduled_date=scheduled_date,
+        )
+
     except Exception as e:
         # If an exception occurs, throw an error
         frappe.throw(f"Error in creating Technician Visit Entry entry: {str(e)}")
@@ -2801,29 +2844,14 @@ def apply_item_filter(doc, method):
 @frappe.whitelist()
 def make_dispatch(docname, dispatch_date):
     try:
-        # Get the 'Sales Order' document
-        rental_sales_order = frappe.get_doc('Sales Order', docname)
-
-        # Update Sales Order with the entered dispatch_date
-        rental_sales_order.dispatch_date = dispatch_date
-        rental_sales_order.status = "DISPATCHED"
-        rental_sales_order.save(ignore_permissions=True)
-
-        # Fetch Sales Order Item records with the given docname as parent
-        sales_order_items = frappe.get_all("Sales Order Item", filters={"parent": docname}, fields=["name"])
-
-        # Iterate through the fetched Sales Order Items and update their child_status to "DISPATCHED"
-        for item in sales_order_items:
-            sales_order_item = frappe.get_doc("Sales Order Item", item.name)
-            sales_order_item.child_status = "DISPATCHED"
-            sales_order_item.dispatch_date = dispatch_date
-            sales_order_item.save(ignore_permissions=True)
-
-        # Optionally, you may want to commit the changes to the database
-        # frappe.db.commit()
+        # Update Sales Order and its items with the entered dispatch_date and status "DISPATCHED"
+        transition_rental_orders([docname], "DISPATCHED", date=dispatch_date)
 
         return "Rental Device DISPATCHED Success"
 
+    except InvalidRentalTransitionError:
+        raise
+
     except Exception as e:
         # Log any errors that occur
         frappe.log_error(f"Error in make_dispatch: {e}")
@@ -2838,7 +2866,7 @@ def make_rental_device_assign(docname, item_group, item_code):
         # Check if the user has permission to update or cancel the Item doctype
         frappe.only_for('Item', ['write', 'cancel'])
 
-        item_status = frappe.get_value("Item", item_code, "status")
+        item_status = get_device_status(item_code)
 
         if item_status == "Available":
             # Update Item status to Reserved
@@ -2882,81 +2910,66 @@ def make_rental_device_assign(docname, item_group, item_code):
 @frappe.whitelist()
 def make_delivered(docname,customer_name, delivered_date, rental_order_agreement_attachment=None, aadhar_card_attachment=None, payment_pending_reasons=None, notes=None):
     try:
-        # print (payment_pending_reasons,notes)
-        # Get the 'Sales Order' document
-        rental_group_order = frappe.get_doc('Sales Order', docname)
+        # Mark the order and its items Active and the reserved devices "Rented Out"
+        transition_rental_orders(
+            [docname],
+            'Active',
+            date=delivered_date,
+            order_values={
+                'reason_for_payment_pending': payment_pending_reasons,
+                'payment_pending_reason': notes,
+                'rental_order_agreement_attachment': rental_order_agreement_attachment,
+                'aadhar_card_attachment': aadhar_card_attachment,
+            },
+            device_values={'customer_n': customer_name},
+        )
 
-        # Update each child item and its status
-        for item in rental_group_order.items:
-            # Get the item code from the child table
-            item_code = item.item_code
-            # Update the item status to "Rented Out"
-            item_doc = frappe.get_doc("Item", item_code)
-            if item_doc.status == 'Reserved':
-                item_doc.status = "Rented Out"
-                item_doc.customer_n = customer_name
-                item_doc.custom_sales_order_id = docname
-                item_doc.save(ignore_permissions=True)
-            else:
-                frappe.throw('Item Is Not Reserved')
-
-        # Update values for rental device and update status in Sales Order
-        rental_group_order.rental_delivery_date = delivered_date
-        rental_group_order.reason_for_payment_pending = payment_pending_reasons
-        rental_group_order.payment_pending_reason = notes
-        rental_group_order.rental_order_agreement_attachment = rental_order_agreement_attachment
-        rental_group_order.aadhar_card_attachment = aadhar_card_attachment
-        rental_group_order.status = 'Active'
-        rental_group_order.save(ignore_permissions=True)
-
-        # Update status in related Sales Order Items
-        sales_order_items = frappe.get_all("Sales Order Item", filters={"parent": docname}, fields=["name"])
-        for item in sales_order_items:
-            sales_order_item = frappe.get_doc("Sales Order Item", item.name)
-            sales_order_item.child_status = "Active"
-            sales_order_item.rental_delivery_date = delivered_date
-            sales_order_item.save(ignore_permissions=True)
+        close_work_items(docname, 'Delivery')
 
         return "Rental Device DELIVERED Success"
 
+    except InvalidRentalTransitionError:
+        raise
+
     except Exception as e:
         # Log any errors that occur
         frappe.log_error(f"Error in make_delivered: {e}")
         frappe.throw("An error occurred while processing the request. Please try again.")
 
 @frappe.whitelist()
-def make_ready_for_pickup(docname, pickup_date, pickup_reason,pickup_remark,technician_name=None,technician_mobile=None,technician_id=None ):
+def make_ready_for_pickup(docname, pickup_date, pickup_reason,pickup_remark,technician_name=None,technician_mobile=None,technician_id=None,expected_modified=None ):
     try:
-        # Get the 'Sales Order' document
-        doc = frappe.get_doc('Sales Order', docname)
         technician_type = 'Pickup'
-        patient_id = doc.customer
-        # Set values for pickup date and update status
-        doc.pickup_date = pickup_date
-        doc.status = 'Ready for Pickup'
-        doc.pickup_reason = pickup_reason
-        doc.pickup_remark = pickup_remark
-        doc.custom_technician_id_pickup = technician_id
-        frappe.db.begin()
-        # doc.technician_mobile_after_delivered = technician_mobile
-        doc.save(ignore_permissions=True)
-
-        # Update status and pickup date in related Sales Order Items
-        sales_order_items = frappe.get_all("Sales Order Item", filters={"parent": docname}, fields=["name"])
-        for item in sales_order_items:
-            sales_order_item = frappe.get_doc("Sales Order Item", item.name)
-            sales_order_item.child_status = "Ready for Pickup"
-            sales_order_item.pickup_date = pickup_date
-            sales_order_item.pickup_reason = pickup_reason
-            sales_order_item.pickup_remark = pickup_remark
-            sales_order_item.technician_id_after_delivered = technician_id
-            # sales_order_item.technician_mobile_after_delivered = technician_mobile
-            sales_order_item.save(ignore_permissions=True)
+        patient_id = frappe.db.get_value('Sales Order', docname, 'customer')
+
+        # Set values for pickup date and update status, on the order and on all of its items
+        update_rental_status(
+            docname,
+            order_values={
+                'pickup_date': pickup_date,
+                'status': 'Ready for Pickup',
+                'pickup_reason': pickup_reason,
+                'pickup_remark': pickup_remark,
+                'custom_technician_id_pickup': technician_id,
+            },
+            item_values={
+                'child_status': 'Ready for Pickup',
+                'pickup_date': pickup_date,
+                'pickup_reason': pickup_reason,
+                'pickup_remark': pickup_remark,
+                'technician_id_after_delivered': technician_id,
+            },
+            expected_modified=expected_modified,
+        )
         if technician_id:
-            create_technician_portal_entry(technician_id, technician_type,docname,patient_id)
+            create_technician_portal_entry(technician_id, technician_type,docname,patient_id,scheduled_date=pickup_date)
 
         return "Sales Order is Ready for Pickup"
 
+    except frappe.TimestampMismatchError:
+        frappe.db.rollback()
+        raise
+
     except Exception as e:
         frappe.db.rollback()
         # Log any errors that occur
@@ -2966,28 +2979,16 @@ def make_ready_for_pickup(docname, pickup_date, pickup_reason,pickup_remark,tech
 @frappe.whitelist()
 def make_pickedup(docname, pickup_date):
     try:
-        # Get the 'Sales Order' document
-        doc = frappe.get_doc('Sales Order', docname)
-
-        # Set values for technician name and mobile
-        doc.picked_up = pickup_date
-        # doc.technician_mobile = technician_mobile
+        # Update status to 'Picked Up' on the order and its items
+        transition_rental_orders([docname], 'Picked Up', date=pickup_date)
 
-        # Update status to 'Picked Up'
-        doc.status = 'Picked Up'
-        doc.save(ignore_permissions=True)
-
-        # Update status in related Sales Order Items
-        sales_order_items = frappe.get_all("Sales Order Item", filters={"parent": docname}, fields=["name"])
-        for item in sales_order_items:
-            sales_order_item = frappe.get_doc("Sales Order Item", item.name)
-            sales_order_item.child_status = "Picked Up"
-            sales_order_item.pickup_date = pickup_date
-            # sales_order_item.technician_mobile = technician_mobile
-            sales_order_item.save(ignore_permissions=True)
+        close_work_items(docname, 'Pickup')
 
         return "Sales Order is marked as Picked Up."
 
+    except InvalidRentalTransitionError:
+        raise
+
     except Exception as e:
         # Log any errors that occur
         frappe.log_error(f"Error in make_pickedup: {e}")
@@ -3000,44 +3001,26 @@ def make_submitted_to_office(docname, item_code, submitted_date, send_email, cus
     try:
         # Convert the string representation of the list to an actual list
         item_codes = ast.literal_eval(item_code)
-        # print('asdddddddddddddddddddddddddddddddddddddddddddd',item_codes)
-        # Get the 'Sales Order' document
-        doc = frappe.get_doc('Sales Order', docname)
-        submitted_items_html = "<ul>"
-        # Update status of items to "Available"
-        for item_code in item_codes:
-            item_doc = frappe.get_doc("Item", item_code)
-            if item_doc.status == 'Rented Out':
-                item_doc.status = "Available"
-                item_doc.customer_n = ""
-                item_doc.customer_name = ""
-                item_doc.custom_sales_order_id = ""
-                item_doc.save(ignore_permissions=True)
-                submitted_items_html += f"<li>{item_doc.item_name} ({item_doc.item_code})</li>"
 
-            else:
-                frappe.throw('Current item Status is Not Rented Out')
-        submitted_items_html += "</ul>"
-        # Set values for submission to office and update status
-        doc.submitted_date = submitted_date
-        doc.status = 'Submitted to Office'
-        doc.save(ignore_permissions=True)
-
-        # Update status in related Sales Order Items
-        sales_order_items = frappe.get_all("Sales Order Item", filters={"parent": docname}, fields=["name"])
-        for item in sales_order_items:
-            sales_order_item = frappe.get_doc("Sales Order Item", item.name)
-            sales_order_item.child_status = "Submitted to Office"
-            sales_order_item.submitted_date = submitted_date
-            sales_order_item.save(ignore_permissions=True)
+        # Release the submitted devices and mark the order and its items "Submitted to Office"
+        transition_rental_orders([docname], 'Submitted to Office', date=submitted_date, item_codes=item_codes)
 
-        # print('send_sssssssssssssssssemail', send_email, customer_email)
         # Send email if checked
         if int(send_email) == 1 and customer_email:
+            doc = frappe.get_doc('Sales Order', docname)
+            item_names = dict(
+                frappe.get_all("Item", filters={"name": ("in", item_codes)}, fields=["name", "item_name"], as_list=True)
+            )
+            submitted_items_html = "<ul>" + "".join(
+                f"<li>{item_names.get(code)} ({code})</li>" for code in item_codes
+            ) + "</ul>"
             send_submitted_email(doc, submitted_items_html, customer_email)
 
         return "Submitted to Office Success"
 
+    except InvalidRentalTransitionError:
+        raise
+
     except Exception as e:
         # Log any errors that occur
         frappe.log_error(f"Error in make_submitted_to_office: {e}")
@@ -3103,35 +3086,15 @@ def send_submitted_email(doc, submitted_items_html, customer_email):
 @frappe.whitelist()
 def make_order_completed(docname, item_code):
     try:
-        # Start a database transaction
-        frappe.db.sql("START TRANSACTION")
-
-        # Convert the string representation of the list to an actual list
-        item_codes = ast.literal_eval(item_code)
-
-        # Get the 'Sales Order' document
-        doc = frappe.get_doc('Sales Order', docname)
-
-        # Check payment and security deposit status
-        if doc.payment_status != "Paid" or doc.security_deposit_status != "Paid":
-            frappe.throw(_("Both Payment Status and Security Deposit Status must be 'Paid' to complete the order."))
-
-        # Update Sales Order status to 'Rental SO Completed'
-        doc.status = 'Rental SO Completed'
-        doc.save(ignore_permissions=True)
-
-        # Update status in related Sales Order Items
-        sales_order_items = frappe.get_all("Sales Order Item", filters={"parent": docname}, fields=["name"])
-        for item in sales_order_items:
-            sales_order_item = frappe.get_doc("Sales Order Item", item.name)
-            sales_order_item.child_status = "Rental SO Completed"
-            sales_order_item.save(ignore_permissions=True)
-
-        # Commit the transaction if no errors occurred
-        frappe.db.commit()
+        # Payment and Security Deposit Status must both be 'Paid'; checked by the transition
+        transition_rental_orders([docname], 'Rental SO Completed')
 
         return "Rental SO Completed Success"
 
+    except InvalidRentalTransitionError:
+        frappe.db.rollback()
+        raise
+
     except Exception as e:
         # Rollback the transaction to undo any changes if an error occurs
         frappe.db.rollback()
@@ -3140,48 +3103,42 @@ def make_order_completed(docname, item_code):
 
 
 
+def set_sales_order_status(docname, status):
+    # Rental orders go through the lifecycle engine, which writes without loading the
+    # document, so check the permission `doc.save()` would have checked
+    if frappe.db.get_value('Sales Order', docname, 'order_type') == 'Rental':
+        frappe.has_permission('Sales Order', 'write', docname, throw=True)
+        transition_rental_orders([docname], status)
+        return
+
+    doc = frappe.get_doc('Sales Order', docname)
+    doc.set('status', status)
+    doc.save()
+
+
 @frappe.whitelist()
 def on_hold(docname):
-    doc = frappe.get_doc('Sales Order', docname)
-    
-    # Perform any server-side logic here, e.g., update some fields, perform calculations, etc.
-    
     # Update the status to 'On Hold'
-    doc.set('status', 'On Hold')
-    doc.save()
+    set_sales_order_status(docname, 'On Hold')
 
     frappe.msgprint(_('Document Hold successfully.'))
 
     return True
 
 
-# your_module/doctype/rental_group_order/rental_group_order.py
-from frappe import _
-
 @frappe.whitelist()
 def update_status(docname, new_status):
-    doc = frappe.get_doc('Sales Order', docname)
-    
-    # Perform any server-side logic here, e.g., update some fields, perform calculations, etc.
-    
     # Update the status to the new status
-    doc.set('status', new_status)
-    doc.save()
+    set_sales_order_status(docname, new_status)
 
-    # frappe.msgprint(_('Document status updated successfully.'))
     return True
 
 
 
 @frappe.whitelist()
 def close_rental_order(docname):
-    doc = frappe.get_doc('Sales Order', docname)
-
-    # Perform any necessary validation or logic before closing the order
-
     # Update the status to 'Closed'
-    doc.set('status', 'Closed')
-    doc.save()
+    set_sales_order_status(docname, 'Closed')
 
     frappe.msgprint(_('Rental Order Closed successfully.'))
     return True
@@ -3189,7 +3146,6 @@ def close_rental_order(docname):
 
 
 
-
 # In sales_order.py
 
 @frappe.whitelist()
@@ -3306,95 +3262,71 @@ def sales_order_for_html(sales_order_id):
 
 
 @frappe.whitelist()
-def update_status_to_ready_for_pickup(item_code, pickup_datetime, docname, child_name,pickupReason,pickupRemark,technician_id=None,technician_mobile=None):
-    # print('qqqqqqqqqqqqqqqqqqqqqqqq',item_code, pickup_datetime, docname, child_name,pickupReason,pickupRemark)
+def update_status_to_ready_for_pickup(item_code, pickup_datetime, docname, child_name,pickupReason,pickupRemark,technician_id=None,technician_mobile=None,expected_modified=None):
     # Retrieve Rental Orders based on the item_code field in the items child table
-    sales_order_items = frappe.get_all("Sales Order Item", filters={"parent": docname}, fields=["name"])
-    sales_order_doc = frappe.get_doc("Sales Order", docname)
-    patient_id = sales_order_doc.customer
-    if sales_order_items:
-        # If there is only one Sales Order Item, update both Sales Order and Sales Order Item statuses
-        if len(sales_order_items) == 1:
-            sales_order_item_doc = frappe.get_doc("Sales Order Item", sales_order_items[0].name)
-            sales_order_item_doc.child_status = "Ready for Pickup"
-            sales_order_item_doc.pickup_date = pickup_datetime
-            sales_order_item_doc.pickup_remark = pickupRemark
-            sales_order_item_doc.pickup_reason = pickupReason
-            sales_order_item_doc.technician_id_after_delivered = technician_id
-            # sales_order_item_doc.technician_mobile_after_delivered = technician_mobile
-            sales_order_item_doc.save(ignore_permissions=True)
+    sales_order_items = frappe.get_all("Sales Order Item", filters={"parent": docname}, pluck="name")
+    if not sales_order_items:
+        return False
 
-            # Retrieve the Sales Order document and update its status
-            
-            # print('patient_iddddddddddddddddddddddddddddddddddddd',patient_id)
-            sales_order_doc.status = "Ready for Pickup"
-            sales_order_doc.pickup_date = pickup_datetime
-            sales_order_doc.pickup_remark = pickupRemark
-            sales_order_doc.pickup_reason = pickupReason
-            sales_order_doc.custom_technician_id_pickup = technician_id
-            # sales_order_doc.technician_mobile_after_delivered = technician_mobile
-            sales_order_doc.save(ignore_permissions=True)
-            technician_type = 'Pickup'
-            if technician_id:
-                create_technician_portal_entry(technician_id, technician_type,docname,patient_id,item_code)
+    item_values = {
+        'child_status': "Ready for Pickup",
+        'pickup_date': pickup_datetime,
+        'pickup_remark': pickupRemark,
+        'pickup_reason': pickupReason,
+        'technician_id_after_delivered': technician_id,
+    }
 
-            return True
-        else:
-            
-            # If there are multiple Sales Order Items, update only the Sales Order Item statuses
-            sales_order_item_doc = frappe.get_doc("Sales Order Item", {"name": child_name})
-            sales_order_item_doc.child_status = "Ready for Pickup"
-            sales_order_item_doc.pickup_date = pickup_datetime
-            sales_order_item_doc.pickup_remark = pickupRemark
-            sales_order_item_doc.pickup_reason = pickupReason
-            sales_order_item_doc.technician_id_after_delivered = technician_id
-            # sales_order_item_doc.technician_mobile_after_delivered = technician_mobile
-            sales_order_item_doc.save(ignore_permissions=True)
-            technician_type = 'Pickup'
-            if technician_id:
-                create_technician_portal_entry(technician_id, technician_type,docname,patient_id,item_code)
-            return True
+    if len(sales_order_items) == 1:
+        # If there is only one Sales Order Item, update both Sales Order and Sales Order Item statuses
+        update_rental_status(
+            docname,
+            order_values={
+                'status': "Ready for Pickup",
+                'pickup_date': pickup_datetime,
+                'pickup_remark': pickupRemark,
+                'pickup_reason': pickupReason,
+                'custom_technician_id_pickup': technician_id,
+            },
+            item_values=item_values,
+            expected_modified=expected_modified,
+        )
     else:
-        return False
+        # If there are multiple Sales Order Items, update only the Sales Order Item statuses
+        update_rental_status(docname, item_values=item_values, items=[child_name], expected_modified=expected_modified)
 
+    technician_type = 'Pickup'
+    if technician_id:
+        patient_id = frappe.db.get_value("Sales Order", docname, "customer")
+        create_technician_portal_entry(technician_id, technician_type,docname,patient_id,item_code,scheduled_date=pickup_datetime)
 
-@frappe.whitelist()
-def update_status_to_picked_up(item_code, docname, child_name,picked_up_datetime):
-    # print()
-    # Retrieve Rental Orders based on the item_code field in the items child table
-    sales_order_items = frappe.get_all("Sales Order Item", filters={"parent": docname}, fields=["name"])
+    return True
 
-    if sales_order_items:
-        # If there is only one Sales Order Item, update both Sales Order and Sales Order Item statuses
-        if len(sales_order_items) == 1:
-            sales_order_item_doc = frappe.get_doc("Sales Order Item", sales_order_items[0].name)
-            sales_order_item_doc.child_status = "Picked Up"
-            sales_order_item_doc.pickup_date = picked_up_datetime
-            # sales_order_item_doc.technician_mobile = technician_mobile
-            # sales_order_item_doc.pickup_date = pickup_datetime
-            sales_order_item_doc.save(ignore_permissions=True)
 
-            # Retrieve the Sales Order document and update its status
-            sales_order_doc = frappe.get_doc("Sales Order", sales_order_item_doc.parent)
-            sales_order_doc.status = "Picked Up"
-            sales_order_doc.pickup_date = picked_up_datetime
-            # sales_order_doc.technician_mobile = technician_mobile
-            # sales_order_doc.pickup_date = pickup_datetime
-            sales_order_doc.save(ignore_permissions=True)
+@frappe.whitelist()
+def update_status_to_picked_up(item_code, docname, child_name,picked_up_datetime,expected_modified=None):
+    # Retrieve Rental Orders based on the item_code field in the items child table
+    sales_order_items = frappe.get_all("Sales Order Item", filters={"parent": docname}, pluck="name")
+    if not sales_order_items:
+        return False
 
-            return True
-        else:
-            # If there are multiple Sales Order Items, update only the Sales Order Item statuses
-            sales_order_item_doc = frappe.get_doc("Sales Order Item", {"name": child_name})
-            sales_order_item_doc.child_status = "Picked Up"
-            sales_order_item_doc.pickup_date = picked_up_datetime
-            # sales_order_item_doc.technician_mobile = technician_mobile
-            sales_order_item_doc.save(ignore_permissions=True)
+    item_values = {'child_status': "Picked Up", 'pickup_date': picked_up_datetime}
 
-            return True
+    if len(sales_order_items) == 1:
+        # If there is only one Sales Order Item, update both Sales Order and Sales Order Item statuses
+        update_rental_status(
+            docname,
+            order_values={'status': "Picked Up", 'pickup_date': picked_up_datetime},
+            item_values=item_values,
+            expected_modified=expected_modified,
+        )
     else:
-        return False
+        # If there are multiple Sales Order Items, update only the Sales Order Item statuses
+        update_rental_status(docname, item_values=item_values, items=[child_name], expected_modified=expected_modified)
+
+    # the order level pickup is done once its only device is picked up
+    close_work_items(docname, 'Pickup', item_code=item_code if len(sales_order_items) > 1 else None)
 
+    return True
 
 
 
@@ -3605,32 +3537,61 @@ from frappe import _, publish_realtime
 from frappe.utils import today, getdate
 
 # Method to change status of overdue Sales Orders
+OVERDUE_STATUS_UPDATE_CHUNK = 1000
+
+
 @frappe.whitelist()
 def mark_overdue_sales_orders():
-    # Get today's date as a datetime.date object
+    """Classify every Sales Order as Renewed / Overdue / Active. Runs daily.
+
+    Orders with status RENEWED are Renewed, orders whose end date has passed are
+    Overdue and everything else (including orders without an end date) is Active.
+    Only rows whose `overdue_status` actually changes are written, in chunks.
+    """
+    start_time = time.monotonic()
     today_date = getdate(today())
-    
-    # Get all Sales Orders
-    sales_orders = frappe.get_list("Sales Order",
-                                   fields=["name", "end_date", "overdue_status", "status"])
 
-    for so in sales_orders:
-        end_date = getdate(so.end_date)  # Convert end_date string to datetime.date object
-        
-        # Check if the status is 'RENEWED'
-        if so.status == 'RENEWED':
-            # Update overdue_status to 'Renewed'
-            frappe.db.set_value("Sales Order", so.name, "overdue_status", "Renewed")
-        elif end_date < today_date:
-            # Update overdue_status to 'Overdue'
-            frappe.db.set_value("Sales Order", so.name, "overdue_status", "Overdue")
-        else:
-            # Update overdue_status to 'Active'
-            frappe.db.set_value("Sales Order", so.name, "overdue_status", "Active")
+    so = frappe.qb.DocType("Sales Order")
+    is_renewed = so.status == "RENEWED"
+    not_renewed = so.status.isnull() | (so.status != "RENEWED")
+    is_past_end_date = so.end_date.isnotnull() & (so.end_date < today_date)
+
+    classifiers = {
+        "Renewed": is_renewed,
+        "Overdue": not_renewed & is_past_end_date,
+        "Active": not_renewed & (so.end_date.isnull() | (so.end_date >= today_date)),
+    }
+
+    counts = {}
+    for overdue_status, condition in classifiers.items():
+        changed = (
+            frappe.qb.from_(so)
+            .select(so.name)
+            .where(condition & (so.overdue_status.isnull() | (so.overdue_status != overdue_status)))
+            .run(pluck=True)
+        )
+
+        for names in create_batch(changed, OVERDUE_STATUS_UPDATE_CHUNK):
+            (
+                frappe.qb.update(so)
+                .set(so.overdue_status, overdue_status)
+                .set(so.modified, frappe.utils.now())
+                .set(so.modified_by, frappe.session.user)
+                .where(so.name.isin(names))
+                .run()
+            )
+            frappe.db.commit()
+
+        counts[overdue_status] = len(changed)
+
+    counts["time_taken"] = round(time.monotonic() - start_time, 3)
+    frappe.logger("sales_order").info(f"mark_overdue_sales_orders: {counts}")
 
     # Publish a message to refresh the list view
     # publish_realtime('list_update', "Sales Order")
 
+    return counts
+
 
 import frappe
 from frappe.utils import add_days
@@ -3646,43 +3607,8 @@ def create_renewal_order(sales_order_name):
 
     original_sales_order = frappe.get_doc("Sales Order", sales_order_name)
 
-    # Filter out items where child_status is 'Submitted to Office'
-    filtered_items = [item for item in original_sales_order.items if item.child_status != 'Submitted to Office']
-
-    # Create a new sales order based on the original one
-    new_sales_order = frappe.copy_doc(original_sales_order)
-    new_sales_order.previous_order_id = original_sales_order.name  # Pass original order ID to renewal_order_id
-    new_sales_order.advance_paid = 0
-    new_sales_order.is_renewed = 1
-    new_sales_order.security_deposit = 0
-    new_sales_order.received_amount = 0
-    new_sales_order.payment_status = 'UnPaid'
-    new_sales_order.outstanding_security_deposit_amount = 0
-    new_sales_order.custom_razorpay_payment_url = ''
-    new_sales_order.custom_razorpay_payment_link_log_id = ''
-    new_sales_order.status = 'Active'
-    new_sales_order.paid_security_deposite_amount = 0
-    new_sales_order.refundable_security_deposit = 0
-
-    # Replace items with the filtered items
-    new_sales_order.items = filtered_items
-
-    for item in new_sales_order.items:
-        item.read_only = 1
-        current_tax_rate = frappe.get_value("Item", item.item_code, "tax_rate") or 0
-        item.tax_rate = current_tax_rate
-        item.gst_treatment = "Non-GST"
-
-    # Increment the renewal_order_count of the new sales order
-    renewal_count = getattr(original_sales_order, "renewal_order_count", 0)
-    new_sales_order.renewal_order_count = renewal_count + 1 if renewal_count > 0 else 1
-    
-    # Set the new order's start date to the original order's end date + 1 day
-    if original_sales_order.end_date:
-        new_start_date = add_days(original_sales_order.end_date, 1)
-        new_sales_order.start_date = new_start_date
-        new_sales_order.end_date = ""
-        new_sales_order.total_no_of_dates = ""
+    # Copy the order with the items that are still out, starting the day after it ends
+    new_sales_order = make_renewal_order(original_sales_order)
 
     new_sales_order.insert()
     return new_sales_order.name
@@ -3758,27 +3684,14 @@ import frappe
 from frappe.utils.background_jobs import enqueue
 
 @frappe.whitelist()
-def validate_and_update_payment_status_for_all():
-    # Get all Sales Orders
-    sales_orders = frappe.get_all("Sales Order", filters={"docstatus": 1, "order_type": ["in", ["Sales", "Service"]]}, fields=["name"])
-
-    # Iterate through each Sales Order
-    for sales_order in sales_orders:
-        docname = sales_order.name
-        # Enqueue the function for each Sales Order
-        enqueue(validate_and_update_payment_status, docname=docname)
+def validate_and_update_payment_status_for_all(full=False):
+    # Recompute payment status of Sales / Service orders whose ledgers changed, in a background job
+    return enqueue_payment_status_update(["Sales", "Service"], full=cint(full))
 
 @frappe.whitelist()
-def validate_and_update_payment_status_for_all_rental():
-    # Get all Sales Orders
-    sales_orders = frappe.get_all("Sales Order", filters={"docstatus": 1, "order_type": "Rental"}, fields=["name","master_order_id"])
-
-    # Iterate through each Sales Order
-    for sales_order in sales_orders:
-        docname = sales_order.name
-        master_order_id = sales_order.master_order_id
-        # Enqueue the function for each Sales Order
-        enqueue(validate_and_update_payment_and_security_deposit_status, docname=docname, master_order_id=master_order_id)
+def validate_and_update_payment_status_for_all_rental(full=False):
+    # Recompute payment and security deposit status of Rental orders whose ledgers changed, in a background job
+    return enqueue_payment_status_update(["Rental"], full=cint(full))
 
 # Add @frappe.whitelist() decorator if these functions will be called from client-side scripts.
 
@@ -3838,104 +3751,19 @@ import frappe
 @frappe.whitelist()
 def validate_and_update_payment_and_security_deposit_status(docname,master_order_id):
     try:
-        # Retrieve Sales Order document
-        sales_order = frappe.get_doc("Sales Order", docname)
-        payment_entries = frappe.get_all(
-            "Payment Entry",
-            filters={
-                "docstatus": 1,
-                "sales_order_id":docname
-            },
-            fields=["paid_amount"]
-        )
+        fields = ["rounded_total", "is_renewed", "security_deposit", "total_rental_amount",
+                  *PAYMENT_FIELDS, *SECURITY_DEPOSIT_FIELDS]
+        sales_order = frappe.db.get_value("Sales Order", docname, fields, as_dict=True)
 
-        # Calculate total allocated amount
-        # total_allocated_amount = sum(entry.paid_amount for entry in payment_entries)
-        total_allocated_amount = sum(entry.paid_amount for entry in payment_entries if entry.paid_amount is not None)
+        received_amount = get_received_amounts([docname]).get(docname, 0.0)
+        values = get_payment_status_values(sales_order.rounded_total, received_amount)
 
-        # print(total_allocated_amount)
-        sales_order.received_amount = total_allocated_amount
-        # Calculate balance amount
-        balance_amount = sales_order.rounded_total - total_allocated_amount
+        # Renewal orders only refresh total_rental_amount, the deposit lives on the master order
+        deposit_totals = get_security_deposit_summary(master_order_id) if master_order_id else {}
+        values.update(get_rental_amount_values(sales_order, deposit_totals))
 
-        # Update balance amount field
-        sales_order.balance_amount = balance_amount
-
-        # Update payment status based on rounded total and advance paid
-        if sales_order.rounded_total == sales_order.received_amount:
-            sales_order.payment_status = 'Paid'
-        elif sales_order.received_amount == 0:
-            sales_order.payment_status = 'UnPaid'
-        else:
-            sales_order.payment_status = 'Partially Paid'
-        if sales_order.is_renewed == 0:
-            # Query Journal Entry records for cash received security deposit
-            journal_entries = frappe.get_all("Journal Entry",
-                                            filters={"master_order_id": master_order_id,
-                                                    "security_deposite_type": "SD Amount Received From Client","docstatus": 1},
-                                            fields=["name", "total_debit"])
-            journal_entries_outstanding = frappe.get_all("Journal Entry",
-                                            filters={"master_order_id": master_order_id,
-                                                    "security_deposite_type": "Booking as Outstanding SD From Client","docstatus": 1},
-                                            fields=["name", "total_debit"])
-
-            # Query Journal Entry records for damage and refund
-            journal_entries_damage = frappe.get_all("Journal Entry",
-                                                    filters={"master_order_id": master_order_id,"docstatus": 1,
-                                                            "security_deposite_type": ["in", ["Adjusted Device Damage Charges", "Adjusted Against Sales Order Rental Charges"]]},
-                                                    fields=["name", "total_debit"])
-
-            journal_entries_refund = frappe.get_all("Journal Entry",
-                                                    filters={"master_order_id": master_order_id,"docstatus": 1,
-                                                            "security_deposite_type": "Refunding SD to Client"},
-                                                    fields=["name", "total_debit"])
-
-            # Calculate total debit amounts
-            total_debit_amount = sum(journal_entry.total_debit for journal_entry in journal_entries)
-            total_debit_amount_damage = sum(journal_entry.total_debit for journal_entry in journal_entries_damage)
-            total_debit_amount_refund = sum(journal_entry.total_debit for journal_entry in journal_entries_refund)
-            # outstanding_amt = sum(journal_entry.total_debit for journal_entry in journal_entries_outstanding)
-            
-            # Update paid security deposit amount and adjustment amount fields
-            sales_order.paid_security_deposite_amount = total_debit_amount
-            sales_order.adjustment_amount = total_debit_amount_damage
-            # sales_order.outstanding_security_deposit_amount = outstanding_amt
-            security_deposit = float(sales_order.security_deposit)
-            # Calculate outstanding security deposit amount
-            outstanding_security_deposit_amount = float(sales_order.security_deposit) - total_debit_amount
-
-            # Update outstanding security deposit amount field
-            sales_order.outstanding_security_deposit_amount = outstanding_security_deposit_amount
-
-            # Update security deposit amount return to client field
-            sales_order.security_deposit_amount_return_to_client = total_debit_amount_refund
-
-            # Calculate refundable security deposit
-            # refundable_security_deposit = sales_order.paid_security_deposite_amount - sales_order.adjustment_amount - total_debit_amount_refund
-
-            # Update refundable security deposit field
-            sales_order.refundable_security_deposit = sales_order.paid_security_deposite_amount - sales_order.adjustment_amount - total_debit_amount_refund
-
-            # Determine security deposit status based on outstanding amount
-            if outstanding_security_deposit_amount == 0:
-                sales_order.security_deposit_status = 'Paid'
-            elif outstanding_security_deposit_amount == security_deposit:
-                sales_order.security_deposit_status = 'Unpaid'
-            else:
-                sales_order.security_deposit_status = 'Partially Paid'
-        # Convert strings to floats
-            security_deposit = float(sales_order.security_deposit)
-            rounded_total = float(sales_order.rounded_total)
-
-        # Perform addition
-        #total_rental_amount = security_deposit + rounded_total
-        # if sales_order.is_renewed == 0:
-            sales_order.total_rental_amount = float(sales_order.security_deposit) + float(sales_order.rounded_total)
-        else:
-            sales_order.total_rental_amount = float(sales_order.rounded_total)
-        # Assign the result back to sales_order.total_rental_amount
-        #sales_order.total_rental_amount = total_rental_amount        # Save changes to the document
-        sales_order.save(ignore_permissions=True)
+        # Update only the fields that changed instead of saving the whole order
+        set_changed_values(docname, sales_order, values)
 
         # Return True to indicate successful update
         return True
@@ -3949,25 +3777,15 @@ def validate_and_update_payment_and_security_deposit_status(docname,master_order
 
 
 def check_overlap(self):
-    previous_order = frappe.get_doc("Sales Order", self.previous_order_id)
-    if previous_order:
-        if self.start_date and self.end_date:
-            # Convert string dates to datetime.date objects
-            start_date = datetime.strptime(self.start_date, '%Y-%m-%d').date()
-            end_date = datetime.strptime(self.end_date, '%Y-%m-%d').date()
-            
-            # Check for overlap
-            overlap = (start_date <= previous_order.end_date and end_date >= previous_order.start_date)
-            return overlap
-    return False
+    # Compare with the previous order's window without loading the document
+    return check_previous_order_overlap(self)
 
 
 
 @frappe.whitelist()
 def item_replacement(item_code,customer, new_item,new_item_group, replacement_date, master_order_id, docname, old_item_status, reason=None):
     try:
-        new_item_code = frappe.get_doc('Item',new_item)
-        if new_item_code.status == 'Available':
+        if get_device_status(new_item) == 'Available':
             # Add a record in the Rental Order Replaced Item
             rental_order = frappe.new_doc("Rental Order Replaced Item")
             rental_order.master_order_id = master_order_id
@@ -5146,134 +4964,15 @@ def get_razorpay_payment_details(sales_order_id, customer, actual_amount, final_
 
         if response.status_code == 200:
             razorpay_response = response.json()
-            # print('Razorpay response:', razorpay_response)
-            # frappe.log_error(f'Razorpay response: {razorpay_response}')  # Debug log
-            
-            payment_link_log = frappe.get_all("Payment Link Log", filters={"link_id": razorpay_payment_link_id})
-            
-            if payment_link_log:
-                payment_link_log_doc = frappe.get_doc("Payment Link Log", payment_link_log[0].name)
-                payment_link_log_id = payment_link_log_doc.name
-                # print('payment_link_log_doc:', payment_link_log_doc)
-                # frappe.log_error(f'payment_link_log_doc: {payment_link_log_doc}')  # Debug log
-                raz_amount_paid = int(float(razorpay_response.get('amount_paid', 0)) / 100)
-                
-                # Update fields from Razorpay response
-                payment_link_log_doc.paid_amount = raz_amount_paid
-                payment_link_log_doc.balance_amount = payment_link_log_doc.total_amount - raz_amount_paid
-                payment_link_log_doc.payment_status = razorpay_response.get('status')
-                
-                # Clear existing child table entries and append new payments
-                payment_ids = []
-                payment_link_log_doc.set("razorpay_payment_details", [])
-                for payment in razorpay_response.get('payments', []):
-                    payment_ids.append(payment.get('payment_id'))
-                    payment_link_log_doc.append('razorpay_payment_details', {
-                        'amount': int(float(payment.get('amount', 0)) / 100),
-                        'payment_id': payment.get('payment_id'),
-                        'status': payment.get('status'),
-                        'method': payment.get('method'),
-                        'description': payment.get('method'),  # Correct field name as needed
-                        'created_at': frappe.utils.datetime.datetime.fromtimestamp(payment.get('created_at', 0))
-                    })
-                
-                # Update the payment_ids field with a comma-separated list of payment IDs
-                razorpay_payment_ids = ','.join(payment_ids)
-                payment_link_log_doc.payment_ids = razorpay_payment_ids
-                
-                # Save the document
-                try:
-                    payment_link_log_doc.save(ignore_permissions=True)
-                    frappe.db.commit()
-                    frappe.msgprint("Payment Link Log updated successfully.")
-                    frappe.log_error("Payment Link Log updated successfully.")  # Debug log
-                except Exception as e:
-                    frappe.msgprint(f'Error saving Payment Link Log: {e}')
-                    frappe.log_error(f'Error saving Payment Link Log: {e}')  # Debug log
-                
-                render_payment_success_page(raz_amount_paid, sales_order_id[:18])
-
-                # Proceed if the payment status is 'paid'
-                if payment_link_log_doc.payment_status == 'paid':
-                    # print('mohaaaaaaaaaaaaaaaaaaaaa')
-                    # payment_link_log_id = payment_link_log_doc.name
-                    # Fetch Sales Order details
-                    sales_order = frappe.get_doc("Sales Order", sales_order_id[:18])
-                    # print('sales_orderrrrrrrrrrrrrrrrrrrrrrr',sales_order.order_type)
-                    order_type = sales_order.order_type
-                    rounded_total = sales_order.rounded_total
-                    master_order_id = sales_order.master_order_id
-                    razorpay_link_so = sales_order.custom_razorpay_payment_url
-                    
-                    if order_type == "Rental":
-                        security_deposit = sales_order.security_deposit if sales_order.security_deposit else 0
-                        if isinstance(security_deposit, str):
-                            security_deposit = float(security_deposit) if '.' in security_deposit else int(security_deposit)
-
-                        payment_entry = create_payment_entry(
-                            rounded_total, 
-                            sales_order_id[:18], 
-                            customer, 
-                            razorpay_payment_link_id, 
-                            rounded_total, 
-                            master_order_id,
-                            razorpay_response,
-                            razorpay_payment_ids
-                        )
-                        
-                        journal_entry = None
-                        if security_deposit > 0:
-                            frappe.set_user("Administrator")
-                            journal_entry = create_journal_entry_razorpay(
-                                security_deposit, 
-                                sales_order_id[:18], 
-                                customer, 
-                                razorpay_payment_link_id, 
-                                master_order_id,
-                                razorpay_payment_ids
-                            )
-                            # frappe.set_user("Guest")
-                        
-                        create_razorpay_payment_details(
-                            payment_entry, 
-                            journal_entry, 
-                            sales_order_id[:18], 
-                            order_type, 
-                            customer, 
-                            razorpay_payment_link_id, 
-                            razorpay_link_so,
-                            payment_link_log_id
-                        )
-                         
-                    
-                    else:
-                        frappe.msgprint("Order type is not Rental. Proceeding with standard payment entry.")
-                        payment_entry = create_payment_entry(
-                            rounded_total, 
-                            sales_order_id[:18], 
-                            customer, 
-                            razorpay_payment_link_id, 
-                            payment_link_log_doc.paid_amount, 
-                            master_order_id,
-                            razorpay_response,
-                            razorpay_payment_ids
-                        )
-                        frappe.set_user("Administrator")
-                        create_razorpay_payment_details(
-                            payment_entry, 
-                            None,  # No journal entry for non-rental orders
-                            sales_order_id[:18], 
-                            order_type, 
-                            customer, 
-                            razorpay_payment_link_id, 
-                            razorpay_link_so,
-                            payment_link_log_id
-                        )
-                        frappe.set_user("Guest")
-                        return render_payment_success_page(raz_amount_paid, sales_order_id[:18])
-            else:
-                frappe.msgprint(f'Payment Link Log not found for link_id: {razorpay_payment_link_id}')
-                frappe.log_error(f'Payment Link Log not found for link_id: {razorpay_payment_link_id}')
+
+            # Register each payment once (keyed on razorpay_payment_id); ledger entries are
+            # created by a per Sales Order background job
+            register_payment_link_callbacks(
+                sales_order_id[:18], customer, payment_link[0].name, razorpay_response
+            )
+
+            raz_amount_paid = int(float(razorpay_response.get('amount_paid', 0)) / 100)
+            return render_payment_success_page(raz_amount_paid, sales_order_id[:18])
         else:
             frappe.msgprint(f'Request failed with status code: {response.status_code}')
             frappe.log_error(f'Request failed with status code: {response.status_code}; Response text: {response.text}')
@@ -5283,215 +4982,6 @@ def get_razorpay_payment_details(sales_order_id, customer, actual_amount, final_
 
 
 
-import frappe
-from frappe.utils import nowdate
-
-def create_journal_entry_razorpay(security_deposit, sales_order_id, customer, razorpay_payment_link_id, master_order_id,razorpay_payment_ids):
-    try:
-        # Check if the journal entry already exists
-        if is_journal_entry_exists(sales_order_id):
-            frappe.msgprint('Journal Entry already exists. Skipping creation.')
-            return
-
-        today = frappe.utils.nowdate()
-
-        # Create a new Journal Entry document
-        journal_entry = frappe.new_doc("Journal Entry")
-        journal_entry.voucher_type = "Journal Entry"
-        journal_entry.sales_order_id = sales_order_id
-        journal_entry.posting_date = today
-        journal_entry.journal_entry_type = "Security Deposit"
-        journal_entry.security_deposite_type = "SD Amount Received From Client"
-        journal_entry.master_order_id = master_order_id
-        journal_entry.cheque_no = razorpay_payment_ids
-        journal_entry.cheque_date = today
-        journal_entry.user_remark = f"Security Deposit Payment Against Sales Order {sales_order_id}. Remark: System Generated From RazorPay"
-        # journal_entry.customer_id = customer
-        journal_entry.mode_of__payment = 'Razorpay'
-        journal_entry.transactional_effect = "Plus"
-        journal_entry.custom_razorpay = 1
-
-        # Add accounts for debit and credit
-        journal_entry.append("accounts", {
-            "account": 'Kotak Bank Current Account - INR',
-            "debit_in_account_currency": security_deposit
-        })
-        journal_entry.append("accounts", {
-            "account": "Debtors - INR",
-            "party_type": "Customer",
-            "party": customer,
-            "credit_in_account_currency": security_deposit
-        })
-
-        # Save and submit the Journal Entry document
-        journal_entry.insert(ignore_permissions=True)
-        journal_entry.submit()
-        frappe.db.commit()
-        frappe.msgprint("Security Deposit Journal Entry created successfully.")
-        return journal_entry.name
-        # frappe.set_user("Guest")
-    except Exception as e:
-        frappe.log_error(frappe.get_traceback(), _("Failed to create Security Deposit Journal Entry"))
-        frappe.throw(_("Failed to create Security Deposit Journal Entry. Please try again later."))
-
-
-import frappe
-from frappe.utils import now_datetime
-
-def create_payment_entry(rounded_total, sales_order_id, customer, razorpay_payment_link_id, amount_paid_razorpay, master_order_id, razorpay_response,razorpay_payment_ids):
-    try:
-        frappe.msgprint("Payment Entry Function Called")
-        frappe.set_user("Administrator")
-
-        # Ensure 'payments' is a list
-        razorpay_p_id_list = razorpay_response.get('payments', [])
-        if not isinstance(razorpay_p_id_list, list):
-            razorpay_p_id_list = []
-
-        # Extract payment_id from the first payment entry
-        if razorpay_p_id_list:
-            razorpay_payment_id = razorpay_p_id_list[0].get('payment_id')
-        else:
-            frappe.msgprint('No payment details found in the response.')
-            return
-        
-        if is_payment_entry_exists(razorpay_payment_id):
-            frappe.msgprint('Payment Entry already exists. Skipping creation.')
-            return
-        
-        # Create Payment Entry
-        payment_entry = frappe.get_doc({
-            "doctype": "Payment Entry",
-            "voucher_type": "Payment Entry",
-            "paid_from": "Debtors - INR",
-            "paid_to": "Kotak Bank Current Account - INR",
-            "received_amount": rounded_total,
-            "base_received_amount": rounded_total,
-            "paid_amount": int(amount_paid_razorpay),
-            "references": [{
-                "reference_doctype": "Sales Order",
-                "reference_name": sales_order_id,
-                "allocated_amount": int(amount_paid_razorpay)
-            }],
-            "sales_order_id": sales_order_id,
-            "custom_system_generator_from_razorpay": 1,
-            "reference_date": now_datetime(),
-            "account": "Accounts Receivable",
-            "party_type": "Customer",
-            "party": customer,
-            "custom_from_razorpay": 1,
-            "master_order_id": master_order_id,
-            "mode_of_payment": "Razorpay",
-            "reference_no": razorpay_payment_ids
-        }, ignore_permissions=True)
-        
-        payment_entry.insert(ignore_permissions=True)
-        payment_entry.submit()
-        frappe.db.commit()
-
-        # frappe.set_user("Guest")
-        return payment_entry.name
-    except frappe.exceptions.ValidationError as e:
-        frappe.log_error(f"Error creating Payment Entry: {e}")
-        frappe.msgprint(f'Error creating Payment Entry: {e}')
-        return f"Error creating Payment Entry: {e}"
-    except Exception as e:
-        frappe.log_error(frappe.get_traceback(), _("Failed to create Payment Entry"))
-        frappe.throw(_("Failed to create Payment Entry. Please try again later."))
-
-
-
-
-# def create_payment_entry(rounded_total, sales_order_id, customer, razorpay_payment_link_id, actual_amount,master_order_id):
-#     try:
-#         frappe.msgprint("Payment Entry Function Called")
-#         frappe.set_user("Administrator")
-        
-#         if is_payment_entry_exists(razorpay_payment_link_id):
-#             frappe.msgprint('Payment Entry already exists. Skipping creation.')
-#             return
-        
-#         payment_entry = frappe.get_doc({
-#             "doctype": "Payment Entry",
-#             "paid_from": "Debtors - INR",
-#             "paid_to": "Kotak Bank Current Account - INR",
-#             "received_amount": rounded_total,
-#             "base_received_amount": rounded_total,
-#             "paid_amount": int(rounded_total),
-#             "references": [{
-#                 "reference_doctype": "Sales Order",
-#                 "reference_name": sales_order_id,
-#                 "allocated_amount": int(actual_amount)
-#             }],
-#             "sales_order_id": sales_order_id,
-#             "custom_system_generator_from_razorpay": 1,
-#             "reference_date": frappe.utils.today(),
-#             "account": "Accounts Receivable",
-#             "party_type": "Customer",
-#             "party": customer,
-#             "custom_from_razorpay": 1,
-#             "master_order_id":master_order_id,
-#             "mode_of_payment": "Razorpay",
-#             "reference_no": razorpay_payment_link_id
-#         }, ignore_permissions=True)
-        
-#         payment_entry.insert(ignore_permissions=True)
-#         payment_entry.submit()
-#         frappe.db.commit()
-        
-#         payment_link_log = frappe.get_all("Payment Link Log", filters={"link_id": razorpay_payment_link_id})
-#         if payment_link_log:
-#             payment_link_log_doc = frappe.get_doc("Payment Link Log", payment_link_log[0].name)
-#             payment_link_log_doc.payment_status = "Paid"
-#             payment_link_log_doc.paid_amount = int(actual_amount)
-#             payment_link_log_doc.save(ignore_permissions=True)
-        
-#         frappe.set_user("Guest")
-#         return payment_entry.name
-#     except frappe.exceptions.ValidationError as e:
-#         frappe.log_error(f"Error creating Payment Entry: {e}")
-#         frappe.msgprint(f'Error creating Payment Entry: {e}')
-#         return f"Error creating Payment Entry: {e}"
-
-def create_razorpay_payment_details(payment_entry_id, journal_entry_id, sales_order_id, order_type, customer, razorpay_payment_link_id, razorpay_link_so, payment_link_log_id):
-    try:
-        # Check if Razorpay Payment Details already exists
-        if is_razorpay_payment_details(razorpay_payment_link_id):
-            frappe.msgprint('Razorpay Payment Details already exists. Skipping creation.')
-            return
-        
-        # Create new Razorpay Payment Details document
-        razorpay_payment_details = frappe.get_doc({
-            "doctype": "Razorpay Payment Details",
-            "payment_entry_id": payment_entry_id,
-            "journal_entry_id": journal_entry_id,
-            "sales_order_id": sales_order_id,
-            "order_type": order_type,
-            "date": frappe.utils.nowdate(),
-            "customer_id": customer,
-            "razorpay_link": razorpay_link_so,
-            "reference_id": razorpay_payment_link_id
-        })
-        
-        # Insert the new document and commit changes
-        razorpay_payment_details.insert(ignore_permissions=True)
-        frappe.db.commit()
-        
-        # Update Payment Link Log document with payment and journal entry IDs
-        doc = frappe.get_doc('Payment Link Log', payment_link_log_id)
-        doc.payment_entry_id = payment_entry_id
-        doc.journal_entry_id = journal_entry_id
-        doc.save()
-        frappe.db.commit()  # Commit the changes to ensure they are saved
-        
-        # Provide user feedback
-        frappe.msgprint("Razorpay Payment Details created and Payment Link Log updated successfully.")
-    
-    except Exception as e:
-        # Log the exception and raise a user-friendly error message
-        frappe.log_error(frappe.get_traceback(), "Failed to create Razorpay Payment Details")
-        frappe.throw("Failed to create Razorpay Payment Details. Please try again later.")
-
 def render_payment_success_page(amount_paid_razorpay, razorpay_payment_link_id):
     success_html = f"""
     <html>
@@ -5516,29 +5006,6 @@ def render_payment_success_page(amount_paid_razorpay, razorpay_payment_link_id):
 ###############################################################################################
 
 
-def is_payment_entry_exists(razorpay_payment_id):
-    existing_payment_entry = frappe.get_value("Payment Entry", {"reference_no": razorpay_payment_id})
-    return bool(existing_payment_entry)
-
-def is_journal_entry_exists(reference_id):
-    existing_journal_entry = frappe.get_value("Journal Entry", {
-        "sales_order_id": reference_id,
-        "security_deposite_type": "SD Amount Received From Client"
-    })
-    return bool(existing_journal_entry)
-
-
-def is_razorpay_payment_details(reference_id):
-    is_razorpay_payment_details = frappe.get_value("Razorpay Payment Details", {
-        "reference_id": reference_id
-    })
-    return bool(is_razorpay_payment_details)
-
-
-
-#####################################################################################
-
-
 
 
 import frappe
@@ -5685,25 +5152,17 @@ def update_sales_order_with_serial_numbers(sales_order_name, delivery_note_name)
 @frappe.whitelist()
 def get_bin_data(item_codes):
     # Convert item_codes string to a list
-    item_codes_list = list(set(frappe.parse_json(item_codes)))
- 
- 
-    # Initialize a list to store warehouse quantities for each item
-    items_data = []
-    warehouse=[]
-    # Query Bin data based on the provided item codes
-    for item_code in item_codes_list:
-        item_data = {'item_code': item_code, 'warehouse_qty': {}}
-        bin_data = frappe.get_all('Bin',
-                                  filters={'item_code': item_code},
-                                  fields=['warehouse', 'actual_qty'])
-        for data in bin_data:
-            item_data['warehouse_qty'][data['warehouse']] = data['actual_qty']
-            if data['warehouse'] not in warehouse:
-                warehouse.append(data['warehouse'])
-        items_data.append(item_data)
-    # print(items_data)
- 
+    item_codes_list = list(dict.fromkeys(frappe.parse_json(item_codes)))
+
+    # Warehouse quantities of all items in a single Bin query
+    bin_qty = get_bin_qty_map(item_codes_list)
+
+    items_data = [
+        {'item_code': item_code, 'warehouse_qty': bin_qty.get(item_code, {})}
+        for item_code in item_codes_list
+    ]
+    warehouse = list(dict.fromkeys(wh for data in items_data for wh in data['warehouse_qty']))
+
     return {'items_data':items_data,'warehouse':warehouse}
 
 
@@ -5723,30 +5182,16 @@ def check_sales_order_items(item_code):
 
 @frappe.whitelist()
 def get_rental_order_items_status():
-    # Fetch all Sales Orders with status 'Active' and order_type 'Rental'
-    sales_orders = frappe.get_all('Sales Order', filters={
-        'status': 'Active',
-        'order_type': 'Rental',
-        'docstatus':1,
-    }, fields=['name', 'status'])
-
-    if not sales_orders:
+    # Lines of active rental orders whose device is not marked as rented out, in one joined query.
+    # Use erpnext.selling.rental.fleet.get_fleet_status for paginated, structured data.
+    if not frappe.db.exists('Sales Order', {'status': 'Active', 'order_type': 'Rental', 'docstatus': 1}):
         return "No active rental orders found."
 
-    items_status = []
-    for order in sales_orders:
-        # Fetch all items in the Sales Order
-        items = frappe.get_all('Sales Order Item', filters={
-            'parent': order.name
-        }, fields=['item_code'])
-        
-        for item in items:
-            # Fetch the status of the item using item_code
-            item_doc = frappe.get_doc('Item', item.item_code)
-            item_status = item_doc.get('status', 'Unknown')  # Replace 'status' with the actual field name if different
-            
-            if item_status != 'Rented Out':
-                items_status.append(f"Sales Order: {order.name}, Item: {item.item_code}, Item Status: {item_status}, Sales Order Status: {order.status}")
+    rows = get_fleet_rows(frappe._dict(exclude_item_status='Rented Out'), page_length=0)
+    items_status = [
+        f"Sales Order: {row.sales_order}, Item: {row.item_code}, Item Status: {row.item_status or 'Unknown'}, Sales Order Status: {row.order_status}"
+        for row in rows
+    ]
 
     if not items_status:
         return "No available items found for the specified sales orders."
@@ -5777,8 +5222,8 @@ def fetch_balance_amount_for_sales_order(sales_order):
 
 @frappe.whitelist()
 def get_sales_orders_containing_item(item_code):
-    item_status = frappe.db.get_value("Item", item_code, "status")
-    item_group = frappe.db.get_value("Item", item_code, "item_group")
+    # Read the device's status from the availability index
+    availability = get_item_availability(item_code)
     sales_orders = frappe.db.sql("""
         SELECT
             so.name,
@@ -5795,14 +5240,42 @@ def get_sales_orders_containing_item(item_code):
         AND
             so.status != 'Submitted to Office'
     """, item_code, as_dict=True)
-    # print(sales_orders)
     return {
-        'item_status': item_status,
-        'item_group': item_group,
+        'item_status': availability.status,
+        'item_group': availability.item_group,
         'sales_orders': sales_orders
     }
 
 
+@frappe.whitelist()
+def get_current_holder_of_item(item_code):
+    # Read the device's status and the rental order currently holding it from the availability index
+    availability = get_item_availability(item_code)
+
+    sales_order = None
+    if availability.sales_order:
+        sales_order = frappe.db.get_value(
+            "Sales Order", availability.sales_order, ["name", "customer_name", "status"], as_dict=True
+        )
+
+    return {
+        'item_status': availability.status,
+        'item_group': availability.item_group,
+        'sales_order': sales_order,
+        'start_date': availability.start_date,
+        'end_date': availability.end_date,
+    }
+
+
+def get_item_availability(item_code):
+    availability = get_device_availability(item_code)
+    if not availability:
+        refresh_device_availability([item_code])
+        availability = get_device_availability(item_code)
+
+    return availability or frappe._dict()
+
+
 
 # @frappe.whitelist()
 # def update_item_status(item_code, status):
@@ -5826,8 +5299,6 @@ def update_item_status(item_code, status):
     item.status = status
     # Save the changes
     item.save()
-    # Commit the transaction
-    frappe.db.commit()
     return f"Item {item_code} updated to status {status}"
 
 
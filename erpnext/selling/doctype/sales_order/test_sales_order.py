@@ -2,6 +2,7 @@
 # License: GNU General Public License v3. See license.txt
 
 import json
+from unittest.mock import patch
 
 import frappe
 import frappe.permissions
@@ -26,6 +27,7 @@ from erpnext.selling.doctype.sales_order.sales_order import (
 	make_raw_material_request,
 	make_sales_invoice,
 	make_work_orders,
+	mark_overdue_sales_orders,
 )
 from erpnext.stock.doctype.item.test_item import make_item
 from erpnext.stock.doctype.stock_entry.stock_entry_utils import make_stock_entry
@@ -2141,6 +2143,54 @@ class TestSalesOrder(FrappeTestCase):
 		dn.submit()
 		dn.reload()
 
+	def test_mark_overdue_sales_orders(self):
+		cases = [
+			# status, end_date, overdue_status
+			("RENEWED", add_days(today(), -5), "Overdue"),
+			("RENEWED", None, None),
+			("To Deliver and Bill", add_days(today(), -1), None),
+			("To Deliver and Bill", add_days(today(), -1), "Active"),
+			("To Deliver and Bill", today(), "Overdue"),
+			("To Deliver and Bill", add_days(today(), 5), "Active"),
+			("To Deliver and Bill", None, "Overdue"),
+			(None, add_days(today(), -1), "Renewed"),
+		]
+		for status, end_date, overdue_status in cases:
+			so = make_sales_order(do_not_submit=True)
+			frappe.db.set_value(
+				"Sales Order",
+				so.name,
+				{"status": status, "end_date": end_date, "overdue_status": overdue_status},
+			)
+
+		# the per order loop the set based update replaced
+		today_date = getdate(today())
+		expected = {}
+		for so in frappe.get_all("Sales Order", fields=["name", "end_date", "status"]):
+			if so.status == "RENEWED":
+				expected[so.name] = "Renewed"
+			elif getdate(so.end_date) < today_date:
+				expected[so.name] = "Overdue"
+			else:
+				expected[so.name] = "Active"
+
+		with patch.object(frappe.db, "commit"):
+			counts = mark_overdue_sales_orders()
+
+		self.assertEqual(
+			dict(frappe.get_all("Sales Order", fields=["name", "overdue_status"], as_list=True)),
+			expected,
+		)
+		self.assertGreaterEqual(counts["Renewed"], 2)
+		self.assertGreaterEqual(counts["Overdue"], 3)
+		self.assertGreaterEqual(counts["Active"], 1)
+
+		# a second run finds nothing left to change
+		with patch.object(frappe.db, "commit"):
+			counts = mark_overdue_sales_orders()
+
+		self.assertEqual((counts["Renewed"], counts["Overdue"], counts["Active"]), (0, 0, 0))
+
 
 def automatically_fetch_payment_terms(enable=1):
 	accounts_settings = frappe.get_doc("Accounts Settings")
@@ -0,0 +1,34 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class TechnicianWorkItem(Document):
+	# begin: auto-generated types
+	# This code is auto-generated. Do not modify anything in this block.
+
+	from typing import TYPE_CHECKING
+
+	if TYPE_CHECKING:
+		from frappe.types import DF
+
+		completed_on: DF.Datetime | None
+		customer: DF.Link | None
+		customer_name: DF.Data | None
+		item_code: DF.Link | None
+		sales_order: DF.Link | None
+		scheduled_date: DF.Datetime | None
+		status: DF.Literal["Open", "Completed", "Cancelled"]
+		technician_id: DF.Data | None
+		technician_user: DF.Link | None
+		technician_visit_entry: DF.Data | None
+		visit_type: DF.Literal["Delivery", "Pickup"]
+	# end: auto-generated types
+
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Technician Work Item", ["technician_user", "status"])
@@ -0,0 +1,57 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, now_datetime
+
+from erpnext.selling.doctype.sales_order.test_sales_order import make_sales_order
+from erpnext.selling.rental.lifecycle import update_rental_status
+from erpnext.selling.rental.technician_queue import (
+	add_work_item,
+	close_work_items,
+	get_technician_work_queue,
+)
+
+
+class TestTechnicianWorkItem(FrappeTestCase):
+	def test_work_queue(self):
+		so = make_sales_order(do_not_submit=True)
+		add_work_item("TECH-1", "Delivery", so.name, technician_user=frappe.session.user)
+		add_work_item(
+			"TECH-1",
+			"Pickup",
+			so.name,
+			item_code=so.items[0].item_code,
+			technician_user=frappe.session.user,
+			scheduled_date=add_days(now_datetime(), 1),
+		)
+		# reassignment replaces the open delivery
+		add_work_item("TECH-1", "Delivery", so.name, technician_user=frappe.session.user)
+
+		queue = get_technician_work_queue()
+		self.assertEqual([d.sales_order for d in queue["deliveries"]], [so.name])
+		self.assertEqual([d.item_code for d in queue["pickups"]], [so.items[0].item_code])
+
+		close_work_items(so.name, "Delivery")
+		self.assertEqual(get_technician_work_queue()["deliveries"], [])
+
+	def test_stale_status_update_is_refused(self):
+		so = make_sales_order(do_not_submit=True)
+		modified = update_rental_status(
+			so.name, item_values={"child_status": "Ready for Delivery"}, expected_modified=so.modified
+		)
+		self.assertEqual(
+			frappe.db.get_value("Sales Order Item", so.items[0].name, "child_status"), "Ready for Delivery"
+		)
+
+		self.assertRaises(
+			frappe.TimestampMismatchError,
+			update_rental_status,
+			so.name,
+			item_values={"child_status": "Picked Up"},
+			expected_modified=so.modified,
+		)
+		update_rental_status(
+			so.name, item_values={"child_status": "Picked Up"}, expected_modified=modified
+		)
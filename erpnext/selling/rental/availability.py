@@ -0,0 +1,168 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+"""Availability index of rental devices.
+
+`Rental Device Availability` keeps one row per device (Item) with its status, the
+rental order currently holding it and that order's rental window. Rows are
+refreshed in the same transaction as the Item or Sales Order change that moves
+the device, so assignment and replacement can look a device up by item code
+instead of scanning every historical order.
+
+The rows follow Item and Sales Order doc events only. Writes that skip them, such as
+`frappe.db.set_value("Item", ..., "status", ...)`, leave the index stale until the
+caller passes the devices to `refresh_device_availability` (the lifecycle engine does
+this for the devices it moves); `rebuild_device_availability` repairs the whole index.
+"""
+
+import frappe
+from frappe.utils import create_batch
+
+# Orders in these states no longer hold their devices
+RELEASED_ORDER_STATUSES = (
+	"Submitted to Office",
+	"Cancelled",
+	"Closed",
+	"Completed",
+	"Rental SO Completed",
+	"RENEWED",
+)
+RELEASED_LINE_STATUSES = (
+	"Submitted to Office",
+	"Item Replaced",
+	"Cancelled",
+	"Closed",
+	"Rental SO Completed",
+)
+
+AVAILABILITY_FIELDS = (
+	"item_code",
+	"item_group",
+	"status",
+	"sales_order",
+	"master_order_id",
+	"customer",
+	"start_date",
+	"end_date",
+)
+
+
+def refresh_device_availability(item_codes):
+	"""Recompute the availability rows of the given devices."""
+	item_codes = list({item_code for item_code in item_codes if item_code})
+	if not item_codes:
+		return
+
+	items = frappe.get_all(
+		"Item",
+		filters={"name": ("in", item_codes)},
+		fields=["name", "item_group", "status"],
+	)
+	holders = get_current_holders(item_codes)
+	existing = set(
+		frappe.get_all("Rental Device Availability", filters={"name": ("in", item_codes)}, pluck="name")
+	)
+
+	for item in items:
+		holder = holders.get(item.name, {})
+		values = {
+			"item_group": item.item_group,
+			"status": item.status,
+			"sales_order": holder.get("sales_order"),
+			"master_order_id": holder.get("master_order_id"),
+			"customer": holder.get("customer"),
+			"start_date": holder.get("start_date"),
+			"end_date": holder.get("end_date"),
+		}
+
+		if item.name in existing:
+			frappe.db.set_value("Rental Device Availability", item.name, values, update_modified=False)
+		else:
+			frappe.get_doc(
+				{"doctype": "Rental Device Availability", "item_code": item.name, **values}
+			).db_insert()
+
+
+def get_current_holders(item_codes):
+	"""{item_code: latest rental order line still holding the device}."""
+	so = frappe.qb.DocType("Sales Order")
+	soi = frappe.qb.DocType("Sales Order Item")
+
+	rows = (
+		frappe.qb.from_(soi)
+		.inner_join(so)
+		.on(so.name == soi.parent)
+		.select(
+			soi.item_code,
+			so.name.as_("sales_order"),
+			so.master_order_id,
+			so.customer,
+			so.start_date,
+			so.end_date,
+		)
+		.where(
+			(soi.item_code.isin(item_codes))
+			& (so.order_type == "Rental")
+			& (so.docstatus < 2)
+			& (so.status.notin(RELEASED_ORDER_STATUSES))
+			& (soi.child_status.isnull() | soi.child_status.notin(RELEASED_LINE_STATUSES))
+		)
+		.orderby(so.start_date)
+		.orderby(so.creation)
+	).run(as_dict=True)
+
+	# later rows win, i.e. the most recent order holding the device
+	return {row.item_code: row for row in rows}
+
+
+def get_device_status(item_code):
+	"""Current status of a device, read from the index with a fallback to Item."""
+	return frappe.db.get_value(
+		"Rental Device Availability", item_code, "status"
+	) or frappe.db.get_value("Item", item_code, "status")
+
+
+@frappe.whitelist()
+def get_device_availability(item_code):
+	return frappe.db.get_value(
+		"Rental Device Availability", item_code, AVAILABILITY_FIELDS, as_dict=True
+	)
+
+
+@frappe.whitelist()
+def get_available_devices(item_group=None, status="Available"):
+	filters = {"status": status}
+	if item_group:
+		filters["item_group"] = item_group
+
+	return frappe.get_all(
+		"Rental Device Availability",
+		filters=filters,
+		fields=list(AVAILABILITY_FIELDS),
+		order_by="item_code",
+	)
+
+
+def rebuild_device_availability():
+	"""Backfill the index for every device that has a status."""
+	item_codes = frappe.get_all("Item", filters={"status": ("is", "set")}, pluck="name")
+	for chunk in create_batch(item_codes, 500):
+		refresh_device_availability(chunk)
+
+
+def on_item_update(doc, method=None):
+	indexed = frappe.db.exists("Rental Device Availability", doc.name)
+	if not indexed and not doc.get("status"):
+		return
+
+	if not indexed or doc.has_value_changed("status") or doc.has_value_changed("item_group"):
+		refresh_device_availability([doc.name])
+
+
+def on_item_trash(doc, method=None):
+	frappe.db.delete("Rental Device Availability", {"name": doc.name})
+
+
+def on_sales_order_update(doc, method=None):
+	if doc.get("order_type") == "Rental":
+		refresh_device_availability([d.item_code for d in doc.get("items")])
@@ -0,0 +1,125 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+"""Fleet status of rental devices.
+
+Returns the rental orders, their devices, the device status and the warehouse
+quantities of those devices with one joined query per concern, independent of
+the number of orders or lines.
+"""
+
+import frappe
+from frappe.query_builder.functions import Count
+from frappe.utils import cint
+
+
+@frappe.whitelist()
+def get_fleet_status(filters=None, start=0, page_length=100):
+	"""Paginated rental order lines with device status and Bin quantities.
+
+	Supported filters: `order_status` (default "Active"), `item_group`,
+	`item_status`, `exclude_item_status`, `customer` and `item_code`.
+	"""
+	# the joined query bypasses permission checks, so require read access to what it returns
+	for doctype in ("Sales Order", "Item", "Bin"):
+		frappe.has_permission(doctype, "read", throw=True)
+
+	filters = frappe._dict(frappe.parse_json(filters) or {})
+	start, page_length = cint(start), cint(page_length)
+
+	rows = get_fleet_rows(filters, start, page_length)
+	bin_qty = get_bin_qty_map({row.item_code for row in rows})
+	for row in rows:
+		row.warehouse_qty = bin_qty.get(row.item_code, {})
+
+	return {
+		"data": rows,
+		"total_count": get_fleet_count(filters),
+		"warehouses": sorted({warehouse for qty in bin_qty.values() for warehouse in qty}),
+		"start": start,
+		"page_length": page_length,
+	}
+
+
+def get_fleet_query(filters):
+	so = frappe.qb.DocType("Sales Order")
+	soi = frappe.qb.DocType("Sales Order Item")
+	item = frappe.qb.DocType("Item")
+
+	query = (
+		frappe.qb.from_(so)
+		.inner_join(soi)
+		.on(soi.parent == so.name)
+		.inner_join(item)
+		.on(item.name == soi.item_code)
+		.where(
+			(so.docstatus == 1)
+			& (so.order_type == "Rental")
+			& (so.status == (filters.get("order_status") or "Active"))
+		)
+	)
+
+	if filters.get("item_group"):
+		query = query.where(item.item_group == filters.item_group)
+	if filters.get("item_status"):
+		query = query.where(item.status == filters.item_status)
+	if filters.get("exclude_item_status"):
+		query = query.where(item.status.isnull() | (item.status != filters.exclude_item_status))
+	if filters.get("customer"):
+		query = query.where(so.customer == filters.customer)
+	if filters.get("item_code"):
+		query = query.where(soi.item_code == filters.item_code)
+
+	return query, so, soi, item
+
+
+def get_fleet_rows(filters, start=0, page_length=100):
+	query, so, soi, item = get_fleet_query(filters)
+	query = (
+		query.select(
+			so.name.as_("sales_order"),
+			so.status.as_("order_status"),
+			so.customer,
+			so.customer_name,
+			so.start_date,
+			so.end_date,
+			soi.name.as_("sales_order_item"),
+			soi.item_code,
+			soi.item_name,
+			soi.child_status,
+			item.item_group,
+			item.status.as_("item_status"),
+		)
+		.orderby(so.name)
+		.orderby(soi.idx)
+	)
+
+	if page_length:
+		query = query.limit(page_length).offset(start)
+
+	return query.run(as_dict=True)
+
+
+def get_fleet_count(filters):
+	query, so, soi, item = get_fleet_query(filters)
+	return query.select(Count(soi.name)).run()[0][0]
+
+
+def get_bin_qty_map(item_codes):
+	"""{item_code: {warehouse: actual_qty}} for all the given items in one query."""
+	if not item_codes:
+		return {}
+
+	bin = frappe.qb.DocType("Bin")
+	rows = (
+		frappe.qb.from_(bin)
+		.select(bin.item_code, bin.warehouse, bin.actual_qty)
+		.where(bin.item_code.isin(list(item_codes)))
+		.orderby(bin.warehouse)
+	).run(as_dict=True)
+
+	bin_qty = {}
+	for row in rows:
+		bin_qty.setdefault(row.item_code, {})[row.warehouse] = row.actual_qty
+
+	return bin_qty
@@ -0,0 +1,389 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+"""Status lifecycle of rental orders.
+
+Rental status changes only touch a handful of fields on the order, its lines and
+its devices, so they are written with `frappe.db.set_value` instead of loading
+and saving whole documents.
+
+`RENTAL_ORDER_TRANSITIONS` declares which statuses an order may move to and
+`RENTAL_STATUS_ACTIONS` what else changes with it (date fields, line status,
+device status). `transition_rental_orders` validates and applies one transition
+to any number of orders in a single transaction: every order, line and device
+is updated with a bounded number of queries and one realtime event is published
+for the whole batch.
+"""
+
+from collections import defaultdict
+
+import frappe
+from frappe import _
+from frappe.utils import create_batch, get_datetime, now
+
+from erpnext.selling.rental.availability import refresh_device_availability
+
+# Above this many orders, bulk transitions run in a background job
+BULK_TRANSITION_THRESHOLD = 50
+RENTAL_STATUS_EVENT = "rental_status_updated"
+
+_NEW = ("Draft", "Pending", "Approved", "Order")
+# Status a closed or held order is re-opened to
+REOPEN_STATUS = "Pending"
+_IN_RENT = ("DELIVERED", "Active", "Overdue", "RENEWED")
+_UNDELIVERED = (*_NEW, "Rental Device Assigned", "Ready for Delivery", "DISPATCHED")
+_OPEN = (
+	*_UNDELIVERED,
+	*_IN_RENT,
+	"Ready for Pickup",
+	"Picked Up",
+	# some devices submitted to office, the others still out
+	"Partially Closed",
+)
+# Lines that left their order keep their status through later transitions
+DETACHED_LINE_STATUSES = ("Item Replaced", "Cancelled")
+
+# {current status: statuses the order may move to}
+RENTAL_ORDER_TRANSITIONS = {
+	**{
+		status: {"Rental Device Assigned", "Ready for Delivery", "DISPATCHED", "DELIVERED", "Active"}
+		for status in _NEW
+	},
+	"Rental Device Assigned": {"Ready for Delivery", "DISPATCHED", "DELIVERED", "Active"},
+	"Ready for Delivery": {"Rental Device Assigned", "DISPATCHED", "DELIVERED", "Active"},
+	"DISPATCHED": {"DELIVERED", "Active"},
+	**{
+		status: {*_IN_RENT, "Ready for Pickup", "Picked Up", "Submitted to Office"} - {status}
+		for status in _IN_RENT
+	},
+	"Ready for Pickup": {"Active", "Picked Up", "Submitted to Office"},
+	"Picked Up": {"Ready for Pickup", "Submitted to Office"},
+	"Partially Closed": {
+		"Ready for Pickup",
+		"Picked Up",
+		"Submitted to Office",
+		"Rental SO Completed",
+	},
+	"On Hold": {*_OPEN, "Closed"},
+	"Submitted to Office": {"Rental SO Completed", REOPEN_STATUS},
+	"Closed": {"Rental SO Completed", REOPEN_STATUS},
+	"Rental SO Completed": set(),
+	"Cancelled": set(),
+}
+for _status in _OPEN:
+	RENTAL_ORDER_TRANSITIONS[_status] |= {"On Hold", "Closed"}
+RENTAL_ORDER_TRANSITIONS["Submitted to Office"].add("Closed")
+
+# Side effects of reaching a status. Devices in `device_from_status` move to `device_status`,
+# only for orders coming from `device_order_statuses` when it is set. Lines move to
+# `line_status`, except detached lines and, unless `include_submitted_lines` is set, lines
+# already submitted to office; without `line_status` the lines are left alone.
+RENTAL_STATUS_ACTIONS = {
+	"DISPATCHED": frappe._dict(
+		line_status="DISPATCHED", date_field="dispatch_date", line_date_field="dispatch_date"
+	),
+	"Active": frappe._dict(
+		line_status="Active",
+		date_field="rental_delivery_date",
+		line_date_field="rental_delivery_date",
+		device_from_status="Reserved",
+		device_status="Rented Out",
+		device_order_statuses=_UNDELIVERED,
+		assign_device=True,
+	),
+	"Picked Up": frappe._dict(
+		line_status="Picked Up", date_field="picked_up", line_date_field="pickup_date"
+	),
+	"Submitted to Office": frappe._dict(
+		line_status="Submitted to Office",
+		date_field="submitted_date",
+		line_date_field="submitted_date",
+		device_from_status="Rented Out",
+		device_status="Available",
+		include_submitted_lines=True,
+	),
+	"Rental SO Completed": frappe._dict(
+		line_status="Rental SO Completed", require_paid=True, include_submitted_lines=True
+	),
+}
+
+
+class InvalidRentalTransitionError(frappe.ValidationError):
+	pass
+
+
+def get_allowed_transitions(status):
+	return RENTAL_ORDER_TRANSITIONS.get(status or "Draft", set())
+
+
+def transition_rental_orders(
+	sales_orders,
+	status,
+	date=None,
+	order_values=None,
+	line_values=None,
+	item_codes=None,
+	device_values=None,
+	publish=True,
+):
+	"""Move `sales_orders` to `status`, validating the whole batch before writing anything.
+
+	`item_codes` limits the device status change to the given devices (e.g. the
+	devices actually submitted to office); by default all devices of the orders
+	move. `device_values` are written on the moved devices along with their status.
+	Returns the names of the transitioned orders.
+	"""
+	sales_orders = list(dict.fromkeys(sales_orders))
+	if not sales_orders:
+		return []
+
+	action = RENTAL_STATUS_ACTIONS.get(status, frappe._dict())
+	orders = get_orders_for_update(sales_orders)
+	validate_transitions(sales_orders, orders, status, action)
+
+	if (item_codes is not None or device_values) and not action.device_status:
+		frappe.throw(
+			_("Devices do not change status when an order moves to {0}").format(status),
+			InvalidRentalTransitionError,
+		)
+
+	devices = get_order_devices(sales_orders)
+	if action.device_status:
+		moving, staying = [], []
+		for d in devices:
+			if (
+				not action.device_order_statuses
+				or (orders[d.sales_order].status or "Draft") in action.device_order_statuses
+			):
+				moving.append(d)
+			else:
+				staying.append(d)
+
+		move_devices(orders, moving, action, item_codes, device_values)
+		log_unmoved_devices(orders, staying, status, action)
+
+	order_values = {"status": status, **(order_values or {})}
+	line_values = dict(line_values or {})
+	if action.line_status:
+		line_values["child_status"] = action.line_status
+	if date and action.date_field:
+		order_values[action.date_field] = date
+	if date and action.line_date_field:
+		line_values[action.line_date_field] = date
+
+	for chunk in create_batch(sales_orders, 500):
+		frappe.db.set_value("Sales Order", {"name": ("in", chunk)}, order_values)
+		if line_values:
+			update_active_lines(chunk, line_values, action)
+
+	refresh_device_availability({d.item_code for d in devices})
+
+	if publish:
+		frappe.publish_realtime(
+			RENTAL_STATUS_EVENT, {"status": status, "sales_orders": sales_orders}, after_commit=True
+		)
+
+	return sales_orders
+
+
+def update_active_lines(sales_orders, line_values, action):
+	"""Write `line_values` on the lines of the orders, leaving detached lines as they are."""
+	detached = list(DETACHED_LINE_STATUSES)
+	if not action.include_submitted_lines:
+		detached.append("Submitted to Office")
+
+	soi = frappe.qb.DocType("Sales Order Item")
+	query = (
+		frappe.qb.update(soi)
+		.set(soi.modified, now())
+		.set(soi.modified_by, frappe.session.user)
+		.where(
+			(soi.parent.isin(sales_orders))
+			& (soi.parenttype == "Sales Order")
+			& (soi.child_status.isnull() | soi.child_status.notin(detached))
+		)
+	)
+	for field, value in line_values.items():
+		query = query.set(soi[field], value)
+
+	query.run()
+
+
+def get_orders_for_update(sales_orders):
+	"""Lock the orders and return {name: order} in one query per chunk."""
+	so = frappe.qb.DocType("Sales Order")
+	orders = {}
+	for chunk in create_batch(sales_orders, 500):
+		rows = (
+			frappe.qb.from_(so)
+			.select(
+				so.name,
+				so.status,
+				so.order_type,
+				so.customer,
+				so.customer_name,
+				so.payment_status,
+				so.security_deposit_status,
+			)
+			.where(so.name.isin(chunk))
+			.for_update()
+		).run(as_dict=True)
+		orders.update({row.name: row for row in rows})
+
+	return orders
+
+
+def validate_transitions(sales_orders, orders, status, action):
+	errors = []
+	for name in sales_orders:
+		order = orders.get(name)
+		if not order:
+			errors.append(_("Sales Order {0} not found").format(name))
+		elif order.order_type != "Rental":
+			errors.append(_("{0} is not a rental order").format(name))
+		elif order.status != status and status not in get_allowed_transitions(order.status):
+			errors.append(_("{0} cannot move from {1} to {2}").format(name, order.status, status))
+		elif action.require_paid and (
+			order.payment_status != "Paid" or order.security_deposit_status != "Paid"
+		):
+			errors.append(
+				_(
+					"{0}: Both Payment Status and Security Deposit Status must be 'Paid' to complete the order."
+				).format(name)
+			)
+
+	if errors:
+		frappe.throw("<br>".join(errors), InvalidRentalTransitionError, title=_("Invalid Status Change"))
+
+
+def get_order_devices(sales_orders):
+	item = frappe.qb.DocType("Item")
+	soi = frappe.qb.DocType("Sales Order Item")
+	devices = []
+	for chunk in create_batch(sales_orders, 500):
+		devices += (
+			frappe.qb.from_(soi)
+			.inner_join(item)
+			.on(item.name == soi.item_code)
+			.select(soi.parent.as_("sales_order"), soi.item_code, item.status)
+			.where((soi.parent.isin(chunk)) & (soi.parenttype == "Sales Order"))
+		).run(as_dict=True)
+
+	return devices
+
+
+def move_devices(orders, devices, action, item_codes=None, device_values=None):
+	"""Move the devices of the orders to `action.device_status` with one update per order."""
+	if item_codes is not None:
+		item_codes = set(item_codes)
+		devices = [d for d in devices if d.item_code in item_codes]
+
+	not_ready = sorted({d.item_code for d in devices if d.status != action.device_from_status})
+	if not_ready:
+		frappe.throw(
+			_("Devices {0} are not {1}").format(", ".join(not_ready), action.device_from_status),
+			InvalidRentalTransitionError,
+		)
+
+	by_order = defaultdict(list)
+	for device in devices:
+		by_order[device.sales_order].append(device.item_code)
+
+	for sales_order, codes in by_order.items():
+		order = orders[sales_order]
+		values = {"status": action.device_status}
+		if action.assign_device:
+			values.update(
+				customer_n=order.customer, customer_name=order.customer_name, custom_sales_order_id=sales_order
+			)
+		else:
+			values.update(customer_n="", customer_name="", custom_sales_order_id="")
+		values.update(device_values or {})
+
+		# skips the Item hooks, `transition_rental_orders` refreshes the availability index
+		frappe.db.set_value("Item", {"name": ("in", codes)}, values)
+
+
+def log_unmoved_devices(orders, devices, status, action):
+	"""Log devices left behind because their order did not come from `action.device_order_statuses`
+	(e.g. an order resumed from On Hold) and that are not already in `action.device_status`."""
+	unmoved = [d for d in devices if d.status != action.device_status]
+	if not unmoved:
+		return
+
+	frappe.log_error(
+		title=_("Rental devices not moved to {0}").format(action.device_status),
+		message="\n".join(
+			_("{0}: {1} is {2}, order moved from {3} to {4}").format(
+				d.sales_order, d.item_code, d.status, orders[d.sales_order].status, status
+			)
+			for d in unmoved
+		),
+	)
+
+
+@frappe.whitelist()
+def bulk_transition_rental_orders(sales_orders, status, date=None):
+	"""Apply one status change to many rental orders, in a background job for large batches."""
+	frappe.only_for(("System Manager", "Sales Manager"))
+	sales_orders = frappe.parse_json(sales_orders)
+
+	if len(sales_orders) > BULK_TRANSITION_THRESHOLD:
+		frappe.enqueue(
+			transition_rental_orders_job, queue="long", sales_orders=sales_orders, status=status, date=date
+		)
+		frappe.msgprint(
+			_("Updating {0} rental orders to {1} in the background").format(len(sales_orders), status),
+			alert=True,
+		)
+		return
+
+	return transition_rental_orders(sales_orders, status, date=date)
+
+
+def transition_rental_orders_job(sales_orders, status, date=None):
+	try:
+		transition_rental_orders(sales_orders, status, date=date)
+		frappe.db.commit()
+	except Exception:
+		frappe.db.rollback()
+		frappe.log_error(title=_("Bulk rental status update to {0} failed").format(status))
+		frappe.publish_realtime(
+			RENTAL_STATUS_EVENT, {"status": status, "sales_orders": sales_orders, "failed": True}
+		)
+
+
+def update_rental_status(
+	sales_order, order_values=None, item_values=None, items=None, expected_modified=None
+):
+	"""Write status fields of an order and its lines.
+
+	`items` restricts `item_values` to the given Sales Order Item names; by default
+	every line of the order is updated. Callers may pass the `modified` timestamp
+	they last read; the order row is locked and the update is refused if someone
+	else changed the order in the meantime. Returns the new `modified` of the order.
+	"""
+	modified = frappe.db.get_value("Sales Order", sales_order, "modified", for_update=True)
+	if not modified:
+		frappe.throw(_("Sales Order {0} not found").format(sales_order), frappe.DoesNotExistError)
+
+	if expected_modified and get_datetime(expected_modified) != get_datetime(modified):
+		frappe.throw(
+			_(
+				"Sales Order {0} has been modified after you opened it. Please refresh and try again."
+			).format(sales_order),
+			frappe.TimestampMismatchError,
+		)
+
+	if item_values:
+		filters = {"parent": sales_order, "parenttype": "Sales Order"}
+		if items:
+			filters["name"] = ("in", list(items))
+		frappe.db.set_value("Sales Order Item", filters, item_values)
+
+	# always bump `modified` so concurrent writers holding the old timestamp are refused
+	frappe.db.set_value(
+		"Sales Order", sales_order, order_values or {"modified_by": frappe.session.user}
+	)
+
+	return frappe.db.get_value("Sales Order", sales_order, "modified")
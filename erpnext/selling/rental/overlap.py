@@ -0,0 +1,251 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+"""Overlap checks for rental windows.
+
+Rental windows (`start_date` to `end_date`, both inclusive) are loaded with one
+query and indexed per device and per master order in static interval trees, so
+"which bookings overlap [start, end]" is answered in O(log n + k) without
+loading any Sales Order documents.
+"""
+
+from collections import defaultdict
+
+import frappe
+from frappe import _
+from frappe.utils import get_link_to_form, getdate
+
+from erpnext.selling.rental.availability import RELEASED_LINE_STATUSES
+
+# Orders that have returned their devices; renewed orders keep their (past) window
+CLOSED_ORDER_STATUSES = (
+	"Submitted to Office",
+	"Cancelled",
+	"Closed",
+	"Completed",
+	"Rental SO Completed",
+)
+
+
+class IntervalTree:
+	"""Static interval tree over closed intervals.
+
+	Intervals are sorted by start and laid out as an implicit balanced binary
+	tree (the middle element of every slice is its root); each node also stores
+	the maximum end within its subtree so whole subtrees can be skipped.
+	"""
+
+	def __init__(self, intervals=None):
+		self.intervals = sorted(intervals or [], key=lambda d: (d[0], d[1]))
+		self.max_end = [None] * len(self.intervals)
+		self._build(0, len(self.intervals) - 1)
+
+	def __len__(self):
+		return len(self.intervals)
+
+	def _build(self, lo, hi):
+		if lo > hi:
+			return None
+
+		mid = (lo + hi) // 2
+		max_end = self.intervals[mid][1]
+		for child_max in (self._build(lo, mid - 1), self._build(mid + 1, hi)):
+			if child_max is not None and child_max > max_end:
+				max_end = child_max
+
+		self.max_end[mid] = max_end
+		return max_end
+
+	def overlapping(self, start, end):
+		"""Payloads of all intervals overlapping [start, end]."""
+		result = []
+		self._search(0, len(self.intervals) - 1, start, end, result)
+		return result
+
+	def _search(self, lo, hi, start, end, result):
+		if lo > hi:
+			return
+
+		mid = (lo + hi) // 2
+		if self.max_end[mid] < start:
+			return
+
+		self._search(lo, mid - 1, start, end, result)
+
+		interval_start, interval_end, payload = self.intervals[mid]
+		if interval_start > end:
+			# every interval to the right starts even later
+			return
+
+		if interval_end >= start:
+			result.append(payload)
+
+		self._search(mid + 1, hi, start, end, result)
+
+
+class RentalOverlapIndex:
+	"""Interval trees of rental windows keyed by device and by master order."""
+
+	def __init__(self, bookings):
+		by_item, by_master_order = defaultdict(list), defaultdict(list)
+		for booking in bookings:
+			interval = (booking.start_date, booking.end_date, booking)
+			if booking.item_code:
+				by_item[booking.item_code].append(interval)
+			if booking.master_order_id:
+				by_master_order[booking.master_order_id].append(interval)
+
+		self.by_item = {key: IntervalTree(value) for key, value in by_item.items()}
+		self.by_master_order = {key: IntervalTree(value) for key, value in by_master_order.items()}
+
+	@classmethod
+	def load(cls, item_codes=None, master_order_ids=None):
+		return cls(get_rental_bookings(item_codes=item_codes, master_order_ids=master_order_ids))
+
+	def device_bookings(self, item_code, start_date, end_date, exclude_sales_order=None):
+		tree = self.by_item.get(item_code)
+		if not tree:
+			return []
+
+		return [
+			booking
+			for booking in tree.overlapping(getdate(start_date), getdate(end_date))
+			if booking.sales_order != exclude_sales_order
+		]
+
+	def chain_bookings(self, master_order_id, start_date, end_date, exclude_sales_order=None):
+		tree = self.by_master_order.get(master_order_id)
+		if not tree:
+			return []
+
+		return [
+			booking
+			for booking in tree.overlapping(getdate(start_date), getdate(end_date))
+			if booking.sales_order != exclude_sales_order
+		]
+
+
+def get_rental_bookings(item_codes=None, master_order_ids=None, include_drafts=False):
+	"""Rental windows per order line, one row per (order, device)."""
+	so = frappe.qb.DocType("Sales Order")
+	soi = frappe.qb.DocType("Sales Order Item")
+
+	query = (
+		frappe.qb.from_(so)
+		.inner_join(soi)
+		.on(soi.parent == so.name)
+		.select(
+			so.name.as_("sales_order"),
+			so.master_order_id,
+			so.previous_order_id,
+			so.start_date,
+			so.end_date,
+			soi.item_code,
+		)
+		.distinct()
+		.where(
+			(so.order_type == "Rental")
+			& (so.docstatus < 2 if include_drafts else so.docstatus == 1)
+			& (so.status.isnull() | so.status.notin(CLOSED_ORDER_STATUSES))
+			& (so.start_date.isnotnull())
+			& (so.end_date.isnotnull())
+			& (soi.child_status.isnull() | soi.child_status.notin(RELEASED_LINE_STATUSES))
+		)
+	)
+
+	if item_codes:
+		query = query.where(soi.item_code.isin(list(item_codes)))
+	if master_order_ids:
+		query = query.where(so.master_order_id.isin(list(master_order_ids)))
+
+	return query.run(as_dict=True)
+
+
+def check_previous_order_overlap(doc):
+	"""True if the order's window overlaps the window of its `previous_order_id`."""
+	if not (doc.previous_order_id and doc.start_date and doc.end_date):
+		return False
+
+	previous = frappe.db.get_value(
+		"Sales Order", doc.previous_order_id, ["start_date", "end_date"], as_dict=True
+	)
+	if not (previous and previous.start_date and previous.end_date):
+		return False
+
+	return getdate(doc.start_date) <= getdate(previous.end_date) and getdate(doc.end_date) >= getdate(
+		previous.start_date
+	)
+
+
+def validate_device_double_booking(doc):
+	"""Throw if any device on the order is booked by another order for an overlapping window."""
+	if doc.get("order_type") != "Rental" or not (doc.start_date and doc.end_date):
+		return
+
+	item_codes = {
+		d.item_code
+		for d in doc.get("items")
+		if d.item_code and d.get("child_status") not in RELEASED_LINE_STATUSES
+	}
+	if not item_codes:
+		return
+
+	index = RentalOverlapIndex.load(item_codes=item_codes)
+	conflicts = []
+	for item_code in sorted(item_codes):
+		for booking in index.device_bookings(item_code, doc.start_date, doc.end_date, doc.name):
+			conflicts.append(
+				_("{0} is booked on {1} from {2} to {3}").format(
+					frappe.bold(item_code),
+					get_link_to_form("Sales Order", booking.sales_order),
+					frappe.format(booking.start_date, "Date"),
+					frappe.format(booking.end_date, "Date"),
+				)
+			)
+
+	if conflicts:
+		frappe.throw(
+			_("Rental devices are already booked for this period:") + "<br>" + "<br>".join(conflicts),
+			title=_("Device Double Booking"),
+		)
+
+
+@frappe.whitelist()
+def validate_renewal_chain(master_order_id):
+	"""Overlapping windows within a renewal chain and device double bookings against other orders.
+
+	All windows are fetched in two queries regardless of the length of the chain.
+	"""
+	chain = get_rental_bookings(master_order_ids=[master_order_id], include_drafts=True)
+	if not chain:
+		return []
+
+	chain_index = RentalOverlapIndex(chain)
+	device_index = RentalOverlapIndex.load(item_codes={d.item_code for d in chain})
+	chain_orders = {d.sales_order for d in chain}
+
+	conflicts, seen = [], set()
+	for booking in chain:
+		for other in chain_index.chain_bookings(
+			master_order_id, booking.start_date, booking.end_date, booking.sales_order
+		):
+			pair = tuple(sorted((booking.sales_order, other.sales_order)))
+			if pair not in seen:
+				seen.add(pair)
+				conflicts.append(frappe._dict(type="Renewal", sales_order=pair[1], conflicting_order=pair[0]))
+
+	for booking in chain:
+		for other in device_index.device_bookings(
+			booking.item_code, booking.start_date, booking.end_date, booking.sales_order
+		):
+			if other.sales_order not in chain_orders:
+				conflicts.append(
+					frappe._dict(
+						type="Device",
+						sales_order=booking.sales_order,
+						conflicting_order=other.sales_order,
+						item_code=booking.item_code,
+					)
+				)
+
+	return conflicts
@@ -0,0 +1,194 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+"""Batched recomputation of Sales Order payment and security deposit status.
+
+Instead of one background job per Sales Order, the orders whose source ledgers
+(Payment Entry, Journal Entry or the order itself) changed since the last run are
+picked up, their totals are fetched with grouped aggregate queries and the
+results are written back with one bulk update per chunk. The last run marker only
+moves once every chunk of a run has been written.
+"""
+
+import frappe
+from frappe.query_builder.functions import Sum
+from frappe.utils import create_batch, flt, now
+
+from erpnext.selling.rental.security_deposit import (
+	get_security_deposit_totals,
+	get_security_deposit_values,
+	has_changed,
+)
+
+PAYMENT_STATUS_CHUNK_SIZE = 500
+LAST_RUN_KEY = "rental_payment_status_last_run"
+
+PAYMENT_FIELDS = ("received_amount", "balance_amount", "payment_status")
+SECURITY_DEPOSIT_FIELDS = (
+	"paid_security_deposite_amount",
+	"adjustment_amount",
+	"outstanding_security_deposit_amount",
+	"security_deposit_amount_return_to_client",
+	"refundable_security_deposit",
+	"security_deposit_status",
+)
+
+
+def enqueue_payment_status_update(order_types, full=False):
+	"""Enqueue a job recomputing the Sales Orders whose payment status may have changed."""
+	order_types = tuple(order_types)
+	started_at = now()
+	last_run = None if full else frappe.db.get_global(get_last_run_key(order_types))
+
+	sales_orders = get_sales_orders_to_recompute(order_types, since=last_run)
+	frappe.enqueue(
+		update_payment_status_job,
+		queue="long",
+		order_types=order_types,
+		sales_orders=sales_orders,
+		started_at=started_at,
+	)
+
+	return len(sales_orders)
+
+
+def update_payment_status_job(order_types, sales_orders, started_at):
+	"""Recompute the orders chunk by chunk and move the last run marker once all of them are done.
+
+	If a chunk fails the marker stays where it was, so the next run picks up the
+	same orders again.
+	"""
+	for chunk in create_batch(sales_orders, PAYMENT_STATUS_CHUNK_SIZE):
+		update_payment_status(chunk, with_security_deposit="Rental" in order_types)
+		frappe.db.commit()
+
+	frappe.db.set_global(get_last_run_key(order_types), started_at)
+	frappe.db.commit()
+
+
+def get_last_run_key(order_types):
+	return f"{LAST_RUN_KEY}:{'|'.join(sorted(order_types))}"
+
+
+def get_sales_orders_to_recompute(order_types, since=None):
+	"""Submitted Sales Orders of the given types whose ledgers changed after `since`.
+
+	When `since` is not set (first run or a forced full run) every submitted order
+	of the given types is returned.
+	"""
+	so = frappe.qb.DocType("Sales Order")
+	query = (
+		frappe.qb.from_(so)
+		.select(so.name)
+		.where((so.docstatus == 1) & (so.order_type.isin(order_types)))
+		.orderby(so.name)
+	)
+
+	if since:
+		pe = frappe.qb.DocType("Payment Entry")
+		changed = (so.modified > since) | so.name.isin(
+			frappe.qb.from_(pe).select(pe.sales_order_id).where(pe.modified > since)
+		)
+
+		if "Rental" in order_types:
+			je = frappe.qb.DocType("Journal Entry")
+			changed |= so.master_order_id.isin(
+				frappe.qb.from_(je).select(je.master_order_id).where(je.modified > since)
+			)
+
+		query = query.where(changed)
+
+	return query.run(pluck=True)
+
+
+def update_payment_status(sales_orders, with_security_deposit=False):
+	"""Recompute payment (and optionally security deposit) fields and bulk update changed rows."""
+	orders = frappe.get_all(
+		"Sales Order",
+		filters={"name": ("in", sales_orders)},
+		fields=[
+			"name",
+			"rounded_total",
+			"is_renewed",
+			"security_deposit",
+			"master_order_id",
+			"total_rental_amount",
+			*PAYMENT_FIELDS,
+			*SECURITY_DEPOSIT_FIELDS,
+		],
+	)
+
+	received_amounts = get_received_amounts(sales_orders)
+	deposit_totals = {}
+	if with_security_deposit:
+		deposit_totals = get_security_deposit_totals(
+			{d.master_order_id for d in orders if d.master_order_id}
+		)
+
+	doc_updates = {}
+	for order in orders:
+		values = get_payment_status_values(order.rounded_total, received_amounts.get(order.name, 0.0))
+		if with_security_deposit:
+			values.update(
+				get_rental_amount_values(order, deposit_totals.get(order.master_order_id, frappe._dict()))
+			)
+
+		changed = {
+			field: value for field, value in values.items() if has_changed(order.get(field), value)
+		}
+		if changed:
+			doc_updates[order.name] = changed
+
+	if doc_updates:
+		# `modified` is left alone, it would make every updated order look changed to the next run
+		frappe.db.bulk_update(
+			"Sales Order", doc_updates, chunk_size=PAYMENT_STATUS_CHUNK_SIZE, update_modified=False
+		)
+
+	return doc_updates
+
+
+def get_received_amounts(sales_orders):
+	"""Sum of submitted Payment Entry `paid_amount` per `sales_order_id`."""
+	if not sales_orders:
+		return {}
+
+	pe = frappe.qb.DocType("Payment Entry")
+	rows = (
+		frappe.qb.from_(pe)
+		.select(pe.sales_order_id, Sum(pe.paid_amount))
+		.where((pe.docstatus == 1) & (pe.sales_order_id.isin(list(sales_orders))))
+		.groupby(pe.sales_order_id)
+	).run()
+
+	return {sales_order: flt(amount) for sales_order, amount in rows}
+
+
+def get_payment_status_values(rounded_total, received_amount):
+	rounded_total = flt(rounded_total)
+	if rounded_total == received_amount:
+		payment_status = "Paid"
+	elif received_amount == 0:
+		payment_status = "UnPaid"
+	else:
+		payment_status = "Partially Paid"
+
+	return {
+		"received_amount": received_amount,
+		"balance_amount": rounded_total - received_amount,
+		"payment_status": payment_status,
+	}
+
+
+def get_rental_amount_values(order, totals):
+	"""Security deposit fields and `total_rental_amount` for a rental order.
+
+	Renewal orders carry no security deposit of their own, so only their
+	`total_rental_amount` is refreshed.
+	"""
+	if order.is_renewed:
+		return {"total_rental_amount": flt(order.rounded_total)}
+
+	values = get_security_deposit_values(order.security_deposit, totals)
+	values["total_rental_amount"] = flt(order.security_deposit) + flt(order.rounded_total)
+	return values
@@ -0,0 +1,397 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+"""Processing of Razorpay payment link callbacks.
+
+Every Razorpay payment is registered once as a `Razorpay Callback`, named after
+its `razorpay_payment_id`, so a burst of callbacks for the same link cannot
+register a payment twice. The callback request only registers payments and
+enqueues a job per Sales Order (deduplicated on the order), which locks the
+order row and turns all pending callbacks of that order into ledger entries in
+a single transaction. Callbacks whose booking failed stay queued and are
+enqueued again by the scheduler.
+
+A later callback for a payment that is registered but not processed yet (e.g. the
+link was paid after its first callback) stores its payload on the registered
+callback and queues it again; only callbacks of processed payments are dropped.
+"""
+
+import json
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt, get_datetime, now_datetime, nowdate
+
+RAZORPAY_BANK_ACCOUNT = "Kotak Bank Current Account - INR"
+RAZORPAY_DEBTORS_ACCOUNT = "Debtors - INR"
+# Failed bookings are retried this many times before the callbacks are marked Failed
+MAX_CALLBACK_RETRIES = 10
+
+
+def parse_payment_link(payload):
+	"""Normalise a Razorpay `payment_links/<id>` response; amounts are converted from paise."""
+	if isinstance(payload, str):
+		payload = json.loads(payload)
+
+	payments = []
+	for payment in payload.get("payments") or []:
+		payments.append(
+			frappe._dict(
+				payment_id=payment.get("payment_id"),
+				amount=int(flt(payment.get("amount")) / 100),
+				status=payment.get("status"),
+				method=payment.get("method"),
+				created_at=datetime_from_timestamp(payment.get("created_at")),
+			)
+		)
+
+	return frappe._dict(
+		link_id=payload.get("id"),
+		status=payload.get("status"),
+		amount_paid=int(flt(payload.get("amount_paid")) / 100),
+		payments=payments,
+		payment_ids=",".join(p.payment_id for p in payments if p.payment_id),
+	)
+
+
+def datetime_from_timestamp(timestamp):
+	return get_datetime(frappe.utils.datetime.datetime.fromtimestamp(cint(timestamp)))
+
+
+def register_payment_link_callbacks(sales_order, customer, payment_link_log, payload):
+	"""Register every payment of the link once and enqueue processing for the order.
+
+	Returns the payment ids that were registered or queued again by this call.
+	"""
+	payment_link = parse_payment_link(payload)
+	raw_payload = payload if isinstance(payload, str) else json.dumps(payload)
+
+	registered = []
+	for payment in payment_link.payments:
+		if not payment.payment_id:
+			continue
+
+		frappe.db.savepoint("razorpay_callback")
+		try:
+			frappe.get_doc(
+				{
+					"doctype": "Razorpay Callback",
+					"payment_id": payment.payment_id,
+					"payment_link_id": payment_link.link_id,
+					"payment_link_log": payment_link_log,
+					"sales_order": sales_order,
+					"customer": customer,
+					"amount": payment.amount,
+					"status": "Queued",
+					"payload": raw_payload,
+				}
+			).insert(ignore_permissions=True)
+		except frappe.DuplicateEntryError:
+			frappe.db.rollback(save_point="razorpay_callback")
+			if not requeue_callback(payment.payment_id, raw_payload):
+				continue
+
+		registered.append(payment.payment_id)
+
+	if registered:
+		# the job must see the registered callbacks
+		frappe.db.commit()
+		enqueue_callback_processing(sales_order)
+
+	return registered
+
+
+def requeue_callback(payment_id, payload):
+	"""Store a newer payload on a registered callback that was not processed yet.
+
+	Callbacks awaiting payment are queued again. Returns True if the callback is queued.
+	"""
+	status = frappe.db.get_value("Razorpay Callback", payment_id, "status")
+	if status in (None, "Processed"):
+		return False
+
+	values = {"payload": payload}
+	if status == "Awaiting Payment":
+		values["status"] = "Queued"
+	frappe.db.set_value("Razorpay Callback", payment_id, values)
+
+	return status != "Failed"
+
+
+def enqueue_callback_processing(sales_order):
+	frappe.enqueue(
+		process_pending_callbacks,
+		queue="short",
+		job_id=f"razorpay_callback::{sales_order}",
+		deduplicate=True,
+		sales_order=sales_order,
+	)
+
+
+def process_pending_callbacks(sales_order):
+	"""Turn all queued callbacks of a Sales Order into ledger entries in one transaction.
+
+	If booking fails, the callbacks stay queued with their retry count raised and are
+	picked up again by `retry_queued_callbacks`, until `MAX_CALLBACK_RETRIES` is reached.
+	"""
+	frappe.set_user("Administrator")
+
+	# row level lock: callbacks of the same order are processed strictly one batch at a time
+	frappe.db.get_value("Sales Order", sales_order, "name", for_update=True)
+
+	pending = frappe.get_all(
+		"Razorpay Callback",
+		filters={"sales_order": sales_order, "status": "Queued"},
+		fields=["name", "payment_link_id", "payment_link_log", "customer", "payload", "retry_count"],
+		# a requeued callback carries the latest payload
+		order_by="modified",
+	)
+	if not pending:
+		return
+
+	links = {}
+	for callback in pending:
+		# the latest payload of a link carries all of its payments
+		links.setdefault(callback.payment_link_id, []).append(callback)
+
+	frappe.db.savepoint("razorpay_callbacks")
+	try:
+		for callbacks in links.values():
+			process_payment_link(sales_order, callbacks)
+	except Exception:
+		error = frappe.get_traceback()
+		frappe.db.rollback(save_point="razorpay_callbacks")
+		frappe.log_error(title=_("Razorpay callback processing failed for {0}").format(sales_order))
+		for callback in pending:
+			retry_count = cint(callback.retry_count) + 1
+			frappe.db.set_value(
+				"Razorpay Callback",
+				callback.name,
+				{
+					"status": "Failed" if retry_count >= MAX_CALLBACK_RETRIES else "Queued",
+					"retry_count": retry_count,
+					"error": error,
+				},
+			)
+
+	frappe.db.commit()
+
+
+def retry_queued_callbacks():
+	"""Enqueue processing for every Sales Order that still has queued callbacks."""
+	for sales_order in frappe.get_all(
+		"Razorpay Callback", filters={"status": "Queued"}, pluck="sales_order", distinct=True
+	):
+		enqueue_callback_processing(sales_order)
+
+
+@frappe.whitelist()
+def requeue_failed_callbacks(sales_order=None):
+	"""Queue callbacks that ran out of retries again, e.g. after fixing the cause."""
+	frappe.only_for("System Manager")
+
+	filters = {"status": "Failed"}
+	if sales_order:
+		filters["sales_order"] = sales_order
+
+	sales_orders = frappe.get_all(
+		"Razorpay Callback", filters=filters, pluck="sales_order", distinct=True
+	)
+	frappe.db.set_value("Razorpay Callback", filters, {"status": "Queued", "retry_count": 0})
+	frappe.db.commit()
+
+	for name in sales_orders:
+		enqueue_callback_processing(name)
+
+
+def process_payment_link(sales_order, callbacks):
+	latest = callbacks[-1]
+	payment_link = parse_payment_link(latest.payload)
+	callback_names = [d.name for d in callbacks]
+
+	if latest.payment_link_log:
+		update_payment_link_log(latest.payment_link_log, payment_link)
+
+	if payment_link.status != "paid":
+		set_callback_status(callback_names, "Awaiting Payment")
+		return
+
+	if frappe.db.exists(
+		"Razorpay Callback",
+		{"payment_link_id": payment_link.link_id, "status": "Processed", "payment_entry": ("is", "set")},
+	):
+		# ledger entries for this link were already booked by an earlier batch
+		set_callback_status(callback_names, "Processed")
+		return
+
+	order = frappe.db.get_value(
+		"Sales Order",
+		sales_order,
+		[
+			"order_type",
+			"rounded_total",
+			"master_order_id",
+			"custom_razorpay_payment_url",
+			"security_deposit",
+		],
+		as_dict=True,
+	)
+
+	paid_amount = order.rounded_total if order.order_type == "Rental" else payment_link.amount_paid
+	payment_entry = make_payment_entry(
+		sales_order, latest.customer, order, order.rounded_total, paid_amount, payment_link.payment_ids
+	)
+
+	journal_entry = None
+	if order.order_type == "Rental" and flt(order.security_deposit) > 0:
+		journal_entry = make_security_deposit_journal_entry(
+			sales_order, latest.customer, order, flt(order.security_deposit), payment_link.payment_ids
+		)
+
+	make_razorpay_payment_details(
+		sales_order, latest.customer, order, payment_link.link_id, payment_entry, journal_entry
+	)
+
+	if latest.payment_link_log:
+		frappe.db.set_value(
+			"Payment Link Log",
+			latest.payment_link_log,
+			{"payment_entry_id": payment_entry, "journal_entry_id": journal_entry},
+		)
+
+	set_callback_status(
+		callback_names, "Processed", payment_entry=payment_entry, journal_entry=journal_entry
+	)
+
+
+def set_callback_status(callback_names, status, **values):
+	frappe.db.set_value(
+		"Razorpay Callback",
+		{"name": ("in", callback_names)},
+		{"status": status, "processed_on": now_datetime(), **values},
+	)
+
+
+def update_payment_link_log(payment_link_log, payment_link):
+	doc = frappe.get_doc("Payment Link Log", payment_link_log)
+	doc.paid_amount = payment_link.amount_paid
+	doc.balance_amount = flt(doc.total_amount) - payment_link.amount_paid
+	doc.payment_status = payment_link.status
+	doc.payment_ids = payment_link.payment_ids
+
+	doc.set("razorpay_payment_details", [])
+	for payment in payment_link.payments:
+		doc.append(
+			"razorpay_payment_details",
+			{
+				"amount": payment.amount,
+				"payment_id": payment.payment_id,
+				"status": payment.status,
+				"method": payment.method,
+				"description": payment.method,
+				"created_at": payment.created_at,
+			},
+		)
+
+	doc.save(ignore_permissions=True)
+
+
+def make_payment_entry(sales_order, customer, order, rounded_total, paid_amount, payment_ids):
+	payment_entry = frappe.get_doc(
+		{
+			"doctype": "Payment Entry",
+			"voucher_type": "Payment Entry",
+			"paid_from": RAZORPAY_DEBTORS_ACCOUNT,
+			"paid_to": RAZORPAY_BANK_ACCOUNT,
+			"received_amount": rounded_total,
+			"base_received_amount": rounded_total,
+			"paid_amount": int(flt(paid_amount)),
+			"references": [
+				{
+					"reference_doctype": "Sales Order",
+					"reference_name": sales_order,
+					"allocated_amount": int(flt(paid_amount)),
+				}
+			],
+			"sales_order_id": sales_order,
+			"custom_system_generator_from_razorpay": 1,
+			"reference_date": now_datetime(),
+			"account": "Accounts Receivable",
+			"party_type": "Customer",
+			"party": customer,
+			"custom_from_razorpay": 1,
+			"master_order_id": order.master_order_id,
+			"mode_of_payment": "Razorpay",
+			"reference_no": payment_ids,
+		}
+	)
+	payment_entry.insert(ignore_permissions=True)
+	payment_entry.submit()
+
+	return payment_entry.name
+
+
+def make_security_deposit_journal_entry(
+	sales_order, customer, order, security_deposit, payment_ids
+):
+	if frappe.db.exists(
+		"Journal Entry",
+		{"sales_order_id": sales_order, "security_deposite_type": "SD Amount Received From Client"},
+	):
+		return
+
+	today = nowdate()
+	journal_entry = frappe.new_doc("Journal Entry")
+	journal_entry.voucher_type = "Journal Entry"
+	journal_entry.sales_order_id = sales_order
+	journal_entry.posting_date = today
+	journal_entry.journal_entry_type = "Security Deposit"
+	journal_entry.security_deposite_type = "SD Amount Received From Client"
+	journal_entry.master_order_id = order.master_order_id
+	journal_entry.cheque_no = payment_ids
+	journal_entry.cheque_date = today
+	journal_entry.user_remark = _(
+		"Security Deposit Payment Against Sales Order {0}. Remark: System Generated From RazorPay"
+	).format(sales_order)
+	journal_entry.mode_of__payment = "Razorpay"
+	journal_entry.transactional_effect = "Plus"
+	journal_entry.custom_razorpay = 1
+
+	journal_entry.append(
+		"accounts", {"account": RAZORPAY_BANK_ACCOUNT, "debit_in_account_currency": security_deposit}
+	)
+	journal_entry.append(
+		"accounts",
+		{
+			"account": RAZORPAY_DEBTORS_ACCOUNT,
+			"party_type": "Customer",
+			"party": customer,
+			"credit_in_account_currency": security_deposit,
+		},
+	)
+
+	journal_entry.insert(ignore_permissions=True)
+	journal_entry.submit()
+
+	return journal_entry.name
+
+
+def make_razorpay_payment_details(
+	sales_order, customer, order, payment_link_id, payment_entry, journal_entry
+):
+	if frappe.db.exists("Razorpay Payment Details", {"reference_id": payment_link_id}):
+		return
+
+	frappe.get_doc(
+		{
+			"doctype": "Razorpay Payment Details",
+			"payment_entry_id": payment_entry,
+			"journal_entry_id": journal_entry,
+			"sales_order_id": sales_order,
+			"order_type": order.order_type,
+			"date": nowdate(),
+			"customer_id": customer,
+			"razorpay_link": order.custom_razorpay_payment_url,
+			"reference_id": payment_link_id,
+		}
+	).insert(ignore_permissions=True)
@@ -0,0 +1,218 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+"""Renewal orders for expiring rental contracts.
+
+`make_renewal_order` builds the renewal of a single order. The bulk pipeline
+selects orders whose `end_date` falls in a window and creates their renewals in
+chunked background jobs, so throughput grows with the number of workers.
+
+Creation is idempotent on `previous_order_id`: the source order row is locked
+and an existing renewal is skipped, and every renewal is committed on its own.
+Re-running the pipeline for the same window after a crash therefore only picks
+up the orders that were not renewed yet. The window of every run is kept in the
+database, which is all that resuming and progress need.
+"""
+
+import frappe
+from frappe import _
+from frappe.query_builder.functions import Count
+from frappe.utils import add_days, cint, create_batch, getdate
+
+from erpnext.selling.rental.overlap import CLOSED_ORDER_STATUSES
+from erpnext.stock.get_item_details import sharing_item_prices
+
+RENEWAL_CHUNK_SIZE = 100
+RUN_KEY = "rental_bulk_renewal_run"
+
+
+def make_renewal_order(original_sales_order, item_tax_rates=None):
+	"""Unsaved renewal of `original_sales_order` starting the day after it ends."""
+	# Filter out items where child_status is 'Submitted to Office'
+	filtered_items = [
+		item for item in original_sales_order.items if item.child_status != "Submitted to Office"
+	]
+
+	new_sales_order = frappe.copy_doc(original_sales_order)
+	new_sales_order.previous_order_id = original_sales_order.name
+	new_sales_order.advance_paid = 0
+	new_sales_order.is_renewed = 1
+	new_sales_order.security_deposit = 0
+	new_sales_order.received_amount = 0
+	new_sales_order.payment_status = "UnPaid"
+	new_sales_order.outstanding_security_deposit_amount = 0
+	new_sales_order.custom_razorpay_payment_url = ""
+	new_sales_order.custom_razorpay_payment_link_log_id = ""
+	new_sales_order.status = "Active"
+	new_sales_order.paid_security_deposite_amount = 0
+	new_sales_order.refundable_security_deposit = 0
+
+	new_sales_order.items = filtered_items
+
+	if item_tax_rates is None:
+		item_tax_rates = get_item_tax_rates({item.item_code for item in filtered_items})
+
+	for item in new_sales_order.items:
+		item.read_only = 1
+		item.tax_rate = item_tax_rates.get(item.item_code) or 0
+		item.gst_treatment = "Non-GST"
+
+	renewal_count = getattr(original_sales_order, "renewal_order_count", 0)
+	new_sales_order.renewal_order_count = renewal_count + 1 if renewal_count > 0 else 1
+
+	if original_sales_order.end_date:
+		new_sales_order.start_date = add_days(original_sales_order.end_date, 1)
+		new_sales_order.end_date = ""
+		new_sales_order.total_no_of_dates = ""
+
+	return new_sales_order
+
+
+def get_existing_renewal(sales_order):
+	return frappe.db.get_value(
+		"Sales Order", {"previous_order_id": sales_order, "docstatus": ("!=", 2)}, "name"
+	)
+
+
+def get_item_tax_rates(item_codes):
+	if not item_codes:
+		return {}
+
+	return dict(
+		frappe.get_all(
+			"Item", filters={"name": ("in", list(item_codes))}, fields=["name", "tax_rate"], as_list=True
+		)
+	)
+
+
+def get_expiring_rental_orders(from_date, to_date):
+	"""Submitted rental orders ending within [from_date, to_date] that have no renewal yet."""
+	so = frappe.qb.DocType("Sales Order")
+	renewal = frappe.qb.DocType("Sales Order").as_("renewal")
+
+	existing_renewals = (
+		frappe.qb.from_(renewal)
+		.select(Count(renewal.name))
+		.where((renewal.previous_order_id == so.name) & (renewal.docstatus != 2))
+	)
+
+	return (
+		frappe.qb.from_(so)
+		.select(so.name)
+		.where(
+			(so.docstatus == 1)
+			& (so.order_type == "Rental")
+			& (so.end_date.between(getdate(from_date), getdate(to_date)))
+			& (so.status.isnull() | so.status.notin(("RENEWED", *CLOSED_ORDER_STATUSES)))
+			& (existing_renewals == 0)
+		)
+		.orderby(so.end_date)
+		.orderby(so.name)
+	).run(pluck=True)
+
+
+@frappe.whitelist()
+def enqueue_bulk_renewal(from_date, to_date, chunk_size=RENEWAL_CHUNK_SIZE):
+	"""Create renewals of all orders expiring between the given dates in background jobs."""
+	frappe.only_for(("System Manager", "Sales Manager"))
+
+	sales_orders = get_expiring_rental_orders(from_date, to_date)
+	if not sales_orders:
+		frappe.msgprint(_("No rental orders to renew between {0} and {1}").format(from_date, to_date))
+		return
+
+	run_id = frappe.generate_hash(length=10)
+	frappe.db.set_global(
+		get_run_key(run_id),
+		frappe.as_json(
+			{
+				"from_date": str(getdate(from_date)),
+				"to_date": str(getdate(to_date)),
+				"total": len(sales_orders),
+			}
+		),
+	)
+	enqueue_renewal_chunks(sales_orders, run_id, chunk_size)
+
+	frappe.msgprint(
+		_("Started background jobs to renew {0} rental orders").format(len(sales_orders)), alert=True
+	)
+	return run_id
+
+
+def enqueue_renewal_chunks(sales_orders, run_id, chunk_size=RENEWAL_CHUNK_SIZE):
+	for chunk in create_batch(sales_orders, cint(chunk_size) or RENEWAL_CHUNK_SIZE):
+		frappe.enqueue(
+			create_renewal_orders,
+			queue="long",
+			enqueue_after_commit=True,
+			sales_orders=chunk,
+			run_id=run_id,
+		)
+
+
+def get_run_key(run_id):
+	return f"{RUN_KEY}:{run_id}"
+
+
+def get_bulk_renewal_run(run_id):
+	"""`_dict(from_date, to_date, total)` of a bulk renewal run."""
+	run = frappe.db.get_global(get_run_key(run_id))
+	if not run:
+		frappe.throw(_("Bulk renewal run {0} not found").format(run_id))
+
+	return frappe._dict(frappe.parse_json(run))
+
+
+def create_renewal_orders(sales_orders, run_id=None):
+	"""Create renewals for a chunk of orders, committing after each one.
+
+	Item tax rates are read once for the chunk, and Item Prices looked up with the same
+	arguments are shared by the renewals of the chunk.
+	"""
+	items = frappe.get_all(
+		"Sales Order Item", filters={"parent": ("in", sales_orders)}, pluck="item_code", distinct=True
+	)
+	item_tax_rates = get_item_tax_rates(set(items))
+
+	with sharing_item_prices():
+		for sales_order in sales_orders:
+			frappe.db.savepoint("before_renewal")
+			try:
+				# lock the source order so parallel jobs cannot renew it twice
+				frappe.db.get_value("Sales Order", sales_order, "name", for_update=True)
+				if not get_existing_renewal(sales_order):
+					original = frappe.get_doc("Sales Order", sales_order)
+					make_renewal_order(original, item_tax_rates).insert()
+			except Exception:
+				frappe.db.rollback(save_point="before_renewal")
+				frappe.log_error(title=_("Rental renewal failed for {0}").format(sales_order))
+
+			frappe.db.commit()
+
+	if run_id:
+		frappe.publish_realtime(
+			"rental_bulk_renewal_progress", {"run_id": run_id, **get_bulk_renewal_progress(run_id)}
+		)
+
+
+@frappe.whitelist()
+def resume_bulk_renewal(run_id, chunk_size=RENEWAL_CHUNK_SIZE):
+	"""Re-enqueue the orders of a run that have not been renewed yet, e.g. after a worker crash."""
+	frappe.only_for(("System Manager", "Sales Manager"))
+
+	run = get_bulk_renewal_run(run_id)
+	# renewed orders drop out of the selection of the window
+	pending = get_expiring_rental_orders(run.from_date, run.to_date)
+	enqueue_renewal_chunks(pending, run_id, chunk_size)
+
+	return len(pending)
+
+
+@frappe.whitelist()
+def get_bulk_renewal_progress(run_id):
+	"""Renewed and pending counts of a bulk renewal run, read from the orders themselves."""
+	run = get_bulk_renewal_run(run_id)
+	pending = len(get_expiring_rental_orders(run.from_date, run.to_date))
+
+	return frappe._dict(total=run.total, renewed=max(run.total - pending, 0), pending=pending)
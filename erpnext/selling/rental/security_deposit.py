@@ -0,0 +1,144 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+"""Security deposit ledger of a rental order chain.
+
+Paid, adjusted and refunded deposit amounts are booked as Journal Entries tagged
+with `master_order_id` and `security_deposite_type`. They are rolled up here with
+a single grouped query and written back to the master Sales Order field by field.
+"""
+
+import frappe
+from frappe.query_builder.functions import Sum
+from frappe.utils import flt
+
+SD_RECEIVED = "SD Amount Received From Client"
+SD_ADJUSTED = ("Adjusted Device Damage Charges", "Adjusted Against Sales Order Rental Charges")
+SD_REFUNDED = "Refunding SD to Client"
+
+
+def get_security_deposit_totals(master_order_ids):
+	"""Submitted Journal Entry `total_debit` per `master_order_id`, split by deposit type."""
+	if not master_order_ids:
+		return {}
+
+	je = frappe.qb.DocType("Journal Entry")
+	rows = (
+		frappe.qb.from_(je)
+		.select(je.master_order_id, je.security_deposite_type, Sum(je.total_debit))
+		.where(
+			(je.docstatus == 1)
+			& (je.master_order_id.isin(list(master_order_ids)))
+			& (je.security_deposite_type.isin([SD_RECEIVED, SD_REFUNDED, *SD_ADJUSTED]))
+		)
+		.groupby(je.master_order_id, je.security_deposite_type)
+	).run()
+
+	totals = {}
+	for master_order_id, deposit_type, amount in rows:
+		row = totals.setdefault(master_order_id, get_empty_totals())
+		if deposit_type == SD_RECEIVED:
+			row.paid += flt(amount)
+		elif deposit_type == SD_REFUNDED:
+			row.refunded += flt(amount)
+		else:
+			row.adjusted += flt(amount)
+
+	return totals
+
+
+def get_security_deposit_summary(master_order_id):
+	"""Cached (per request) deposit totals of a master order.
+
+	Whatever writes a deposit Journal Entry clears the cache with `clear_security_deposit_cache`.
+	"""
+	cache = get_request_cache()
+	if master_order_id not in cache:
+		cache[master_order_id] = get_security_deposit_totals([master_order_id]).get(
+			master_order_id, get_empty_totals()
+		)
+
+	return cache[master_order_id]
+
+
+def clear_security_deposit_cache(master_order_id=None):
+	cache = get_request_cache()
+	if master_order_id:
+		cache.pop(master_order_id, None)
+	else:
+		cache.clear()
+
+
+def get_request_cache():
+	if not hasattr(frappe.local, "security_deposit_summary"):
+		frappe.local.security_deposit_summary = {}
+
+	return frappe.local.security_deposit_summary
+
+
+def get_empty_totals():
+	return frappe._dict(paid=0.0, adjusted=0.0, refunded=0.0)
+
+
+def get_security_deposit_values(security_deposit, totals):
+	security_deposit = flt(security_deposit)
+	paid = flt(totals.get("paid"))
+	adjusted = flt(totals.get("adjusted"))
+	refunded = flt(totals.get("refunded"))
+
+	outstanding = security_deposit - paid
+	if outstanding == 0:
+		status = "Paid"
+	elif outstanding == security_deposit:
+		status = "Unpaid"
+	else:
+		status = "Partially Paid"
+
+	return {
+		"paid_security_deposite_amount": paid,
+		"adjustment_amount": adjusted,
+		"outstanding_security_deposit_amount": outstanding,
+		"security_deposit_amount_return_to_client": refunded,
+		"refundable_security_deposit": paid - adjusted - refunded,
+		"security_deposit_status": status,
+	}
+
+
+def update_security_deposit_status(master_order_id):
+	"""Refresh the deposit fields of the master Sales Order from its Journal Entries.
+
+	Only fields whose value changed are written; the order itself is not saved.
+	"""
+	fields = list(get_security_deposit_values(0, {})) + [
+		"security_deposit",
+		"rounded_total",
+		"total_rental_amount",
+	]
+	order = frappe.db.get_value("Sales Order", master_order_id, fields, as_dict=True)
+	if not order:
+		return
+
+	values = get_security_deposit_values(
+		order.security_deposit, get_security_deposit_summary(master_order_id)
+	)
+	values["total_rental_amount"] = flt(order.security_deposit) + flt(order.rounded_total)
+
+	set_changed_values(master_order_id, order, values)
+	return values
+
+
+def set_changed_values(sales_order, current, values):
+	changed = {
+		field: value for field, value in values.items() if has_changed(current.get(field), value)
+	}
+	if changed:
+		frappe.db.set_value("Sales Order", sales_order, changed)
+
+	return changed
+
+
+def has_changed(old, new):
+	if isinstance(new, float):
+		return flt(old, 9) != flt(new, 9)
+
+	return (old or "") != (new or "")
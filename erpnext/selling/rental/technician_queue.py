@@ -0,0 +1,111 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+"""Per-technician work queue.
+
+Every delivery or pickup assigned to a technician is mirrored as an open
+`Technician Work Item` carrying what the portal needs to list it (order,
+device, customer, schedule). The portal reads its queue with one indexed query
+on (technician_user, status) instead of joining Technician Visit Entries,
+Sales Orders and their items per request. Items are closed when the order is
+delivered or picked up.
+"""
+
+import frappe
+from frappe.utils import now_datetime
+
+
+def add_work_item(
+	technician_id,
+	visit_type,
+	sales_order,
+	item_code=None,
+	technician_user=None,
+	technician_visit_entry=None,
+	scheduled_date=None,
+):
+	"""Open a work item, replacing any open item for the same order, device and visit type."""
+	close_work_items(sales_order, visit_type, item_code=item_code, status="Cancelled")
+
+	order = (
+		frappe.db.get_value("Sales Order", sales_order, ["customer", "customer_name"], as_dict=True)
+		or {}
+	)
+	frappe.get_doc(
+		{
+			"doctype": "Technician Work Item",
+			"technician_id": technician_id,
+			"technician_user": technician_user,
+			"technician_visit_entry": technician_visit_entry,
+			"visit_type": visit_type,
+			"status": "Open",
+			"sales_order": sales_order,
+			"item_code": item_code,
+			"customer": order.get("customer"),
+			"customer_name": order.get("customer_name"),
+			"scheduled_date": scheduled_date,
+		}
+	).insert(ignore_permissions=True)
+
+
+def close_work_items(sales_order, visit_type, item_code=None, status="Completed"):
+	"""Close open work items of an order, or only those of one device."""
+	work_item = frappe.qb.DocType("Technician Work Item")
+	condition = (
+		(work_item.sales_order == sales_order)
+		& (work_item.visit_type == visit_type)
+		& (work_item.status == "Open")
+	)
+	if item_code:
+		condition &= work_item.item_code == item_code
+
+	now = now_datetime()
+	(
+		frappe.qb.update(work_item)
+		.set(work_item.status, status)
+		.set(work_item.completed_on, now)
+		.set(work_item.modified, now)
+		.where(condition)
+	).run()
+
+
+@frappe.whitelist()
+def get_technician_work_queue(technician_user=None):
+	"""Open deliveries and pickups of a technician, read in one query.
+
+	`modified` of each order is returned so status updates can be sent back with
+	`expected_modified` for the optimistic concurrency check.
+	"""
+	if technician_user and technician_user != frappe.session.user:
+		frappe.only_for(("System Manager", "Sales Manager"))
+	technician_user = technician_user or frappe.session.user
+
+	work_item = frappe.qb.DocType("Technician Work Item")
+	so = frappe.qb.DocType("Sales Order")
+
+	rows = (
+		frappe.qb.from_(work_item)
+		.inner_join(so)
+		.on(so.name == work_item.sales_order)
+		.select(
+			work_item.name,
+			work_item.visit_type,
+			work_item.sales_order,
+			work_item.item_code,
+			work_item.customer,
+			work_item.customer_name,
+			work_item.scheduled_date,
+			work_item.technician_visit_entry,
+			so.status.as_("order_status"),
+			so.modified.as_("order_modified"),
+		)
+		.where((work_item.technician_user == technician_user) & (work_item.status == "Open"))
+		.orderby(work_item.scheduled_date)
+		.orderby(work_item.creation)
+	).run(as_dict=True)
+
+	queue = {"deliveries": [], "pickups": []}
+	for row in rows:
+		queue["deliveries" if row.visit_type == "Delivery" else "pickups"].append(row)
+
+	return queue
@@ -0,0 +1,207 @@
+import unittest
+from contextlib import ExitStack
+from unittest.mock import MagicMock, patch
+
+import frappe
+
+from erpnext.selling.doctype.sales_order import sales_order
+from erpnext.selling.rental.lifecycle import (
+	RENTAL_STATUS_ACTIONS,
+	REOPEN_STATUS,
+	InvalidRentalTransitionError,
+	get_allowed_transitions,
+	log_unmoved_devices,
+	transition_rental_orders,
+	validate_transitions,
+)
+
+
+# Statuses sales_order.py gives rental orders, None for a new order
+ORDER_STATUSES = (
+	None,
+	"Pending",
+	"Order",
+	"Approved",
+	"Ready for Delivery",
+	"DISPATCHED",
+	"Active",
+	"RENEWED",
+	"Ready for Pickup",
+	"Picked Up",
+	"Partially Closed",
+	"Submitted to Office",
+	"On Hold",
+	"Closed",
+	"Rental SO Completed",
+	"Cancelled",
+)
+_UNDELIVERED = (None, "Pending", "Order", "Approved", "Ready for Delivery")
+_OUT = ("Active", "RENEWED", "Ready for Pickup", "Picked Up", "Partially Closed")
+_OPEN = (*_UNDELIVERED, "DISPATCHED", *_OUT)
+
+# whitelisted action: (call, statuses it must work from)
+RENTAL_ACTIONS = {
+	"make_dispatch": (
+		lambda name: sales_order.make_dispatch(name, "2026-10-01"),
+		(*_UNDELIVERED, "DISPATCHED", "On Hold"),
+	),
+	"make_delivered": (
+		lambda name: sales_order.make_delivered(name, "Customer", "2026-10-01"),
+		(*_UNDELIVERED, "DISPATCHED", "Active", "RENEWED", "Ready for Pickup", "On Hold"),
+	),
+	"make_pickedup": (
+		lambda name: sales_order.make_pickedup(name, "2026-10-01"),
+		(*_OUT, "On Hold"),
+	),
+	"make_submitted_to_office": (
+		lambda name: sales_order.make_submitted_to_office(name, "['D-1']", "2026-10-01", 0),
+		(*_OUT, "Submitted to Office", "On Hold"),
+	),
+	"make_order_completed": (
+		lambda name: sales_order.make_order_completed(name, "[]"),
+		("Partially Closed", "Submitted to Office", "Closed", "Rental SO Completed"),
+	),
+	"on_hold": (lambda name: sales_order.on_hold(name), (*_OPEN, "On Hold")),
+	"close_rental_order": (
+		lambda name: sales_order.close_rental_order(name),
+		(*_OPEN, "On Hold", "Submitted to Office", "Closed"),
+	),
+	"update_status": (
+		lambda name: sales_order.update_status(name, REOPEN_STATUS),
+		(REOPEN_STATUS, "On Hold", "Submitted to Office", "Closed"),
+	),
+}
+
+
+class TestRentalLifecycle(unittest.TestCase):
+	def test_transition_table(self):
+		self.assertIn("DISPATCHED", get_allowed_transitions("Ready for Delivery"))
+		self.assertIn("Active", get_allowed_transitions(None))
+		self.assertIn("Active", get_allowed_transitions("On Hold"))
+		self.assertIn("Closed", get_allowed_transitions("Picked Up"))
+		self.assertNotIn("Active", get_allowed_transitions("Submitted to Office"))
+		self.assertEqual(get_allowed_transitions("Rental SO Completed"), set())
+
+	def test_closed_orders_can_be_reopened(self):
+		for status in ("Closed", "Submitted to Office", "On Hold"):
+			self.assertIn(REOPEN_STATUS, get_allowed_transitions(status))
+
+	def test_batch_is_validated_as_a_whole(self):
+		orders = {
+			"SO-1": frappe._dict(name="SO-1", order_type="Rental", status="Ready for Pickup"),
+			"SO-2": frappe._dict(name="SO-2", order_type="Rental", status="Picked Up"),
+			"SO-3": frappe._dict(name="SO-3", order_type="Rental", status="Draft"),
+		}
+		validate_transitions(["SO-1", "SO-2"], orders, "Picked Up", frappe._dict())
+
+		with self.assertRaises(InvalidRentalTransitionError):
+			validate_transitions(["SO-1", "SO-3"], orders, "Picked Up", frappe._dict())
+
+	def test_completion_requires_payment(self):
+		order = frappe._dict(
+			name="SO-1",
+			order_type="Rental",
+			status="Submitted to Office",
+			payment_status="Paid",
+			security_deposit_status="Unpaid",
+		)
+		action = RENTAL_STATUS_ACTIONS["Rental SO Completed"]
+
+		with self.assertRaises(InvalidRentalTransitionError):
+			validate_transitions(["SO-1"], {"SO-1": order}, "Rental SO Completed", action)
+
+		order.security_deposit_status = "Paid"
+		validate_transitions(["SO-1"], {"SO-1": order}, "Rental SO Completed", action)
+
+	def test_devices_outside_the_transition_are_logged(self):
+		action = RENTAL_STATUS_ACTIONS["Active"]
+		orders = {"SO-1": frappe._dict(name="SO-1", status="On Hold")}
+		devices = [
+			frappe._dict(sales_order="SO-1", item_code="D-1", status="Rented Out"),
+			frappe._dict(sales_order="SO-1", item_code="D-2", status="Reserved"),
+		]
+
+		with patch("frappe.log_error") as log_error:
+			log_unmoved_devices(orders, devices[:1], "Active", action)
+			log_error.assert_not_called()
+
+			log_unmoved_devices(orders, devices, "Active", action)
+			log_error.assert_called_once()
+			self.assertIn("D-2", log_error.call_args.kwargs["message"])
+			self.assertNotIn("D-1", log_error.call_args.kwargs["message"])
+
+	def test_actions_from_every_status(self):
+		for action, (call, allowed) in RENTAL_ACTIONS.items():
+			for status in ORDER_STATUSES:
+				with self.subTest(action=action, status=status):
+					if status in allowed:
+						run_action(call, status)
+					else:
+						self.assertRaises(InvalidRentalTransitionError, run_action, call, status)
+
+	@patch("erpnext.selling.rental.lifecycle.refresh_device_availability")
+	@patch("erpnext.selling.rental.lifecycle.update_active_lines")
+	@patch("erpnext.selling.rental.lifecycle.get_order_devices", return_value=[])
+	@patch("erpnext.selling.rental.lifecycle.get_orders_for_update")
+	def test_lines_follow_line_status_only(
+		self, get_orders_for_update, get_order_devices, update_active_lines, refresh
+	):
+		get_orders_for_update.return_value = get_orders("Active")
+
+		with patch.object(frappe, "db"), patch.object(frappe, "publish_realtime"):
+			transition_rental_orders(["SO-1"], "On Hold")
+			update_active_lines.assert_not_called()
+
+			transition_rental_orders(["SO-1"], "Picked Up", date="2026-10-01")
+			update_active_lines.assert_called_once()
+			self.assertEqual(
+				update_active_lines.call_args.args[1],
+				{"child_status": "Picked Up", "pickup_date": "2026-10-01"},
+			)
+
+
+def run_action(call, status):
+	with ExitStack() as stack:
+		stack.enter_context(
+			patch.multiple(
+				"erpnext.selling.rental.lifecycle",
+				get_orders_for_update=MagicMock(return_value=get_orders(status)),
+				get_order_devices=MagicMock(return_value=get_devices(status)),
+				update_active_lines=MagicMock(),
+				refresh_device_availability=MagicMock(),
+			)
+		)
+		stack.enter_context(
+			patch.object(frappe, "db", MagicMock(**{"get_value.return_value": "Rental"}))
+		)
+		stack.enter_context(
+			patch.multiple(
+				frappe,
+				has_permission=MagicMock(),
+				publish_realtime=MagicMock(),
+				msgprint=MagicMock(),
+				log_error=MagicMock(),
+			)
+		)
+		stack.enter_context(patch.object(sales_order, "close_work_items"))
+		call("SO-1")
+
+
+def get_orders(status):
+	return {
+		"SO-1": frappe._dict(
+			name="SO-1",
+			status=status,
+			order_type="Rental",
+			customer="Customer",
+			customer_name="Customer",
+			payment_status="Paid",
+			security_deposit_status="Paid",
+		)
+	}
+
+
+def get_devices(status):
+	# the device of the order as the action moving it expects to find it
+	device_status = "Reserved" if status in _UNDELIVERED or status == "DISPATCHED" else "Rented Out"
+	return [frappe._dict(sales_order="SO-1", item_code="D-1", status=device_status)]
@@ -0,0 +1,59 @@
+import random
+import unittest
+from datetime import date, timedelta
+
+import frappe
+
+from erpnext.selling.rental.overlap import IntervalTree, RentalOverlapIndex
+
+
+class TestIntervalTree(unittest.TestCase):
+	def test_overlapping(self):
+		tree = IntervalTree([(1, 5, "a"), (6, 10, "b"), (3, 8, "c"), (12, 15, "d")])
+
+		self.assertEqual(sorted(tree.overlapping(5, 6)), ["a", "b", "c"])
+		self.assertEqual(tree.overlapping(11, 11), [])
+		self.assertEqual(tree.overlapping(15, 20), ["d"])
+		self.assertEqual(IntervalTree().overlapping(1, 2), [])
+
+	def test_matches_linear_scan(self):
+		rng = random.Random(7)
+		intervals = []
+		for i in range(300):
+			start = rng.randint(0, 1000)
+			intervals.append((start, start + rng.randint(0, 60), i))
+
+		tree = IntervalTree(intervals)
+		for _ in range(200):
+			start = rng.randint(0, 1000)
+			end = start + rng.randint(0, 30)
+			expected = sorted(p for s, e, p in intervals if s <= end and e >= start)
+			self.assertEqual(sorted(tree.overlapping(start, end)), expected)
+
+
+class TestRentalOverlapIndex(unittest.TestCase):
+	def test_device_and_chain_bookings(self):
+		start = date(2026, 1, 1)
+
+		def booking(sales_order, item_code, master_order_id, offset, days):
+			return frappe._dict(
+				sales_order=sales_order,
+				item_code=item_code,
+				master_order_id=master_order_id,
+				start_date=start + timedelta(days=offset),
+				end_date=start + timedelta(days=offset + days),
+			)
+
+		index = RentalOverlapIndex(
+			[
+				booking("SO-1", "DEV-1", "SO-1", 0, 29),
+				booking("SO-2", "DEV-1", "SO-1", 30, 29),
+				booking("SO-3", "DEV-1", "SO-3", 45, 10),
+			]
+		)
+
+		conflicts = index.device_bookings("DEV-1", date(2026, 2, 10), date(2026, 2, 20), "SO-3")
+		self.assertEqual([d.sales_order for d in conflicts], ["SO-2"])
+		chain = index.chain_bookings("SO-1", date(2026, 1, 30), date(2026, 1, 31))
+		self.assertEqual(sorted(d.sales_order for d in chain), ["SO-1", "SO-2"])
+		self.assertEqual(index.device_bookings("DEV-2", date(2026, 1, 1), date(2026, 12, 31)), [])
@@ -0,0 +1,88 @@
+import unittest
+from unittest.mock import patch
+
+import frappe
+
+from erpnext.selling.rental.payment_status import (
+	get_last_run_key,
+	get_payment_status_values,
+	get_rental_amount_values,
+	update_payment_status_job,
+)
+from erpnext.selling.rental.security_deposit import (
+	clear_security_deposit_cache,
+	get_security_deposit_summary,
+	get_security_deposit_values,
+	has_changed,
+	update_security_deposit_status,
+)
+
+
+class TestRentalPaymentStatus(unittest.TestCase):
+	def test_payment_status(self):
+		self.assertEqual(get_payment_status_values(1000, 1000.0)["payment_status"], "Paid")
+		self.assertEqual(get_payment_status_values(1000, 0.0)["payment_status"], "UnPaid")
+
+		values = get_payment_status_values(1000, 400.0)
+		self.assertEqual(values["payment_status"], "Partially Paid")
+		self.assertEqual(values["balance_amount"], 600.0)
+
+	def test_security_deposit_status(self):
+		totals = frappe._dict(paid=3000.0, adjusted=500.0, refunded=1000.0)
+		values = get_security_deposit_values("5000", totals)
+
+		self.assertEqual(values["outstanding_security_deposit_amount"], 2000.0)
+		self.assertEqual(values["refundable_security_deposit"], 1500.0)
+		self.assertEqual(values["security_deposit_status"], "Partially Paid")
+
+		self.assertEqual(get_security_deposit_values("5000", {})["security_deposit_status"], "Unpaid")
+		self.assertEqual(
+			get_security_deposit_values("5000", {"paid": 5000.0})["security_deposit_status"], "Paid"
+		)
+
+	@patch("erpnext.selling.rental.security_deposit.set_changed_values")
+	@patch("erpnext.selling.rental.security_deposit.frappe.db.get_value")
+	@patch("erpnext.selling.rental.security_deposit.get_security_deposit_totals")
+	def test_security_deposit_cache(self, get_totals, get_value, set_changed_values):
+		get_totals.return_value = {"SO-1": frappe._dict(paid=100.0, adjusted=0.0, refunded=0.0)}
+		get_value.return_value = frappe._dict(security_deposit=100, rounded_total=50)
+		clear_security_deposit_cache()
+		self.addCleanup(clear_security_deposit_cache)
+
+		self.assertEqual(get_security_deposit_summary("SO-1").paid, 100.0)
+		# refreshing the order reads the cached totals
+		self.assertEqual(update_security_deposit_status("SO-1")["security_deposit_status"], "Paid")
+		get_totals.assert_called_once()
+
+		clear_security_deposit_cache("SO-1")
+		get_security_deposit_summary("SO-1")
+		self.assertEqual(get_totals.call_count, 2)
+
+	def test_renewed_order_skips_security_deposit(self):
+		order = frappe._dict(is_renewed=1, rounded_total=1200, security_deposit="5000")
+		self.assertEqual(get_rental_amount_values(order, {}), {"total_rental_amount": 1200.0})
+
+		order.is_renewed = 0
+		self.assertEqual(get_rental_amount_values(order, {})["total_rental_amount"], 6200.0)
+
+	def test_has_changed(self):
+		self.assertFalse(has_changed(100, 100.0))
+		self.assertFalse(has_changed(None, ""))
+		self.assertTrue(has_changed("Paid", "UnPaid"))
+		self.assertTrue(has_changed(None, 10.0))
+
+	@patch("frappe.db")
+	def test_last_run_moves_after_all_chunks(self, db):
+		sales_orders = [f"SO-{i}" for i in range(3)]
+
+		with patch(
+			"erpnext.selling.rental.payment_status.update_payment_status", side_effect=[{}, Exception]
+		), patch("erpnext.selling.rental.payment_status.PAYMENT_STATUS_CHUNK_SIZE", 2):
+			with self.assertRaises(Exception):
+				update_payment_status_job(("Rental",), sales_orders, "2026-10-18 10:00:00")
+		db.set_global.assert_not_called()
+
+		with patch("erpnext.selling.rental.payment_status.update_payment_status") as update:
+			update_payment_status_job(("Rental",), sales_orders, "2026-10-18 10:00:00")
+		self.assertEqual(update.call_count, 1)
+		db.set_global.assert_called_once_with(get_last_run_key(("Rental",)), "2026-10-18 10:00:00")
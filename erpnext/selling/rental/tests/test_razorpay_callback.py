@@ -0,0 +1,180 @@
+import json
+import unittest
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext.selling.doctype.sales_order.test_sales_order import make_sales_order
+from erpnext.selling.rental.razorpay_callback import (
+	MAX_CALLBACK_RETRIES,
+	parse_payment_link,
+	process_pending_callbacks,
+	register_payment_link_callbacks,
+)
+
+# Trimmed `GET /v1/payment_links/<id>` response of the Razorpay API
+PAYMENT_LINK_PAYLOAD = {
+	"id": "plink_PvKXC3Aa8Qm2Ri",
+	"status": "paid",
+	"amount": 1250000,
+	"amount_paid": 1250000,
+	"currency": "INR",
+	"reference_id": "SAL-ORD-2026-00042",
+	"payments": [
+		{
+			"payment_id": "pay_PvKYuMnBJvvT7Q",
+			"amount": 500000,
+			"status": "captured",
+			"method": "upi",
+			"created_at": 1792300000,
+		},
+		{
+			"payment_id": "pay_PvKZ7dQ2hD3s1a",
+			"amount": 750000,
+			"status": "captured",
+			"method": "card",
+			"created_at": 1792300600,
+		},
+	],
+}
+
+
+class TestRazorpayCallback(unittest.TestCase):
+	def test_parse_payment_link(self):
+		payment_link = parse_payment_link(json.dumps(PAYMENT_LINK_PAYLOAD))
+
+		self.assertEqual(payment_link.link_id, "plink_PvKXC3Aa8Qm2Ri")
+		self.assertEqual(payment_link.status, "paid")
+		self.assertEqual(payment_link.amount_paid, 12500)
+		self.assertEqual(payment_link.payment_ids, "pay_PvKYuMnBJvvT7Q,pay_PvKZ7dQ2hD3s1a")
+		self.assertEqual([p.amount for p in payment_link.payments], [5000, 7500])
+		self.assertEqual(payment_link.payments[1].method, "card")
+
+	def test_parse_unpaid_link(self):
+		payment_link = parse_payment_link({"id": "plink_1", "status": "created", "amount_paid": 0})
+
+		self.assertEqual(payment_link.amount_paid, 0)
+		self.assertEqual(payment_link.payments, [])
+		self.assertEqual(payment_link.payment_ids, "")
+
+
+@patch("frappe.db.commit")
+@patch("erpnext.selling.rental.razorpay_callback.enqueue_callback_processing")
+class TestProcessPendingCallbacks(FrappeTestCase):
+	def setUp(self):
+		self.sales_order = make_sales_order(do_not_submit=True).name
+
+	def make_callback(self, payload):
+		return frappe.get_doc(
+			{
+				"doctype": "Razorpay Callback",
+				"payment_id": frappe.generate_hash(length=14),
+				"payment_link_id": payload["id"],
+				"sales_order": self.sales_order,
+				"customer": "_Test Customer",
+				"status": "Queued",
+				"payload": json.dumps(payload),
+			}
+		).insert(ignore_permissions=True)
+
+	def get_callback(self, callback):
+		return frappe.db.get_value(
+			"Razorpay Callback",
+			callback.name,
+			["status", "retry_count", "payment_entry", "error"],
+			as_dict=True,
+		)
+
+	@patch("erpnext.selling.rental.razorpay_callback.make_razorpay_payment_details")
+	@patch("erpnext.selling.rental.razorpay_callback.make_security_deposit_journal_entry")
+	@patch("erpnext.selling.rental.razorpay_callback.make_payment_entry", return_value="ACC-PAY-1")
+	def test_paid_link_is_booked_once(self, make_payment_entry, *mocks):
+		first = self.make_callback(PAYMENT_LINK_PAYLOAD)
+		second = self.make_callback(PAYMENT_LINK_PAYLOAD)
+
+		process_pending_callbacks(self.sales_order)
+
+		make_payment_entry.assert_called_once()
+		for callback in (first, second):
+			self.assertEqual(self.get_callback(callback).status, "Processed")
+			self.assertEqual(self.get_callback(callback).payment_entry, "ACC-PAY-1")
+
+		# a late callback of the same link does not book it again
+		late = self.make_callback(PAYMENT_LINK_PAYLOAD)
+		process_pending_callbacks(self.sales_order)
+
+		make_payment_entry.assert_called_once()
+		self.assertEqual(self.get_callback(late).status, "Processed")
+
+	@patch("erpnext.selling.rental.razorpay_callback.make_payment_entry")
+	def test_unpaid_link_awaits_payment(self, make_payment_entry, *mocks):
+		callback = self.make_callback({**PAYMENT_LINK_PAYLOAD, "status": "partially_paid"})
+
+		process_pending_callbacks(self.sales_order)
+
+		make_payment_entry.assert_not_called()
+		self.assertEqual(self.get_callback(callback).status, "Awaiting Payment")
+
+	@patch("erpnext.selling.rental.razorpay_callback.make_payment_entry", side_effect=Exception)
+	def test_failed_booking_is_retried(self, make_payment_entry, *mocks):
+		callback = self.make_callback(PAYMENT_LINK_PAYLOAD)
+
+		process_pending_callbacks(self.sales_order)
+
+		row = self.get_callback(callback)
+		self.assertEqual(row.status, "Queued")
+		self.assertEqual(row.retry_count, 1)
+		self.assertTrue(row.error)
+
+		# the retry picks the callback up again and books it once it succeeds
+		make_payment_entry.side_effect = None
+		make_payment_entry.return_value = "ACC-PAY-1"
+		with (
+			patch("erpnext.selling.rental.razorpay_callback.make_security_deposit_journal_entry"),
+			patch("erpnext.selling.rental.razorpay_callback.make_razorpay_payment_details"),
+		):
+			process_pending_callbacks(self.sales_order)
+
+		self.assertEqual(self.get_callback(callback).status, "Processed")
+
+	@patch("erpnext.selling.rental.razorpay_callback.make_payment_entry", side_effect=Exception)
+	def test_failed_after_max_retries(self, make_payment_entry, *mocks):
+		callback = self.make_callback(PAYMENT_LINK_PAYLOAD)
+		frappe.db.set_value("Razorpay Callback", callback.name, "retry_count", MAX_CALLBACK_RETRIES - 1)
+
+		process_pending_callbacks(self.sales_order)
+
+		self.assertEqual(self.get_callback(callback).status, "Failed")
+
+	@patch("erpnext.selling.rental.razorpay_callback.make_razorpay_payment_details")
+	@patch("erpnext.selling.rental.razorpay_callback.make_security_deposit_journal_entry")
+	@patch("erpnext.selling.rental.razorpay_callback.make_payment_entry", return_value="ACC-PAY-1")
+	def test_link_paid_after_first_callback(self, make_payment_entry, *mocks):
+		payment = {**PAYMENT_LINK_PAYLOAD["payments"][0], "status": "created"}
+		created = {**PAYMENT_LINK_PAYLOAD, "status": "created", "amount_paid": 0, "payments": [payment]}
+		paid = {
+			**PAYMENT_LINK_PAYLOAD,
+			"amount_paid": 500000,
+			"payments": [{**payment, "status": "captured"}],
+		}
+
+		register_payment_link_callbacks(self.sales_order, "_Test Customer", None, created)
+		process_pending_callbacks(self.sales_order)
+
+		callback = frappe._dict(name=payment["payment_id"])
+		self.assertEqual(self.get_callback(callback).status, "Awaiting Payment")
+		make_payment_entry.assert_not_called()
+
+		registered = register_payment_link_callbacks(self.sales_order, "_Test Customer", None, paid)
+		self.assertEqual(registered, [payment["payment_id"]])
+		process_pending_callbacks(self.sales_order)
+
+		make_payment_entry.assert_called_once()
+		self.assertEqual(self.get_callback(callback).status, "Processed")
+
+		# once processed, a repeated callback is dropped
+		self.assertEqual(
+			register_payment_link_callbacks(self.sales_order, "_Test Customer", None, paid), []
+		)
+		make_payment_entry.assert_called_once()
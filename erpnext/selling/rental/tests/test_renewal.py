@@ -0,0 +1,48 @@
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext.selling.rental.renewal import (
+	get_bulk_renewal_progress,
+	get_run_key,
+	resume_bulk_renewal,
+)
+from erpnext.stock.get_item_details import get_item_price, sharing_item_prices
+
+
+class TestBulkRenewal(FrappeTestCase):
+	@patch("erpnext.selling.rental.renewal.frappe.enqueue")
+	@patch("erpnext.selling.rental.renewal.get_expiring_rental_orders")
+	def test_resume_from_saved_run(self, get_expiring_rental_orders, enqueue):
+		frappe.db.set_global(
+			get_run_key("run-1"),
+			frappe.as_json({"from_date": "2026-10-01", "to_date": "2026-10-31", "total": 5}),
+		)
+		get_expiring_rental_orders.return_value = ["SO-4", "SO-5"]
+
+		self.assertEqual(get_bulk_renewal_progress("run-1"), frappe._dict(total=5, renewed=3, pending=2))
+		self.assertEqual(resume_bulk_renewal("run-1", chunk_size=1), 2)
+
+		get_expiring_rental_orders.assert_called_with("2026-10-01", "2026-10-31")
+		self.assertEqual(
+			[call.kwargs["sales_orders"] for call in enqueue.call_args_list], [["SO-4"], ["SO-5"]]
+		)
+
+	def test_unknown_run(self):
+		self.assertRaises(frappe.ValidationError, get_bulk_renewal_progress, "no-such-run")
+
+	@patch("erpnext.stock.get_item_details.query_item_price")
+	def test_shared_item_prices(self, query_item_price):
+		query_item_price.return_value = (("IP-1", 100.0, "Nos"),)
+		args = {"price_list": "Standard Selling", "uom": "Nos", "transaction_date": "2026-10-01"}
+
+		with sharing_item_prices():
+			get_item_price(args, "ITEM-1")
+			get_item_price(dict(args), "ITEM-1")
+			get_item_price(args, "ITEM-2")
+
+		self.assertEqual(query_item_price.call_count, 2)
+
+		get_item_price(args, "ITEM-1")
+		self.assertEqual(query_item_price.call_count, 3)
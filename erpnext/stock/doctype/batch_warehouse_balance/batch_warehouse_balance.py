@@ -0,0 +1,345 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+"""Running qty and stock value of every batch in every warehouse.
+
+The balance sums the Serial and Batch Entries of submitted, not cancelled Inward
+and Outward bundles other than those of Pick Lists, the same entries that
+`BatchNoValuation.get_batch_no_ledgers` aggregates. It is moved when a bundle is
+submitted or cancelled and when the entries of a counted bundle are rewritten,
+and `check_batch_balances` compares it with the raw entries.
+"""
+
+from contextlib import contextmanager
+
+import frappe
+from frappe.model.document import Document
+from frappe.query_builder.functions import CombineDatetime, Max, Sum
+from frappe.utils import flt, now
+
+FIELDS = (
+	"name",
+	"creation",
+	"modified",
+	"owner",
+	"modified_by",
+	"batch_no",
+	"item_code",
+	"warehouse",
+	"company",
+	"qty",
+	"stock_value",
+	"posting_datetime",
+)
+
+
+class BatchWarehouseBalance(Document):
+	# begin: auto-generated types
+	# This code is auto-generated. Do not modify anything in this block.
+
+	from typing import TYPE_CHECKING
+
+	if TYPE_CHECKING:
+		from frappe.types import DF
+
+		batch_no: DF.Link | None
+		company: DF.Link | None
+		item_code: DF.Link | None
+		posting_datetime: DF.Datetime | None
+		qty: DF.Float
+		stock_value: DF.Float
+		warehouse: DF.Link | None
+	# end: auto-generated types
+
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_unique(
+		"Batch Warehouse Balance", ["batch_no", "warehouse"], constraint_name="unique_batch_warehouse"
+	)
+
+
+def get_counted_bundles_query():
+	bundle = frappe.qb.DocType("Serial and Batch Bundle")
+	entry = frappe.qb.DocType("Serial and Batch Entry")
+
+	query = (
+		frappe.qb.from_(bundle)
+		.inner_join(entry)
+		.on(bundle.name == entry.parent)
+		.where(
+			(bundle.docstatus == 1)
+			& (bundle.is_cancelled == 0)
+			& (bundle.type_of_transaction.isin(["Inward", "Outward"]))
+			& (bundle.voucher_type != "Pick List")
+			& (entry.batch_no.isnotnull())
+			& (entry.batch_no != "")
+		)
+	)
+
+	return query, bundle, entry
+
+
+def get_counted_bundle(bundle_name):
+	"""Header of the bundle if its entries are counted in the balance."""
+	bundle = frappe.db.get_value(
+		"Serial and Batch Bundle",
+		bundle_name,
+		[
+			"name",
+			"docstatus",
+			"is_cancelled",
+			"type_of_transaction",
+			"voucher_type",
+			"has_batch_no",
+			"item_code",
+			"warehouse",
+			"company",
+			"posting_date",
+			"posting_time",
+		],
+		as_dict=True,
+	)
+
+	if (
+		bundle
+		and bundle.has_batch_no
+		and bundle.docstatus == 1
+		and not bundle.is_cancelled
+		and bundle.type_of_transaction in ("Inward", "Outward")
+		and bundle.voucher_type != "Pick List"
+	):
+		return bundle
+
+
+def get_bundle_batch_totals(bundle_name):
+	"""{batch_no: [qty, stock_value]} of the entries of a bundle."""
+	entry = frappe.qb.DocType("Serial and Batch Entry")
+	rows = (
+		frappe.qb.from_(entry)
+		.select(entry.batch_no, Sum(entry.qty), Sum(entry.stock_value_difference))
+		.where((entry.parent == bundle_name) & (entry.batch_no.isnotnull()) & (entry.batch_no != ""))
+		.groupby(entry.batch_no)
+	).run()
+
+	return {batch_no: [flt(qty), flt(value)] for batch_no, qty, value in rows}
+
+
+def add_bundle_to_balance(bundle_name, sign=1):
+	"""Add the entries of a counted bundle to the balance, or remove them with `sign=-1`."""
+	if bundle := get_counted_bundle(bundle_name):
+		changes = {
+			batch_no: [sign * qty, sign * value]
+			for batch_no, (qty, value) in get_bundle_batch_totals(bundle.name).items()
+		}
+		apply_batch_balance_changes(bundle, changes)
+
+
+def remove_voucher_bundles_from_balance(voucher_type, voucher_no):
+	"""Remove the counted bundles of a voucher before they are marked as cancelled."""
+	for bundle_name in frappe.get_all(
+		"Serial and Batch Bundle",
+		filters={
+			"voucher_type": voucher_type,
+			"voucher_no": voucher_no,
+			"docstatus": 1,
+			"is_cancelled": 0,
+			"has_batch_no": 1,
+		},
+		pluck="name",
+	):
+		add_bundle_to_balance(bundle_name, sign=-1)
+
+
+@contextmanager
+def tracking_bundle_changes(bundle_name):
+	"""Move the balance by what the block changes in the entries of a counted bundle.
+
+	Nested blocks for the same bundle are folded into the outermost one.
+	"""
+	tracked = frappe.flags.setdefault("batch_balance_tracked_bundles", set())
+	bundle = None
+	if bundle_name and bundle_name not in tracked:
+		bundle = get_counted_bundle(bundle_name)
+
+	if not bundle:
+		yield
+		return
+
+	tracked.add(bundle.name)
+	try:
+		before = get_bundle_batch_totals(bundle.name)
+		yield
+		after = get_bundle_batch_totals(bundle.name)
+	finally:
+		tracked.discard(bundle.name)
+
+	changes = {}
+	for batch_no in set(before) | set(after):
+		old_qty, old_value = before.get(batch_no, (0.0, 0.0))
+		new_qty, new_value = after.get(batch_no, (0.0, 0.0))
+		if new_qty != old_qty or new_value != old_value:
+			changes[batch_no] = [new_qty - old_qty, new_value - old_value]
+
+	apply_batch_balance_changes(bundle, changes)
+
+
+def apply_batch_balance_changes(bundle, changes):
+	"""Move the balances in the warehouse of the bundle by {batch_no: [qty, stock_value]}."""
+	from erpnext.stock.utils import get_combine_datetime
+
+	if not changes:
+		return
+
+	posting_datetime = get_combine_datetime(bundle.posting_date, bundle.posting_time)
+	existing = dict(
+		frappe.get_all(
+			"Batch Warehouse Balance",
+			filters={"warehouse": bundle.warehouse, "batch_no": ("in", list(changes))},
+			fields=["batch_no", "name"],
+			as_list=True,
+		)
+	)
+
+	for batch_no, (qty, value) in changes.items():
+		name = existing.get(batch_no) or _create_batch_balance(bundle, batch_no)
+		frappe.db.sql(
+			"""
+			update `tabBatch Warehouse Balance`
+			set qty = qty + %(qty)s,
+				stock_value = stock_value + %(value)s,
+				posting_datetime = greatest(coalesce(posting_datetime, %(posting_datetime)s), %(posting_datetime)s),
+				modified = %(modified)s
+			where name = %(name)s
+			""",
+			{
+				"qty": qty,
+				"value": value,
+				"posting_datetime": posting_datetime,
+				"modified": now(),
+				"name": name,
+			},
+		)
+
+
+def _create_batch_balance(bundle, batch_no):
+	savepoint = "create_batch_warehouse_balance"
+	try:
+		frappe.db.savepoint(savepoint)
+		doc = frappe.get_doc(
+			doctype="Batch Warehouse Balance",
+			batch_no=batch_no,
+			item_code=bundle.item_code,
+			warehouse=bundle.warehouse,
+			company=bundle.company,
+		)
+		doc.flags.ignore_permissions = True
+		doc.insert()
+		return doc.name
+	except frappe.UniqueValidationError:
+		# created by a concurrent transaction
+		frappe.db.rollback(save_point=savepoint)
+		return frappe.db.get_value(
+			"Batch Warehouse Balance", {"batch_no": batch_no, "warehouse": bundle.warehouse}
+		)
+
+
+def get_batch_balances(warehouse, batches):
+	"""{batch_no: balance} of the batches in a warehouse."""
+	if not batches:
+		return {}
+
+	return {
+		row.batch_no: row
+		for row in frappe.get_all(
+			"Batch Warehouse Balance",
+			filters={"warehouse": warehouse, "batch_no": ("in", batches)},
+			fields=["batch_no", "qty", "stock_value", "posting_datetime"],
+		)
+	}
+
+
+def get_expected_batch_balances():
+	"""Balances computed from the Serial and Batch Entries."""
+	query, bundle, entry = get_counted_bundles_query()
+	return (
+		query.select(
+			entry.batch_no,
+			bundle.warehouse,
+			Max(bundle.item_code).as_("item_code"),
+			Max(bundle.company).as_("company"),
+			Sum(entry.qty).as_("qty"),
+			Sum(entry.stock_value_difference).as_("stock_value"),
+			Max(CombineDatetime(bundle.posting_date, bundle.posting_time)).as_("posting_datetime"),
+		)
+		.groupby(entry.batch_no, bundle.warehouse)
+		.run(as_dict=True)
+	)
+
+
+def rebuild_batch_balances():
+	"""Recompute every balance from the Serial and Batch Entries."""
+	frappe.db.delete("Batch Warehouse Balance")
+
+	timestamp, user = now(), frappe.session.user
+	frappe.db.bulk_insert(
+		"Batch Warehouse Balance",
+		fields=FIELDS,
+		values=[
+			(
+				frappe.generate_hash(length=10),
+				timestamp,
+				timestamp,
+				user,
+				user,
+				row.batch_no,
+				row.item_code,
+				row.warehouse,
+				row.company,
+				row.qty,
+				row.stock_value,
+				row.posting_datetime,
+			)
+			for row in get_expected_batch_balances()
+		],
+	)
+
+
+def check_batch_balances():
+	"""Balances that differ from the Serial and Batch Entries, as
+	`_dict(batch_no, warehouse, qty, expected_qty, stock_value, expected_stock_value)`."""
+	qty_precision = frappe.get_precision("Batch Warehouse Balance", "qty") or 3
+	value_precision = frappe.get_precision("Batch Warehouse Balance", "stock_value") or 2
+
+	balances = {
+		(row.batch_no, row.warehouse): row
+		for row in frappe.get_all(
+			"Batch Warehouse Balance", fields=["batch_no", "warehouse", "qty", "stock_value"]
+		)
+	}
+
+	mismatches = []
+	for expected in get_expected_batch_balances():
+		balance = balances.pop((expected.batch_no, expected.warehouse), None) or frappe._dict()
+		if flt(balance.qty, qty_precision) != flt(expected.qty, qty_precision) or flt(
+			balance.stock_value, value_precision
+		) != flt(expected.stock_value, value_precision):
+			mismatches.append(get_mismatch(expected.batch_no, expected.warehouse, balance, expected))
+
+	for (batch_no, warehouse), balance in balances.items():
+		if flt(balance.qty, qty_precision) or flt(balance.stock_value, value_precision):
+			mismatches.append(get_mismatch(batch_no, warehouse, balance, frappe._dict()))
+
+	return mismatches
+
+
+def get_mismatch(batch_no, warehouse, balance, expected):
+	return frappe._dict(
+		batch_no=batch_no,
+		warehouse=warehouse,
+		qty=flt(balance.qty),
+		expected_qty=flt(expected.qty),
+		stock_value=flt(balance.stock_value),
+		expected_stock_value=flt(expected.stock_value),
+	)
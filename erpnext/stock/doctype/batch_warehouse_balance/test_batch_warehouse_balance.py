@@ -0,0 +1,68 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import flt
+
+from erpnext.stock.doctype.batch_warehouse_balance.batch_warehouse_balance import (
+	check_batch_balances,
+	get_batch_balances,
+	rebuild_batch_balances,
+)
+from erpnext.stock.doctype.delivery_note.test_delivery_note import create_delivery_note
+from erpnext.stock.doctype.item.test_item import make_item
+from erpnext.stock.doctype.purchase_receipt.test_purchase_receipt import make_purchase_receipt
+from erpnext.stock.doctype.serial_and_batch_bundle.test_serial_and_batch_bundle import (
+	get_batch_from_bundle,
+)
+
+
+class TestBatchWarehouseBalance(FrappeTestCase):
+	WAREHOUSE = "_Test Warehouse - _TC"
+
+	def get_balance(self, batch_no):
+		balance = get_batch_balances(self.WAREHOUSE, [batch_no])[batch_no]
+		return flt(balance.qty, 3), flt(balance.stock_value, 2)
+
+	def test_balance_follows_bundles(self):
+		item_code = make_item(
+			"Test Batch Warehouse Balance Item",
+			{
+				"has_batch_no": 1,
+				"create_new_batch": 1,
+				"batch_number_series": "TEST-BWB-.#####",
+				"is_stock_item": 1,
+			},
+		).name
+
+		pr = make_purchase_receipt(item_code=item_code, warehouse=self.WAREHOUSE, qty=10, rate=500)
+		batch_no = get_batch_from_bundle(pr.items[0].serial_and_batch_bundle)
+		self.assertEqual(self.get_balance(batch_no), (10, 5000))
+
+		dn = create_delivery_note(
+			item_code=item_code, warehouse=self.WAREHOUSE, qty=4, rate=1500, batch_no=batch_no
+		)
+		self.assertEqual(self.get_balance(batch_no), (6, 3000))
+
+		stock_value_difference = frappe.db.get_value(
+			"Stock Ledger Entry",
+			{"voucher_no": dn.name, "is_cancelled": 0, "voucher_type": "Delivery Note"},
+			"stock_value_difference",
+		)
+		self.assertEqual(flt(stock_value_difference, 2), -2000)
+
+		dn.cancel()
+		self.assertEqual(self.get_balance(batch_no), (10, 5000))
+		self.assertFalse([d for d in check_batch_balances() if d.batch_no == batch_no])
+
+		# drift is reported and repaired by a rebuild
+		frappe.db.set_value(
+			"Batch Warehouse Balance", {"batch_no": batch_no, "warehouse": self.WAREHOUSE}, "qty", 1
+		)
+		mismatches = [d for d in check_batch_balances() if d.batch_no == batch_no]
+		self.assertEqual(len(mismatches), 1)
+		self.assertEqual((mismatches[0].qty, mismatches[0].expected_qty), (1, 10))
+
+		rebuild_batch_balances()
+		self.assertEqual(self.get_balance(batch_no), (10, 5000))
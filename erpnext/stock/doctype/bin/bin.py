@@ -21,6 +21,7 @@ class Bin(Document):
 		actual_qty: DF.Float
 		indented_qty: DF.Float
 		item_code: DF.Link
+		latest_posting_datetime: DF.Datetime | None
 		ordered_qty: DF.Float
 		planned_qty: DF.Float
 		projected_qty: DF.Float
@@ -217,6 +218,19 @@ def on_doctype_update():
 	frappe.db.add_unique("Bin", ["item_code", "warehouse"], constraint_name="unique_item_warehouse")
 
 
+def update_latest_posting_datetime(bin_name, posting_datetime):
+	"""Move `latest_posting_datetime` forward to `posting_datetime`, in a single statement."""
+	bin = frappe.qb.DocType("Bin")
+	(
+		frappe.qb.update(bin)
+		.set(bin.latest_posting_datetime, posting_datetime)
+		.where(
+			(bin.name == bin_name)
+			& (bin.latest_posting_datetime.isnull() | (bin.latest_posting_datetime < posting_datetime))
+		)
+	).run()
+
+
 def get_bin_details(bin_name):
 	return frappe.db.get_value(
 		"Bin",
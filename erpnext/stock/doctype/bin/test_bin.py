@@ -1,10 +1,15 @@
 # Copyright (c) 2015, Frappe Technologies Pvt. Ltd. and Contributors
 # See license.txt
 
+from unittest.mock import patch
+
 import frappe
 from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, get_datetime, today
 
+from erpnext.controllers.stock_controller import future_sle_exists
 from erpnext.stock.doctype.item.test_item import make_item
+from erpnext.stock.doctype.stock_entry.stock_entry_utils import make_stock_entry
 from erpnext.stock.utils import _create_bin
 
 
@@ -32,3 +37,52 @@ class TestBin(FrappeTestCase):
 		indexes = frappe.db.sql("show index from tabBin where Non_unique = 0", as_dict=1)
 		if not any(index.get("Key_name") == "unique_item_warehouse" for index in indexes):
 			self.fail(f"Expected unique index on item-warehouse")
+
+	def test_latest_posting_datetime(self):
+		item_code = make_item("_TestBinLatestPosting").name
+		warehouse = "_Test Warehouse - _TC"
+
+		def get_latest_posting_datetime():
+			return frappe.db.get_value(
+				"Bin", {"item_code": item_code, "warehouse": warehouse}, "latest_posting_datetime"
+			)
+
+		se = make_stock_entry(item_code=item_code, to_warehouse=warehouse, qty=10, rate=10)
+		latest = get_latest_posting_datetime()
+		self.assertEqual(
+			latest, get_datetime(f"{se.posting_date} {se.posting_time}").replace(microsecond=0)
+		)
+
+		# a backdated entry does not move it back and sees the later entry
+		backdated = make_stock_entry(
+			item_code=item_code,
+			to_warehouse=warehouse,
+			qty=5,
+			rate=10,
+			posting_date=add_days(today(), -5),
+		)
+		self.assertEqual(get_latest_posting_datetime(), latest)
+		self.assertTrue(
+			future_sle_exists(
+				frappe._dict(
+					voucher_type="Stock Entry",
+					voucher_no=backdated.name,
+					posting_date=backdated.posting_date,
+					posting_time=backdated.posting_time,
+				)
+			)
+		)
+
+		# nothing is posted after the first entry, the ledger is not scanned
+		frappe.local.future_sle = {}
+		args = frappe._dict(
+			voucher_type="Stock Entry",
+			voucher_no=se.name,
+			posting_date=se.posting_date,
+			posting_time=se.posting_time,
+		)
+		with patch.object(frappe.db, "sql", wraps=frappe.db.sql) as sql:
+			self.assertFalse(future_sle_exists(args))
+			self.assertFalse(
+				any("tabStock Ledger Entry` force index" in str(call.args[0]) for call in sql.call_args_list)
+			)
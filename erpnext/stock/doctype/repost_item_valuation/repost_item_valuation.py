@@ -1,6 +1,9 @@
 # Copyright (c) 2020, Frappe Technologies Pvt. Ltd. and contributors
 # For license information, please see license.txt
 
+import time
+from contextlib import contextmanager
+
 import frappe
 from frappe import _
 from frappe.desk.form.load import get_attachments
@@ -8,21 +11,36 @@ from frappe.exceptions import QueryDeadlockError, QueryTimeoutError
 from frappe.model.document import Document
 from frappe.query_builder import DocType, Interval
 from frappe.query_builder.functions import Max, Now
-from frappe.utils import cint, get_link_to_form, get_weekday, getdate, now, nowtime
+from frappe.utils import (
+	cint,
+	create_batch,
+	get_link_to_form,
+	get_weekday,
+	getdate,
+	now,
+	nowtime,
+)
+from frappe.utils.background_jobs import is_job_enqueued
 from frappe.utils.user import get_users_with_role
 from rq.timeouts import JobTimeoutException
 
 import erpnext
 from erpnext.accounts.general_ledger import validate_accounting_period
 from erpnext.accounts.utils import get_future_stock_vouchers, repost_gle_for_stock_vouchers
+from erpnext.stock.repost_profiler import RepostProfiler, get_item_rows
 from erpnext.stock.stock_ledger import (
 	get_affected_transactions,
+	get_distinct_item_warehouse,
 	get_items_to_be_repost,
 	repost_future_sle,
 )
+from erpnext.stock.utils import get_combine_datetime
 
 RecoverableErrors = (JobTimeoutException, QueryDeadlockError, QueryTimeoutError)
 
+# seconds; also the timeout of parallel repost jobs
+REPOST_COMPONENT_LOCK_TIMEOUT = 6 * 60 * 60
+
 
 class RepostItemValuation(Document):
 	# begin: auto-generated types
@@ -47,6 +65,7 @@ class RepostItemValuation(Document):
 		items_to_be_repost: DF.Code | None
 		posting_date: DF.Date
 		posting_time: DF.Time | None
+		repost_profile: DF.Code | None
 		reposting_data_file: DF.Attach | None
 		status: DF.Literal["Queued", "In Progress", "Completed", "Skipped", "Failed"]
 		total_reposting_count: DF.Int
@@ -225,6 +244,7 @@ class RepostItemValuation(Document):
 		self.distinct_item_and_warehouse = None
 		self.items_to_be_repost = None
 		self.gl_reposting_index = 0
+		self.repost_profile = None
 		self.db_update()
 
 	def deduplicate_similar_repost(self):
@@ -273,9 +293,14 @@ def repost(doc):
 		if not frappe.flags.in_test:
 			frappe.db.commit()
 
-		repost_sl_entries(doc)
-		repost_gl_entries(doc)
+		profiler = RepostProfiler.from_doc(doc)
+		with profiler.running():
+			with profiler.phase("repost_sl_entries"):
+				repost_sl_entries(doc, profiler)
+			with profiler.phase("repost_gl_entries"), parallel_gl_repost_lock():
+				repost_gl_entries(doc)
 
+		doc.db_set("repost_profile", profiler.as_json())
 		doc.set_status("Completed")
 		remove_attached_file(doc.name)
 
@@ -324,7 +349,7 @@ def remove_attached_file(docname):
 		frappe.delete_doc("File", file_name, delete_permanently=True)
 
 
-def repost_sl_entries(doc):
+def repost_sl_entries(doc, profiler=None):
 	if doc.based_on == "Transaction":
 		repost_future_sle(
 			voucher_type=doc.voucher_type,
@@ -332,6 +357,7 @@ def repost_sl_entries(doc):
 			allow_negative_stock=doc.allow_negative_stock,
 			via_landed_cost_voucher=doc.via_landed_cost_voucher,
 			doc=doc,
+			profiler=profiler,
 		)
 	else:
 		repost_future_sle(
@@ -348,6 +374,7 @@ def repost_sl_entries(doc):
 			allow_negative_stock=doc.allow_negative_stock,
 			via_landed_cost_voucher=doc.via_landed_cost_voucher,
 			doc=doc,
+			profiler=profiler,
 		)
 
 
@@ -431,10 +458,20 @@ def repost_entries():
 	"""
 	Reposts 'Repost Item Valuation' entries in queue.
 	Called hourly via hooks.py.
+
+	With "Parallel Reposting Jobs" set in Stock Reposting Settings, queued entries
+	are split into independent components that run in that many background jobs.
 	"""
 	if not in_configured_timeslot():
 		return
 
+	parallel_jobs = cint(
+		frappe.db.get_single_value("Stock Reposting Settings", "parallel_reposting_jobs")
+	)
+	if parallel_jobs > 1:
+		enqueue_parallel_reposts(parallel_jobs)
+		return
+
 	riv_entries = get_repost_item_valuation_entries()
 
 	for row in riv_entries:
@@ -450,7 +487,9 @@ def repost_entries():
 
 def get_repost_item_valuation_entries():
 	return frappe.db.sql(
-		""" SELECT name from `tabRepost Item Valuation`
+		""" SELECT name, based_on, voucher_type, voucher_no, item_code, warehouse,
+			posting_date, posting_time, status, reposting_data_file, distinct_item_and_warehouse
+		from `tabRepost Item Valuation`
 		WHERE status in ('Queued', 'In Progress') and creation <= %s and docstatus = 1
 		ORDER BY timestamp(posting_date, posting_time) asc, creation asc, status asc
 	""",
@@ -459,6 +498,254 @@ def get_repost_item_valuation_entries():
 	)
 
 
+class DisjointSet:
+	"""Union-find over hashable keys with path halving and union by size."""
+
+	def __init__(self):
+		self.parent = {}
+		self.size = {}
+
+	def find(self, key):
+		if key not in self.parent:
+			self.parent[key] = key
+			self.size[key] = 1
+			return key
+
+		while self.parent[key] != key:
+			self.parent[key] = self.parent[self.parent[key]]
+			key = self.parent[key]
+
+		return key
+
+	def union(self, *keys):
+		roots = [self.find(key) for key in keys]
+		root = max(roots, key=lambda r: self.size[r])
+		for other in roots:
+			if other != root:
+				self.parent[other] = root
+				self.size[root] += self.size[other]
+
+		return root
+
+
+def group_into_components(riv_keys, linked_keys):
+	"""Split reposts into components that share no item-warehouse.
+
+	:param riv_keys: {repost name: item-warehouse pairs touched by the repost}, in posting order
+	:param linked_keys: iterable of item-warehouse groups whose valuations depend on each other
+
+	Returns lists of repost names, each in the order of `riv_keys`.
+	"""
+	graph = DisjointSet()
+	for keys in linked_keys:
+		graph.union(*keys)
+
+	for name, keys in riv_keys.items():
+		# a repost without keys still needs a component of its own
+		graph.union(("riv", name), *keys)
+
+	components = {}
+	for name in riv_keys:
+		components.setdefault(graph.find(("riv", name)), []).append(name)
+
+	return list(components.values())
+
+
+def get_repost_components(riv_entries):
+	"""Independent components of the queued reposts.
+
+	Two reposts land in the same component if they touch a common item-warehouse,
+	directly or through the value that vouchers posted after the earliest repost
+	move between item-warehouses (transfers, repacks, manufacturing and subcontracting,
+	linked by `dependant_sle_voucher_detail_no`). Components can therefore be reposted
+	in any order relative to each other without changing any valuation. GL entries of
+	vouchers shared by components are reposted under `parallel_gl_repost_lock`.
+	"""
+	if not riv_entries:
+		return []
+
+	riv_keys = get_item_warehouses_of_reposts(riv_entries)
+	from_datetime = min(get_combine_datetime(d.posting_date, d.posting_time) for d in riv_entries)
+	item_warehouses = set().union(*riv_keys.values())
+
+	return group_into_components(riv_keys, get_linked_item_warehouses(from_datetime, item_warehouses))
+
+
+def get_item_warehouses_of_reposts(riv_entries):
+	vouchers = {(d.voucher_type, d.voucher_no) for d in riv_entries if d.based_on == "Transaction"}
+	voucher_keys = {}
+	for chunk in create_batch(list({voucher_no for _, voucher_no in vouchers}), 500):
+		for row in frappe.get_all(
+			"Stock Ledger Entry",
+			filters={"voucher_no": ("in", chunk)},
+			fields=["voucher_type", "voucher_no", "item_code", "warehouse"],
+			distinct=True,
+		):
+			voucher_keys.setdefault((row.voucher_type, row.voucher_no), set()).add(
+				(row.item_code, row.warehouse)
+			)
+
+	riv_keys = {}
+	for d in riv_entries:
+		if d.based_on == "Transaction":
+			keys = set(voucher_keys.get((d.voucher_type, d.voucher_no), ()))
+		else:
+			keys = {(d.item_code, d.warehouse)}
+
+		if d.reposting_data_file or d.distinct_item_and_warehouse:
+			# item-warehouses already discovered by an interrupted repost
+			keys.update(get_distinct_item_warehouse(args=[], doc=d).keys())
+
+		riv_keys[d.name] = keys
+
+	return riv_keys
+
+
+def get_linked_item_warehouses(from_datetime, item_warehouses):
+	"""Pairs of item-warehouses whose valuation flows from one to the other after `from_datetime`.
+
+	The `dependant_sle_voucher_detail_no` links are followed from `item_warehouses` the
+	same way a repost follows them, so only the entries of item-warehouses a repost can
+	reach are read.
+	"""
+	sle = DocType("Stock Ledger Entry")
+	dependant = DocType("Stock Ledger Entry").as_("dependant")
+
+	linked = []
+	seen = set(item_warehouses)
+	pending = set(item_warehouses)
+	while pending:
+		reached = set()
+		for chunk in create_batch(sorted(pending), 500):
+			rows = (
+				frappe.qb.from_(sle)
+				.inner_join(dependant)
+				.on(
+					(dependant.voucher_detail_no == sle.dependant_sle_voucher_detail_no)
+					& (dependant.name != sle.name)
+					& (dependant.is_cancelled == 0)
+				)
+				.select(
+					sle.item_code,
+					sle.warehouse,
+					dependant.item_code.as_("dependant_item_code"),
+					dependant.warehouse.as_("dependant_warehouse"),
+				)
+				.distinct()
+				.where(
+					(sle.is_cancelled == 0)
+					& (sle.posting_datetime >= from_datetime)
+					& (sle.warehouse.isin(list({warehouse for _, warehouse in chunk})))
+					& (sle.item_code.isin(list({item_code for item_code, _ in chunk})))
+					& (sle.dependant_sle_voucher_detail_no.isnotnull())
+					& (sle.dependant_sle_voucher_detail_no != "")
+				)
+			).run(as_dict=True)
+
+			for row in rows:
+				key = (row.item_code, row.warehouse)
+				if key not in pending:
+					# matched the item and warehouse filters, but not as a pair
+					continue
+
+				dependant_key = (row.dependant_item_code, row.dependant_warehouse)
+				if dependant_key != key:
+					linked.append({key, dependant_key})
+				reached.add(dependant_key)
+
+		pending = reached - seen
+		seen |= reached
+
+	return linked
+
+
+def enqueue_parallel_reposts(parallel_jobs):
+	"""Spread the components of queued reposts over `parallel_jobs` background jobs."""
+	riv_entries = get_repost_item_valuation_entries()
+	components = get_repost_components(riv_entries)
+
+	# largest components first, each into the least loaded job
+	groups = [[] for _ in range(min(parallel_jobs, len(components)))]
+	load = [0] * len(groups)
+	for component in sorted(components, key=len, reverse=True):
+		idx = load.index(min(load))
+		groups[idx].append(component)
+		load[idx] += len(component)
+
+	for idx, group in enumerate(groups):
+		job_id = f"repost_item_valuation::{idx}"
+		if is_job_enqueued(job_id):
+			# components of a running job stay locked and are picked up by the next run
+			continue
+
+		frappe.enqueue(
+			repost_components,
+			queue="long",
+			job_id=job_id,
+			timeout=REPOST_COMPONENT_LOCK_TIMEOUT,
+			components=group,
+		)
+
+
+def repost_components(components):
+	frappe.flags.in_parallel_repost = True
+	for component in components:
+		with repost_component_lock(component) as acquired:
+			if not acquired:
+				continue
+
+			for name in component:
+				doc = frappe.get_doc("Repost Item Valuation", name)
+				if doc.status in ("Queued", "In Progress"):
+					repost(doc)
+					doc.deduplicate_similar_repost()
+
+
+@contextmanager
+def repost_component_lock(component):
+	"""Lock every repost of a component, so overlapping components never run concurrently."""
+	cache = frappe.cache()
+	keys = [cache.make_key(f"repost_item_valuation_lock:{name}") for name in component]
+
+	acquired = []
+	for key in keys:
+		if not cache.set(key, frappe.local.site, nx=True, ex=REPOST_COMPONENT_LOCK_TIMEOUT):
+			break
+		acquired.append(key)
+
+	try:
+		yield len(acquired) == len(keys)
+	finally:
+		if acquired:
+			cache.delete(*acquired)
+
+
+@contextmanager
+def parallel_gl_repost_lock():
+	"""Run the GL phase of reposts in parallel jobs one at a time.
+
+	Components share no item-warehouse but can share vouchers, and every component
+	reposts the GL entries of such a voucher from all of its SLEs. The SLEs are
+	committed before the lock is taken and the GL entries before it is released, so
+	the last GL repost of a shared voucher sees the SLEs of every component.
+	"""
+	if not frappe.flags.in_parallel_repost:
+		yield
+		return
+
+	frappe.db.commit()
+	cache = frappe.cache()
+	key = cache.make_key("repost_item_valuation_gl_lock")
+	while not cache.set(key, frappe.local.site, nx=True, ex=REPOST_COMPONENT_LOCK_TIMEOUT):
+		time.sleep(1)
+
+	try:
+		yield
+		frappe.db.commit()
+	finally:
+		cache.delete(key)
+
+
 def in_configured_timeslot(repost_settings=None, current_time=None):
 	"""Check if current time is in configured timeslot for reposting."""
 
@@ -486,3 +773,23 @@ def in_configured_timeslot(repost_settings=None, current_time=None):
 def execute_repost_item_valuation():
 	"""Execute repost item valuation via scheduler."""
 	frappe.get_doc("Scheduled Job Type", "repost_item_valuation.repost_entries").enqueue(force=True)
+
+
+@frappe.whitelist()
+def get_repost_progress(name, limit=20):
+	"""Progress, estimated remaining seconds and slowest item-warehouses of a repost."""
+	doc = frappe.get_doc("Repost Item Valuation", name)
+	doc.check_permission("read")
+
+	profile = frappe.parse_json(doc.repost_profile or "{}")
+	return frappe._dict(
+		name=doc.name,
+		status=doc.status,
+		current_index=profile.get("current_index") or doc.current_index,
+		total=profile.get("total") or doc.total_reposting_count,
+		elapsed=profile.get("elapsed"),
+		estimated_remaining=profile.get("estimated_remaining") if doc.status == "In Progress" else 0,
+		phases=profile.get("phases") or {},
+		items=get_item_rows(profile, cint(limit)),
+		other_items=profile.get("other_items") or {},
+	)
@@ -2,7 +2,7 @@
 # See license.txt
 
 
-from unittest.mock import MagicMock, call
+from unittest.mock import MagicMock, call, patch
 
 import frappe
 from frappe.tests.utils import FrappeTestCase, change_settings
@@ -14,9 +14,14 @@ from erpnext.controllers.stock_controller import create_item_wise_repost_entries
 from erpnext.stock.doctype.item.test_item import make_item
 from erpnext.stock.doctype.purchase_receipt.test_purchase_receipt import make_purchase_receipt
 from erpnext.stock.doctype.repost_item_valuation.repost_item_valuation import (
+	get_repost_components,
+	get_repost_progress,
+	group_into_components,
 	in_configured_timeslot,
+	repost,
 )
 from erpnext.stock.doctype.stock_entry.stock_entry_utils import make_stock_entry
+from erpnext.stock.repost_profiler import RepostProfiler
 from erpnext.stock.tests.test_utils import StockTestMixin
 from erpnext.stock.utils import PendingRepostingError
 
@@ -455,3 +460,153 @@ class TestRepostItemValuation(FrappeTestCase, StockTestMixin):
 						"name",
 					)
 				)
+
+	def test_group_into_components(self):
+		riv_keys = {
+			"RIV-1": {("A", "W1")},
+			"RIV-2": {("B", "W1")},
+			"RIV-3": {("A", "W2")},
+			"RIV-4": {("C", "W1"), ("A", "W1")},
+			"RIV-5": set(),
+		}
+		# transfer of A from W1 to W2
+		linked = [{("A", "W1"), ("A", "W2")}]
+
+		components = sorted(group_into_components(riv_keys, linked))
+		self.assertEqual(components, [["RIV-1", "RIV-3", "RIV-4"], ["RIV-2"], ["RIV-5"]])
+
+	def make_item_warehouse_repost(self, item_code, warehouse):
+		return frappe.get_doc(
+			doctype="Repost Item Valuation",
+			based_on="Item and Warehouse",
+			item_code=item_code,
+			warehouse=warehouse,
+			posting_date=add_days(today(), -1),
+			posting_time="00:00:00",
+			company="_Test Company",
+		).submit()
+
+	def get_components_of(self, *reposts):
+		rows = frappe.get_all(
+			"Repost Item Valuation",
+			filters={"name": ("in", [d.name for d in reposts])},
+			fields=[
+				"name",
+				"based_on",
+				"voucher_type",
+				"voucher_no",
+				"item_code",
+				"warehouse",
+				"posting_date",
+				"posting_time",
+				"reposting_data_file",
+				"distinct_item_and_warehouse",
+			],
+			order_by="creation",
+		)
+		return sorted(get_repost_components(rows))
+
+	def test_repost_components_follow_transfers(self):
+		from erpnext.stock.doctype.warehouse.test_warehouse import create_warehouse
+
+		frappe.flags.dont_execute_stock_reposts = True
+		item_a = make_item(properties={"is_stock_item": 1}).name
+		item_b = make_item(properties={"is_stock_item": 1}).name
+		source = create_warehouse("_Test Parallel Repost Source")
+		target = create_warehouse("_Test Parallel Repost Target")
+
+		make_stock_entry(item_code=item_a, to_warehouse=source, qty=10, rate=10)
+		make_stock_entry(item_code=item_b, to_warehouse=source, qty=10, rate=10)
+		make_stock_entry(item_code=item_a, from_warehouse=source, to_warehouse=target, qty=5)
+
+		riv_source = self.make_item_warehouse_repost(item_a, source)
+		riv_target = self.make_item_warehouse_repost(item_a, target)
+		riv_other = self.make_item_warehouse_repost(item_b, source)
+
+		self.assertEqual(
+			self.get_components_of(riv_source, riv_target, riv_other),
+			sorted([[riv_source.name, riv_target.name], [riv_other.name]]),
+		)
+
+	def test_multi_item_vouchers_do_not_link_items(self):
+		from erpnext.stock.doctype.warehouse.test_warehouse import create_warehouse
+
+		frappe.flags.dont_execute_stock_reposts = True
+		item_a = make_item(properties={"is_stock_item": 1}).name
+		item_b = make_item(properties={"is_stock_item": 1}).name
+		source = create_warehouse("_Test Parallel Repost Source")
+		target = create_warehouse("_Test Parallel Repost Target")
+
+		# one receipt and one transfer moving both items, without value flowing between them
+		for kwargs in ({"to_warehouse": source}, {"from_warehouse": source, "to_warehouse": target}):
+			se = make_stock_entry(item_code=item_a, qty=5, rate=10, do_not_submit=True, **kwargs)
+			row = frappe.copy_doc(se.items[0])
+			row.item_code = item_b
+			se.append("items", row)
+			se.submit()
+
+		reposts = [
+			self.make_item_warehouse_repost(item_code, warehouse)
+			for item_code in (item_a, item_b)
+			for warehouse in (source, target)
+		]
+
+		# each item is an independent chain from source to target
+		self.assertEqual(
+			self.get_components_of(*reposts),
+			sorted([[reposts[0].name, reposts[1].name], [reposts[2].name, reposts[3].name]]),
+		)
+
+	def test_repost_profile(self):
+		frappe.flags.dont_execute_stock_reposts = True
+		item_code = make_item(properties={"is_stock_item": 1}).name
+		warehouse = "_Test Warehouse - _TC"
+
+		for days in (3, 2, 1):
+			make_stock_entry(
+				item_code=item_code,
+				to_warehouse=warehouse,
+				qty=5,
+				rate=10 + days,
+				posting_date=add_days(today(), -days),
+			)
+
+		riv = frappe.get_doc(
+			doctype="Repost Item Valuation",
+			based_on="Item and Warehouse",
+			item_code=item_code,
+			warehouse=warehouse,
+			posting_date=add_days(today(), -3),
+			posting_time="00:00:00",
+			company="_Test Company",
+		).submit()
+		repost(riv)
+
+		progress = get_repost_progress(riv.name)
+		self.assertEqual(progress.status, "Completed")
+		self.assertEqual(progress.current_index, progress.total)
+		self.assertGreater(progress.phases["repost_sl_entries"]["queries"], 0)
+
+		item = next(row for row in progress["items"] if row.item_code == item_code)
+		self.assertEqual(item.warehouse, warehouse)
+		self.assertEqual(item.sles, 3)
+		self.assertGreater(item.process_sle_queries, 0)
+
+	@patch("erpnext.stock.repost_profiler.TOP_ITEMS", 2)
+	def test_repost_profile_keeps_slowest_items(self):
+		profiler = RepostProfiler()
+		for index, seconds in enumerate((3.0, 1.0, 4.0, 2.0)):
+			profiler.items[f"item-{index}::wh"] = {
+				"item_code": f"item-{index}",
+				"warehouse": "wh",
+				"sles": 1,
+				"phases": {"process_sle": {"calls": 1, "seconds": seconds, "queries": 5}},
+			}
+
+		profile = frappe.parse_json(profiler.as_json())
+		self.assertEqual(sorted(profile["items"]), ["item-0::wh", "item-2::wh"])
+		self.assertEqual(profile["other_items"]["count"], 2)
+		self.assertEqual(profile["other_items"]["sles"], 2)
+		self.assertEqual(
+			profile["other_items"]["phases"]["process_sle"], {"calls": 2, "seconds": 3.0, "queries": 10}
+		)
@@ -23,6 +23,10 @@ from frappe.utils import (
 )
 from frappe.utils.csvutils import build_csv_response
 
+from erpnext.stock.doctype.batch_warehouse_balance.batch_warehouse_balance import (
+	add_bundle_to_balance,
+	tracking_bundle_changes,
+)
 from erpnext.stock.serial_batch_bundle import (
 	BatchNoValuation,
 	SerialNoValuation,
@@ -202,12 +206,13 @@ class SerialandBatchBundle(Document):
 		]:
 			return
 
-		if self.type_of_transaction == "Outward":
-			self.set_incoming_rate_for_outward_transaction(
-				row, save, allow_negative_stock=allow_negative_stock
-			)
-		else:
-			self.set_incoming_rate_for_inward_transaction(row, save)
+		with tracking_bundle_changes(self.name if save else None):
+			if self.type_of_transaction == "Outward":
+				self.set_incoming_rate_for_outward_transaction(
+					row, save, allow_negative_stock=allow_negative_stock
+				)
+			else:
+				self.set_incoming_rate_for_inward_transaction(row, save)
 
 	def calculate_total_qty(self, save=True):
 		self.total_qty = 0.0
@@ -724,6 +729,8 @@ class SerialandBatchBundle(Document):
 
 	def before_cancel(self):
 		self.delink_serial_and_batch_bundle()
+		# bundles delinked from a cancelled voucher are already out of the balance
+		add_bundle_to_balance(self.name, sign=-1)
 
 	def delink_serial_and_batch_bundle(self):
 		sles = frappe.get_all("Stock Ledger Entry", filters={"serial_and_batch_bundle": self.name})
@@ -804,6 +811,7 @@ class SerialandBatchBundle(Document):
 	def on_submit(self):
 		self.validate_batch_inventory()
 		self.validate_serial_nos_inventory()
+		add_bundle_to_balance(self.name)
 
 	def set_purchase_document_no(self):
 		if not self.has_serial_no:
@@ -12,9 +12,14 @@ from frappe.utils import add_days, cint, flt, formatdate, get_datetime, getdate
 
 from erpnext.accounts.utils import get_fiscal_year
 from erpnext.controllers.item_variant import ItemTemplateCannotHaveStock
+from erpnext.stock.doctype.bin.bin import update_latest_posting_datetime
 from erpnext.stock.doctype.inventory_dimension.inventory_dimension import get_inventory_dimensions
+from erpnext.stock.doctype.stock_ledger_entry_serial_no.stock_ledger_entry_serial_no import (
+	make_serial_no_entries,
+)
 from erpnext.stock.serial_batch_bundle import SerialBatchBundle
 from erpnext.stock.stock_ledger import get_previous_sle
+from erpnext.stock.utils import get_or_make_bin
 
 
 class StockFreezeError(frappe.ValidationError):
@@ -171,9 +176,14 @@ class StockLedgerEntry(Document):
 	def on_submit(self):
 		self.set_posting_datetime()
 		self.check_stock_frozen_date()
+		if not self.is_cancelled:
+			update_latest_posting_datetime(
+				get_or_make_bin(self.item_code, self.warehouse), self.posting_datetime
+			)
 
 		# Added to handle few test cases where serial_and_batch_bundles are not required
 		if frappe.flags.in_test and frappe.flags.ignore_serial_batch_bundle_validation:
+			make_serial_no_entries(self)
 			return
 
 		if not self.get("via_landed_cost_voucher"):
@@ -186,6 +196,9 @@ class StockLedgerEntry(Document):
 
 		self.validate_serial_batch_no_bundle()
 
+		# after SerialBatchBundle, which creates the bundle of serial items submitted without one
+		make_serial_no_entries(self)
+
 	def validate_mandatory(self):
 		mandatory = ["warehouse", "posting_date", "voucher_type", "voucher_no", "company"]
 		for k in mandatory:
@@ -0,0 +1,154 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+"""One row per serial no moved by a Stock Ledger Entry.
+
+Serial nos of an entry are stored either newline separated in its `serial_no`
+text column or in its Serial and Batch Bundle. Neither can be searched by serial
+no with an index, so every entry also records its serial nos here when it is
+submitted. Rows are never removed on cancellation: queries join back to the
+Stock Ledger Entry and filter on its `is_cancelled`.
+"""
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import now
+
+FIELDS = (
+	"name",
+	"creation",
+	"modified",
+	"owner",
+	"modified_by",
+	"serial_no",
+	"item_code",
+	"warehouse",
+	"stock_ledger_entry",
+	"voucher_type",
+	"voucher_no",
+	"posting_datetime",
+)
+
+
+class StockLedgerEntrySerialNo(Document):
+	# begin: auto-generated types
+	# This code is auto-generated. Do not modify anything in this block.
+
+	from typing import TYPE_CHECKING
+
+	if TYPE_CHECKING:
+		from frappe.types import DF
+
+		item_code: DF.Link | None
+		posting_datetime: DF.Datetime | None
+		serial_no: DF.Link | None
+		stock_ledger_entry: DF.Link | None
+		voucher_no: DF.DynamicLink | None
+		voucher_type: DF.Link | None
+		warehouse: DF.Link | None
+	# end: auto-generated types
+
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Stock Ledger Entry Serial No", ["serial_no", "posting_datetime"])
+
+
+def make_serial_no_entries(sle):
+	"""Record the serial nos of a submitted Stock Ledger Entry."""
+	from erpnext.stock.doctype.serial_no.serial_no import get_serial_nos
+
+	serial_nos = get_serial_nos(sle.serial_no) if sle.serial_no else []
+	if sle.serial_and_batch_bundle:
+		serial_nos += frappe.get_all(
+			"Serial and Batch Entry",
+			filters={"parent": sle.serial_and_batch_bundle, "serial_no": ("is", "set")},
+			pluck="serial_no",
+		)
+
+	insert_serial_no_entries([(serial_no, sle) for serial_no in serial_nos])
+
+
+def insert_serial_no_entries(rows):
+	"""Bulk insert (serial_no, sle) pairs."""
+	if not rows:
+		return
+
+	timestamp, user = now(), frappe.session.user
+	frappe.db.bulk_insert(
+		"Stock Ledger Entry Serial No",
+		fields=FIELDS,
+		values=[
+			(
+				frappe.generate_hash(length=12),
+				timestamp,
+				timestamp,
+				user,
+				user,
+				serial_no,
+				sle.item_code,
+				sle.warehouse,
+				sle.name,
+				sle.voucher_type,
+				sle.voucher_no,
+				sle.posting_datetime,
+			)
+			for serial_no, sle in rows
+		],
+	)
+
+
+def rebuild_serial_no_entries(chunk_size=5000):
+	"""Rebuild the map from the `serial_no` column and the bundles of all Stock Ledger Entries."""
+	from erpnext.stock.doctype.serial_no.serial_no import get_serial_nos
+
+	frappe.db.delete("Stock Ledger Entry Serial No")
+
+	sle = frappe.qb.DocType("Stock Ledger Entry")
+	last_name = ""
+	while True:
+		entries = (
+			frappe.qb.from_(sle)
+			.select(
+				sle.name,
+				sle.item_code,
+				sle.warehouse,
+				sle.voucher_type,
+				sle.voucher_no,
+				sle.posting_datetime,
+				sle.serial_no,
+				sle.serial_and_batch_bundle,
+			)
+			.where(
+				(sle.name > last_name)
+				& (
+					(sle.serial_no.isnotnull() & (sle.serial_no != "")) | sle.serial_and_batch_bundle.isnotnull()
+				)
+			)
+			.orderby(sle.name)
+			.limit(chunk_size)
+		).run(as_dict=True)
+
+		if not entries:
+			break
+
+		bundle_serial_nos = {}
+		bundles = [d.serial_and_batch_bundle for d in entries if d.serial_and_batch_bundle]
+		if bundles:
+			for row in frappe.get_all(
+				"Serial and Batch Entry",
+				filters={"parent": ("in", bundles), "serial_no": ("is", "set")},
+				fields=["parent", "serial_no"],
+			):
+				bundle_serial_nos.setdefault(row.parent, []).append(row.serial_no)
+
+		rows = []
+		for entry in entries:
+			serial_nos = get_serial_nos(entry.serial_no) if entry.serial_no else []
+			serial_nos += bundle_serial_nos.get(entry.serial_and_batch_bundle, [])
+			rows.extend((serial_no, entry) for serial_no in serial_nos)
+
+		insert_serial_no_entries(rows)
+		frappe.db.commit()
+		last_name = entries[-1].name
@@ -0,0 +1,75 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext.stock.doctype.delivery_note.test_delivery_note import create_delivery_note
+from erpnext.stock.doctype.serial_and_batch_bundle.test_serial_and_batch_bundle import (
+	get_serial_nos_from_bundle,
+)
+from erpnext.stock.doctype.stock_entry.stock_entry_utils import make_stock_entry
+from erpnext.stock.doctype.stock_entry.test_stock_entry import make_serialized_item
+from erpnext.stock.doctype.stock_ledger_entry_serial_no.stock_ledger_entry_serial_no import (
+	rebuild_serial_no_entries,
+)
+from erpnext.stock.stock_ledger import get_stock_ledger_entries
+
+
+class TestStockLedgerEntrySerialNo(FrappeTestCase):
+	def get_entries(self, serial_no):
+		return frappe.get_all(
+			"Stock Ledger Entry Serial No",
+			filters={"serial_no": serial_no},
+			fields=["stock_ledger_entry", "voucher_no"],
+			order_by="posting_datetime, creation",
+		)
+
+	def test_serial_no_history(self):
+		se = make_serialized_item(target_warehouse="_Test Warehouse - _TC")
+		serial_no = get_serial_nos_from_bundle(se.get("items")[0].serial_and_batch_bundle)[0]
+		dn = create_delivery_note(
+			item_code="_Test Serialized Item With Series", qty=1, serial_no=[serial_no]
+		)
+
+		entries = self.get_entries(serial_no)
+		self.assertEqual([d.voucher_no for d in entries], [se.name, dn.name])
+
+		history = get_stock_ledger_entries(
+			frappe._dict(item_code="_Test Serialized Item With Series", serial_no=serial_no),
+			">",
+			order="asc",
+		)
+		self.assertEqual([d.name for d in history], [d.stock_ledger_entry for d in entries])
+
+		# cancelled entries stay mapped but are filtered out of the history
+		dn.cancel()
+		history = get_stock_ledger_entries(
+			frappe._dict(item_code="_Test Serialized Item With Series", serial_no=serial_no),
+			">",
+		)
+		self.assertEqual([d.voucher_no for d in history], [se.name])
+
+		# the backfill maps the same entries as submission did
+		mapped = sorted(d.stock_ledger_entry for d in self.get_entries(serial_no))
+		rebuild_serial_no_entries()
+		self.assertEqual(sorted(d.stock_ledger_entry for d in self.get_entries(serial_no)), mapped)
+
+	def test_auto_created_bundle(self):
+		# no bundle is passed, the Stock Ledger Entry creates one from the serial no series
+		se = make_stock_entry(
+			item_code="_Test Serialized Item With Series",
+			target="_Test Warehouse - _TC",
+			qty=2,
+			basic_rate=100,
+		)
+		bundle = frappe.db.get_value(
+			"Stock Ledger Entry",
+			{"voucher_no": se.name, "is_cancelled": 0},
+			"serial_and_batch_bundle",
+		)
+		serial_nos = get_serial_nos_from_bundle(bundle)
+		self.assertEqual(len(serial_nos), 2)
+
+		for serial_no in serial_nos:
+			self.assertEqual([d.voucher_no for d in self.get_entries(serial_no)], [se.name])
@@ -12,6 +12,9 @@ import erpnext
 from erpnext.accounts.utils import get_company_default
 from erpnext.controllers.stock_controller import StockController
 from erpnext.stock.doctype.batch.batch import get_available_batches, get_batch_qty
+from erpnext.stock.doctype.batch_warehouse_balance.batch_warehouse_balance import (
+	tracking_bundle_changes,
+)
 from erpnext.stock.doctype.inventory_dimension.inventory_dimension import get_inventory_dimensions
 from erpnext.stock.doctype.serial_and_batch_bundle.serial_and_batch_bundle import (
 	get_available_serial_nos,
@@ -920,10 +923,11 @@ class StockReconciliation(StockController):
 	def get_current_qty_for_serial_or_batch(self, row):
 		doc = frappe.get_doc("Serial and Batch Bundle", row.current_serial_and_batch_bundle)
 		current_qty = 0.0
-		if doc.has_serial_no:
-			current_qty = self.get_current_qty_for_serial_nos(doc)
-		elif doc.has_batch_no:
-			current_qty = self.get_current_qty_for_batch_nos(doc)
+		with tracking_bundle_changes(doc.name):
+			if doc.has_serial_no:
+				current_qty = self.get_current_qty_for_serial_nos(doc)
+			elif doc.has_batch_no:
+				current_qty = self.get_current_qty_for_batch_nos(doc)
 
 		return abs(current_qty)
 
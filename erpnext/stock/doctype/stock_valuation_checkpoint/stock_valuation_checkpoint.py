@@ -0,0 +1,233 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+"""Periodic snapshots of the stock ledger of an item-warehouse.
+
+A checkpoint holds the balance, valuation, FIFO/LIFO queue and Stock Ageing
+slots after the last entry posted at `posting_datetime`. Checkpoints are built
+incrementally by a daily job, each one from the previous checkpoint, and are
+deleted as soon as an entry is posted, cancelled or reposted at or before their
+`posting_datetime`, so a checkpoint never disagrees with the ledger.
+"""
+
+import json
+
+import frappe
+from frappe.model.document import Document
+from frappe.query_builder.functions import Count, Max
+from frappe.utils import get_datetime, getdate, nowdate
+
+# Minimum number of entries between two checkpoints of an item-warehouse
+CHECKPOINT_INTERVAL = 1000
+
+
+class StockValuationCheckpoint(Document):
+	# begin: auto-generated types
+	# This code is auto-generated. Do not modify anything in this block.
+
+	from typing import TYPE_CHECKING
+
+	if TYPE_CHECKING:
+		from frappe.types import DF
+
+		company: DF.Link | None
+		fifo_slots: DF.LongText | None
+		item_code: DF.Link | None
+		posting_date: DF.Date | None
+		posting_datetime: DF.Datetime | None
+		qty_after_transaction: DF.Float
+		stock_ledger_entry: DF.Link | None
+		stock_queue: DF.LongText | None
+		stock_value: DF.Currency
+		total_qty: DF.Float
+		valuation_rate: DF.Currency
+		warehouse: DF.Link | None
+	# end: auto-generated types
+
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Stock Valuation Checkpoint", ["item_code", "warehouse", "posting_datetime"])
+
+
+def invalidate_valuation_checkpoints(item_code, warehouse, posting_datetime):
+	"""Delete the checkpoints of the item-warehouse that include entries from `posting_datetime` on."""
+	frappe.db.delete(
+		"Stock Valuation Checkpoint",
+		{
+			"item_code": item_code,
+			"warehouse": warehouse,
+			"posting_datetime": (">=", get_datetime(posting_datetime)),
+		},
+	)
+
+
+def invalidate_voucher_checkpoints(voucher_type, voucher_no):
+	entries = frappe.get_all(
+		"Stock Ledger Entry",
+		filters={"voucher_type": voucher_type, "voucher_no": voucher_no},
+		fields=["item_code", "warehouse", "posting_datetime"],
+		distinct=True,
+	)
+	for entry in entries:
+		invalidate_valuation_checkpoints(entry.item_code, entry.warehouse, entry.posting_datetime)
+
+
+def get_latest_checkpoints_query(company=None, to_date=None, warehouses=None):
+	"""Sub query returning the posting datetime of the latest checkpoint per item-warehouse."""
+	checkpoint = frappe.qb.DocType("Stock Valuation Checkpoint")
+	query = (
+		frappe.qb.from_(checkpoint)
+		.select(
+			checkpoint.item_code,
+			checkpoint.warehouse,
+			Max(checkpoint.posting_datetime).as_("posting_datetime"),
+		)
+		.groupby(checkpoint.item_code, checkpoint.warehouse)
+	)
+
+	if company:
+		query = query.where(checkpoint.company == company)
+	if to_date:
+		query = query.where(checkpoint.posting_date <= getdate(to_date))
+	if warehouses is not None:
+		query = query.where(checkpoint.warehouse.isin(warehouses or [""]))
+
+	return query
+
+
+def get_latest_checkpoint(item_code, warehouse):
+	checkpoint = frappe.qb.DocType("Stock Valuation Checkpoint")
+	checkpoints = (
+		frappe.qb.from_(checkpoint)
+		.select(
+			checkpoint.item_code,
+			checkpoint.warehouse,
+			checkpoint.posting_datetime,
+			checkpoint.qty_after_transaction,
+			checkpoint.total_qty,
+			checkpoint.fifo_slots,
+		)
+		.where((checkpoint.item_code == item_code) & (checkpoint.warehouse == warehouse))
+		.orderby(checkpoint.posting_datetime, order=frappe.qb.desc)
+		.limit(1)
+	).run(as_dict=True)
+
+	return checkpoints[0] if checkpoints else None
+
+
+def build_valuation_checkpoints():
+	"""Add a checkpoint to every item-warehouse with enough new entries since its last checkpoint.
+
+	Only entries posted before today are included, recent entries are the ones
+	most likely to be backdated and would invalidate the checkpoint right away.
+	"""
+	before = get_datetime(nowdate())
+	for row in get_item_warehouses_due(before):
+		try:
+			make_checkpoint(row.item_code, row.warehouse, before)
+			frappe.db.commit()
+		except Exception:
+			frappe.db.rollback()
+			frappe.log_error(
+				title=f"Stock valuation checkpoint failed for {row.item_code} in {row.warehouse}"
+			)
+
+
+def get_item_warehouses_due(before, interval=None):
+	sle = frappe.qb.DocType("Stock Ledger Entry")
+	item = frappe.qb.DocType("Item")
+	latest = get_latest_checkpoints_query()
+
+	return (
+		frappe.qb.from_(sle)
+		.inner_join(item)
+		.on(item.name == sle.item_code)
+		.left_join(latest)
+		.on((latest.item_code == sle.item_code) & (latest.warehouse == sle.warehouse))
+		.select(sle.item_code, sle.warehouse)
+		.where(
+			(sle.is_cancelled == 0)
+			& (sle.posting_datetime < before)
+			& (latest.posting_datetime.isnull() | (sle.posting_datetime > latest.posting_datetime))
+			# ageing of serialized items is tracked per serial no across warehouses
+			& (item.has_serial_no == 0)
+		)
+		.groupby(sle.item_code, sle.warehouse)
+		.having(Count("*") >= (interval or CHECKPOINT_INTERVAL))
+	).run(as_dict=True)
+
+
+def make_checkpoint(item_code, warehouse, before):
+	"""Checkpoint the item-warehouse after its last entry posted before `before`."""
+	from erpnext.stock.report.stock_ageing.stock_ageing import FIFOSlots
+
+	previous = get_latest_checkpoint(item_code, warehouse)
+	entries = get_entries_since_checkpoint(
+		item_code, warehouse, previous.posting_datetime if previous else None, before
+	)
+	if not entries:
+		return
+
+	slots = FIFOSlots(
+		frappe._dict(show_warehouse_wise_stock=True),
+		entries,
+		checkpoints=[previous] if previous else [],
+	).generate()[(item_code, warehouse)]
+
+	last_entry = entries[-1]
+	return frappe.get_doc(
+		{
+			"doctype": "Stock Valuation Checkpoint",
+			"item_code": item_code,
+			"warehouse": warehouse,
+			"company": last_entry.company,
+			"posting_date": last_entry.posting_date,
+			"posting_datetime": last_entry.posting_datetime,
+			"stock_ledger_entry": last_entry.sle,
+			"qty_after_transaction": last_entry.qty_after_transaction,
+			"total_qty": slots["total_qty"],
+			"valuation_rate": last_entry.valuation_rate,
+			"stock_value": last_entry.stock_value,
+			"stock_queue": last_entry.stock_queue,
+			"fifo_slots": json.dumps(slots["fifo_queue"], default=str),
+		}
+	).insert(ignore_permissions=True)
+
+
+def get_entries_since_checkpoint(item_code, warehouse, after, before):
+	sle = frappe.qb.DocType("Stock Ledger Entry")
+	query = (
+		frappe.qb.from_(sle)
+		.select(
+			sle.item_code.as_("name"),
+			sle.name.as_("sle"),
+			sle.company,
+			sle.warehouse,
+			sle.actual_qty,
+			sle.posting_date,
+			sle.posting_datetime,
+			sle.voucher_type,
+			sle.voucher_no,
+			sle.serial_no,
+			sle.batch_no,
+			sle.qty_after_transaction,
+			sle.valuation_rate,
+			sle.stock_value,
+			sle.stock_queue,
+		)
+		.where(
+			(sle.item_code == item_code)
+			& (sle.warehouse == warehouse)
+			& (sle.is_cancelled == 0)
+			& (sle.posting_datetime < before)
+		)
+		.orderby(sle.posting_datetime)
+		.orderby(sle.creation)
+		.orderby(sle.actual_qty)
+	)
+	if after:
+		query = query.where(sle.posting_datetime > after)
+
+	return query.run(as_dict=True)
@@ -0,0 +1,88 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, today
+
+from erpnext.stock.doctype.stock_entry.stock_entry_utils import make_stock_entry
+from erpnext.stock.doctype.stock_valuation_checkpoint.stock_valuation_checkpoint import (
+	build_valuation_checkpoints,
+)
+from erpnext.stock.report.stock_ageing.stock_ageing import FIFOSlots, format_report_data
+from erpnext.stock.tests.test_utils import StockTestMixin
+
+WAREHOUSE = "_Test Warehouse - _TC"
+
+
+class TestStockValuationCheckpoint(FrappeTestCase, StockTestMixin):
+	def setUp(self):
+		self.item_code = self.make_item(properties={"valuation_method": "FIFO"}).name
+		self.start = add_days(today(), -30)
+		for i in range(12):
+			kwargs = {"item_code": self.item_code, "qty": 4, "posting_date": add_days(self.start, i)}
+			if i % 3 == 2:
+				make_stock_entry(from_warehouse=WAREHOUSE, **kwargs)
+			else:
+				make_stock_entry(to_warehouse=WAREHOUSE, rate=10 + i, **kwargs)
+
+		self.filters = frappe._dict(
+			company="_Test Company",
+			to_date=today(),
+			item_code=self.item_code,
+			show_warehouse_wise_stock=True,
+			range1=5,
+			range2=15,
+			range3=25,
+		)
+
+	def get_checkpoints(self):
+		return frappe.get_all(
+			"Stock Valuation Checkpoint",
+			filters={"item_code": self.item_code, "warehouse": WAREHOUSE},
+			fields=["posting_date", "qty_after_transaction", "total_qty", "stock_ledger_entry"],
+		)
+
+	def build(self):
+		with patch(
+			"erpnext.stock.doctype.stock_valuation_checkpoint.stock_valuation_checkpoint.CHECKPOINT_INTERVAL",
+			5,
+		):
+			build_valuation_checkpoints()
+
+	def test_ageing_resumes_from_checkpoint(self):
+		self.build()
+		checkpoints = self.get_checkpoints()
+		self.assertEqual(len(checkpoints), 1)
+		self.assertEqual(checkpoints[0].qty_after_transaction, 16)
+		self.assertEqual(checkpoints[0].total_qty, 16)
+
+		# add entries after the checkpoint, the report must only replay those
+		make_stock_entry(item_code=self.item_code, from_warehouse=WAREHOUSE, qty=6)
+		make_stock_entry(item_code=self.item_code, to_warehouse=WAREHOUSE, qty=2, rate=20)
+		full_replay = FIFOSlots(self.filters, checkpoints=[]).generate()
+		resumed = FIFOSlots(self.filters).generate()
+
+		self.assertEqual(
+			format_report_data(self.filters, resumed, self.filters.to_date),
+			format_report_data(self.filters, full_replay, self.filters.to_date),
+		)
+
+		# entries posted today are not checkpointed yet
+		self.build()
+		self.assertEqual(len(self.get_checkpoints()), 1)
+
+	def test_backdated_entry_invalidates_checkpoint(self):
+		self.build()
+		self.assertTrue(self.get_checkpoints())
+
+		make_stock_entry(
+			item_code=self.item_code,
+			to_warehouse=WAREHOUSE,
+			qty=1,
+			rate=5,
+			posting_date=add_days(self.start, 5),
+		)
+		self.assertFalse(self.get_checkpoints())
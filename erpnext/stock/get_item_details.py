@@ -3,6 +3,7 @@
 
 
 import json
+from contextlib import contextmanager
 
 import frappe
 from frappe import _, throw
@@ -891,7 +892,29 @@ def get_item_price(args, item_code, ignore_party=False):
 	        optional fields transaction_date, customer, supplier
 	:param item_code: str, Item Doctype field item_code
 	"""
+	cache = frappe.flags.item_price_cache
+	if cache is None:
+		return query_item_price(args, item_code, ignore_party)
 
+	key = (item_code, cint(ignore_party), frappe.as_json(args))
+	if key not in cache:
+		cache[key] = query_item_price(args, item_code, ignore_party)
+
+	return cache[key]
+
+
+@contextmanager
+def sharing_item_prices():
+	"""Reuse the Item Prices looked up with the same arguments inside the block, e.g. across the
+	documents created by a bulk job."""
+	frappe.flags.item_price_cache = {}
+	try:
+		yield
+	finally:
+		frappe.flags.item_price_cache = None
+
+
+def query_item_price(args, item_code, ignore_party=False):
 	ip = frappe.qb.DocType("Item Price")
 	query = (
 		frappe.qb.from_(ip)
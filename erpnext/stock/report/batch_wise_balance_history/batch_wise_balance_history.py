@@ -129,6 +129,10 @@ def get_stock_ledger_entries_for_batch_no(filters):
 
 
 def get_stock_ledger_entries_for_batch_bundle(filters):
+	entries = get_batch_warehouse_balances(filters)
+	if entries is not None:
+		return entries
+
 	sle = frappe.qb.DocType("Stock Ledger Entry")
 	batch_package = frappe.qb.DocType("Serial and Batch Entry")
 
@@ -164,6 +168,40 @@ def get_stock_ledger_entries_for_batch_bundle(filters):
 	return query.run(as_dict=True) or []
 
 
+def get_batch_warehouse_balances(filters):
+	"""Batch Warehouse Balances in the shape of `get_stock_ledger_entries_for_batch_bundle`.
+
+	Returns None when a balance has moved after the To Date.
+	"""
+	balance = frappe.qb.DocType("Batch Warehouse Balance")
+	query = (
+		frappe.qb.from_(balance)
+		.select(
+			balance.item_code,
+			balance.warehouse,
+			balance.batch_no,
+			balance.posting_datetime,
+			balance.qty.as_("actual_qty"),
+		)
+		.orderby(balance.item_code, balance.warehouse)
+	)
+
+	query = apply_warehouse_filter(query, balance, filters)
+	for field in ["item_code", "batch_no", "company"]:
+		if filters.get(field):
+			query = query.where(balance[field] == filters.get(field))
+
+	entries = query.run(as_dict=True)
+	to_date = getdate(filters["to_date"])
+	if any(getdate(d.posting_datetime) > to_date for d in entries):
+		return None
+
+	for d in entries:
+		d.posting_date = getdate(d.pop("posting_datetime"))
+
+	return entries
+
+
 def get_item_warehouse_batch_map(filters, float_precision):
 	sle = get_stock_ledger_entries(filters)
 	iwb_map = {}
@@ -0,0 +1,14 @@
+// Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+// For license information, please see license.txt
+
+frappe.query_reports["Repost Item Valuation Profile"] = {
+	filters: [
+		{
+			fieldname: "repost_item_valuation",
+			label: __("Repost Item Valuation"),
+			fieldtype: "Link",
+			options: "Repost Item Valuation",
+			reqd: 1,
+		},
+	],
+};
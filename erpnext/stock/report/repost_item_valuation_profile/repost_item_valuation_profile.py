@@ -0,0 +1,87 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+
+from erpnext.stock.doctype.repost_item_valuation.repost_item_valuation import get_repost_progress
+
+PHASES = {
+	"process_sle": _("Process SLE"),
+	"get_incoming_outgoing_rate_from_transaction": _("Rate from Transaction"),
+	"update_outgoing_rate_on_transaction": _("Update Rate on Transaction"),
+}
+
+
+def execute(filters=None):
+	progress = get_repost_progress(filters.get("repost_item_valuation"), limit=0)
+	return get_columns(), progress["items"], None, None, get_report_summary(progress)
+
+
+def get_columns():
+	columns = [
+		{
+			"label": _("Item"),
+			"fieldname": "item_code",
+			"fieldtype": "Link",
+			"options": "Item",
+			"width": 160,
+		},
+		{
+			"label": _("Warehouse"),
+			"fieldname": "warehouse",
+			"fieldtype": "Link",
+			"options": "Warehouse",
+			"width": 160,
+		},
+		{"label": _("SLEs Processed"), "fieldname": "sles", "fieldtype": "Int", "width": 120},
+	]
+
+	for phase, label in PHASES.items():
+		columns += [
+			{
+				"label": _("{0} (s)").format(label),
+				"fieldname": f"{phase}_seconds",
+				"fieldtype": "Float",
+				"precision": 3,
+				"width": 150,
+			},
+			{
+				"label": _("{0} Queries").format(label),
+				"fieldname": f"{phase}_queries",
+				"fieldtype": "Int",
+				"width": 150,
+			},
+		]
+
+	return columns
+
+
+def get_report_summary(progress):
+	summary = [
+		{"value": progress.status, "label": _("Status"), "datatype": "Data"},
+		{
+			"value": f"{progress.current_index} / {progress.total}",
+			"label": _("Item-Warehouses Reposted"),
+			"datatype": "Data",
+		},
+		{"value": progress.elapsed or 0, "label": _("Elapsed (s)"), "datatype": "Float"},
+		{
+			"value": progress.estimated_remaining or 0,
+			"label": _("Estimated Remaining (s)"),
+			"indicator": "Blue",
+			"datatype": "Float",
+		},
+	]
+
+	for phase in ("repost_sl_entries", "repost_gl_entries"):
+		if values := progress.phases.get(phase):
+			summary.append(
+				{
+					"value": values["queries"],
+					"label": _("Queries in {0}").format(frappe.unscrub(phase)),
+					"datatype": "Int",
+				}
+			)
+
+	return summary
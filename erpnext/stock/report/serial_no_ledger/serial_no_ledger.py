@@ -78,7 +78,7 @@ def get_columns(filters):
 
 
 def get_data(filters):
-	stock_ledgers = get_stock_ledger_entries(filters, "<=", order="asc", check_serial_no=False)
+	stock_ledgers = get_stock_ledger_entries(filters, "<=", order="asc")
 
 	if not stock_ledgers:
 		return []
@@ -2,14 +2,18 @@
 # License: GNU General Public License v3. See license.txt
 
 
+import json
 from operator import itemgetter
 from typing import Dict, Iterator, List, Tuple, Union
 
 import frappe
 from frappe import _
-from frappe.utils import cint, date_diff, flt
+from frappe.utils import cint, date_diff, flt, getdate
 
 from erpnext.stock.doctype.serial_no.serial_no import get_serial_nos
+from erpnext.stock.doctype.stock_valuation_checkpoint.stock_valuation_checkpoint import (
+	get_latest_checkpoints_query,
+)
 
 Filters = frappe._dict
 
@@ -214,12 +218,14 @@ def add_column(
 class FIFOSlots:
 	"Returns FIFO computed slots of inwarded stock as per date."
 
-	def __init__(self, filters: Dict = None, sle: List = None):
+	def __init__(self, filters: Dict = None, sle: List = None, checkpoints: List = None):
 		self.item_details = {}
 		self.transferred_item_details = {}
 		self.serial_no_batch_purchase_details = {}
 		self.filters = filters
 		self.sle = sle
+		# Stock Valuation Checkpoints to resume from, `sle` must then only hold later entries
+		self.checkpoints = checkpoints
 
 	def generate(self) -> Dict:
 		"""
@@ -233,6 +239,11 @@ class FIFOSlots:
 		"""
 
 		stock_ledger_entries = self.sle
+		if stock_ledger_entries is None and self.checkpoints is None:
+			self.checkpoints = self.__get_checkpoints()
+
+		for checkpoint in self.checkpoints or []:
+			self.__init_from_checkpoint(checkpoint)
 
 		with frappe.db.unbuffered_cursor():
 			if stock_ledger_entries is None:
@@ -276,6 +287,21 @@ class FIFOSlots:
 
 		return key, fifo_queue, transferred_item_key
 
+	def __init_from_checkpoint(self, checkpoint: Dict):
+		"Initialise the key stores with the slots of a Stock Valuation Checkpoint."
+		details = frappe._dict(checkpoint)
+		details.name = checkpoint.get("name") or checkpoint.item_code
+
+		self.item_details[(details.name, checkpoint.warehouse)] = {
+			"details": details,
+			"fifo_queue": [
+				[qty, getdate(posting_date)] for qty, posting_date in json.loads(checkpoint.fifo_slots or "[]")
+			],
+			"qty_after_transaction": checkpoint.qty_after_transaction,
+			"total_qty": checkpoint.total_qty,
+			"has_serial_no": 0,
+		}
+
 	def __compute_incoming_stock(
 		self, row: Dict, fifo_queue: List, transfer_key: Tuple, serial_nos: List
 	):
@@ -394,7 +420,8 @@ class FIFOSlots:
 
 		sle_query = (
 			frappe.qb.from_(sle)
-			.from_(item)
+			.inner_join(item)
+			.on(sle.item_code == item.name)
 			.select(
 				item.name,
 				item.item_name,
@@ -413,15 +440,23 @@ class FIFOSlots:
 				sle.warehouse,
 			)
 			.where(
-				(sle.item_code == item.name)
-				& (sle.company == self.filters.get("company"))
+				(sle.company == self.filters.get("company"))
 				& (sle.posting_date <= self.filters.get("to_date"))
 				& (sle.is_cancelled != 1)
 			)
 		)
 
 		if self.filters.get("warehouse"):
-			sle_query = self.__get_warehouse_conditions(sle, sle_query)
+			sle_query = sle_query.where(sle.warehouse.isin(self.__get_warehouses()))
+
+		if self.checkpoints:
+			# entries up to the checkpoint of their item-warehouse are already in its slots
+			latest = self.__get_latest_checkpoints_query()
+			sle_query = (
+				sle_query.left_join(latest)
+				.on((latest.item_code == sle.item_code) & (latest.warehouse == sle.warehouse))
+				.where(latest.posting_datetime.isnull() | (sle.posting_datetime > latest.posting_datetime))
+			)
 
 		sle_query = sle_query.orderby(sle.posting_date, sle.posting_time, sle.creation, sle.actual_qty)
 
@@ -442,16 +477,57 @@ class FIFOSlots:
 
 		return item
 
-	def __get_warehouse_conditions(self, sle, sle_query) -> str:
-		warehouse = frappe.qb.DocType("Warehouse")
-		lft, rgt = frappe.db.get_value("Warehouse", self.filters.get("warehouse"), ["lft", "rgt"])
+	def __get_checkpoints(self) -> List[Dict]:
+		"Latest Stock Valuation Checkpoint of each item-warehouse up to `to_date`."
+		if not (self.filters.get("company") and self.filters.get("to_date")):
+			return []
+
+		checkpoint = frappe.qb.DocType("Stock Valuation Checkpoint")
+		latest = self.__get_latest_checkpoints_query()
+		item = self.__get_item_query()
+
+		return (
+			frappe.qb.from_(checkpoint)
+			.inner_join(latest)
+			.on(
+				(latest.item_code == checkpoint.item_code)
+				& (latest.warehouse == checkpoint.warehouse)
+				& (latest.posting_datetime == checkpoint.posting_datetime)
+			)
+			.inner_join(item)
+			.on(item.name == checkpoint.item_code)
+			.select(
+				item.name,
+				item.item_name,
+				item.item_group,
+				item.brand,
+				item.description,
+				item.stock_uom,
+				item.has_serial_no,
+				checkpoint.item_code,
+				checkpoint.warehouse,
+				checkpoint.qty_after_transaction,
+				checkpoint.total_qty,
+				checkpoint.fifo_slots,
+			)
+		).run(as_dict=True)
 
-		warehouse_results = (
-			frappe.qb.from_(warehouse)
-			.select("name")
-			.where((warehouse.lft >= lft) & (warehouse.rgt <= rgt))
-			.run()
+	def __get_latest_checkpoints_query(self):
+		return get_latest_checkpoints_query(
+			self.filters.get("company"),
+			self.filters.get("to_date"),
+			self.__get_warehouses() if self.filters.get("warehouse") else None,
 		)
-		warehouse_results = [x[0] for x in warehouse_results]
 
-		return sle_query.where(sle.warehouse.isin(warehouse_results))
+	def __get_warehouses(self) -> List[str]:
+		if not hasattr(self, "_warehouses"):
+			warehouse = frappe.qb.DocType("Warehouse")
+			lft, rgt = frappe.db.get_value("Warehouse", self.filters.get("warehouse"), ["lft", "rgt"])
+
+			self._warehouses = (
+				frappe.qb.from_(warehouse)
+				.select("name")
+				.where((warehouse.lft >= lft) & (warehouse.rgt <= rgt))
+			).run(pluck=True)
+
+		return self._warehouses
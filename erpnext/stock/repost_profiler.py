@@ -0,0 +1,183 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+"""Instrumentation of Repost Item Valuation runs.
+
+`RepostProfiler` counts the SQL queries and wall time of the repost phases, in
+total and per item-warehouse, and estimates the remaining time of the stock
+ledger repost from the progress so far. The profile is saved as JSON on the
+Repost Item Valuation and accumulates across restarts of the same repost. Only the
+slowest item-warehouses are kept individually, the others are summed up.
+"""
+
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+import frappe
+from frappe.utils import flt
+
+# Seconds between two saves of the profile while reposting
+SAVE_INTERVAL = 10
+# Item-warehouses kept individually in the profile, slowest first
+TOP_ITEMS = 50
+
+
+class RepostProfiler:
+	def __init__(self, profile=None):
+		profile = frappe.parse_json(profile) if profile else {}
+
+		self.elapsed = flt(profile.get("elapsed"))
+		self.current_index = profile.get("current_index") or 0
+		self.total = profile.get("total") or 0
+		# {phase: {"calls": int, "seconds": float, "queries": int}}, nested phases are inclusive
+		self.phases = profile.get("phases") or {}
+		# {"item::warehouse": {"item_code", "warehouse", "sles", "phases": {...}}}
+		self.items = profile.get("items") or {}
+		# totals of the item-warehouses dropped from `items`
+		self.other_items = profile.get("other_items") or {"count": 0, "sles": 0, "phases": {}}
+
+		self.queries = 0
+		self.started = None
+		self.saved = None
+
+	@classmethod
+	def from_doc(cls, doc):
+		return cls(doc.get("repost_profile"))
+
+	@contextmanager
+	def running(self):
+		"""Count every query and the time spent inside the block."""
+		patched = "sql" in frappe.db.__dict__
+		sql = frappe.db.sql
+
+		def counted_sql(*args, **kwargs):
+			self.queries += 1
+			return sql(*args, **kwargs)
+
+		frappe.db.sql = counted_sql
+		self.started = self.saved = time.monotonic()
+		try:
+			yield self
+		finally:
+			if patched:
+				frappe.db.sql = sql
+			else:
+				del frappe.db.sql
+
+			self.elapsed = self.get_elapsed()
+			self.started = None
+
+	def get_elapsed(self):
+		if self.started is None:
+			return self.elapsed
+		return self.elapsed + time.monotonic() - self.started
+
+	@contextmanager
+	def phase(self, name, item_code=None, warehouse=None):
+		started = time.monotonic()
+		queries = self.queries
+		try:
+			yield
+		finally:
+			seconds = time.monotonic() - started
+			queries = self.queries - queries
+
+			add_to_phase(self.phases, name, seconds, queries)
+			if item_code:
+				item = self.items.setdefault(
+					f"{item_code}::{warehouse}",
+					{"item_code": item_code, "warehouse": warehouse, "sles": 0, "phases": {}},
+				)
+				add_to_phase(item["phases"], name, seconds, queries)
+				if name == "process_sle":
+					item["sles"] += 1
+
+	def set_progress(self, current_index, total):
+		self.current_index = current_index
+		self.total = total
+
+	def get_estimated_remaining(self):
+		"""Seconds left for the stock ledger repost, at the average pace per item-warehouse so far."""
+		if not self.current_index or not self.total:
+			return None
+
+		return self.get_elapsed() / self.current_index * max(self.total - self.current_index, 0)
+
+	def should_save(self):
+		return self.saved is None or time.monotonic() - self.saved >= SAVE_INTERVAL
+
+	def trim_items(self):
+		"""Sum up all but the `TOP_ITEMS` slowest item-warehouses into `other_items`."""
+		if len(self.items) <= TOP_ITEMS:
+			return
+
+		ranked = sorted(self.items, key=lambda key: get_item_seconds(self.items[key]), reverse=True)
+		for key in ranked[TOP_ITEMS:]:
+			item = self.items.pop(key)
+			self.other_items["count"] += 1
+			self.other_items["sles"] += item["sles"]
+			for name, phase in item["phases"].items():
+				merge_phase(self.other_items["phases"], name, phase)
+
+	def as_dict(self):
+		self.trim_items()
+		return {
+			"elapsed": self.get_elapsed(),
+			"current_index": self.current_index,
+			"total": self.total,
+			"estimated_remaining": self.get_estimated_remaining(),
+			"phases": self.phases,
+			"items": self.items,
+			"other_items": self.other_items,
+		}
+
+	def as_json(self):
+		self.saved = time.monotonic()
+		return frappe.as_json(self.as_dict(), indent=None)
+
+
+def add_to_phase(phases, name, seconds, queries):
+	merge_phase(phases, name, {"calls": 1, "seconds": seconds, "queries": queries})
+
+
+def merge_phase(phases, name, other):
+	phase = phases.setdefault(name, {"calls": 0, "seconds": 0.0, "queries": 0})
+	phase["calls"] += other["calls"]
+	phase["seconds"] += other["seconds"]
+	phase["queries"] += other["queries"]
+
+
+def get_item_seconds(item):
+	return (item["phases"].get("process_sle") or {}).get("seconds") or 0.0
+
+
+def profiled(phase):
+	"""Profile a method of `update_entries_after` taking the SLE as first argument."""
+
+	def decorator(method):
+		@wraps(method)
+		def wrapper(self, sle, *args, **kwargs):
+			if not self.profiler:
+				return method(self, sle, *args, **kwargs)
+
+			with self.profiler.phase(phase, sle.item_code, sle.warehouse):
+				return method(self, sle, *args, **kwargs)
+
+		return wrapper
+
+	return decorator
+
+
+def get_item_rows(profile, limit=None):
+	"""Item-warehouses of a profile, slowest first."""
+	rows = []
+	for item in (profile.get("items") or {}).values():
+		row = frappe._dict(item_code=item["item_code"], warehouse=item["warehouse"], sles=item["sles"])
+		for name, phase in item["phases"].items():
+			row[f"{name}_seconds"] = phase["seconds"]
+			row[f"{name}_queries"] = phase["queries"]
+		rows.append(row)
+
+	rows.sort(key=lambda row: row.get("process_sle_seconds") or 0.0, reverse=True)
+	return rows[:limit] if limit else rows
@@ -5,9 +5,14 @@ import frappe
 from frappe import _, bold
 from frappe.model.naming import make_autoname
 from frappe.query_builder.functions import CombineDatetime, Sum, Timestamp
-from frappe.utils import cint, cstr, flt, get_link_to_form, now, nowtime, today
+from frappe.utils import cint, cstr, flt, get_datetime, get_link_to_form, now, nowtime, today
 from pypika import Order
 
+from erpnext.stock.doctype.batch_warehouse_balance.batch_warehouse_balance import (
+	get_batch_balances,
+	remove_voucher_bundles_from_balance,
+	tracking_bundle_changes,
+)
 from erpnext.stock.deprecated_serial_batch import (
 	DeprecatedBatchNoValuation,
 	DeprecatedSerialNoValuation,
@@ -217,6 +222,7 @@ class SerialBatchBundle:
 
 		frappe.db.set_value(self.child_doctype, self.sle.voucher_detail_no, update_values)
 
+		remove_voucher_bundles_from_balance(self.sle.voucher_type, self.sle.voucher_no)
 		frappe.db.set_value(
 			"Serial and Batch Bundle",
 			{"voucher_no": self.sle.voucher_no, "voucher_type": self.sle.voucher_type},
@@ -564,6 +570,10 @@ class BatchNoValuation(DeprecatedBatchNoValuation):
 		if not self.batchwise_valuation_batches:
 			return []
 
+		ledgers = self.get_batch_no_ledgers_from_balance()
+		if ledgers is not None:
+			return ledgers
+
 		parent = frappe.qb.DocType("Serial and Batch Bundle")
 		child = frappe.qb.DocType("Serial and Batch Entry")
 
@@ -605,6 +615,64 @@ class BatchNoValuation(DeprecatedBatchNoValuation):
 
 		return query.run(as_dict=True)
 
+	def get_batch_no_ledgers_from_balance(self):
+		"""Same as `get_batch_no_ledgers`, read from the Batch Warehouse Balance.
+
+		Returns None when a batch has no balance yet or a bundle counted in the balance is
+		posted after this entry.
+		"""
+		from erpnext.stock.utils import get_combine_datetime
+
+		if not (self.sle.voucher_detail_no and self.sle.posting_date and self.sle.posting_time):
+			return None
+
+		posting_datetime = get_combine_datetime(self.sle.posting_date, self.sle.posting_time)
+		balances = get_batch_balances(self.sle.warehouse, self.batchwise_valuation_batches)
+		if len(balances) < len(self.batchwise_valuation_batches) or any(
+			get_datetime(d.posting_datetime) > posting_datetime for d in balances.values()
+		):
+			return None
+
+		parent = frappe.qb.DocType("Serial and Batch Bundle")
+		child = frappe.qb.DocType("Serial and Batch Entry")
+
+		# Entries of the current voucher detail no are excluded from the valuation
+		current_entries = (
+			frappe.qb.from_(parent)
+			.inner_join(child)
+			.on(parent.name == child.parent)
+			.select(
+				child.batch_no,
+				Sum(child.stock_value_difference).as_("incoming_rate"),
+				Sum(child.qty).as_("qty"),
+			)
+			.where(
+				(parent.voucher_detail_no == self.sle.voucher_detail_no)
+				& (child.batch_no.isin(self.batchwise_valuation_batches))
+				& (parent.warehouse == self.sle.warehouse)
+				& (parent.item_code == self.sle.item_code)
+				& (parent.docstatus == 1)
+				& (parent.is_cancelled == 0)
+				& (parent.type_of_transaction.isin(["Inward", "Outward"]))
+				& (parent.voucher_type != "Pick List")
+			)
+			.groupby(child.batch_no)
+		).run(as_dict=True)
+		current_entries = {d.batch_no: d for d in current_entries}
+
+		ledgers = []
+		for batch_no, balance in balances.items():
+			current = current_entries.get(batch_no) or frappe._dict()
+			ledgers.append(
+				frappe._dict(
+					batch_no=batch_no,
+					incoming_rate=flt(balance.stock_value) - flt(current.incoming_rate),
+					qty=flt(balance.qty) - flt(current.qty),
+				)
+			)
+
+		return ledgers
+
 	def prepare_batches(self):
 		self.batches = self.batch_nos
 		if isinstance(self.batch_nos, dict):
@@ -631,29 +699,30 @@ class BatchNoValuation(DeprecatedBatchNoValuation):
 		return get_batch_nos(self.sle.serial_and_batch_bundle)
 
 	def set_stock_value_difference(self):
-		for batch_no, ledger in self.batch_nos.items():
-			if batch_no in self.non_batchwise_valuation_batches:
-				continue
+		with tracking_bundle_changes(self.sle.serial_and_batch_bundle):
+			for batch_no, ledger in self.batch_nos.items():
+				if batch_no in self.non_batchwise_valuation_batches:
+					continue
 
-			if not self.available_qty[batch_no]:
-				continue
+				if not self.available_qty[batch_no]:
+					continue
 
-			self.batch_avg_rate[batch_no] = (
-				self.stock_value_differece[batch_no] / self.available_qty[batch_no]
-			)
+				self.batch_avg_rate[batch_no] = (
+					self.stock_value_differece[batch_no] / self.available_qty[batch_no]
+				)
 
-			# New Stock Value Difference
-			stock_value_change = self.batch_avg_rate[batch_no] * ledger.qty
-			self.stock_value_change += stock_value_change
+				# New Stock Value Difference
+				stock_value_change = self.batch_avg_rate[batch_no] * ledger.qty
+				self.stock_value_change += stock_value_change
 
-			frappe.db.set_value(
-				"Serial and Batch Entry",
-				ledger.name,
-				{
-					"stock_value_difference": stock_value_change,
-					"incoming_rate": self.batch_avg_rate[batch_no],
-				},
-			)
+				frappe.db.set_value(
+					"Serial and Batch Entry",
+					ledger.name,
+					{
+						"stock_value_difference": stock_value_change,
+						"incoming_rate": self.batch_avg_rate[batch_no],
+					},
+				)
 
 	def calculate_valuation_rate(self):
 		if not hasattr(self, "wh_data"):
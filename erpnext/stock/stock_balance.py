@@ -3,10 +3,20 @@
 
 
 import frappe
-from frappe.utils import cstr, flt, now, nowdate, nowtime
+from frappe.utils import cint, create_batch, cstr, flt, now, nowdate, nowtime
 
 from erpnext.controllers.stock_controller import create_repost_item_valuation_entry
 
+# Bin columns recomputed from transactions by `reconcile_bins`
+BIN_QTY_FIELDS = ("actual_qty", "reserved_qty", "indented_qty", "ordered_qty", "planned_qty")
+
+# Bin columns maintained elsewhere that still count in the projected qty
+BIN_RESERVED_FIELDS = (
+	"reserved_qty_for_production",
+	"reserved_qty_for_sub_contract",
+	"reserved_qty_for_production_plan",
+)
+
 
 def repost(only_actual=False, allow_negative_stock=False, allow_zero_rate=False, only_bin=False):
 	"""
@@ -20,15 +30,13 @@ def repost(only_actual=False, allow_negative_stock=False, allow_zero_rate=False,
 		)
 		frappe.db.set_single_value("Stock Settings", "allow_negative_stock", 1)
 
-	item_warehouses = frappe.db.sql(
-		"""
-		select distinct item_code, warehouse
-		from
-			(select item_code, warehouse from tabBin
-			union
-			select item_code, warehouse from `tabStock Ledger Entry`) a
-	"""
-	)
+	if only_bin and not only_actual:
+		reconcile_bins()
+		frappe.db.commit()
+		item_warehouses = []
+	else:
+		item_warehouses = get_item_warehouses()
+
 	for d in item_warehouses:
 		try:
 			repost_stock(d[0], d[1], allow_zero_rate, only_actual, only_bin, allow_negative_stock)
@@ -43,6 +51,18 @@ def repost(only_actual=False, allow_negative_stock=False, allow_zero_rate=False,
 	frappe.db.auto_commit_on_many_writes = 0
 
 
+def get_item_warehouses():
+	return frappe.db.sql(
+		"""
+		select distinct item_code, warehouse
+		from
+			(select item_code, warehouse from tabBin
+			union
+			select item_code, warehouse from `tabStock Ledger Entry`) a
+	"""
+	)
+
+
 def repost_stock(
 	item_code,
 	warehouse,
@@ -230,6 +250,246 @@ def update_bin_qty(item_code, warehouse, qty_dict=None):
 		bin.clear_cache()
 
 
+def reconcile_bins(warehouses=None, dry_run=False, parallel_jobs=1):
+	"""Recompute the quantities of all Bins from transactions, warehouse by warehouse.
+
+	Every component of `BIN_QTY_FIELDS` is computed for all item-warehouses at once with
+	grouped queries, instead of one query per component and item-warehouse as in
+	`repost_stock`. Only the Bins that differ are written.
+
+	:param warehouses: limit the reconciliation to these warehouses, all leaf warehouses by default
+	:param dry_run: only report the drift, nothing is written
+	:param parallel_jobs: spread the warehouses over this many background jobs
+
+	Dry runs always run in the current process so that the drift can be returned. Only
+	stock items are reconciled, as in the transactions that maintain the Bins.
+
+	Returns the drift as a list of dicts with the item code, warehouse, Bin name and
+	the `{field: (bin value, expected value)}` changes, or the enqueued jobs when run
+	in parallel.
+	"""
+	if not warehouses:
+		warehouses = frappe.get_all("Warehouse", filters={"is_group": 0}, pluck="name")
+
+	parallel_jobs = cint(parallel_jobs)
+	if parallel_jobs > 1 and not dry_run:
+		chunk_size = -(-len(warehouses) // parallel_jobs)
+		return [
+			frappe.enqueue(
+				reconcile_warehouse_bins,
+				queue="long",
+				timeout=6 * 60 * 60,
+				warehouses=chunk,
+			)
+			for chunk in create_batch(warehouses, chunk_size)
+		]
+
+	drift = []
+	for warehouse in warehouses:
+		drift.extend(reconcile_warehouse_bins([warehouse], dry_run=dry_run))
+
+	return drift
+
+
+def reconcile_warehouse_bins(warehouses, dry_run=False):
+	expected = get_expected_bin_qty(warehouses)
+	bins = {
+		(d.item_code, d.warehouse): d
+		for d in frappe.get_all(
+			"Bin",
+			filters={"warehouse": ("in", warehouses)},
+			fields=["name", "item_code", "warehouse", *BIN_QTY_FIELDS, *BIN_RESERVED_FIELDS],
+		)
+	}
+
+	precision = frappe.get_precision("Bin", "actual_qty")
+	drift, updates = [], {}
+	for key in bins.keys() | expected.keys():
+		bin = bins.get(key) or frappe._dict()
+		qty = expected.get(key, {})
+
+		changes = {}
+		for field in BIN_QTY_FIELDS:
+			value = flt(qty.get(field), precision)
+			if flt(bin.get(field), precision) != value:
+				changes[field] = (flt(bin.get(field)), value)
+
+		if not changes:
+			continue
+
+		drift.append(
+			frappe._dict(item_code=key[0], warehouse=key[1], bin=bin.get("name"), changes=changes)
+		)
+		if dry_run:
+			continue
+
+		if not bin:
+			from erpnext.stock.utils import get_or_make_bin
+
+			bin.name = get_or_make_bin(*key)
+
+		bin.update({field: value for field, (_, value) in changes.items()})
+		updates[bin.name] = {field: value for field, (_, value) in changes.items()}
+		updates[bin.name]["projected_qty"] = get_projected_qty(bin)
+
+	if updates:
+		frappe.db.bulk_update("Bin", updates)
+		for name in updates:
+			frappe.clear_document_cache("Bin", name)
+
+	return drift
+
+
+def get_projected_qty(bin):
+	"""Same as `Bin.set_projected_qty` for a Bin row."""
+	return (
+		flt(bin.actual_qty)
+		+ flt(bin.ordered_qty)
+		+ flt(bin.indented_qty)
+		+ flt(bin.planned_qty)
+		- flt(bin.reserved_qty)
+		- sum(flt(bin.get(field)) for field in BIN_RESERVED_FIELDS)
+	)
+
+
+def get_expected_bin_qty(warehouses):
+	"""Quantities of `BIN_QTY_FIELDS` as per transactions, {(item_code, warehouse): {field: qty}}."""
+	expected = {}
+	for field, rows in (
+		("actual_qty", get_actual_qty_by_item_warehouse(warehouses)),
+		("reserved_qty", get_reserved_qty_by_item_warehouse(warehouses)),
+		("indented_qty", get_indented_qty_by_item_warehouse(warehouses)),
+		("ordered_qty", get_ordered_qty_by_item_warehouse(warehouses)),
+		("planned_qty", get_planned_qty_by_item_warehouse(warehouses)),
+	):
+		for item_code, warehouse, qty in rows:
+			expected.setdefault((item_code, warehouse), {})[field] = flt(qty)
+
+	return expected
+
+
+def get_actual_qty_by_item_warehouse(warehouses):
+	"""Grouped `get_balance_qty_from_sle`, from the last entry of every item-warehouse."""
+	return frappe.db.sql(
+		"""
+		select item_code, warehouse, qty_after_transaction
+		from (
+			select item_code, warehouse, qty_after_transaction,
+				row_number() over (
+					partition by item_code, warehouse order by posting_datetime desc, creation desc
+				) as row_no
+			from `tabStock Ledger Entry`
+			where warehouse in %(warehouses)s and is_cancelled = 0
+		) sle
+		where row_no = 1
+	""",
+		{"warehouses": tuple(warehouses)},
+	)
+
+
+def get_reserved_qty_by_item_warehouse(warehouses):
+	"""Grouped `get_reserved_qty`."""
+	dont_reserve_on_return = cint(
+		frappe.get_cached_value(
+			"Selling Settings", "Selling Settings", "dont_reserve_sales_order_qty_on_sales_return"
+		)
+	)
+	return frappe.db.sql(
+		f"""
+		select
+			item_code, warehouse,
+			sum(dnpi_qty * ((so_item_qty - so_item_delivered_qty - if({dont_reserve_on_return}, so_item_returned_qty, 0)) / so_item_qty))
+		from
+			(
+				(select
+					dnpi.item_code, dnpi.warehouse, dnpi.qty as dnpi_qty,
+					so_item.qty as so_item_qty,
+					so_item.delivered_qty as so_item_delivered_qty,
+					so_item.returned_qty as so_item_returned_qty,
+					dnpi.parent, dnpi.name
+				from `tabPacked Item` dnpi
+				inner join `tabSales Order Item` so_item
+					on so_item.name = dnpi.parent_detail_docname and so_item.delivered_by_supplier = 0
+				inner join `tabItem` item on item.name = dnpi.item_code and item.is_stock_item = 1
+				where dnpi.warehouse in %(warehouses)s
+				and dnpi.parenttype = 'Sales Order'
+				and dnpi.item_code != dnpi.parent_item
+				and exists (select * from `tabSales Order` so
+					where so.name = dnpi.parent and so.docstatus = 1 and so.status not in ('On Hold', 'Closed')))
+			union
+				(select so_item.item_code, so_item.warehouse, so_item.stock_qty as dnpi_qty,
+					so_item.qty as so_item_qty,
+					so_item.delivered_qty as so_item_delivered_qty,
+					so_item.returned_qty as so_item_returned_qty,
+					so_item.parent, so_item.name
+				from `tabSales Order Item` so_item
+				inner join `tabItem` item on item.name = so_item.item_code and item.is_stock_item = 1
+				where so_item.warehouse in %(warehouses)s
+				and (so_item.delivered_by_supplier is null or so_item.delivered_by_supplier = 0)
+				and exists(select * from `tabSales Order` so
+					where so.name = so_item.parent and so.docstatus = 1
+					and so.status not in ('On Hold', 'Closed')))
+			) tab
+		where
+			so_item_qty >= so_item_delivered_qty
+		group by item_code, warehouse
+	""",
+		{"warehouses": tuple(warehouses)},
+	)
+
+
+def get_indented_qty_by_item_warehouse(warehouses):
+	"""Grouped `get_indented_qty`, issues count against the requested qty."""
+	return frappe.db.sql(
+		"""
+		select mr_item.item_code, mr_item.warehouse,
+			sum(
+				case when mr.material_request_type = 'Material Issue'
+					then mr_item.ordered_qty - mr_item.stock_qty
+					else mr_item.stock_qty - mr_item.ordered_qty
+				end
+			)
+		from `tabMaterial Request Item` mr_item, `tabMaterial Request` mr, `tabItem` item
+		where mr_item.warehouse in %(warehouses)s
+			and item.name = mr_item.item_code and item.is_stock_item = 1
+			and mr.material_request_type in ('Purchase', 'Manufacture', 'Customer Provided', 'Material Transfer', 'Material Issue')
+			and mr_item.stock_qty > mr_item.ordered_qty and mr_item.parent=mr.name
+			and mr.status!='Stopped' and mr.docstatus=1
+		group by mr_item.item_code, mr_item.warehouse
+	""",
+		{"warehouses": tuple(warehouses)},
+	)
+
+
+def get_ordered_qty_by_item_warehouse(warehouses):
+	"""Grouped `get_ordered_qty`."""
+	return frappe.db.sql(
+		"""
+		select po_item.item_code, po_item.warehouse,
+			sum((po_item.qty - po_item.received_qty)*po_item.conversion_factor)
+		from `tabPurchase Order Item` po_item, `tabPurchase Order` po, `tabItem` item
+		where po_item.warehouse in %(warehouses)s
+		and item.name = po_item.item_code and item.is_stock_item = 1
+		and po_item.qty > po_item.received_qty and po_item.parent=po.name
+		and po.status not in ('Closed', 'Delivered') and po.docstatus=1
+		and po_item.delivered_by_supplier = 0
+		group by po_item.item_code, po_item.warehouse""",
+		{"warehouses": tuple(warehouses)},
+	)
+
+
+def get_planned_qty_by_item_warehouse(warehouses):
+	"""Grouped `get_planned_qty`."""
+	return frappe.db.sql(
+		"""
+		select production_item, fg_warehouse, sum(qty - produced_qty) from `tabWork Order`
+		where fg_warehouse in %(warehouses)s and status not in ('Stopped', 'Completed', 'Closed')
+		and docstatus=1 and qty > produced_qty
+		group by production_item, fg_warehouse""",
+		{"warehouses": tuple(warehouses)},
+	)
+
+
 def set_stock_balance_as_per_serial_no(
 	item_code=None, posting_date=None, posting_time=None, fiscal_year=None
 ):
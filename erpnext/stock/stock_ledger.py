@@ -32,6 +32,11 @@ from erpnext.stock.doctype.stock_reservation_entry.stock_reservation_entry impor
 	get_sre_reserved_batch_nos_details,
 	get_sre_reserved_serial_nos_details,
 )
+from erpnext.stock.doctype.stock_valuation_checkpoint.stock_valuation_checkpoint import (
+	invalidate_valuation_checkpoints,
+	invalidate_voucher_checkpoints,
+)
+from erpnext.stock.repost_profiler import profiled
 from erpnext.stock.utils import (
 	get_combine_datetime,
 	get_incoming_outgoing_rate_for_cancel,
@@ -40,7 +45,12 @@ from erpnext.stock.utils import (
 	get_stock_balance,
 	get_valuation_method,
 )
-from erpnext.stock.valuation import FIFOValuation, LIFOValuation, round_off_if_near_zero
+from erpnext.stock.valuation import (
+	FIFOValuation,
+	LIFOValuation,
+	get_moving_average_chain,
+	round_off_if_near_zero,
+)
 
 
 class NegativeStockError(frappe.ValidationError):
@@ -51,6 +61,65 @@ class SerialNoExistsInFutureTransaction(frappe.ValidationError):
 	pass
 
 
+# number of reposted SLEs written back per multi-row update
+REPOST_WRITE_BATCH_SIZE = 500
+
+
+class SLEWriteBuffer:
+	"""Deferred write-back of the valuation columns of reposted SLEs.
+
+	Rows are flushed with one multi-row update per `batch_size` entries. Entries
+	whose processing reads the ledger back (rate recalculation, serial / batch
+	valuation, vouchers that recompute rates from other SLEs) are not deferred;
+	the buffer is flushed before they are processed so every read sees the rows
+	written so far.
+	"""
+
+	fields = (
+		"qty_after_transaction",
+		"valuation_rate",
+		"stock_value",
+		"stock_value_difference",
+		"stock_queue",
+	)
+
+	def __init__(self, batch_size=REPOST_WRITE_BATCH_SIZE):
+		self.batch_size = batch_size
+		self.pending = {}
+
+	def __len__(self):
+		return len(self.pending)
+
+	@staticmethod
+	def can_defer(sle):
+		if sle.recalculate_rate or sle.serial_no or sle.batch_no or sle.serial_and_batch_bundle:
+			return False
+
+		if sle.voucher_type == "Stock Reconciliation":
+			return False
+
+		# outgoing rows of these vouchers recompute rates from other ledger entries
+		return not (
+			flt(sle.actual_qty) < 0
+			and sle.voucher_type
+			in ("Stock Entry", "Purchase Receipt", "Purchase Invoice", "Subcontracting Receipt")
+		)
+
+	def add(self, sle):
+		self.pending[sle.name] = {field: sle.get(field) for field in self.fields}
+		if len(self.pending) >= self.batch_size:
+			self.flush()
+
+	def flush(self):
+		if not self.pending:
+			return
+
+		frappe.db.bulk_update(
+			"Stock Ledger Entry", self.pending, chunk_size=self.batch_size, update_modified=False
+		)
+		self.pending = {}
+
+
 def make_sl_entries(sl_entries, allow_negative_stock=False, via_landed_cost_voucher=False):
 	"""Create SL entries from SL entry dicts
 
@@ -207,6 +276,7 @@ def validate_cancellation(args):
 
 
 def set_as_cancel(voucher_type, voucher_no):
+	invalidate_voucher_checkpoints(voucher_type, voucher_no)
 	frappe.db.sql(
 		"""update `tabStock Ledger Entry` set is_cancelled=1,
 		modified=%s, modified_by=%s
@@ -222,6 +292,7 @@ def make_entry(args, allow_negative_stock=False, via_landed_cost_voucher=False):
 	sle.allow_negative_stock = allow_negative_stock
 	sle.via_landed_cost_voucher = via_landed_cost_voucher
 	sle.submit()
+	invalidate_valuation_checkpoints(sle.item_code, sle.warehouse, sle.posting_datetime)
 
 	# Added to handle the case when the stock ledger entry is created from the repostig
 	if args.get("creation_time") and args.get("voucher_type") == "Stock Reconciliation":
@@ -237,6 +308,7 @@ def repost_future_sle(
 	allow_negative_stock=None,
 	via_landed_cost_voucher=False,
 	doc=None,
+	profiler=None,
 ):
 	if not args:
 		args = []  # set args to empty list if None to avoid enumerate error
@@ -269,6 +341,7 @@ def repost_future_sle(
 			},
 			allow_negative_stock=allow_negative_stock,
 			via_landed_cost_voucher=via_landed_cost_voucher,
+			profiler=profiler,
 		)
 		affected_transactions.update(obj.affected_transactions)
 
@@ -291,7 +364,7 @@ def repost_future_sle(
 
 		if doc:
 			update_args_in_repost_item_valuation(
-				doc, i, args, distinct_item_warehouses, affected_transactions
+				doc, i, args, distinct_item_warehouses, affected_transactions, profiler
 			)
 
 
@@ -325,8 +398,14 @@ def validate_item_warehouse(args):
 
 
 def update_args_in_repost_item_valuation(
-	doc, index, args, distinct_item_warehouses, affected_transactions
+	doc, index, args, distinct_item_warehouses, affected_transactions, profiler=None
 ):
+	values = {}
+	if profiler:
+		profiler.set_progress(index, len(args))
+		if profiler.should_save() or index == len(args):
+			values["repost_profile"] = profiler.as_json()
+
 	if not doc.items_to_be_repost:
 		file_name = ""
 		if doc.reposting_data_file:
@@ -348,6 +427,7 @@ def update_args_in_repost_item_valuation(
 				"current_index": index,
 				"total_reposting_count": len(args),
 				"reposting_data_file": doc.reposting_data_file,
+				**values,
 			}
 		)
 
@@ -360,6 +440,7 @@ def update_args_in_repost_item_valuation(
 				),
 				"current_index": index,
 				"affected_transactions": frappe.as_json(affected_transactions),
+				**values,
 			}
 		)
 
@@ -373,6 +454,7 @@ def update_args_in_repost_item_valuation(
 			"items_to_be_repost": json.dumps(args, default=str),
 			"current_index": index,
 			"total_reposting_count": len(args),
+			"estimated_remaining": profiler.get_estimated_remaining() if profiler else None,
 		},
 		doctype=doc.doctype,
 		docname=doc.name,
@@ -512,6 +594,11 @@ class update_entries_after(object):
 	        }
 	"""
 
+	# set to 0 to write every SLE and the Bin right away
+	write_batch_size = REPOST_WRITE_BATCH_SIZE
+	# set to False to process every moving average entry with `process_sle`
+	columnar_moving_average = True
+
 	def __init__(
 		self,
 		args,
@@ -519,8 +606,10 @@ class update_entries_after(object):
 		allow_negative_stock=None,
 		via_landed_cost_voucher=False,
 		verbose=1,
+		profiler=None,
 	):
 		self.exceptions = {}
+		self.profiler = profiler
 		self.verbose = verbose
 		self.allow_zero_rate = allow_zero_rate
 		self.via_landed_cost_voucher = via_landed_cost_voucher
@@ -543,6 +632,10 @@ class update_entries_after(object):
 		self.reserved_stock = flt(self.args.reserved_stock)
 
 		self.data = frappe._dict()
+		self.sle_buffer = None
+		if self.write_batch_size and not self.args.get("sle_id"):
+			self.sle_buffer = SLEWriteBuffer(self.write_batch_size)
+
 		self.initialize_previous_data(self.args)
 		self.build()
 
@@ -591,23 +684,52 @@ class update_entries_after(object):
 	def build(self):
 		from erpnext.controllers.stock_controller import future_sle_exists
 
+		invalidate_valuation_checkpoints(
+			self.item_code,
+			self.args.warehouse,
+			get_combine_datetime(self.args.posting_date, self.args.posting_time),
+		)
+
 		if self.args.get("sle_id"):
 			self.process_sle_against_current_timestamp()
 			if not future_sle_exists(self.args):
 				self.update_bin()
 		else:
 			entries_to_fix = self.get_future_entries_to_fix()
+			last_sle_by_warehouse = {}
+			reposted_warehouses = {self.args.warehouse}
 
 			i = 0
 			while i < len(entries_to_fix):
-				sle = entries_to_fix[i]
-				i += 1
+				processed = 0
+				if self.valuation_method == "Moving Average" and self.columnar_moving_average:
+					processed = self.process_moving_average_chain(entries_to_fix, i)
+
+				if not processed:
+					self.process_sle(entries_to_fix[i])
+					processed = 1
+
+				for sle in entries_to_fix[i : i + processed]:
+					if self.sle_buffer is None:
+						self.update_bin_data(sle)
+					else:
+						last_sle_by_warehouse[sle.warehouse] = sle
+
+					if sle.dependant_sle_voucher_detail_no:
+						entries_to_fix = self.get_dependent_entries_to_fix(entries_to_fix, sle)
 
-				self.process_sle(sle)
-				self.update_bin_data(sle)
+					if sle.warehouse not in reposted_warehouses:
+						# dependent entries of other warehouses are reposted here as well
+						reposted_warehouses.add(sle.warehouse)
+						invalidate_valuation_checkpoints(sle.item_code, sle.warehouse, sle.posting_datetime)
 
-				if sle.dependant_sle_voucher_detail_no:
-					entries_to_fix = self.get_dependent_entries_to_fix(entries_to_fix, sle)
+				i += processed
+
+			if self.sle_buffer is not None:
+				self.sle_buffer.flush()
+				# the Bin only needs the state after the last entry of each warehouse
+				for sle in last_sle_by_warehouse.values():
+					self.update_bin_data(sle)
 
 		if self.exceptions:
 			self.raise_exceptions()
@@ -706,11 +828,17 @@ class update_entries_after(object):
 
 		return self.distinct_item_warehouses[key].dependent_voucher_detail_nos
 
+	@profiled("process_sle")
 	def process_sle(self, sle):
 		# previous sle data for this warehouse
 		self.wh_data = self.data[sle.warehouse]
 		self.affected_transactions.add((sle.voucher_type, sle.voucher_no))
 
+		defer_write = self.sle_buffer is not None and self.sle_buffer.can_defer(sle)
+		if self.sle_buffer is not None and not defer_write:
+			# processing this entry may read back entries that are still buffered
+			self.sle_buffer.flush()
+
 		if (sle.serial_no and not self.via_landed_cost_voucher) or not cint(self.allow_negative_stock):
 			# validate negative stock for serialized items, fifo valuation
 			# or when negative stock is not allowed for moving average
@@ -785,6 +913,9 @@ class update_entries_after(object):
 				else:
 					self.update_queue_values(sle)
 
+		self.save_processed_sle(sle, defer_write)
+
+	def save_processed_sle(self, sle, defer_write):
 		# rounding as per precision
 		self.wh_data.stock_value = flt(self.wh_data.stock_value, self.currency_precision)
 		if not self.wh_data.qty_after_transaction:
@@ -803,13 +934,81 @@ class update_entries_after(object):
 			sle.stock_value_difference = stock_value_difference
 
 		sle.doctype = "Stock Ledger Entry"
-		frappe.get_doc(sle).db_update()
+		if defer_write:
+			self.sle_buffer.add(sle)
+		else:
+			frappe.get_doc(sle).db_update()
 
 		if not self.args.get("sle_id") or (
 			sle.serial_and_batch_bundle and sle.auto_created_serial_and_batch_bundle
 		):
 			self.update_outgoing_rate_on_transaction(sle)
 
+	def process_moving_average_chain(self, entries, start):
+		"""Process the plain entries of a moving average item from `start` in one columnar pass.
+
+		Returns the number of entries processed, 0 if the entry at `start` needs `process_sle`.
+		"""
+		warehouse = entries[start].warehouse
+		end = start
+		while end < len(entries) and self.is_plain_moving_average_entry(entries[end], warehouse):
+			end += 1
+
+		if end - start < 2:
+			return 0
+
+		chain = entries[start:end]
+
+		wh_data = self.data[warehouse]
+		qtys, rates = get_moving_average_chain(
+			flt(wh_data.qty_after_transaction),
+			flt(wh_data.valuation_rate),
+			[flt(sle.actual_qty) for sle in chain],
+			[flt(sle.incoming_rate) for sle in chain],
+			[flt(sle.outgoing_rate) for sle in chain],
+		)
+
+		processed = 0
+		for sle, qty, rate in zip(chain, qtys, rates):
+			if not cint(self.allow_negative_stock):
+				# same check as `validate_negative_stock`, failing entries are left to `process_sle`
+				diff = flt(qty - flt(self.reserved_stock), self.flt_precision)
+				if diff < 0 and abs(diff) > 0.0001:
+					break
+
+			self.process_moving_average_sle(sle, qty, rate)
+			processed += 1
+
+		return processed
+
+	def is_plain_moving_average_entry(self, sle, warehouse):
+		"""Entries valued by the moving average alone, without any lookup while processing."""
+		return (
+			sle.warehouse == warehouse
+			and not sle.recalculate_rate
+			and not (sle.serial_no or sle.batch_no or sle.serial_and_batch_bundle)
+			and not sle.dependant_sle_voucher_detail_no
+			and sle.voucher_type != "Stock Reconciliation"
+			# inter company transfers read their outgoing rate from the transaction
+			and not (
+				sle.voucher_type in ("Purchase Receipt", "Purchase Invoice") and flt(sle.actual_qty) < 0
+			)
+		)
+
+	@profiled("process_sle")
+	def process_moving_average_sle(self, sle, qty, rate):
+		self.wh_data = self.data[sle.warehouse]
+		self.affected_transactions.add((sle.voucher_type, sle.voucher_no))
+
+		defer_write = self.sle_buffer is not None and self.sle_buffer.can_defer(sle)
+		if self.sle_buffer is not None and not defer_write:
+			self.sle_buffer.flush()
+
+		self.wh_data.qty_after_transaction = qty
+		self.wh_data.valuation_rate = rate
+		self.wh_data.stock_value = flt(qty) * flt(rate)
+		self.save_processed_sle(sle, defer_write)
+
 	def get_serialized_values(self, sle):
 		incoming_rate = flt(sle.incoming_rate)
 		actual_qty = flt(sle.actual_qty)
@@ -936,6 +1135,7 @@ class update_entries_after(object):
 			else:
 				sle.outgoing_rate = rate
 
+	@profiled("get_incoming_outgoing_rate_from_transaction")
 	def get_incoming_outgoing_rate_from_transaction(self, sle):
 		rate = 0
 		# Material Transfer, Repack, Manufacturing
@@ -1036,6 +1236,7 @@ class update_entries_after(object):
 
 		return rate
 
+	@profiled("update_outgoing_rate_on_transaction")
 	def update_outgoing_rate_on_transaction(self, sle):
 		"""
 		Update outgoing rate in Stock Entry, Delivery Note, Sales Invoice and Sales Return
@@ -1167,21 +1368,18 @@ class update_entries_after(object):
 		for serial_no in invalid_serial_nos:
 			incoming_rate = frappe.db.sql(
 				"""
-				select incoming_rate
-				from `tabStock Ledger Entry`
+				select sle.incoming_rate
+				from `tabStock Ledger Entry Serial No` sle_serial_no
+				inner join `tabStock Ledger Entry` sle on sle.name = sle_serial_no.stock_ledger_entry
 				where
-					company = %s
-					and actual_qty > 0
-					and is_cancelled = 0
-					and (serial_no = %s
-						or serial_no like %s
-						or serial_no like %s
-						or serial_no like %s
-					)
-				order by posting_date desc
+					sle_serial_no.serial_no = %s
+					and sle.company = %s
+					and sle.actual_qty > 0
+					and sle.is_cancelled = 0
+				order by sle.posting_date desc
 				limit 1
 			""",
-				(sle.company, serial_no, serial_no + "\n%", "%\n" + serial_no, "%\n" + serial_no + "\n%"),
+				(serial_no, sle.company),
 			)
 
 			incoming_values += flt(incoming_rate[0][0]) if incoming_rate else 0
@@ -1496,23 +1694,10 @@ def get_stock_ledger_entries(
 		conditions += " and " + previous_sle.get("warehouse_condition")
 
 	if check_serial_no and previous_sle.get("serial_no"):
-		# conditions += " and serial_no like {}".format(frappe.db.escape('%{0}%'.format(previous_sle.get("serial_no"))))
-		serial_no = previous_sle.get("serial_no")
-		conditions += (
-			""" and
-			(
-				serial_no = {0}
-				or serial_no like {1}
-				or serial_no like {2}
-				or serial_no like {3}
-			)
-		"""
-		).format(
-			frappe.db.escape(serial_no),
-			frappe.db.escape("{}\n%".format(serial_no)),
-			frappe.db.escape("%\n{}".format(serial_no)),
-			frappe.db.escape("%\n{}\n%".format(serial_no)),
-		)
+		# indexed lookup of the entries of the serial no instead of `serial_no like` scans
+		conditions += """ and name in (
+			select stock_ledger_entry from `tabStock Ledger Entry Serial No` where serial_no = %(serial_no)s
+		)"""
 
 	# if not previous_sle.get("posting_date"):
 	# 	previous_sle["posting_datetime"] = "1900-01-01 00:00:00"
@@ -1720,11 +1905,21 @@ def get_valuation_rate(
 
 def update_qty_in_future_sle(args, allow_negative_stock=False):
 	"""Recalculate Qty after Transaction in future SLEs based on current SLE."""
-	datetime_limit_condition = ""
-	qty_shift = args.actual_qty
+	from erpnext.controllers.stock_controller import future_sle_exists
 
 	args["posting_datetime"] = get_combine_datetime(args["posting_date"], args["posting_time"])
 
+	# nothing to shift when no other voucher has entries at or after this one
+	if future_sle_exists(args):
+		shift_qty_in_future_sle(args)
+
+	validate_negative_qty_in_future_sle(args, allow_negative_stock)
+
+
+def shift_qty_in_future_sle(args):
+	datetime_limit_condition = ""
+	qty_shift = args.actual_qty
+
 	# find difference/shift in qty caused by stock reconciliation
 	if args.voucher_type == "Stock Reconciliation":
 		qty_shift = get_stock_reco_qty_shift(args)
@@ -1752,8 +1947,6 @@ def update_qty_in_future_sle(args, allow_negative_stock=False):
 		args,
 	)
 
-	validate_negative_qty_in_future_sle(args, allow_negative_stock)
-
 
 def get_stock_reco_qty_shift(args):
 	stock_reco_qty_shift = 0
@@ -1838,7 +2031,10 @@ def validate_negative_qty_in_future_sle(args, allow_negative_stock=False):
 	if args.actual_qty >= 0 and args.voucher_type != "Stock Reconciliation":
 		return
 
-	neg_sle = get_future_sle_with_negative_qty(args)
+	from erpnext.controllers.stock_controller import future_sle_exists
+
+	# without entries of other vouchers at or after this one no future qty can go negative
+	neg_sle = get_future_sle_with_negative_qty(args) if future_sle_exists(args) else []
 
 	if is_negative_with_precision(neg_sle):
 		message = _(
@@ -0,0 +1,79 @@
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext.buying.doctype.purchase_order.test_purchase_order import create_purchase_order
+from erpnext.selling.doctype.sales_order.test_sales_order import make_sales_order
+from erpnext.stock.doctype.material_request.test_material_request import make_material_request
+from erpnext.stock.doctype.stock_entry.stock_entry_utils import make_stock_entry
+from erpnext.stock.stock_balance import (
+	BIN_QTY_FIELDS,
+	get_indented_qty,
+	get_ordered_qty,
+	get_reserved_qty,
+	reconcile_warehouse_bins,
+)
+from erpnext.stock.tests.test_utils import StockTestMixin
+
+
+class TestBinReconciliation(FrappeTestCase, StockTestMixin):
+	WAREHOUSE = "_Test Warehouse - _TC"
+
+	def get_bin(self, item_code):
+		return frappe.db.get_value(
+			"Bin",
+			{"item_code": item_code, "warehouse": self.WAREHOUSE},
+			[*BIN_QTY_FIELDS, "projected_qty"],
+			as_dict=True,
+		)
+
+	def test_reconcile_drifted_bin(self):
+		item_code = self.make_item(properties={"stock_uom": "_Test UOM"}).name
+		make_stock_entry(item_code=item_code, to_warehouse=self.WAREHOUSE, qty=10, rate=100)
+		make_stock_entry(item_code=item_code, from_warehouse=self.WAREHOUSE, qty=3)
+		make_material_request(item_code=item_code, qty=7, warehouse=self.WAREHOUSE)
+		make_material_request(
+			item_code=item_code, qty=2, warehouse=self.WAREHOUSE, material_request_type="Material Issue"
+		)
+		create_purchase_order(item_code=item_code, qty=4, warehouse=self.WAREHOUSE)
+
+		expected = self.get_bin(item_code)
+		self.assertEqual(expected.actual_qty, 7)
+		self.assertEqual(expected.indented_qty, get_indented_qty(item_code, self.WAREHOUSE))
+		self.assertEqual(expected.ordered_qty, get_ordered_qty(item_code, self.WAREHOUSE))
+		self.assertEqual(expected.reserved_qty, get_reserved_qty(item_code, self.WAREHOUSE))
+
+		# in sync, nothing to report
+		drift = [d for d in reconcile_warehouse_bins([self.WAREHOUSE]) if d.item_code == item_code]
+		self.assertFalse(drift)
+
+		frappe.db.set_value(
+			"Bin",
+			{"item_code": item_code, "warehouse": self.WAREHOUSE},
+			{"actual_qty": 1, "indented_qty": 0, "ordered_qty": 50, "projected_qty": 51},
+		)
+
+		drift = [
+			d for d in reconcile_warehouse_bins([self.WAREHOUSE], dry_run=True) if d.item_code == item_code
+		]
+		self.assertEqual(len(drift), 1)
+		self.assertEqual(
+			drift[0].changes,
+			{
+				"actual_qty": (1, 7),
+				"indented_qty": (0, expected.indented_qty),
+				"ordered_qty": (50, expected.ordered_qty),
+			},
+		)
+		self.assertEqual(self.get_bin(item_code).actual_qty, 1)
+
+		reconcile_warehouse_bins([self.WAREHOUSE])
+		self.assertEqual(self.get_bin(item_code), expected)
+
+	def test_non_stock_items_are_skipped(self):
+		item_code = self.make_item(properties={"is_stock_item": 0}).name
+		make_sales_order(item_code=item_code, warehouse=self.WAREHOUSE, qty=5)
+		create_purchase_order(item_code=item_code, qty=4, warehouse=self.WAREHOUSE)
+
+		drift = [d for d in reconcile_warehouse_bins([self.WAREHOUSE]) if d.item_code == item_code]
+		self.assertFalse(drift)
+		self.assertFalse(frappe.db.exists("Bin", {"item_code": item_code, "warehouse": self.WAREHOUSE}))
@@ -0,0 +1,154 @@
+import os
+import time
+import unittest
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, flt, today
+
+from erpnext.stock.doctype.stock_entry.stock_entry_utils import make_stock_entry
+from erpnext.stock.stock_ledger import update_entries_after
+from erpnext.stock.tests.test_utils import StockTestMixin
+
+SLE_FIELDS = (
+	"name",
+	"actual_qty",
+	"qty_after_transaction",
+	"valuation_rate",
+	"stock_value",
+	"stock_value_difference",
+	"stock_queue",
+)
+
+
+class TestRepostWriteBuffer(FrappeTestCase, StockTestMixin):
+	WAREHOUSE = "_Test Warehouse - _TC"
+
+	def make_ledger(self, item_code, entries=60):
+		start = add_days(today(), -entries - 10)
+		for i in range(entries):
+			kwargs = {"item_code": item_code, "qty": 5, "posting_date": add_days(start, i)}
+			if i % 4 == 3:
+				make_stock_entry(from_warehouse=self.WAREHOUSE, **kwargs)
+			else:
+				make_stock_entry(to_warehouse=self.WAREHOUSE, rate=10 + i, **kwargs)
+
+		return start
+
+	def get_ledger(self, item_code):
+		return frappe.get_all(
+			"Stock Ledger Entry",
+			filters={"item_code": item_code, "warehouse": self.WAREHOUSE, "is_cancelled": 0},
+			fields=SLE_FIELDS,
+			order_by="posting_datetime, creation",
+		)
+
+	def get_bin(self, item_code):
+		return frappe.db.get_value(
+			"Bin",
+			{"item_code": item_code, "warehouse": self.WAREHOUSE},
+			["actual_qty", "stock_value", "valuation_rate"],
+			as_dict=True,
+		)
+
+	def clear_valuation(self, item_code, start):
+		"""Zero the values a repost from `start` recomputes, so a repost that writes nothing fails."""
+		frappe.db.sql(
+			"""
+			update `tabStock Ledger Entry`
+			set qty_after_transaction = 0, valuation_rate = 0, stock_value = 0,
+				stock_value_difference = 0, stock_queue = '[]'
+			where item_code = %s and warehouse = %s and posting_date >= %s
+			""",
+			(item_code, self.WAREHOUSE, start),
+		)
+		frappe.db.set_value(
+			"Bin",
+			{"item_code": item_code, "warehouse": self.WAREHOUSE},
+			{"actual_qty": 0, "stock_value": 0, "valuation_rate": 0},
+		)
+
+	def repost(self, item_code, start, write_batch_size):
+		"""Repost the ledger of the item from `start`, returning the number of sql statements."""
+		args = {
+			"item_code": item_code,
+			"warehouse": self.WAREHOUSE,
+			"posting_date": start,
+			"posting_time": "00:00",
+		}
+
+		with patch.object(update_entries_after, "write_batch_size", write_batch_size), patch.object(
+			frappe.db, "sql", wraps=frappe.db.sql
+		) as sql:
+			update_entries_after(args)
+
+		return sql.call_count
+
+	def assertLedgerIsConsistent(self, ledger):
+		qty = stock_value = 0.0
+		for sle in ledger:
+			qty += flt(sle.actual_qty)
+			stock_value += flt(sle.stock_value_difference)
+			self.assertAlmostEqual(flt(sle.qty_after_transaction), qty, 6)
+			self.assertAlmostEqual(flt(sle.stock_value), stock_value, 2)
+
+	def test_buffered_repost_matches_write_through(self):
+		item_code = self.make_item(properties={"valuation_method": "FIFO"}).name
+		start = self.make_ledger(item_code)
+
+		# backdated receipt changes the valuation of every later entry
+		make_stock_entry(
+			item_code=item_code,
+			to_warehouse=self.WAREHOUSE,
+			qty=7,
+			rate=3,
+			posting_date=add_days(start, -1),
+		)
+
+		# each path reposts a cleared ledger, the buffered one first
+		self.clear_valuation(item_code, start)
+		buffered_queries = self.repost(item_code, start, 500)
+		buffered_ledger = self.get_ledger(item_code)
+		buffered_bin = self.get_bin(item_code)
+
+		self.clear_valuation(item_code, start)
+		unbuffered_queries = self.repost(item_code, start, 0)
+		expected_ledger = self.get_ledger(item_code)
+
+		self.assertLedgerIsConsistent(expected_ledger)
+		self.assertEqual(buffered_ledger, expected_ledger)
+		self.assertEqual(
+			buffered_bin,
+			frappe._dict(
+				actual_qty=expected_ledger[-1].qty_after_transaction,
+				stock_value=expected_ledger[-1].stock_value,
+				valuation_rate=expected_ledger[-1].valuation_rate,
+			),
+		)
+		self.assertEqual(self.get_bin(item_code), buffered_bin)
+		self.assertLess(buffered_queries, unbuffered_queries)
+
+	@unittest.skipUnless(
+		os.environ.get("ERPNEXT_RUN_BENCHMARKS"), "set ERPNEXT_RUN_BENCHMARKS=1 to run benchmarks"
+	)
+	def test_repost_wall_time(self):
+		item_code = self.make_item(properties={"valuation_method": "FIFO"}).name
+		start = self.make_ledger(item_code, entries=200)
+
+		timings = {}
+		for label, write_batch_size in (("buffered", 500), ("unbuffered", 0)):
+			for _ in range(3):
+				self.clear_valuation(item_code, start)
+				started = time.perf_counter()
+				self.repost(item_code, start, write_batch_size)
+				elapsed = time.perf_counter() - started
+				timings[label] = min(timings.get(label, elapsed), elapsed)
+
+		print(
+			"\nrepost of 200 entries: buffered {buffered:.3f}s, unbuffered {unbuffered:.3f}s".format(
+				**timings
+			)
+		)
+		# timings vary on shared runners, only catch a buffered repost that got much slower
+		self.assertLess(timings["buffered"], timings["unbuffered"] * 2)
@@ -1,14 +1,29 @@
 import json
+import os
+import time
 import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
 
 import frappe
 from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, today
 from hypothesis import given
 from hypothesis import strategies as st
 
 from erpnext.stock.doctype.item.test_item import make_item
 from erpnext.stock.doctype.stock_entry.stock_entry_utils import make_stock_entry
-from erpnext.stock.valuation import FIFOValuation, LIFOValuation, round_off_if_near_zero
+from erpnext.stock.stock_ledger import update_entries_after
+from erpnext.stock.valuation import (
+	CompactFIFOValuation,
+	CompactLIFOValuation,
+	FIFOValuation,
+	LIFOValuation,
+	dumps_queue,
+	get_moving_average_chain,
+	loads_queue,
+	round_off_if_near_zero,
+)
 
 qty_gen = st.floats(min_value=-1e6, max_value=1e6)
 value_gen = st.floats(min_value=1, max_value=1e6)
@@ -321,6 +336,175 @@ class TestLIFOValuation(unittest.TestCase):
 			self.assertTotalValue(total_value)
 
 
+class TestCompactValuation(unittest.TestCase):
+	def replay(self, queues, stock_queue, outgoing_rate=0.0):
+		"Apply the same moves to all queues, they must stay identical."
+		for qty, rate in stock_queue:
+			if round_off_if_near_zero(qty) == 0:
+				continue
+			if qty > 0:
+				results = [queue.add_stock(qty, rate) for queue in queues]
+			else:
+				results = [queue.remove_stock(abs(qty), outgoing_rate, lambda: rate) for queue in queues]
+
+			self.assertEqual(results[0], results[1])
+			self.assertEqual(queues[0].state, queues[1].state)
+			self.assertEqual(queues[0].get_total_stock_and_value(), queues[1].get_total_stock_and_value())
+
+	@given(stock_queue_generator, st.sampled_from([0.0, 1.0, 10.0]))
+	def test_fifo_matches_list_queue(self, stock_queue, outgoing_rate):
+		self.replay([FIFOValuation([]), CompactFIFOValuation()], stock_queue, outgoing_rate)
+
+	@given(stock_queue_generator)
+	def test_lifo_matches_list_queue(self, stock_queue):
+		self.replay([LIFOValuation([]), CompactLIFOValuation()], stock_queue)
+
+	def test_outgoing_rate_after_consumed_bins(self):
+		queue = CompactFIFOValuation([[1, 10], [2, 20], [3, 10]])
+		queue.remove_stock(1)
+		self.assertEqual(queue.remove_stock(2, outgoing_rate=10), [[2, 10]])
+		self.assertEqual(queue, [[2, 20], [1, 10]])
+
+	def test_dumps_and_loads(self):
+		state = [[1.5, 10.25], [2, 20], [-3, 7.125]]
+		for valuation_class in (CompactFIFOValuation, CompactLIFOValuation):
+			queue = loads_queue(dumps_queue(valuation_class(state)), valuation_class)
+			self.assertIsInstance(queue, valuation_class)
+			self.assertEqual(queue, state)
+
+		# plain JSON, as stored in the stock ledger, is read as well
+		self.assertEqual(loads_queue(json.dumps(state)), state)
+		self.assertEqual(loads_queue(dumps_queue([])), [])
+		self.assertEqual(loads_queue(None), [])
+
+
+class TestMovingAverageChain(unittest.TestCase):
+	@given(
+		st.floats(min_value=-10, max_value=1e3),
+		value_gen,
+		st.lists(st.tuples(qty_gen, value_gen, st.sampled_from([0.0, 5.0])), min_size=1),
+	)
+	def test_chain_matches_moving_average_values(self, qty, rate, moves):
+		actual_qty, incoming_rate, outgoing_rate = zip(*moves)
+		qtys, rates = get_moving_average_chain(qty, rate, actual_qty, incoming_rate, outgoing_rate)
+
+		# replay through the entry-by-entry path until the qty goes negative
+		state = SimpleNamespace(wh_data=frappe._dict(qty_after_transaction=qty, valuation_rate=rate))
+		expected_qtys, expected_rates = [], []
+		for in_qty, in_rate, out_rate in moves:
+			if state.wh_data.qty_after_transaction + in_qty < 0:
+				break
+
+			sle = frappe._dict(actual_qty=in_qty, incoming_rate=in_rate, outgoing_rate=out_rate)
+			update_entries_after.get_moving_average_values(state, sle)
+			state.wh_data.qty_after_transaction += in_qty
+			expected_qtys.append(state.wh_data.qty_after_transaction)
+			expected_rates.append(state.wh_data.valuation_rate)
+
+		self.assertEqual(qtys, expected_qtys)
+		self.assertEqual(rates, expected_rates)
+
+
+class TestMovingAverageRepost(FrappeTestCase):
+	WAREHOUSE = "_Test Warehouse - _TC"
+
+	def test_columnar_repost_matches_process_sle(self):
+		item_code = make_item(properties={"valuation_method": "Moving Average"}).name
+		start = add_days(today(), -40)
+		for i in range(30):
+			kwargs = {"item_code": item_code, "qty": 3 + i % 4, "posting_date": add_days(start, i)}
+			if i % 3 == 2:
+				make_stock_entry(from_warehouse=self.WAREHOUSE, **kwargs)
+			else:
+				make_stock_entry(to_warehouse=self.WAREHOUSE, rate=10 + i * 1.37, **kwargs)
+
+		def repost(columnar):
+			with patch.object(update_entries_after, "columnar_moving_average", columnar):
+				update_entries_after(
+					{
+						"item_code": item_code,
+						"warehouse": self.WAREHOUSE,
+						"posting_date": start,
+						"posting_time": "00:00",
+					}
+				)
+
+			return frappe.get_all(
+				"Stock Ledger Entry",
+				filters={"item_code": item_code, "warehouse": self.WAREHOUSE, "is_cancelled": 0},
+				fields=["qty_after_transaction", "valuation_rate", "stock_value", "stock_value_difference"],
+				order_by="posting_datetime, creation",
+			)
+
+		# a backdated receipt changes the rate of every later entry
+		make_stock_entry(
+			item_code=item_code,
+			to_warehouse=self.WAREHOUSE,
+			qty=7,
+			rate=3.5,
+			posting_date=add_days(start, 1),
+		)
+		self.assertEqual(repost(columnar=True), repost(columnar=False))
+
+
+@unittest.skipUnless(
+	os.environ.get("ERPNEXT_RUN_BENCHMARKS"), "set ERPNEXT_RUN_BENCHMARKS=1 to run benchmarks"
+)
+class TestValuationQueueBenchmark(unittest.TestCase):
+	"""Microbenchmarks of the list and array backed queues.
+
+	Timings are printed; the assertions only catch large regressions, as shared
+	runners are too noisy for tight ratios.
+	"""
+
+	BINS = 20_000
+
+	def time(self, fn, repeat=3):
+		best = None
+		for _ in range(repeat):
+			started = time.perf_counter()
+			result = fn()
+			elapsed = time.perf_counter() - started
+			best = elapsed if best is None else min(best, elapsed)
+
+		return result, best
+
+	def long_queue(self):
+		# thousands of small receipts at distinct rates
+		return [[float(1 + i % 5), 10.0 + (i % 997) / 100] for i in range(self.BINS)]
+
+	def test_long_queue_consumption(self):
+		def consume(valuation_class):
+			queue = valuation_class(self.long_queue())
+			for _ in range(self.BINS // 2):
+				queue.remove_stock(4)
+			return queue.state
+
+		expected, list_time = self.time(lambda: consume(FIFOValuation))
+		result, compact_time = self.time(lambda: consume(CompactFIFOValuation))
+
+		print(f"\nconsumption: list {list_time:.3f}s, compact {compact_time:.3f}s")
+		self.assertEqual(result, expected)
+		self.assertLess(compact_time, list_time * 2)
+
+	def test_serialisation(self):
+		state = self.long_queue()
+		queue = CompactFIFOValuation(state)
+
+		dumped_json, json_dump_time = self.time(lambda: json.dumps(state))
+		_, json_load_time = self.time(lambda: FIFOValuation(json.loads(dumped_json)))
+		dumped, dump_time = self.time(lambda: dumps_queue(queue))
+		loaded, load_time = self.time(lambda: loads_queue(dumped))
+
+		print(
+			f"\nserialisation: json {json_dump_time + json_load_time:.3f}s, "
+			f"compact {dump_time + load_time:.3f}s"
+		)
+		self.assertEqual(loaded.state, state)
+		self.assertLess(len(dumped), len(dumped_json))
+		self.assertLess(dump_time + load_time, (json_dump_time + json_load_time) * 2)
+
+
 class TestLIFOValuationSLE(FrappeTestCase):
 	ITEM_CODE = "_Test LIFO item"
 	WAREHOUSE = "_Test Warehouse - _TC"
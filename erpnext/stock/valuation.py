@@ -1,5 +1,11 @@
+import base64
+import json
+import sys
+import zlib
 from abc import ABC, abstractmethod, abstractproperty
-from typing import Callable, List, NewType, Optional, Tuple
+from array import array
+from itertools import accumulate
+from typing import Callable, List, NewType, Optional, Tuple, Union
 
 from frappe.utils import flt
 
@@ -9,6 +15,9 @@ StockBin = NewType("StockBin", List[float])  # [[qty, rate], ...]
 QTY = 0
 RATE = 1
 
+# Prefix of queues serialised with `dumps_queue`, plain JSON queues start with "["
+PACKED_QUEUE_PREFIX = "z:"
+
 
 class BinWiseValuation(ABC):
 	@abstractmethod
@@ -244,6 +253,228 @@ class LIFOValuation(BinWiseValuation):
 		return consumed_bins
 
 
+class CompactBinWiseValuation(BinWiseValuation):
+	"""Bin-wise valuation with the bins kept in two arrays of doubles.
+
+	Same behaviour as the list based implementations, but a bin takes 16 bytes
+	instead of a list with two float objects and the whole queue can be dumped
+	and loaded as raw bytes. Consumed bins at the front are skipped by moving
+	`head` and only reclaimed once they make up half of the arrays, so FIFO
+	consumption does not shift the queue on every bin.
+	"""
+
+	__slots__ = ["qty", "rate", "head"]
+
+	def __init__(self, state: Optional[List[StockBin]] = None):
+		self.qty = array("d")
+		self.rate = array("d")
+		self.head = 0
+
+		for qty, rate in state or []:
+			self.qty.append(qty)
+			self.rate.append(rate)
+
+	@property
+	def state(self) -> List[StockBin]:
+		"""Current bins as a new list of [qty, rate]."""
+		return [[qty, rate] for qty, rate in zip(self.qty[self.head :], self.rate[self.head :])]
+
+	def __len__(self):
+		return len(self.qty) - self.head
+
+	def __iter__(self):
+		return iter(self.state)
+
+	def get_total_stock_and_value(self) -> Tuple[float, float]:
+		total_qty = 0.0
+		total_value = 0.0
+
+		for i in range(self.head, len(self.qty)):
+			total_qty += self.qty[i]
+			total_value += self.qty[i] * self.rate[i]
+
+		return round_off_if_near_zero(total_qty), round_off_if_near_zero(total_value)
+
+	def add_stock(self, qty: float, rate: float) -> None:
+		"""Add stock at the end, merging it into the last bin if the rate is the same."""
+		if not len(self):
+			self._append(0, 0)
+
+		last = len(self.qty) - 1
+		if self.rate[last] == rate:
+			self.qty[last] += qty
+		elif self.qty[last] > 0:
+			self._append(qty, rate)
+		else:  # negative balance qty
+			qty = self.qty[last] + qty
+			self.qty[last] = qty
+			if qty > 0:  # new balance qty is positive
+				self.rate[last] = rate
+
+	def remove_stock(
+		self, qty: float, outgoing_rate: float = 0.0, rate_generator: Callable[[], float] = None
+	) -> List[StockBin]:
+		if not rate_generator:
+			rate_generator = lambda: 0.0  # noqa
+
+		consumed_bins = []
+		while qty:
+			if not len(self):
+				# rely on rate generator.
+				self._append(0, rate_generator())
+
+			index = self._get_bin_to_consume(outgoing_rate)
+			bin_qty, bin_rate = self.qty[index], self.rate[index]
+			if qty >= bin_qty:
+				# consume current bin
+				qty = round_off_if_near_zero(qty - bin_qty)
+				self._remove(index)
+				consumed_bins.append([bin_qty, bin_rate])
+
+				if not len(self) and qty:
+					# stock finished, negative stock, keep in as a negative bin
+					self._append(-qty, outgoing_rate or bin_rate)
+					consumed_bins.append([qty, outgoing_rate or bin_rate])
+					break
+			else:
+				# qty found in current bin consume it and exit
+				self.qty[index] = round_off_if_near_zero(bin_qty - qty)
+				consumed_bins.append([qty, bin_rate])
+				qty = 0
+
+		return consumed_bins
+
+	@abstractmethod
+	def _get_bin_to_consume(self, outgoing_rate: float) -> int:
+		pass
+
+	def _append(self, qty: float, rate: float) -> None:
+		self.qty.append(qty)
+		self.rate.append(rate)
+
+	def _remove(self, index: int) -> None:
+		if index == self.head:
+			self.head += 1
+			if self.head * 2 >= len(self.qty):
+				del self.qty[: self.head]
+				del self.rate[: self.head]
+				self.head = 0
+		elif index == len(self.qty) - 1:
+			self.qty.pop()
+			self.rate.pop()
+		else:
+			del self.qty[index]
+			del self.rate[index]
+
+	def to_bytes(self) -> bytes:
+		"""All quantities followed by all rates as little-endian doubles."""
+		data = self.qty[self.head :] + self.rate[self.head :]
+		if sys.byteorder == "big":
+			data.byteswap()
+		return data.tobytes()
+
+	@classmethod
+	def from_bytes(cls, data: bytes) -> "CompactBinWiseValuation":
+		values = array("d")
+		values.frombytes(data)
+		if sys.byteorder == "big":
+			values.byteswap()
+
+		valuation = cls()
+		size = len(values) // 2
+		valuation.qty = values[:size]
+		valuation.rate = values[size:]
+		return valuation
+
+
+class CompactFIFOValuation(CompactBinWiseValuation):
+	"""Array backed `FIFOValuation`."""
+
+	__slots__ = []
+
+	def _get_bin_to_consume(self, outgoing_rate: float) -> int:
+		if outgoing_rate > 0:
+			# bin with the outgoing rate, else first in first out
+			try:
+				return self.rate.index(outgoing_rate, self.head)
+			except ValueError:
+				pass
+
+		return self.head
+
+
+class CompactLIFOValuation(CompactBinWiseValuation):
+	"""Array backed `LIFOValuation`, the outgoing rate is ignored."""
+
+	__slots__ = []
+
+	def _get_bin_to_consume(self, outgoing_rate: float) -> int:
+		return len(self.qty) - 1
+
+
+def dumps_queue(queue: Union[List[StockBin], CompactBinWiseValuation]) -> str:
+	"""Serialise a queue compactly: zlib compressed columns of doubles, base64 encoded.
+
+	Storing all quantities before all rates puts similar values next to each
+	other, which compresses long queues to a fraction of their JSON size.
+	"""
+	if not isinstance(queue, CompactBinWiseValuation):
+		queue = CompactFIFOValuation(queue)
+
+	return PACKED_QUEUE_PREFIX + base64.b64encode(zlib.compress(queue.to_bytes())).decode()
+
+
+def loads_queue(
+	data: Optional[str], valuation_class: type = CompactFIFOValuation
+) -> CompactBinWiseValuation:
+	"""Load a queue written by `dumps_queue` or as JSON, like `Stock Ledger Entry.stock_queue`."""
+	if data and data.startswith(PACKED_QUEUE_PREFIX):
+		return valuation_class.from_bytes(
+			zlib.decompress(base64.b64decode(data[len(PACKED_QUEUE_PREFIX) :]))
+		)
+
+	return valuation_class(json.loads(data or "[]"))
+
+
+def get_moving_average_chain(
+	qty: float,
+	valuation_rate: float,
+	actual_qty: List[float],
+	incoming_rate: List[float],
+	outgoing_rate: List[float],
+) -> Tuple[List[float], List[float]]:
+	"""Qty after transaction and moving average rate after each entry of a chain.
+
+	Columnar equivalent of `update_entries_after.get_moving_average_values` for
+	entries without serial nos, batches or rates recomputed from transactions.
+	Quantities are a running sum, so only the rate needs a pass over the entries.
+	Stops before the first entry that takes the qty below zero, which needs the
+	fallback rates of the entry-by-entry path.
+	"""
+	qtys = list(accumulate(actual_qty, initial=qty))
+	rates = []
+	for prev_qty, new_qty, in_qty, in_rate, out_rate in zip(
+		qtys, qtys[1:], actual_qty, incoming_rate, outgoing_rate
+	):
+		if new_qty < 0:
+			break
+
+		if in_qty > 0:
+			if prev_qty <= 0:
+				valuation_rate = in_rate
+			else:
+				valuation_rate = (prev_qty * valuation_rate + in_qty * in_rate) / new_qty
+		elif out_rate:
+			if new_qty:
+				valuation_rate = (prev_qty * valuation_rate + in_qty * out_rate) / new_qty
+			else:
+				valuation_rate = out_rate
+
+		rates.append(valuation_rate)
+
+	return qtys[1 : len(rates) + 1], rates
+
+
 def round_off_if_near_zero(number: float, precision: int = 7) -> float:
 	"""Rounds off the number to zero only if number is close to zero for decimal
 	specified in precision. Precision defaults to 7.